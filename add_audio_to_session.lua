@@ -18,14 +18,28 @@ reaper.ShowConsoleMsg("Original name: " .. original_name .. "\n")
 -- DEBUG: Logs en consola (sin cuadros de diálogo)
 -- Para ver logs: Extensions > ReaScript > Show console output
 
+-- Modo sin diálogos: lo activa reaper_worker.lua, que lee el error de ExtState
+local headless = reaper.GetExtState("AudioPro", "headless") == "1"
+
+local function show_message(msg, title)
+    if headless then
+        reaper.ShowConsoleMsg(title .. ": " .. msg .. "\n")
+        if title == "AudioPro Error" then
+            reaper.SetExtState("AudioPro", "last_error", msg, false)
+        end
+    else
+        reaper.MB(msg, title, 0)
+    end
+end
+
 if audio_file == "" or session_name == "" or template_path == "" then
-    reaper.MB("Error: Faltan parámetros (archivo de audio, sesión y template)", "AudioPro Error", 0)
+    show_message("Error: Faltan parámetros (archivo de audio, sesión y template)", "AudioPro Error")
     return
 end
 
 -- Verificar que el archivo de audio existe
 if not reaper.file_exists(audio_file) then
-    reaper.MB("Error: El archivo de audio no existe: " .. audio_file, "AudioPro Error", 0)
+    show_message("Error: El archivo de audio no existe: " .. audio_file, "AudioPro Error")
     return
 end
 
@@ -47,16 +61,16 @@ if file then
     reaper.ShowConsoleMsg("Header WAVE: " .. (wave or "null") .. "\n")
     
     if size < 1000 then
-        reaper.MB("Error: El archivo de audio está vacío o es demasiado pequeño: " .. size .. " bytes", "AudioPro Error", 0)
+        show_message("Error: El archivo de audio está vacío o es demasiado pequeño: " .. size .. " bytes", "AudioPro Error")
         return
     end
     
     if riff ~= "RIFF" or wave ~= "WAVE" then
-        reaper.MB("Error: El archivo no es un WAV válido. Header: " .. (riff or "null") .. " " .. (wave or "null"), "AudioPro Error", 0)
+        show_message("Error: El archivo no es un WAV válido. Header: " .. (riff or "null") .. " " .. (wave or "null"), "AudioPro Error")
         return
     end
 else
-    reaper.MB("Error: No se pudo abrir el archivo de audio", "AudioPro Error", 0)
+    show_message("Error: No se pudo abrir el archivo de audio", "AudioPro Error")
     return
 end
 
@@ -90,14 +104,14 @@ else
         -- Usar la copia para insertar
         audio_file = audio_copy
     else
-        reaper.MB("Error: No se pudo copiar el archivo de audio a " .. audio_copy, "AudioPro Error", 0)
+        show_message("Error: No se pudo copiar el archivo de audio a " .. audio_copy, "AudioPro Error")
         return
     end
 end
 
 -- Verificar que el template existe
 if not reaper.file_exists(template_path) then
-    reaper.MB("Error: Template no encontrado: " .. template_path, "AudioPro Error", 0)
+    show_message("Error: Template no encontrado: " .. template_path, "AudioPro Error")
     return
 end
 
@@ -117,7 +131,7 @@ reaper.Main_SaveProjectEx(0, session_name, 0)
 if reaper.file_exists(session_name) then
     reaper.ShowConsoleMsg("Sesión guardada exitosamente\n")
 else
-    reaper.MB("Error: No se pudo verificar que la sesión se guardó: " .. session_name, "AudioPro Error", 0)
+    show_message("Error: No se pudo verificar que la sesión se guardó: " .. session_name, "AudioPro Error")
     return
 end
 
@@ -147,10 +161,10 @@ for i = 0, track_count - 1 do
 end
 
 -- DEBUG: Mostrar lista de pistas
-reaper.MB(tracks_list, "AudioPro Debug - Pistas", 0)
+show_message(tracks_list, "AudioPro Debug - Pistas")
 
 if not track then
-    reaper.MB("Error: No se encontró la pista 'Clase'", "AudioPro Error", 0)
+    show_message("Error: No se encontró la pista 'Clase'", "AudioPro Error")
     reaper.ShowConsoleMsg("ERROR: No se encontró la pista 'Clase'\n")
     return
 end
@@ -248,23 +262,38 @@ if item then
         -- Guardar sesión antes de renderizar
         reaper.Main_SaveProjectEx(0, session_name, 0)
         
+        -- Testigo de fin de render: AudioPro lo espera en lugar de adivinar con pausas fijas
+        local sentinel_file = session_dir .. "/" .. original_name .. "_renderizado.done"
+        os.remove(sentinel_file)
+        
         -- Renderizar usando el comando correcto
         reaper.Main_OnCommand(41824, 0) -- File: Render project, using the most recent render settings
         
+        -- El render es síncrono: al volver, el WAV ya está cerrado
+        local sentinel = io.open(sentinel_file, "w")
+        if sentinel then
+            local render_ok = reaper.file_exists(output_file)
+            sentinel:write("status=" .. (render_ok and "ok" or "missing") .. "\n")
+            sentinel:write("render=" .. output_file .. "\n")
+            sentinel:write("finished=" .. os.date("%Y-%m-%dT%H:%M:%S") .. "\n")
+            sentinel:close()
+            reaper.ShowConsoleMsg("Testigo de render escrito: " .. sentinel_file .. "\n")
+        end
+        
         reaper.ShowConsoleMsg("=== Proceso completado exitosamente ===\n")
         reaper.ShowConsoleMsg("Reaper permanecerá abierto para revisar el resultado\n")
         
         -- NO cerrar Reaper automáticamente - dejar abierto para revisión
         -- El archivo renderizado se creará en: output_file
         else
-            reaper.MB("Error: El source PCM tiene duración 0", "AudioPro Error", 0)
+            show_message("Error: El source PCM tiene duración 0", "AudioPro Error")
             reaper.ShowConsoleMsg("ERROR: source_length = 0\n")
         end
     else
-        reaper.MB("Error: No se pudo crear PCM_Source desde el archivo", "AudioPro Error", 0)
+        show_message("Error: No se pudo crear PCM_Source desde el archivo", "AudioPro Error")
         reaper.ShowConsoleMsg("ERROR: PCM_Source_CreateFromFile falló\n")
     end
 else
-    reaper.MB("Error: No se pudo crear ítem en la pista", "AudioPro Error", 0)
+    show_message("Error: No se pudo crear ítem en la pista", "AudioPro Error")
     reaper.ShowConsoleMsg("ERROR: AddMediaItemToTrack falló\n")
 end
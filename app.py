@@ -1,411 +1,69 @@
 """
 AudioPro v1.7 - Integración con Reaper
-Este archivo implementa el flujo completo con Reaper para procesamiento profesional
+Este archivo implementa la interfaz de Streamlit; el flujo de procesamiento está en pipeline.py
 """
 
 import os
 import streamlit as st
-import tempfile
-import subprocess
-import shutil
-from datetime import datetime
-from typing import Optional
+import threading
+from typing import Callable, Optional
 from audio_utils import (
-    get_bytes_from_local_path,
-    get_bytes_from_drive,
-    extract_audio_wav16_mono,
-    run_ffmpeg,
-    is_audio_only_file,
-    process_audio_with_elevenlabs,
     register_user_session,
-    display_user_stats
+    display_user_stats,
+    get_source_from_drive,
+    get_source_from_local_path,
+    IsolationDeferredError
+)
+from media_source import UploadSource
+from batch_executor import run_batch
+from isolation_cache import get_isolation_cache
+from isolation_client import get_isolation_client
+from job_journal import get_job_journal
+from drive_ingest import DRIVE_DOWNLOAD_WORKERS, get_drive_downloader, prefetch_drive_sources
+from reaper_worker import get_reaper_worker_host
+from telemetry import get_telemetry, new_batch_id
+from pipeline import (
+    MAX_WORKERS,
+    MEDIA_EXTENSIONS,
+    PIPELINE_VERSION,
+    REAPER_EXE,
+    REAPER_MODE,
+    REAPER_SESSIONS_DIR,
+    REAPER_TEMPLATE,
+    RENDER_BACKEND,
+    STAGE_QUEUE_SIZE,
+    STAGE_WORKERS,
+    build_staged_pipeline,
+    new_pipeline_job,
+    process_with_reaper_pipeline,
+    reject_invalid_inputs,
+    test_reaper_script,
 )
 
-##############################
-# Configuración / Parámetros #
-##############################
 APP_TITLE = "🎵 AudioPro v1.7 - Reaper Edition"
-PIPELINE_VERSION = "v1.7.0"
-
-# Rutas de Reaper
-REAPER_EXE = r"C:\Program Files\REAPER (x64)\reaper.exe"
-REAPER_TEMPLATE = r"F:\00\00 Reaper\00 Voces.rpp"
-REAPER_SESSIONS_DIR = r"F:\00\00 Reaper\Procesados"
-
-# Límite de archivos
-MAX_FILE_MB = int(os.getenv("MAX_FILE_MB", "800"))
-MAX_WORKERS = int(os.getenv("MAX_WORKERS", "2"))
-
-# ElevenLabs
-try:
-    ELEVENLABS_API_KEY = st.secrets.get("elevenlabs", {}).get("api_key")
-    ELEVENLABS_BASE_URL = st.secrets.get("elevenlabs", {}).get("base_url")
-except Exception:
-    ELEVENLABS_API_KEY = None
-    ELEVENLABS_BASE_URL = None
-
-#########################
-# Funciones de Reaper #
-#########################
-
-
-def create_reaper_session_from_template(
-    template_path: str,
-    session_name: str,
-    audio_file: str,
-    output_dir: str
-) -> str:
-    """Crea una nueva sesión de Reaper a partir del template.
-
-    Args:
-        template_path: Ruta al template .rpp
-        session_name: Nombre para la nueva sesión
-        audio_file: Ruta al archivo de audio a procesar
-        output_dir: Directorio donde guardar la sesión
-
-    Returns:
-        Ruta al archivo .rpp de la nueva sesión
-    """
-    # Crear directorio de sesión
-    session_dir = os.path.join(output_dir, session_name)
-    os.makedirs(session_dir, exist_ok=True)
-
-    # Leer template
-    with open(template_path, 'r', encoding='utf-8', errors='ignore') as f:
-        template_content = f.read()
-
-    # Modificar template para la nueva sesión
-    # Actualizar RENDER_FILE path
-    new_render_path = os.path.join(session_dir, session_name)
-    template_content = template_content.replace(
-        'RENDER_FILE "F:\\CURSOS\\2025\\Q2\\2505_php\\Prueba Reaper"',
-        f'RENDER_FILE "{new_render_path}"'
-    )
-
-    # Guardar nueva sesión
-    new_session_path = os.path.join(session_dir, f"{session_name}.rpp")
-    with open(new_session_path, 'w', encoding='utf-8') as f:
-        f.write(template_content)
-
-    return new_session_path
 
+# Tipo MIME de los entregables adicionales (deliverables.py) para el botón de descarga
+DELIVERABLE_MIME = {'.wav': 'audio/wav', '.mp3': 'audio/mpeg', '.mp4': 'video/mp4', '.m4a': 'audio/mp4'}
 
-def test_reaper_script():
-    """Función de prueba para verificar que Reaper funciona correctamente."""
-    lua_script = os.path.join(os.path.dirname(__file__), "test_reaper.lua")
-    
-    if not os.path.exists(lua_script):
-        st.error("❌ Script de prueba no encontrado")
-        return
 
-    # Ejecutar script de prueba
-    cmd = [
-        REAPER_EXE,
-        '-nosplash',
-        lua_script,
-        "test_audio.wav",
-        "F:\\00\\00 Reaper\\test_session.rpp"
-    ]
+def _streamlit_thread_initializer() -> Optional[Callable[[], None]]:
+    """Retorna un inicializador que propaga el contexto de Streamlit a los hilos del pool.
 
-    try:
-        result = subprocess.run(cmd, capture_output=True, text=True, timeout=60)
-        st.info(f"Resultado: {result.returncode}")
-        st.info(f"Salida: {result.stdout}")
-        if result.stderr:
-            st.error(f"Error: {result.stderr}")
-    except Exception as e:
-        st.error(f"❌ Error ejecutando prueba: {e}")
-
-
-def add_audio_to_reaper_session(session_path: str, audio_file: str, original_name: str = None):
-    """Agrega un archivo de audio a una sesión de Reaper usando ReaScript Lua.
-
-    Args:
-        session_path: Ruta al archivo .rpp de la sesión
-        audio_file: Ruta al archivo de audio a agregar
-        original_name: Nombre original del archivo (sin extensión)
+    Sin el contexto, los mensajes st.* emitidos desde los workers se pierden.
     """
-    # Usar el script Lua estático
-    lua_script = os.path.abspath(os.path.join(os.path.dirname(__file__), "add_audio_to_session.lua"))
-    if not os.path.exists(lua_script):
-        st.error("❌ Script Lua no encontrado: add_audio_to_session.lua")
-        return
-
-    # Crear script temporal que establece ExtState y ejecuta el script principal
-    # Según documentación: usar SetExtState para pasar parámetros
-    temp_script = tempfile.NamedTemporaryFile(
-        mode='w',
-        suffix='.lua',
-        delete=False,
-        encoding='utf-8'
-    )
-
-    # Convertir rutas a formato compatible con Lua (usar / en lugar de \)
-    lua_script_path = lua_script.replace('\\', '/')
-    audio_file_path = audio_file.replace('\\', '/')
-    session_path_path = session_path.replace('\\', '/')
-    template_path = REAPER_TEMPLATE.replace('\\', '/')
-    
-    # Usar el nombre original proporcionado o fallback al nombre del audio_file
-    if not original_name:
-        original_name = os.path.splitext(os.path.basename(audio_file))[0]
-
-    temp_script.write(f"""
--- Script temporal para pasar parámetros usando ExtState
--- Según documentación de ReaScript: https://www.reaper.fm/sdk/reascript/reascript.php
-
--- Establecer parámetros usando ExtState
-reaper.SetExtState("AudioPro", "audio_file", [[{audio_file_path}]], false)
-reaper.SetExtState("AudioPro", "session_name", [[{session_path_path}]], false)
-reaper.SetExtState("AudioPro", "template_path", [[{template_path}]], false)
-reaper.SetExtState("AudioPro", "original_name", [[{original_name}]], false)
-
--- Ejecutar el script principal
-dofile([[{lua_script_path}]])
-
--- Limpiar ExtState
-reaper.DeleteExtState("AudioPro", "audio_file", false)
-reaper.DeleteExtState("AudioPro", "session_name", false)
-reaper.DeleteExtState("AudioPro", "template_path", false)
-reaper.DeleteExtState("AudioPro", "original_name", false)
-""")
-    temp_script.close()
-
-    # Ejecutar ReaScript según documentación
-    cmd = [
-        REAPER_EXE,
-        '-nosplash',
-        temp_script.name
-    ]
-
     try:
-        # Ejecutar Reaper en background para que permanezca abierto
-        process = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
-        
-        # Esperar un poco para que Reaper inicie y ejecute el script
-        import time
-        time.sleep(5)  # Esperar 5 segundos para que el script se ejecute
-        
-        # Verificar si el proceso sigue corriendo
-        if process.poll() is None:
-            st.success("✅ Audio agregado a sesión de Reaper - Reaper permanecerá abierto")
-        else:
-            # Si terminó, verificar el código de salida
-            stdout, stderr = process.communicate()
-            if process.returncode != 0:
-                st.error(f"❌ Error ejecutando ReaScript: {stderr}")
-            else:
-                st.success("✅ Audio agregado a sesión de Reaper")
-    except Exception as e:
-        st.error(f"❌ Error ejecutando ReaScript: {e}")
-    finally:
-        # Limpiar archivo temporal
-        try:
-            os.unlink(temp_script.name)
-        except Exception:
-            pass
-
-
-def get_audio_duration(audio_file: str) -> float:
-    """Obtiene la duración de un archivo de audio usando ffprobe.
-
-    Args:
-        audio_file: Ruta al archivo de audio
-
-    Returns:
-        Duración en segundos
-    """
-    cmd = [
-        'ffprobe', '-v', 'error', '-show_entries',
-        'format=duration', '-of',
-        'default=noprint_wrappers=1:nokey=1', audio_file
-    ]
-    result = subprocess.run(cmd, capture_output=True, text=True)
-    try:
-        return float(result.stdout.strip())
+        from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
     except Exception:
-        return 10.0  # Default 10 segundos
-
-
-def render_reaper_session(session_path: str, reaper_exe: str, original_name: str = None) -> str:
-    """El render ya se hace en add_audio_to_reaper_session, solo retorna la ruta esperada.
-
-    Args:
-        session_path: Ruta al archivo .rpp de la sesión
-        reaper_exe: Ruta al ejecutable de Reaper
-        original_name: Nombre original del archivo (sin extensión)
-
-    Returns:
-        Ruta al archivo renderizado
-    """
-    # El render ya se ejecutó en add_audio_to_reaper_session
-    # Solo retornamos la ruta esperada del archivo renderizado
-    session_dir = os.path.dirname(session_path)
-    
-    if original_name:
-        # Usar nombre original del archivo
-        output_file = os.path.join(session_dir, f"{original_name}_renderizado.wav")
-    else:
-        # Fallback al nombre de sesión
-        session_name = os.path.splitext(os.path.basename(session_path))[0]
-        output_file = os.path.join(session_dir, f"{session_name}_renderizado.wav")
-    
-    st.info(f"🔍 Buscando archivo renderizado en: {output_file}")
-    
-    # Verificar que el archivo existe
-    if os.path.exists(output_file):
-        st.success(f"✅ Render completado: {output_file}")
-        return output_file
-    else:
-        st.error(f"❌ Archivo renderizado no encontrado en: {output_file}")
-        # Listar archivos en el directorio para debug
-        if os.path.exists(session_dir):
-            files = os.listdir(session_dir)
-            st.info(f"📂 Archivos en {session_dir}: {files}")
         return None
 
+    ctx = get_script_run_ctx()
+    if ctx is None:
+        return None
 
-def process_with_reaper_pipeline(
-    file_bytes: bytes,
-    original_name: str,
-    source_dir: Optional[str] = None
-) -> dict:
-    """Pipeline completo con Reaper.
-
-    Args:
-        file_bytes: Bytes del archivo original
-        original_name: Nombre del archivo original
-        source_dir: Directorio de origen (opcional)
-
-    Returns:
-        Dict con información del archivo procesado
-    """
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    session_name = f"{os.path.splitext(original_name)[0]}_{timestamp}"
-
-    # 1) Guardar archivo original temporalmente
-    tmp_input = tempfile.NamedTemporaryFile(
-        delete=False,
-        suffix=os.path.splitext(original_name)[1]
-    ).name
-    with open(tmp_input, 'wb') as f:
-        f.write(file_bytes)
-
-    st.info(f"📁 Procesando: {original_name}")
-
-    # 2) Extraer audio
-    st.info("🎵 Extrayendo audio...")
-    audio_wav = extract_audio_wav16_mono(tmp_input)
-
-    # 3) ElevenLabs Audio Isolation
-    if ELEVENLABS_API_KEY and ELEVENLABS_BASE_URL:
-        st.info("🤖 Aplicando Audio Isolation (ElevenLabs)...")
-        st.info(f"📤 Enviando a ElevenLabs: {audio_wav}")
-        audio_wav_before = audio_wav
-        audio_wav = process_audio_with_elevenlabs(audio_wav)
-        if audio_wav != audio_wav_before:
-            st.success(f"✅ ElevenLabs procesó correctamente: {audio_wav}")
-        else:
-            st.warning("⚠️ ElevenLabs no procesó el audio - usando original")
-    else:
-        st.warning("⚠️ ElevenLabs no configurado - saltando Audio Isolation")
-
-    # 4) Crear directorio de sesiones si no existe
-    os.makedirs(REAPER_SESSIONS_DIR, exist_ok=True)
-    
-    # 5) Definir ruta de la nueva sesión
-    session_path = os.path.join(REAPER_SESSIONS_DIR, f"{session_name}.rpp")
-    
-    st.info(f"🎛️ Creando sesión de Reaper: {session_name}")
-    st.info(f"📁 Sesión se guardará en: {session_path}")
-    
-    # 6) Agregar audio a la sesión (esto crea la sesión desde el template)
-    st.info("📂 Agregando audio a sesión de Reaper...")
-    st.info(f"📤 Enviando a Reaper: {audio_wav}")
-    
-    # Obtener nombre original sin extensión para pasar a Reaper
-    original_name_clean = os.path.splitext(original_name)[0]
-    add_audio_to_reaper_session(session_path, audio_wav, original_name_clean)
-
-    # 7) Esperar a que Reaper termine el render
-    st.info("⚙️ Esperando a que Reaper complete el render...")
-    st.warning("⏰ Por favor, ten paciencia. El procesamiento con Reaper puede tomar varios minutos.")
-    
-    # Esperar hasta 10 minutos para que el archivo renderizado aparezca
-    session_dir = os.path.dirname(session_path)
-    expected_render = os.path.join(session_dir, f"{original_name_clean}_renderizado.wav")
-    
-    import time
-    max_wait = 600  # 10 minutos
-    elapsed = 0
-    check_interval = 5  # Verificar cada 5 segundos
-    
-    while elapsed < max_wait:
-        if os.path.exists(expected_render):
-            # Esperar un poco más para asegurar que el archivo esté completamente escrito
-            time.sleep(2)
-            st.success(f"✅ Render completado: {expected_render}")
-            rendered_audio = expected_render
-            break
-        time.sleep(check_interval)
-        elapsed += check_interval
-        if elapsed % 30 == 0:  # Mostrar progreso cada 30 segundos
-            st.info(f"⏳ Esperando render... ({elapsed}s / {max_wait}s)")
-    else:
-        st.error(f"❌ Timeout esperando el archivo renderizado: {expected_render}")
-        raise Exception("Timeout esperando render de Reaper")
-
-    # Verificar que el render fue exitoso
-    if not rendered_audio or not os.path.exists(rendered_audio):
-        st.error("❌ El render de Reaper no generó un archivo de salida")
-        raise Exception("Render de Reaper falló")
-
-    # 8) Determinar directorio de salida
-    if source_dir:
-        output_dir = os.path.join(source_dir, 'procesados')
-        os.makedirs(output_dir, exist_ok=True)
-    else:
-        output_dir = os.path.dirname(rendered_audio)
-
-    # 9) Procesar según tipo de archivo
-    is_video = not is_audio_only_file(tmp_input)
-
-    if is_video:
-        # Mux audio con video
-        st.info("🎬 Combinando audio procesado con video...")
-        base_name = os.path.splitext(original_name)[0]
-        final_out = os.path.join(output_dir, f"{base_name}_procesado.mp4")
-
-        cmd = [
-            'ffmpeg', '-y', '-i', tmp_input, '-i', rendered_audio,
-            '-c:v', 'copy', '-c:a', 'aac', '-b:a', '256k',
-            '-ar', '48000', '-map', '0:v:0', '-map', '1:a:0',
-            '-shortest', final_out
-        ]
-        run_ffmpeg(cmd)
-    else:
-        # Solo copiar audio procesado
-        base_name = os.path.splitext(original_name)[0]
-        ext = os.path.splitext(original_name)[1]
-        final_out = os.path.join(output_dir, f"{base_name}_procesado{ext}")
-        shutil.copy(rendered_audio, final_out)
-
-    # 9) Limpiar archivos temporales
-    try:
-        os.unlink(tmp_input)
-        os.unlink(audio_wav)
-    except Exception:
-        pass
-
-    st.success(f"✅ Procesado completado: {os.path.basename(final_out)}")
+    def _init():
+        add_script_run_ctx(threading.current_thread(), ctx)
 
-    return {
-        'original_name': original_name,
-        'output_file': final_out,
-        'reaper_session': session_path,
-        'is_video': is_video,
-        'is_local': source_dir is not None  # Indica si es archivo local
-    }
+    return _init
 
 
 def main():
@@ -445,8 +103,18 @@ def main():
         **Sesiones**: `{REAPER_SESSIONS_DIR}`
 
         **Reaper**: `{REAPER_EXE}`
+
+        **Render**: `{RENDER_BACKEND}`
         """)
 
+        if RENDER_BACKEND == "reaper" and REAPER_MODE == "worker":
+            worker = get_reaper_worker_host().stats()
+            st.markdown(f"**Worker:** {'🟢 Activo' if worker['alive'] else '⚪ Inactivo'}")
+            st.caption(
+                f"📥 {worker['queued']} en cola · ⚙️ {worker['working']} en proceso · "
+                f"✅ {worker['ok']} · ❌ {worker['failed']} · 🚀 {worker['launches']} arranque(s)"
+            )
+
         st.markdown("---")
         st.header("🤖 ElevenLabs")
 
@@ -458,9 +126,73 @@ def main():
         if st.button("🔄 Rehabilitar ElevenLabs"):
             st.session_state['disable_elevenlabs'] = False
             st.success("✅ ElevenLabs habilitado - Se aplicará Voice Isolator")
+
+        # Estado compartido del servicio (circuit breaker + límite de rate)
+        service = get_isolation_client().stats()
+        breaker = service['breaker']
+        bucket = service['bucket']
+        state_labels = {
+            'closed': "🟢 Disponible",
+            'half_open': "🟡 Probando",
+            'open': f"🔴 Circuito abierto (reintento en {breaker['retry_in_s']:.0f}s)"
+        }
+        st.markdown(f"**Servicio:** {state_labels[breaker['state']]}")
+        st.caption(
+            f"✅ {breaker['successes']} · ❌ {breaker['failures']} · "
+            f"⛔ {breaker['rejected']} rechazadas · 🔁 {breaker['opens']} aperturas"
+        )
+        pause = f" · pausa {bucket['paused_s']}s" if bucket['paused_s'] else ""
+        st.caption(
+            f"🪣 {bucket['tokens']} token(s) · {bucket['waits']} espera(s) ({bucket['wait_s']}s) · "
+            f"{bucket['penalties']} Retry-After{pause}"
+        )
+
+        # Caché de resultados de Audio Isolation
+        cache = get_isolation_cache()
+        if cache.enabled:
+            cache_stats = cache.stats()
+            col_hits, col_misses = st.columns(2)
+            col_hits.metric("Caché: aciertos", cache_stats['hits'])
+            col_misses.metric("Caché: fallos", cache_stats['misses'])
+            st.caption(
+                f"♻️ {cache_stats['entries']} entrada(s), "
+                f"{cache_stats['size_mb']} / {cache_stats['max_mb']} MB"
+            )
+
+        # Diario de trabajos: lotes interrumpidos se retoman por etapa
+        journal = get_job_journal()
+        if journal is not None:
+            journal_stats = journal.stats()
+            st.markdown("**Diario de trabajos**")
+            st.caption(
+                f"✅ {journal_stats['done']} terminado(s) · ⏸️ {journal_stats['running']} sin terminar · "
+                f"❌ {journal_stats['error']} con error · ↩️ {journal_stats['resumed']} retomado(s) "
+                f"({journal_stats['stages_skipped']} etapa(s) omitida(s))"
+            )
+            if st.button("🧹 Olvidar trabajos (reprocesar desde cero)"):
+                journal.clear()
+                st.success("✅ Diario vaciado - el próximo lote procesa todo desde cero")
             
         st.divider()
-        
+
+        # Paralelismo del lote
+        st.header("⚡ Procesamiento en lote")
+        st.slider(
+            "Archivos en paralelo",
+            min_value=1,
+            max_value=max(MAX_WORKERS, 8),
+            value=MAX_WORKERS,
+            key='max_workers'
+        )
+        st.radio(
+            "Modo de ejecución",
+            ["Por archivo", "Por etapas"],
+            key='execution_mode',
+            help="Por etapas solapa extracción, isolation, render y mux de archivos distintos"
+        )
+
+        st.divider()
+
         # Botón de prueba para Reaper
         if st.button("🧪 Probar Reaper"):
             test_reaper_script()
@@ -485,14 +217,14 @@ def main():
         st.markdown("### 📤 Subir Archivos Manualmente")
         uploaded_files = st.file_uploader(
             "Selecciona archivos",
-            type=['mp3', 'mp4', 'wav', 'avi', 'mov', 'mkv', 'm4a', 'flac'],
+            type=list(MEDIA_EXTENSIONS),
             accept_multiple_files=True
         )
 
         if uploaded_files:
             for f in uploaded_files:
                 files_to_process.append({
-                    'bytes': f.getbuffer(),
+                    'source': UploadSource(f, f.name),
                     'name': f.name,
                     'source_dir': None
                 })
@@ -506,15 +238,34 @@ def main():
 
         if drive_links and st.button("📥 Cargar desde Drive"):
             links_list = [link.strip() for link in drive_links.split('\n') if link.strip()]
+            drive_sources = []
             for link in links_list:
-                result = get_bytes_from_drive(link)
-                if result:
-                    file_bytes, file_name = result
-                    files_to_process.append({
-                        'bytes': file_bytes,
-                        'name': file_name,
-                        'source_dir': None
-                    })
+                source = get_source_from_drive(link)
+                if source:
+                    drive_sources.append(source)
+            # Las fuentes sobreviven al rerun del botón de procesar y las descargas
+            # empiezan ya, mientras se revisa el lote
+            # Las descargas de una carga anterior que no se procesó se liberan
+            for source in st.session_state.get('drive_sources', []):
+                source.cleanup()
+            st.session_state['drive_sources'] = drive_sources
+            queued = prefetch_drive_sources(drive_sources)
+            st.info(f"⬇️ {queued} descarga(s) en curso ({DRIVE_DOWNLOAD_WORKERS} en paralelo)")
+
+        for source in st.session_state.get('drive_sources', []):
+            files_to_process.append({
+                'source': source,
+                'name': source.name,
+                'source_dir': None
+            })
+
+        drive_stats = get_drive_downloader().stats()
+        if drive_stats['cache']['entries'] or drive_stats['downloads']:
+            st.caption(
+                f"♻️ Caché de Drive: {drive_stats['cache']['entries']} archivo(s), "
+                f"{drive_stats['cache']['size_mb']} / {drive_stats['cache']['max_mb']} MB · "
+                f"{drive_stats['cache']['hits']} acierto(s), {drive_stats['cache']['saved_mb']} MB sin descargar"
+            )
 
     with tab3:
         st.markdown("### 💾 Desde NAS/Ruta Local")
@@ -526,13 +277,12 @@ def main():
         if local_paths and st.button("📥 Cargar desde Rutas"):
             paths_list = [p.strip() for p in local_paths.split('\n') if p.strip()]
             for path in paths_list:
-                result = get_bytes_from_local_path(path)
-                if result:
-                    file_bytes, file_name, source_dir = result
+                source = get_source_from_local_path(path)
+                if source:
                     files_to_process.append({
-                        'bytes': file_bytes,
-                        'name': file_name,
-                        'source_dir': source_dir
+                        'source': source,
+                        'name': source.name,
+                        'source_dir': source.source_dir
                     })
 
     # Botón de procesamiento
@@ -541,49 +291,132 @@ def main():
         st.info(f"📋 {len(files_to_process)} archivo(s) listo(s) para procesar")
 
         if st.button("🎛️ Procesar con Reaper", type="primary"):
-            results = []
+            # Entradas ilegibles o sin audio se descartan antes de cualquier etapa cara
+            files_to_process, rejected = reject_invalid_inputs(files_to_process)
+            for item, reason in rejected:
+                st.error(f"🚫 {item['name']} rechazado: {reason}")
+            if not files_to_process:
+                st.stop()
+
+            # Las descargas de Drive corren en su propio pool, por delante del lote
+            prefetch_drive_sources([f['source'] for f in files_to_process])
 
             progress_bar = st.progress(0)
             status = st.empty()
+            max_workers = st.session_state.get('max_workers', MAX_WORKERS)
+            staged = st.session_state.get('execution_mode') == "Por etapas"
+            batch_id = new_batch_id()
+
+            def _on_result(entry, completed, total):
+                progress_bar.progress(completed / total)
+                status.info(
+                    f"Procesados {completed}/{total}: "
+                    f"{entry['item']['name']}"
+                )
 
-            for idx, file_data in enumerate(files_to_process):
-                progress = (idx + 1) / len(files_to_process)
-                progress_bar.progress(progress)
+            if staged:
+                stages = ", ".join(f"{name}={n}" for name, n in STAGE_WORKERS.items())
+                status.info(f"Procesando {len(files_to_process)} archivo(s) por etapas: {stages}")
+                pipeline = build_staged_pipeline(
+                    queue_size=STAGE_QUEUE_SIZE,
+                    thread_initializer=_streamlit_thread_initializer()
+                )
+                batch = pipeline.run(
+                    [
+                        new_pipeline_job(f['source'], f['name'], f['source_dir'], batch_id)
+                        for f in files_to_process
+                    ],
+                    on_result=_on_result
+                )
+            else:
                 status.info(
-                    f"Procesando {idx + 1}/{len(files_to_process)}: "
-                    f"{file_data['name']}"
+                    f"Procesando {len(files_to_process)} archivo(s) "
+                    f"con {max_workers} worker(s)..."
                 )
 
-                try:
-                    result = process_with_reaper_pipeline(
-                        file_data['bytes'],
+                def _process_file(file_data):
+                    return process_with_reaper_pipeline(
+                        file_data['source'],
                         file_data['name'],
-                        file_data['source_dir']
+                        file_data['source_dir'],
+                        batch_id
                     )
-                    results.append(result)
-                except Exception as e:
-                    st.error(f"❌ Error en {file_data['name']}: {e}")
+
+                batch = run_batch(
+                    files_to_process,
+                    _process_file,
+                    max_workers=max_workers,
+                    on_result=_on_result,
+                    thread_initializer=_streamlit_thread_initializer()
+                )
+
+            results = []
+            for entry in batch:
+                if entry['ok']:
+                    results.append(entry['result'])
+                    if entry['result'].get('resumed_from'):
+                        st.info(
+                            f"↩️ {entry['item']['name']}: retomado después de la etapa "
+                            f"{entry['result']['resumed_from']} (diario de trabajos)"
+                        )
+                elif isinstance(entry['error'], IsolationDeferredError):
+                    st.warning(f"⏸️ {entry['item']['name']} diferido: {entry['error']}")
+                else:
+                    stage = f" (etapa {entry['stage']})" if entry.get('stage') else ""
+                    st.error(f"❌ Error en {entry['item']['name']}{stage}: {entry['error']}")
 
             status.success(
                 f"🎉 Procesamiento completado: {len(results)} archivo(s)"
             )
+            # Los links de Drive ya procesados no se vuelven a cargar en el próximo rerun
+            # (cleanup libera también las descargas de archivos rechazados o fallidos)
+            for source in st.session_state.pop('drive_sources', []):
+                source.cleanup()
+
+            if staged:
+                st.subheader("📊 Etapas del pipeline")
+                st.table(pipeline.stats())
+                st.caption(f"Cuello de botella: **{pipeline.bottleneck()}**")
+
+            telemetry = get_telemetry()
+            summary = telemetry.summary(batch_id)
+            if summary:
+                st.subheader("⏱️ Tiempos y bytes del lote")
+                st.table(summary)
+                prom_path = telemetry.export_prometheus()
+                if prom_path:
+                    st.caption(
+                        f"Lote `{batch_id}` · spans en `{telemetry.jsonl_path}` · métricas en `{prom_path}`"
+                    )
 
             # Mostrar resultados
             st.header("✅ Resultados")
             for result in results:
                 st.subheader(f"📁 {result['original_name']}")
+                if result.get('loudness'):
+                    loud = result['loudness']
+                    st.caption(
+                        f"📏 {loud['integrated_lufs']} LUFS · LRA {loud['lra_lu']} LU · "
+                        f"true peak {loud['true_peak_dbtp']} dBTP"
+                    )
                 
                 if result.get('is_local', False):
                     # Archivo local - solo mostrar ruta
                     st.success(f"✅ Archivo procesado guardado en:")
                     st.code(result['output_file'], language=None)
-                    st.info(f"🎛️ Sesión de Reaper guardada en:")
-                    st.code(result['reaper_session'], language=None)
+                    extras = [path for name, path in (result.get('deliverables') or {}).items() if name != 'main']
+                    if extras:
+                        st.info("📦 Entregables adicionales:")
+                        st.code("\n".join(extras), language=None)
+                    if result['reaper_session']:
+                        st.info(f"🎛️ Sesión de Reaper guardada en:")
+                        st.code(result['reaper_session'], language=None)
                     st.info("💡 Los archivos están listos en tu sistema local")
                 else:
                     # Archivo subido - mostrar preview y descarga
                     st.success(f"✅ Archivo procesado: `{result['output_file']}`")
-                    st.info(f"🎛️ Sesión de Reaper: `{result['reaper_session']}`")
+                    if result['reaper_session']:
+                        st.info(f"🎛️ Sesión de Reaper: `{result['reaper_session']}`")
                     
                     # Preview
                     if result['is_video']:
@@ -600,6 +433,19 @@ def main():
                             mime='video/mp4' if result['is_video'] else 'audio/wav'
                         )
 
+                    # Entregables adicionales (master, preview, proxy), uno por botón
+                    for name, path in (result.get('deliverables') or {}).items():
+                        if name == 'main':
+                            continue
+                        with open(path, 'rb') as f:
+                            st.download_button(
+                                label=f"📥 Descargar {name}: {os.path.basename(path)}",
+                                data=f.read(),
+                                file_name=os.path.basename(path),
+                                mime=DELIVERABLE_MIME.get(os.path.splitext(path)[1].lower(), 'application/octet-stream'),
+                                key=f"deliverable_{path}"
+                            )
+
 
 if __name__ == '__main__':
     main()
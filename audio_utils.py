@@ -4,106 +4,379 @@ Contiene todas las funciones de procesamiento de audio
 """
 
 import os
+import shutil
+import uuid
 import tempfile
+import threading
 import subprocess
 import requests
-import gdown
-from typing import Optional, Tuple
-import streamlit as st
+from typing import List, Optional, Tuple
+from ui_bridge import read_secrets, session_flag, st
+from media_source import DriveSource, LocalPathSource
+from media_probe import ProbeError, probe_media
+from isolation_cache import get_isolation_cache
+from isolation_client import CircuitOpenError, get_isolation_client, resolve_upload_codec, upload_codec_signature
+from isolation_chunks import Segment, plan_segments, splice_regions, stitch_segments, write_regions, write_segments
+from telemetry import current_context, file_size, span, use_context
+from voice_activity import plan_speech_upload, vad_signature
+from wav_io import WAVE_FORMAT_PCM, is_wav_complete, parse_wav_header, parse_wav_header_bytes, wav_header_bytes
 
+# Parámetros que determinan el resultado de Audio Isolation (forman parte de la clave de caché)
+ISOLATION_PARAMS = {'output_codec': 'pcm_s16le', 'sample_rate': 48000, 'channels': 1, 'bitexact': True}
 
-def get_bytes_from_local_path(file_path: str) -> Optional[Tuple[bytes, str, str]]:
-    """Obtiene bytes de un archivo desde una ruta local.
+# Audio Isolation por segmentos (ISOLATION_CHUNK_SECONDS=0 envía siempre el archivo completo)
+ISOLATION_CHUNK_SECONDS = float(os.getenv("ISOLATION_CHUNK_SECONDS", "0"))
+ISOLATION_CHUNK_OVERLAP = float(os.getenv("ISOLATION_CHUNK_OVERLAP", "1.0"))
+ISOLATION_CONCURRENCY = int(os.getenv("ISOLATION_CONCURRENCY", "4"))
+
+# Con el circuito abierto: "skip" sigue sin Voice Isolator, "defer" marca el archivo como diferido
+ISOLATION_BREAKER_MODE = os.getenv("ISOLATION_BREAKER_MODE", "skip").lower()
+
+# Carpeta donde quedan el audio extraído y el resultado del Voice Isolator
+ELEVEN_DIR = os.getenv("AUDIOPRO_ELEVEN_DIR", r"F:\00\00 Reaper\Eleven")
+
+# Reutilizar (o enlazar) entradas que ya están en el formato del pipeline en vez de pasar por ffmpeg
+EXTRACT_FAST_PATH = os.getenv("EXTRACT_FAST_PATH", "1") == "1"
+
+
+# Formato PCM con el que trabaja todo el pipeline (extracción, Voice Isolator y Reaper)
+PIPELINE_SAMPLE_RATE = 48000
+PIPELINE_CHANNELS = 1
+PIPELINE_BITS = 16
+
+# Bytes que se acumulan de un flujo antes de decidir si hace falta transcodificar
+TRANSCODE_PROBE_BYTES = 64 * 1024
+
+# Los segmentos de un mismo archivo actualizan su reporte desde varios hilos
+_IO_REPORT_LOCK = threading.Lock()
+
+
+class IsolationDeferredError(Exception):
+    """Audio Isolation no disponible: el archivo se difiere en lugar de procesarse sin ella."""
+
+
+def get_elevenlabs_config() -> Tuple[Optional[str], Optional[str]]:
+    """API key y URL base de ElevenLabs.
+
+    ELEVENLABS_API_KEY / ELEVENLABS_BASE_URL tienen prioridad sobre la
+    sección [elevenlabs] de .streamlit/secrets.toml (benchmarks y ejecución
+    fuera de Streamlit).
+    """
+    api_key = os.getenv("ELEVENLABS_API_KEY")
+    base_url = os.getenv("ELEVENLABS_BASE_URL")
+    if not api_key:
+        secrets = read_secrets("elevenlabs")
+        api_key = secrets.get("api_key")
+        base_url = base_url or secrets.get("base_url")
+    return api_key, base_url
+
+
+def matches_pipeline_format(info: Optional[dict]) -> bool:
+    """True si una cabecera WAV ya es PCM 16-bit mono 48kHz (no hace falta ffmpeg)."""
+    return bool(info) and all((
+        info['format_tag'] == WAVE_FORMAT_PCM,
+        info['sample_rate'] == PIPELINE_SAMPLE_RATE,
+        info['channels'] == PIPELINE_CHANNELS,
+        info['bits_per_sample'] == PIPELINE_BITS,
+    ))
+
+
+def new_io_report() -> dict:
+    """Reporte por archivo del I/O intermedio que el pipeline evitó."""
+    return {
+        'io_saved_bytes': 0, 'ffmpeg_skipped': 0, 'ffmpeg_piped': 0, 'extract_mode': None,
+        'vad_skipped_bytes': 0, 'upload_bytes': 0
+    }
+
+
+def record_io_report(report: Optional[dict], stats: Optional[dict]) -> None:
+    """Suma las métricas de una transcodificación al reporte del archivo."""
+    if report is None or not stats:
+        return
+    with _IO_REPORT_LOCK:
+        report['io_saved_bytes'] += stats.get('io_saved_bytes', 0)
+        if stats.get('mode') == 'direct':
+            report['ffmpeg_skipped'] += 1
+        elif stats.get('mode') == 'ffmpeg':
+            report['ffmpeg_piped'] += 1
+
+
+class WavTranscodeSink:
+    """Destino de un flujo de audio que termina como WAV del pipeline sin archivos intermedios.
+
+    Los primeros bytes deciden el camino: si el flujo ya es WAV PCM 16-bit
+    mono 48kHz se copia solo su data chunk detrás de una cabecera canónica
+    (el mismo resultado que la conversión con ffmpeg -bitexact, sin lanzar
+    ffmpeg); si no, se entrega por stdin a ffmpeg, que escribe el WAV final.
+    En ambos casos se evita escribir el flujo a un temporal y volver a leerlo.
 
     Args:
-        file_path: Ruta al archivo
+        output_file: Ruta del WAV final (se escribe en .part y se renombra)
+        probe_bytes: Bytes a acumular antes de decidir el camino
+    """
+
+    def __init__(self, output_file: str, probe_bytes: int = TRANSCODE_PROBE_BYTES):
+        self.output_file = output_file
+        self.probe_bytes = probe_bytes
+        self._part = f"{output_file}.{uuid.uuid4().hex[:8]}.part"
+        self._head = bytearray()
+        self._mode = None
+        self._out = None
+        self._process = None
+        self._stderr = None
+        self._skip = 0
+        self._remaining = None
+        self.bytes_in = 0
+        self.bytes_out = 0
+
+    def write(self, block: bytes) -> None:
+        self.bytes_in += len(block)
+        if self._mode is None:
+            self._head += block
+            if len(self._head) < self.probe_bytes:
+                return
+            self._start()
+            block, self._head = bytes(self._head), bytearray()
+        self._forward(block)
+
+    def _start(self) -> None:
+        info = parse_wav_header_bytes(bytes(self._head))
+        if matches_pipeline_format(info):
+            self._mode = 'direct'
+            self._skip = info['data_offset']
+            # Tamaño 0 o 0xFFFFFFFF: WAV transmitido sin tamaño conocido, se copia hasta el final
+            if 0 < info['data_size'] < 0xFFFFFFFF:
+                self._remaining = info['data_size']
+            self._out = open(self._part, 'wb')
+            self._out.write(wav_header_bytes(PIPELINE_SAMPLE_RATE, PIPELINE_CHANNELS, PIPELINE_BITS, 0))
+            return
+
+        self._mode = 'ffmpeg'
+        self._stderr = tempfile.TemporaryFile()
+        cmd = [
+            'ffmpeg', '-y', '-v', 'error', '-i', 'pipe:0',
+            '-ar', str(PIPELINE_SAMPLE_RATE),
+            '-ac', str(PIPELINE_CHANNELS),
+            '-acodec', 'pcm_s16le',
+            '-sample_fmt', 's16',
+            '-fflags', '+bitexact',
+            '-flags:v', '+bitexact',
+            '-flags:a', '+bitexact',
+            '-f', 'wav', self._part
+        ]
+        self._process = subprocess.Popen(cmd, stdin=subprocess.PIPE, stdout=subprocess.DEVNULL, stderr=self._stderr)
+
+    def _forward(self, block: bytes) -> None:
+        if self._mode == 'ffmpeg':
+            try:
+                self._process.stdin.write(block)
+            except BrokenPipeError:
+                # ffmpeg terminó antes de tiempo; close() reporta su error
+                pass
+            return
+
+        if self._skip:
+            drop = min(self._skip, len(block))
+            block = block[drop:]
+            self._skip -= drop
+        if self._remaining is not None:
+            block = block[:self._remaining]
+            self._remaining -= len(block)
+        if block:
+            self._out.write(block)
+            self.bytes_out += len(block)
+
+    def close(self) -> dict:
+        """Termina el WAV, lo mueve a output_file y retorna las métricas.
+
+        Raises:
+            Exception si el flujo está vacío o ffmpeg no pudo convertirlo
+        """
+        try:
+            if self._mode is None:
+                if not self._head:
+                    raise Exception("Respuesta de audio vacía")
+                self._start()
+                head, self._head = bytes(self._head), bytearray()
+                self._forward(head)
+
+            if self._mode == 'direct':
+                # Un frame incompleto al final se descarta, como haría ffmpeg
+                data_size = self.bytes_out - self.bytes_out % (PIPELINE_CHANNELS * PIPELINE_BITS // 8)
+                self._out.truncate(44 + data_size)
+                self._out.seek(0)
+                self._out.write(wav_header_bytes(PIPELINE_SAMPLE_RATE, PIPELINE_CHANNELS, PIPELINE_BITS, data_size))
+                self._out.close()
+                self.bytes_out = 44 + data_size
+            else:
+                try:
+                    self._process.stdin.close()
+                except BrokenPipeError:
+                    pass
+                if self._process.wait() != 0:
+                    self._stderr.seek(0)
+                    error = self._stderr.read().decode('utf-8', 'ignore').strip()
+                    raise Exception(f"FFmpeg failed: {error}")
+                self.bytes_out = os.path.getsize(self._part)
+            os.replace(self._part, self.output_file)
+        except BaseException:
+            self.abort()
+            raise
+        finally:
+            if self._stderr:
+                self._stderr.close()
+
+        return {
+            'mode': self._mode,
+            'bytes_in': self.bytes_in,
+            'bytes_out': self.bytes_out,
+            # Antes: el flujo se escribía a un temporal y ffmpeg lo volvía a leer
+            'io_saved_bytes': 2 * self.bytes_in
+        }
+
+    def abort(self) -> None:
+        """Descarta el resultado parcial (y detiene ffmpeg si estaba corriendo)."""
+        if self._out and not self._out.closed:
+            self._out.close()
+        if self._process and self._process.poll() is None:
+            self._process.kill()
+            self._process.wait()
+        _remove_quietly(self._part)
+
+
+def drive_file_id(drive_url: str) -> Optional[str]:
+    """Extrae el ID de archivo de una URL de Google Drive.
+
+    Args:
+        drive_url: URL de Google Drive
 
     Returns:
-        Tuple de (bytes, nombre_archivo, directorio_origen) o None
+        ID del archivo o None si la URL no es válida
     """
-    try:
-        if not os.path.exists(file_path):
-            st.error(f"❌ Archivo no encontrado: {file_path}")
-            return None
+    if 'id=' in drive_url:
+        return drive_url.split('id=')[1].split('&')[0]
+    if '/file/d/' in drive_url:
+        return drive_url.split('/file/d/')[1].split('/')[0]
+    return None
 
-        with open(file_path, 'rb') as f:
-            file_bytes = f.read()
 
-        file_name = os.path.basename(file_path)
-        source_dir = os.path.dirname(file_path)
+def get_source_from_local_path(file_path: str) -> Optional[LocalPathSource]:
+    """Crea una fuente por referencia para un archivo local o del NAS.
 
-        return file_bytes, file_name, source_dir
+    No lee el archivo: ffmpeg lo abrirá directamente en la etapa de extracción.
 
-    except Exception as e:
-        st.error(f"❌ Error leyendo archivo {file_path}: {e}")
+    Args:
+        file_path: Ruta al archivo
+
+    Returns:
+        LocalPathSource o None si el archivo no existe
+    """
+    if not os.path.isfile(file_path):
+        st.error(f"❌ Archivo no encontrado: {file_path}")
         return None
+    return LocalPathSource(file_path)
+
 
+def get_source_from_drive(drive_url: str) -> Optional[DriveSource]:
+    """Crea una fuente diferida para un archivo de Google Drive.
 
-def get_bytes_from_drive(drive_url: str) -> Optional[Tuple[bytes, str]]:
-    """Obtiene bytes de un archivo desde Google Drive.
+    La descarga ocurre en streaming a disco en el pool de drive_ingest
+    (prefetch_drive_sources la adelanta) o cuando el pipeline la necesita.
 
     Args:
         drive_url: URL de Google Drive
 
     Returns:
-        Tuple de (bytes, nombre_archivo) o None
+        DriveSource o None si la URL no es válida
     """
-    try:
-        # Extraer ID del archivo de la URL
-        if 'id=' in drive_url:
-            file_id = drive_url.split('id=')[1].split('&')[0]
-        elif '/file/d/' in drive_url:
-            file_id = drive_url.split('/file/d/')[1].split('/')[0]
-        else:
-            st.error("❌ URL de Google Drive no válida")
-            return None
-
-        # Descargar archivo
-        download_url = f"https://drive.google.com/uc?id={file_id}"
-        file_path = gdown.download(download_url, quiet=True)
+    file_id = drive_file_id(drive_url)
+    if not file_id:
+        st.error("❌ URL de Google Drive no válida")
+        return None
+    return DriveSource(file_id)
 
-        if not file_path:
-            st.error("❌ No se pudo descargar el archivo de Google Drive")
-            return None
 
-        # Leer bytes
-        with open(file_path, 'rb') as f:
-            file_bytes = f.read()
+def _extract_fast_path(input_file: str, output_file: str) -> Optional[Tuple[str, str]]:
+    """Evita la decodificación completa cuando la entrada ya sirve al pipeline.
 
-        file_name = os.path.basename(file_path)
+    - WAV PCM 16-bit mono 48kHz con cabecera completa: se enlaza (hard link)
+      en la carpeta de trabajo o, si el volumen no lo permite, se usa tal cual
+    - Otro contenedor con audio pcm_s16le mono 48kHz: ffmpeg copia el stream
+      sin decodificar ni re-codificar
 
-        # Limpiar archivo temporal
+    Returns:
+        (ruta del WAV a usar, modo) o None si hace falta transcodificar
+    """
+    if is_wav_complete(input_file) and matches_pipeline_format(parse_wav_header(input_file)):
         try:
-            os.unlink(file_path)
-        except Exception:
-            pass
-
-        return file_bytes, file_name
+            os.link(input_file, output_file)
+            return output_file, 'link'
+        except OSError:
+            # Otro volumen (NAS -> carpeta local): el original se usa sin copiarlo
+            return input_file, 'reuse'
 
-    except Exception as e:
-        st.error(f"❌ Error descargando de Google Drive: {e}")
+    try:
+        audio = probe_media(input_file).audio
+    except ProbeError:
         return None
-
-
-def extract_audio_wav16_mono(input_file: str) -> str:
+    if audio and all((
+        audio.codec_name == 'pcm_s16le',
+        audio.sample_rate == PIPELINE_SAMPLE_RATE,
+        audio.channels == PIPELINE_CHANNELS,
+    )):
+        run_ffmpeg([
+            'ffmpeg', '-y', '-i', input_file,
+            '-map', f'0:{audio.index}', '-c:a', 'copy',
+            '-fflags', '+bitexact', output_file
+        ])
+        return output_file, 'copy'
+    return None
+
+
+def extract_audio_wav16_mono(input_file: str, io_report: Optional[dict] = None,
+                             fast_path: bool = EXTRACT_FAST_PATH) -> str:
     """Extrae audio de un archivo y lo convierte a WAV mono 48kHz.
 
+    Si la entrada ya está en el formato del pipeline no se transcodifica
+    (ver _extract_fast_path). En modo 'reuse' la ruta retornada es la
+    misma entrada: quien limpie temporales no debe borrarla.
+
     Args:
         input_file: Ruta al archivo de entrada
+        io_report: Reporte de I/O del archivo (opcional, registra el modo usado)
+        fast_path: Permitir el camino sin transcodificación
 
     Returns:
-        Ruta al archivo WAV generado
+        Ruta al archivo WAV generado (o la entrada misma si ya servía)
     """
-    # Guardar audio extraído directamente en F:\00\00 Reaper\Eleven\
+    # Guardar audio extraído directamente en la carpeta Eleven
     import datetime
     timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
-    eleven_dir = r"F:\00\00 Reaper\Eleven"
-    os.makedirs(eleven_dir, exist_ok=True)
-    
-    output_file = os.path.join(eleven_dir, f"extracted_{timestamp}.wav")
+    os.makedirs(ELEVEN_DIR, exist_ok=True)
+
+    # Sufijo único para que varios archivos procesados en paralelo no colisionen
+    output_file = os.path.join(ELEVEN_DIR, f"extracted_{timestamp}_{uuid.uuid4().hex[:8]}.wav")
+
+    fast = _extract_fast_path(input_file, output_file) if fast_path else None
+    if fast:
+        wav_file, mode = fast
+        if io_report is not None:
+            with _IO_REPORT_LOCK:
+                io_report['extract_mode'] = mode
+                if mode in ('link', 'reuse'):
+                    io_report['ffmpeg_skipped'] += 1
+                    io_report['io_saved_bytes'] += os.path.getsize(wav_file)
+        labels = {
+            'link': "enlazado sin transcodificar",
+            'reuse': "ya estaba en formato 48kHz mono 16-bit, se usa el original",
+            'copy': "stream PCM copiado sin re-codificar"
+        }
+        st.info(f"⚡ Audio {labels[mode]}: {wav_file}")
+        return wav_file
 
     cmd = [
         'ffmpeg', '-y', '-i', input_file,
+        '-map', '0:a:0',  # solo el primer stream de audio (no se demuxa el video)
         '-ac', '1',  # mono
         '-ar', '48000',  # 48kHz (estándar profesional)
         '-acodec', 'pcm_s16le',  # 16-bit PCM
@@ -112,6 +385,8 @@ def extract_audio_wav16_mono(input_file: str) -> str:
     ]
 
     run_ffmpeg(cmd)
+    if io_report is not None:
+        io_report['extract_mode'] = 'transcode'
     st.info(f"📁 Audio extraído guardado en: {output_file}")
     return output_file
 
@@ -122,17 +397,21 @@ def run_ffmpeg(cmd: list) -> None:
     Args:
         cmd: Lista de argumentos del comando
     """
+    inputs = [cmd[i + 1] for i, arg in enumerate(cmd[:-1]) if arg == '-i']
     try:
-        result = subprocess.run(
-            cmd,
-            capture_output=True,
-            text=True,
-            timeout=600
-        )
-
-        if result.returncode != 0:
-            st.error(f"❌ Error FFmpeg: {result.stderr}")
-            raise Exception(f"FFmpeg failed: {result.stderr}")
+        with span('ffmpeg', bytes_in=sum(file_size(p) or 0 for p in inputs),
+                  output=os.path.basename(cmd[-1])) as s:
+            result = subprocess.run(
+                cmd,
+                capture_output=True,
+                text=True,
+                timeout=600
+            )
+            s.set(bytes_out=file_size(cmd[-1]), returncode=result.returncode)
+
+            if result.returncode != 0:
+                st.error(f"❌ Error FFmpeg: {result.stderr}")
+                raise Exception(f"FFmpeg failed: {result.stderr}")
 
     except subprocess.TimeoutExpired:
         st.error("❌ FFmpeg excedió el tiempo límite (10 min)")
@@ -143,39 +422,44 @@ def run_ffmpeg(cmd: list) -> None:
 
 
 def is_audio_only_file(file_path: str) -> bool:
-    """Determina si un archivo es solo audio.
+    """Determina si un archivo es solo audio según sus streams (no su extensión).
+
+    Usa la caché de media_probe, así que no lanza ffprobe si el archivo ya
+    se inspeccionó al validar el lote.
 
     Args:
         file_path: Ruta al archivo
 
     Returns:
         True si es solo audio, False si es video
+
+    Raises:
+        ProbeError si ffprobe no puede leer el archivo
     """
-    audio_extensions = {'.mp3', '.wav', '.flac', '.m4a', '.aac', '.ogg'}
-    _, ext = os.path.splitext(file_path.lower())
-    return ext in audio_extensions
+    return probe_media(file_path).is_audio_only
 
 
-def process_audio_with_elevenlabs(audio_file: str) -> str:
+def process_audio_with_elevenlabs(audio_file: str, io_report: Optional[dict] = None) -> str:
     """Procesa audio con ElevenLabs Audio Isolation.
 
     Args:
         audio_file: Ruta al archivo de audio
+        io_report: Reporte de I/O del archivo (opcional, ver new_io_report)
 
     Returns:
         Ruta al archivo procesado
     """
     try:
         # Obtener configuración de ElevenLabs
-        api_key = st.secrets.get("elevenlabs", {}).get("api_key")
-        base_url = st.secrets.get("elevenlabs", {}).get("base_url", "https://api.elevenlabs.io")
+        api_key, base_url = get_elevenlabs_config()
+        base_url = base_url or "https://api.elevenlabs.io"
 
         if not api_key:
             st.warning("⚠️ API key de ElevenLabs no configurada")
             return audio_file
 
         # Verificar si ElevenLabs está deshabilitado temporalmente
-        if st.session_state.get('disable_elevenlabs', False):
+        if session_flag('disable_elevenlabs'):
             st.info("ℹ️ ElevenLabs deshabilitado temporalmente - Continuando sin Voice Isolator")
             return audio_file
 
@@ -187,89 +471,292 @@ def process_audio_with_elevenlabs(audio_file: str) -> str:
         # Endpoint de Audio Isolation (según documentación oficial)
         url = f"{base_url}/audio-isolation"
 
-        # Preparar archivos para multipart/form-data
-        with open(audio_file, 'rb') as f:
-            files = {
-                'audio': (os.path.basename(audio_file), f, 'audio/wav')
-            }
-
-            # Enviar request con reintentos
-            st.info(f"🌐 Enviando a ElevenLabs: {url}")
-            st.info(f"📊 Archivo: {os.path.basename(audio_file)}")
-            max_retries = 5
-            for attempt in range(max_retries):
-                try:
-                    st.info(f"🔄 Intento {attempt + 1}/{max_retries}...")
-                    response = requests.post(url, headers=headers, files=files, timeout=180)
-                    st.info(f"📡 Respuesta recibida: {response.status_code}")
-                    break
-                except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
-                    if attempt < max_retries - 1:
-                        wait_time = (attempt + 1) * 3  # Incrementar tiempo de espera
-                        st.warning(f"⚠️ Intento {attempt + 1} falló, reintentando en {wait_time}s... ({e})")
-                        import time
-                        time.sleep(wait_time)
-                    else:
-                        st.error(f"❌ Error de conexión con ElevenLabs después de {max_retries} intentos")
-                        return audio_file
-
-            if response.status_code == 200:
-                # Guardar resultado temporal primero
-                import datetime
-                timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
-                eleven_dir = r"F:\00\00 Reaper\Eleven"
-                os.makedirs(eleven_dir, exist_ok=True)
-                
-                # Guardar respuesta temporal
-                temp_file = tempfile.NamedTemporaryFile(delete=False, suffix='.wav').name
-                with open(temp_file, 'wb') as f:
-                    f.write(response.content)
-                
-                # Convertir a WAV puro usando FFmpeg (eliminar metadata ID3)
-                output_file = os.path.join(eleven_dir, f"elevenlabs_{timestamp}.wav")
-                
-                st.info("🔧 Convirtiendo a WAV puro compatible con Reaper...")
-                cmd = [
-                    'ffmpeg', '-y', '-i', temp_file,
-                    '-ar', '48000',  # 48kHz
-                    '-ac', '1',  # Mono
-                    '-acodec', 'pcm_s16le',  # 16-bit PCM
-                    '-sample_fmt', 's16',  # Asegurar formato 16-bit
-                    '-fflags', '+bitexact',  # Sin metadata
-                    '-flags:v', '+bitexact',
-                    '-flags:a', '+bitexact',
-                    output_file
-                ]
-                
-                run_ffmpeg(cmd)
-                
-                # Eliminar archivo temporal
-                try:
-                    os.unlink(temp_file)
-                except Exception:
-                    pass
-                
-                st.success(f"✅ Voice Isolator aplicado y convertido a WAV puro: {output_file}")
+        import datetime
+        os.makedirs(ELEVEN_DIR, exist_ok=True)
+        timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+        output_file = os.path.join(ELEVEN_DIR, f"elevenlabs_{timestamp}_{uuid.uuid4().hex[:8]}.wav")
+
+        # Solo se suben los tramos con voz: los silencios largos vuelven como silencio
+        params = dict(ISOLATION_PARAMS)
+        with span('isolation.vad', bytes_in=file_size(audio_file)) as s:
+            regions = plan_speech_upload(audio_file)
+            s.set(regions=len(regions) if regions else 0)
+        upload_frames = None
+        # Un códec de subida con pérdida cambia lo que procesa el servicio (FLAC no)
+        if upload_codec_signature():
+            params['upload_codec'] = upload_codec_signature()
+        if regions:
+            params['vad'] = vad_signature()
+            upload_frames = sum(end - start for start, end in regions)
+
+        # Audios largos se procesan por segmentos concurrentes
+        segments = _plan_isolation_segments(audio_file, upload_frames)
+        if segments:
+            params.update({
+                'chunk_seconds': ISOLATION_CHUNK_SECONDS,
+                'chunk_overlap': ISOLATION_CHUNK_OVERLAP
+            })
+
+        # Resultado ya calculado para este mismo audio: no hace falta subirlo
+        cache = get_isolation_cache()
+        cache_key = None
+        if cache.enabled:
+            cache_key = cache.key_for(audio_file, url, params)
+            if cache.get(cache_key, output_file):
+                st.success(f"♻️ Voice Isolator desde caché (sin subir el audio): {output_file}")
                 return output_file
-            elif response.status_code == 401:
-                st.error("❌ Error de autenticación ElevenLabs - Verifica tu API key")
-                return audio_file
-            elif response.status_code == 404:
-                st.warning("⚠️ Voice Isolator no disponible en tu cuenta de ElevenLabs")
-                st.info("💡 Tip: Deshabilita ElevenLabs temporalmente usando el botón en el sidebar")
-                return audio_file
-            elif response.status_code == 429:
-                st.error("❌ Límite de rate excedido en ElevenLabs - Espera unos minutos")
-                return audio_file
-            else:
-                st.error(f"❌ Error ElevenLabs: {response.status_code} - {response.text}")
-                return audio_file
 
+        if regions:
+            ok = _isolate_speech_regions(audio_file, output_file, url, headers, regions, segments, io_report)
+        elif segments:
+            ok = _isolate_in_segments(audio_file, output_file, url, headers, segments, io_report)
+        else:
+            ok = _isolate_request(audio_file, output_file, url, headers, io_report=io_report)
+        if not ok:
+            return audio_file
+
+        if cache_key:
+            cache.put(cache_key, output_file)
+
+        st.success(f"✅ Voice Isolator aplicado y convertido a WAV puro: {output_file}")
+        return output_file
+
+    except IsolationDeferredError:
+        raise
     except Exception as e:
         st.error(f"❌ Error procesando con ElevenLabs: {e}")
         return audio_file
 
 
+def _isolate_request(audio_file: str, output_file: str, url: str, headers: dict, quiet: bool = False,
+                     io_report: Optional[dict] = None) -> bool:
+    """Envía un WAV a Audio Isolation y guarda el resultado como WAV puro.
+
+    La respuesta pasa directo a WavTranscodeSink: sin temporal intermedio y
+    sin ffmpeg cuando el servicio ya devuelve PCM 16-bit mono 48kHz.
+
+    Args:
+        audio_file: Ruta al WAV a enviar
+        output_file: Ruta donde guardar el resultado convertido
+        url: Endpoint de Audio Isolation
+        headers: Headers HTTP (incluye la API key)
+        quiet: Omite los mensajes de progreso (se usa por segmento)
+        io_report: Reporte de I/O del archivo (opcional)
+
+    Returns:
+        True si el resultado quedó en output_file
+    """
+    # Cliente compartido: conexiones keep-alive y cuerpo/respuesta en streaming
+    client = get_isolation_client()
+    # El audio se comprime al vuelo mientras se sube (FLAC por defecto)
+    codec = resolve_upload_codec()
+
+    # Enviar request con reintentos
+    if not quiet:
+        st.info(f"🌐 Enviando a ElevenLabs: {url}")
+        st.info(f"📊 Archivo: {os.path.basename(audio_file)}")
+    max_retries = 5
+    for attempt in range(max_retries):
+        last_attempt = attempt == max_retries - 1
+        try:
+            if not quiet:
+                st.info(f"🔄 Intento {attempt + 1}/{max_retries}...")
+            response = client.post_audio(url, headers, audio_file, output_file,
+                                         open_sink=lambda: WavTranscodeSink(output_file), codec=codec)
+            if not quiet:
+                st.info(f"📡 Respuesta recibida: {response['status_code']}")
+        except CircuitOpenError as e:
+            if ISOLATION_BREAKER_MODE == 'defer':
+                raise IsolationDeferredError(str(e))
+            st.warning(f"⚡ {e} - se omite Voice Isolator para {os.path.basename(audio_file)}")
+            return False
+        except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+            if not last_attempt:
+                wait_time = (attempt + 1) * 3  # Incrementar tiempo de espera
+                st.warning(f"⚠️ Intento {attempt + 1} falló, reintentando en {wait_time}s... ({e})")
+                import time
+                time.sleep(wait_time)
+                continue
+            st.error(f"❌ Error de conexión con ElevenLabs después de {max_retries} intentos")
+            return False
+
+        if response['status_code'] == 429 and not last_attempt:
+            # El cliente ya pausó a todos los workers lo que pidió Retry-After
+            st.warning(f"⏳ Límite de rate en ElevenLabs - reintentando en {response['retry_after']:.0f}s")
+            continue
+        if response['status_code'] >= 500 and not last_attempt:
+            wait_time = (attempt + 1) * 3
+            st.warning(f"⚠️ ElevenLabs respondió {response['status_code']}, reintentando en {wait_time}s...")
+            import time
+            time.sleep(wait_time)
+            continue
+        break
+
+    status_code = response['status_code']
+    if status_code == 200:
+        # La respuesta ya quedó como WAV puro (sin metadata ID3) al recibirla
+        sink = response['sink']
+        record_io_report(io_report, sink)
+        if io_report is not None:
+            with _IO_REPORT_LOCK:
+                # .get: un reporte restaurado del diario puede ser de una versión anterior
+                io_report['upload_bytes'] = io_report.get('upload_bytes', 0) + response['bytes_sent']
+        if not quiet:
+            if codec != 'wav':
+                st.info(f"🗜️ Subido en {codec.upper()}: {response['bytes_sent'] / (1024 * 1024):.1f} MB "
+                        f"(WAV: {file_size(audio_file) / (1024 * 1024):.1f} MB)")
+            how = "sin ffmpeg (ya era PCM 48kHz mono)" if sink['mode'] == 'direct' else "con ffmpeg por pipe"
+            st.info(f"🔧 Respuesta convertida a WAV puro {how}")
+        return True
+
+    if status_code == 401:
+        st.error("❌ Error de autenticación ElevenLabs - Verifica tu API key")
+        return False
+    elif status_code == 404:
+        st.warning("⚠️ Voice Isolator no disponible en tu cuenta de ElevenLabs")
+        st.info("💡 Tip: Deshabilita ElevenLabs temporalmente usando el botón en el sidebar")
+        return False
+    elif status_code == 429:
+        st.error("❌ Límite de rate excedido en ElevenLabs - Espera unos minutos")
+        return False
+    else:
+        st.error(f"❌ Error ElevenLabs: {status_code} - {response['text']}")
+        return False
+
+
+def _remove_quietly(path: str) -> None:
+    """Elimina un archivo temporal ignorando errores."""
+    try:
+        os.unlink(path)
+    except Exception:
+        pass
+
+
+def _plan_isolation_segments(audio_file: str, total_frames: Optional[int] = None) -> Optional[List[Segment]]:
+    """Retorna los segmentos a procesar si el audio supera ISOLATION_CHUNK_SECONDS.
+
+    Args:
+        audio_file: WAV extraído
+        total_frames: Frames que se van a subir (por defecto todo el archivo; menos con VAD)
+
+    Returns:
+        Lista de segmentos, o None si el audio se envía completo
+    """
+    if ISOLATION_CHUNK_SECONDS <= 0:
+        return None
+    info = parse_wav_header(audio_file)
+    if not info or info['bits_per_sample'] != 16:
+        return None
+
+    rate = info['sample_rate']
+    if total_frames is None:
+        total_frames = min(info['data_size'], info['file_size'] - info['data_offset']) // info['block_align']
+    segment_frames = int(ISOLATION_CHUNK_SECONDS * rate)
+    if total_frames <= segment_frames:
+        return None
+    return plan_segments(total_frames, segment_frames, int(ISOLATION_CHUNK_OVERLAP * rate))
+
+
+def _isolate_in_segments(audio_file: str, output_file: str, url: str, headers: dict,
+                         segments: List[Segment], io_report: Optional[dict] = None) -> bool:
+    """Procesa un audio largo en segmentos solapados enviados en paralelo.
+
+    La latencia total depende de cuántos segmentos hay en vuelo
+    (ISOLATION_CONCURRENCY) y no de la duración completa del archivo.
+
+    Args:
+        audio_file: WAV PCM 16-bit extraído
+        output_file: Ruta del WAV final unido
+        url: Endpoint de Audio Isolation
+        headers: Headers HTTP (incluye la API key)
+        segments: Segmentos calculados con plan_segments
+        io_report: Reporte de I/O del archivo (opcional)
+
+    Returns:
+        True si todos los segmentos se procesaron y se unieron
+    """
+    from concurrent.futures import ThreadPoolExecutor
+
+    work_dir = tempfile.mkdtemp(prefix="audiopro_segments_")
+    try:
+        st.info(
+            f"✂️ Audio largo: {len(segments)} segmentos de {ISOLATION_CHUNK_SECONDS:.0f}s "
+            f"({ISOLATION_CONCURRENCY} en paralelo)"
+        )
+        inputs = write_segments(audio_file, segments, work_dir)
+        outputs = [os.path.splitext(path)[0] + "_isolated.wav" for path in inputs]
+
+        # Los hilos del pool no heredan el contexto de telemetría (lote/archivo)
+        context = current_context()
+
+        def _isolate_segment(pair):
+            with use_context(**context):
+                return _isolate_request(pair[0], pair[1], url, headers, quiet=True, io_report=io_report)
+
+        with ThreadPoolExecutor(max_workers=ISOLATION_CONCURRENCY, thread_name_prefix="audiopro-isolate") as pool:
+            done = list(pool.map(_isolate_segment, zip(inputs, outputs)))
+
+        if not all(done):
+            st.error(f"❌ {done.count(False)} de {len(segments)} segmentos fallaron en ElevenLabs")
+            return False
+
+        st.info("🧵 Uniendo segmentos con crossfade...")
+        info = parse_wav_header(audio_file)
+        stitch_segments(outputs, segments, output_file, info['sample_rate'], info['channels'])
+        return True
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+def _isolate_speech_regions(audio_file: str, output_file: str, url: str, headers: dict,
+                            regions: List[Segment], segments: Optional[List[Segment]] = None,
+                            io_report: Optional[dict] = None) -> bool:
+    """Sube solo los tramos con voz (concatenados) y devuelve el resultado a su lugar.
+
+    Los bytes subidos y la espera del servicio bajan en proporción al
+    silencio recortado; la salida conserva la longitud exacta del original.
+
+    Args:
+        audio_file: WAV PCM 16-bit extraído
+        output_file: Ruta del WAV final, alineado con el original
+        url: Endpoint de Audio Isolation
+        headers: Headers HTTP (incluye la API key)
+        regions: Tramos de voz calculados con plan_speech_upload
+        segments: Segmentos del audio compacto si supera ISOLATION_CHUNK_SECONDS
+        io_report: Reporte de I/O del archivo (opcional)
+
+    Returns:
+        True si el resultado quedó en output_file
+    """
+    info = parse_wav_header(audio_file)
+    total_frames = min(info['data_size'], info['file_size'] - info['data_offset']) // info['block_align']
+    work_dir = tempfile.mkdtemp(prefix="audiopro_vad_")
+    try:
+        compact = os.path.join(work_dir, "speech.wav")
+        isolated = os.path.join(work_dir, "speech_isolated.wav")
+        kept = write_regions(audio_file, regions, compact)
+        st.info(
+            f"🔇 {len(regions)} tramo(s) con voz: se suben {kept / info['sample_rate']:.0f}s "
+            f"de {total_frames / info['sample_rate']:.0f}s ({100.0 * (1 - kept / total_frames):.0f}% de silencio recortado)"
+        )
+
+        if segments:
+            ok = _isolate_in_segments(compact, isolated, url, headers, segments, io_report)
+        else:
+            ok = _isolate_request(compact, isolated, url, headers, io_report=io_report)
+        if not ok:
+            return False
+
+        splice_regions(isolated, regions, total_frames, output_file, info['sample_rate'], info['channels'],
+                       fade_frames=int(0.01 * info['sample_rate']))
+        if io_report is not None:
+            with _IO_REPORT_LOCK:
+                io_report['vad_skipped_bytes'] = (total_frames - kept) * info['block_align']
+        return True
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
 def register_user_session() -> None:
     """Registra la sesión del usuario para estadísticas."""
     if 'user_sessions' not in st.session_state:
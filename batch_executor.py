@@ -0,0 +1,80 @@
+"""
+Ejecutor de lotes para AudioPro v1.7
+Procesa varios archivos en paralelo con un pool de workers configurable
+"""
+
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+
+def run_batch(
+    items: Sequence[Any],
+    process_fn: Callable[[Any], Any],
+    max_workers: int = 2,
+    on_result: Optional[Callable[[Dict, int, int], None]] = None,
+    thread_initializer: Optional[Callable[[], None]] = None
+) -> List[Dict]:
+    """Procesa una lista de elementos en paralelo con un pool de hilos.
+
+    Cada elemento se procesa de forma aislada: una excepción en un archivo
+    no detiene el resto del lote. Los resultados se devuelven en el mismo
+    orden que la entrada, sin importar el orden en que terminen.
+
+    Args:
+        items: Elementos a procesar (p. ej. dicts de files_to_process)
+        process_fn: Función que procesa un elemento y retorna su resultado
+        max_workers: Número máximo de elementos en vuelo al mismo tiempo
+        on_result: Callback opcional (entrada, completados, total) que se
+            llama desde el hilo que invoca run_batch al terminar cada elemento
+        thread_initializer: Función opcional que se ejecuta al crear cada
+            hilo del pool (p. ej. para propagar el contexto de Streamlit)
+
+    Returns:
+        Lista de dicts con 'index', 'item', 'ok', 'result', 'error' y
+        'elapsed', en el orden original de items
+    """
+    total = len(items)
+    entries: List[Optional[Dict]] = [None] * total
+    if total == 0:
+        return []
+
+    workers = max(1, min(int(max_workers), total))
+
+    def _run(index: int, item: Any) -> Dict:
+        start = time.perf_counter()
+        try:
+            result = process_fn(item)
+            return {
+                'index': index,
+                'item': item,
+                'ok': True,
+                'result': result,
+                'error': None,
+                'elapsed': time.perf_counter() - start
+            }
+        except Exception as e:
+            return {
+                'index': index,
+                'item': item,
+                'ok': False,
+                'result': None,
+                'error': e,
+                'elapsed': time.perf_counter() - start
+            }
+
+    with ThreadPoolExecutor(
+        max_workers=workers,
+        thread_name_prefix="audiopro-batch",
+        initializer=thread_initializer
+    ) as executor:
+        futures = [executor.submit(_run, idx, item) for idx, item in enumerate(items)]
+        completed = 0
+        for future in as_completed(futures):
+            entry = future.result()
+            entries[entry['index']] = entry
+            completed += 1
+            if on_result:
+                on_result(entry, completed, total)
+
+    return entries
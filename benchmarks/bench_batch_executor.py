@@ -0,0 +1,85 @@
+"""
+Benchmark de throughput del ejecutor de lotes (batch_executor.run_batch)
+
+Simula un lote de archivos donde cada uno pasa por extracción (ffmpeg),
+Audio Isolation (HTTP) y render (Reaper) y mide cómo escala el throughput
+de 1 a N workers.
+
+Uso:
+    python benchmarks/bench_batch_executor.py --files 40 --max-workers 8
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from batch_executor import run_batch  # noqa: E402
+
+
+def simulated_file(extract_s: float, isolate_s: float, render_s: float):
+    """Crea una función que simula el pipeline de un archivo con esperas."""
+    def _process(item):
+        time.sleep(extract_s)
+        time.sleep(isolate_s)
+        time.sleep(render_s)
+        if item.get('fail'):
+            raise Exception(f"Fallo simulado en {item['name']}")
+        return {'original_name': item['name']}
+    return _process
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--files', type=int, default=40, help="Archivos en el lote")
+    parser.add_argument('--max-workers', type=int, default=8, help="Máximo de workers a medir")
+    parser.add_argument('--extract', type=float, default=0.02, help="Segundos simulados de extracción")
+    parser.add_argument('--isolate', type=float, default=0.05, help="Segundos simulados de Audio Isolation")
+    parser.add_argument('--render', type=float, default=0.03, help="Segundos simulados de render")
+    parser.add_argument('--fail-every', type=int, default=0, help="Marca 1 de cada N archivos como fallido")
+    parser.add_argument('--json', action='store_true', help="Imprime los resultados en JSON")
+    args = parser.parse_args()
+
+    items = [
+        {'name': f"clase_{i:03d}.mp4", 'fail': bool(args.fail_every) and i % args.fail_every == 0}
+        for i in range(args.files)
+    ]
+    process = simulated_file(args.extract, args.isolate, args.render)
+
+    rows = []
+    baseline = None
+    for workers in range(1, args.max_workers + 1):
+        start = time.perf_counter()
+        batch = run_batch(items, process, max_workers=workers)
+        wall = time.perf_counter() - start
+
+        ordered = [entry['index'] for entry in batch] == list(range(len(items)))
+        failures = sum(1 for entry in batch if not entry['ok'])
+        throughput = len(items) / wall
+        baseline = baseline or throughput
+        rows.append({
+            'workers': workers,
+            'wall_s': round(wall, 4),
+            'files_per_s': round(throughput, 3),
+            'speedup': round(throughput / baseline, 2),
+            'failures': failures,
+            'ordered': ordered
+        })
+
+    if args.json:
+        print(json.dumps(rows, indent=2))
+        return
+
+    print(f"{'workers':>8} {'wall (s)':>10} {'files/s':>10} {'speedup':>8} {'fallos':>7} {'orden':>6}")
+    for row in rows:
+        print(
+            f"{row['workers']:>8} {row['wall_s']:>10.3f} {row['files_per_s']:>10.2f} "
+            f"{row['speedup']:>7.2f}x {row['failures']:>7} {'ok' if row['ordered'] else 'NO':>6}"
+        )
+
+
+if __name__ == '__main__':
+    main()
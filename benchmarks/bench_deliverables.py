@@ -0,0 +1,119 @@
+"""
+Benchmark de los entregables de salida (deliverables.py)
+
+Arma una clase sintética (video H.264 de --minutes con --height líneas y el
+render WAV 24-bit mono 48kHz) y produce los entregables pedidos de dos
+formas: una sola invocación de ffmpeg (como la etapa final del pipeline) y
+una invocación por entregable, que vuelve a leer el video y el render en
+cada pasada (lo que se hacía a mano). Reporta el tiempo de cada forma, los
+bytes de entrada leídos y verifica que todos los entregables tengan la
+duración del render.
+
+Uso:
+    python benchmarks/bench_deliverables.py --minutes 5
+    python benchmarks/bench_deliverables.py --minutes 20 --deliverables main,master,preview --audio-only --json
+"""
+
+import argparse
+import json
+import os
+import re
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from deliverables import deliverable_paths, deliverables_command, parse_deliverables  # noqa: E402
+
+
+def make_class(work: str, minutes: float, height: int) -> tuple:
+    """Video de prueba (sin audio útil) y su render WAV 24-bit."""
+    seconds = str(minutes * 60)
+    video = os.path.join(work, 'clase.mp4')
+    render = os.path.join(work, 'render.wav')
+    subprocess.run(['ffmpeg', '-y', '-v', 'error', '-f', 'lavfi', '-i', f"testsrc2=size={height * 16 // 9}x{height}:rate=30",
+                    '-f', 'lavfi', '-i', 'anoisesrc=sample_rate=48000:amplitude=0.1', '-t', seconds,
+                    '-c:v', 'libx264', '-preset', 'ultrafast', '-c:a', 'aac', video], check=True)
+    subprocess.run(['ffmpeg', '-y', '-v', 'error', '-f', 'lavfi', '-i', 'anoisesrc=sample_rate=48000:amplitude=0.2',
+                    '-t', seconds, '-ac', '1', '-c:a', 'pcm_s24le', render], check=True)
+    return video, render
+
+
+def duration(path: str) -> float:
+    """Duración que reporta ffmpeg al leer el archivo completo."""
+    result = subprocess.run(['ffmpeg', '-hide_banner', '-i', path, '-f', 'null', '-'], capture_output=True, text=True)
+    times = re.findall(r"time=(\d+):(\d+):([\d.]+)", result.stderr)
+    h, m, s = times[-1]
+    return int(h) * 3600 + int(m) * 60 + float(s)
+
+
+def run(video, render, outputs, separate: bool) -> dict:
+    """Produce los entregables en una pasada o en una por entregable."""
+    for path in outputs.values():
+        if os.path.exists(path):
+            os.unlink(path)
+    passes = [{name: path} for name, path in outputs.items()] if separate else [outputs]
+    bytes_in = 0
+    start = time.perf_counter()
+    for part in passes:
+        cmd, encoded = deliverables_command(video, render, part)
+        if cmd:
+            subprocess.run(cmd[:1] + ['-v', 'error'] + cmd[1:], check=True)
+            bytes_in += os.path.getsize(render) + (os.path.getsize(video) if video else 0)
+        if not video and 'main' in part:
+            shutil.copy(render, part['main'])
+            bytes_in += os.path.getsize(render)
+    return {'wall_s': round(time.perf_counter() - start, 3), 'passes': len(passes),
+            'read_mb': round(bytes_in / 2 ** 20, 1)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--minutes', type=float, default=2.0)
+    parser.add_argument('--height', type=int, default=720, help="Alto del video de prueba")
+    parser.add_argument('--deliverables', default='main,master,preview,proxy')
+    parser.add_argument('--audio-only', action='store_true', help="Clase solo de audio (sin video)")
+    parser.add_argument('--json', action='store_true')
+    args = parser.parse_args()
+
+    names = parse_deliverables(args.deliverables)
+    work = tempfile.mkdtemp(prefix="bench_deliverables_")
+    try:
+        video, render = make_class(work, args.minutes, args.height)
+        if args.audio_only:
+            video = None
+        out_dir = os.path.join(work, 'procesados')
+        os.makedirs(out_dir)
+        outputs = deliverable_paths(out_dir, 'clase.wav' if args.audio_only else 'clase.mp4', not args.audio_only, names)
+
+        separate = run(video, render, outputs, separate=True)
+        single = run(video, render, outputs, separate=False)
+        expected = duration(render)
+        valid = all(abs(duration(path) - expected) < 0.1 for path in outputs.values())
+        result = {
+            'minutes': args.minutes,
+            'deliverables': names,
+            'video': not args.audio_only,
+            'separate': separate,
+            'single': single,
+            'speedup': round(separate['wall_s'] / single['wall_s'], 2),
+            'outputs_valid': valid,
+        }
+    finally:
+        shutil.rmtree(work, ignore_errors=True)
+
+    if args.json:
+        print(json.dumps(result, indent=2))
+        return
+    print(f"{args.minutes:g} min {'de audio' if args.audio_only else 'de video'}  |  entregables: {', '.join(names)}")
+    print(f"{'forma':>18} {'pasadas':>8} {'total s':>9} {'MB leídos':>10}")
+    for label, row in (('una por entregable', separate), ('una sola pasada', single)):
+        print(f"{label:>18} {row['passes']:>8} {row['wall_s']:>9} {row['read_mb']:>10}")
+    print(f"Aceleración: {result['speedup']}x  |  duraciones correctas: {'sí' if valid else 'NO'}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,378 @@
+"""
+Benchmark de punta a punta del pipeline de AudioPro (sin API key ni Reaper)
+
+Arma un entorno completo en un directorio temporal:
+    - Fixtures sintéticas: clases de audio (WAV 48kHz mono y MP3) y videos
+      (MP4 con video de prueba) de las duraciones pedidas
+    - fake_isolation_server.py como /audio-isolation, con latencia y tasas
+      de error configurables
+    - fake_reaper.py como REAPER_EXE: escribe <nombre>_renderizado.wav tras
+      --render-seconds (worker persistente o un proceso por archivo)
+
+y ejecuta el lote completo con cada modo pedido, cada uno en un proceso
+aparte (caches, worker de Reaper y RSS pico no se mezclan entre modos):
+    serial   process_with_reaper_pipeline archivo por archivo
+    batch    el bucle del lote: run_batch con --workers archivos en vuelo
+    staged   el motor por etapas (build_staged_pipeline)
+
+El resultado es JSON (con el commit actual) para comparar entre versiones:
+latencia por etapa, por operación (spans de telemetry.py) y por archivo
+(p50/p90/p95/p99), throughput, fallas,
+contadores del servidor de isolation y RSS pico propio y de los procesos hijos.
+
+Requiere ffmpeg y ffprobe en el PATH.
+
+Uso:
+    python benchmarks/bench_end_to_end.py --audio 30,120 --video 60 --copies 2
+    python benchmarks/bench_end_to_end.py --modes staged --latency 0.5 --error-rate 0.1 \\
+        --render-seconds 2 --output resultados.json
+"""
+
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, 'benchmarks'))
+
+MODES = ('serial', 'batch', 'staged')
+
+
+def percentiles(values) -> dict:
+    """Resumen de una lista de latencias en segundos."""
+    if not values:
+        return {'count': 0}
+    ordered = sorted(values)
+
+    def _at(q: float) -> float:
+        pos = (len(ordered) - 1) * q
+        low = int(pos)
+        high = min(low + 1, len(ordered) - 1)
+        return ordered[low] + (ordered[high] - ordered[low]) * (pos - low)
+
+    return {
+        'count': len(ordered),
+        'mean': round(sum(ordered) / len(ordered), 4),
+        'p50': round(_at(0.50), 4),
+        'p90': round(_at(0.90), 4),
+        'p95': round(_at(0.95), 4),
+        'p99': round(_at(0.99), 4),
+        'max': round(ordered[-1], 4)
+    }
+
+
+def peak_rss_mb() -> dict:
+    """RSS pico del proceso y del mayor de sus hijos ya terminados (ffmpeg, Reaper)."""
+    try:
+        import resource
+    except ImportError:
+        try:
+            import psutil
+            info = psutil.Process().memory_info()
+            return {'self': round(getattr(info, 'peak_wset', info.rss) / 2 ** 20, 1), 'children': None}
+        except ImportError:
+            return {'self': None, 'children': None}
+    # ru_maxrss está en KB en Linux y en bytes en macOS
+    scale = 2 ** 20 if sys.platform == 'darwin' else 2 ** 10
+    return {
+        'self': round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / scale, 1),
+        'children': round(resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / scale, 1)
+    }
+
+
+def current_commit() -> dict:
+    def _git(*cmd):
+        result = subprocess.run(['git', *cmd], cwd=ROOT, capture_output=True, text=True)
+        return result.stdout.strip() if result.returncode == 0 else None
+    return {'commit': _git('rev-parse', '--short', 'HEAD'), 'dirty': bool(_git('status', '--porcelain', '-uno'))}
+
+
+#############
+# Fixtures  #
+#############
+
+def make_fixtures(fixture_dir: str, audio_lengths, video_lengths, copies: int) -> list:
+    """Genera clases sintéticas de audio y video. Retorna [{'path', 'kind', 'seconds'}]."""
+    from bench_render_backend import make_voice_wav
+
+    os.makedirs(fixture_dir, exist_ok=True)
+    fixtures = []
+    seed = 0
+    for seconds in audio_lengths:
+        for copy in range(copies):
+            seed += 1
+            wav = os.path.join(fixture_dir, f"clase_{seconds:g}s_{copy}.wav")
+            make_voice_wav(wav, seconds, seed)
+            mp3 = os.path.join(fixture_dir, f"clase_{seconds:g}s_{copy}.mp3")
+            subprocess.run(['ffmpeg', '-y', '-v', 'error', '-i', wav, '-ac', '2', '-ar', '44100',
+                            '-b:a', '128k', mp3], check=True)
+            fixtures += [{'path': wav, 'kind': 'audio-wav', 'seconds': seconds},
+                         {'path': mp3, 'kind': 'audio-mp3', 'seconds': seconds}]
+    for seconds in video_lengths:
+        for copy in range(copies):
+            seed += 1
+            voice = os.path.join(fixture_dir, f".voz_{seed}.wav")
+            make_voice_wav(voice, seconds, seed)
+            mp4 = os.path.join(fixture_dir, f"video_{seconds:g}s_{copy}.mp4")
+            subprocess.run([
+                'ffmpeg', '-y', '-v', 'error',
+                '-f', 'lavfi', '-i', f"testsrc2=size=320x240:rate=15:duration={seconds}",
+                '-i', voice, '-c:v', 'mpeg4', '-q:v', '8', '-c:a', 'aac', '-b:a', '96k',
+                '-shortest', mp4
+            ], check=True)
+            os.unlink(voice)
+            fixtures.append({'path': mp4, 'kind': 'video', 'seconds': seconds})
+    return fixtures
+
+
+################
+# Proceso hijo #
+################
+
+def run_mode(mode: str, fixtures: list, output_dir: str, workers: int) -> dict:
+    """Ejecuta el lote en este proceso con el entorno ya configurado."""
+    import pipeline
+    from ui_bridge import set_message_handler
+    from batch_executor import run_batch
+    from media_probe import get_probe_cache
+    from media_source import LocalPathSource
+    from telemetry import get_telemetry
+
+    # Sin Streamlit: los mensajes del pipeline se descartan
+    set_message_handler(lambda level, message: None)
+
+    os.makedirs(output_dir, exist_ok=True)
+    files = [{'source': LocalPathSource(f['path']), 'name': os.path.basename(f['path']),
+              'source_dir': output_dir} for f in fixtures]
+    seconds_by_name = {os.path.basename(f['path']): f['seconds'] for f in fixtures}
+
+    start = time.perf_counter()
+    validate_start = start
+    files, rejected = pipeline.reject_invalid_inputs(files)
+    validate_s = time.perf_counter() - validate_start
+
+    staged = None
+    if mode == 'serial':
+        batch = run_batch(files, lambda f: pipeline.process_with_reaper_pipeline(f['source'], f['name'], f['source_dir']),
+                          max_workers=1)
+    elif mode == 'batch':
+        batch = run_batch(files, lambda f: pipeline.process_with_reaper_pipeline(f['source'], f['name'], f['source_dir']),
+                          max_workers=workers)
+    else:
+        staged = pipeline.build_staged_pipeline(queue_size=pipeline.STAGE_QUEUE_SIZE)
+        batch = staged.run([pipeline.new_pipeline_job(f['source'], f['name'], f['source_dir']) for f in files])
+    wall = time.perf_counter() - start
+
+    if pipeline.RENDER_BACKEND == 'reaper' and pipeline.REAPER_MODE == 'worker':
+        from reaper_worker import get_reaper_worker_host
+        worker_stats = get_reaper_worker_host().stats()
+        get_reaper_worker_host().stop()
+    else:
+        worker_stats = None
+
+    ok = [entry for entry in batch if entry['ok']]
+    # Latencias desde los spans de telemetría (etapas y llamadas a ffmpeg, HTTP y Reaper)
+    durations = {}
+    for record in get_telemetry().spans():
+        durations.setdefault(record['name'], []).append(record['duration_s'])
+    audio_s = sum(seconds_by_name[entry['item']['name']] for entry in ok)
+    result = {
+        'mode': mode,
+        'workers': 1 if mode == 'serial' else (workers if mode == 'batch' else pipeline.STAGE_WORKERS),
+        'files': len(batch) + len(rejected),
+        'ok': len(ok),
+        'failed': len(batch) - len(ok),
+        'rejected': [{'name': item['name'], 'reason': reason} for item, reason in rejected],
+        'errors': [{
+            'name': entry['item']['name'],
+            'stage': entry.get('stage'),
+            'error': str(entry['error'])
+        } for entry in batch if not entry['ok']],
+        'wall_s': round(wall, 3),
+        'validate_s': round(validate_s, 3),
+        'throughput': {
+            'files_per_min': round(len(ok) / wall * 60, 2) if wall else None,
+            'audio_x_realtime': round(audio_s / wall, 2) if wall else None
+        },
+        'stage_latency_s': {name[len('stage.'):]: percentiles(values)
+                            for name, values in durations.items() if name.startswith('stage.')},
+        'operation_latency_s': {name: percentiles(values)
+                                for name, values in durations.items() if not name.startswith('stage.')},
+        'file_latency_s': percentiles([entry['elapsed'] for entry in ok]),
+        'operation_totals': get_telemetry().summary(),
+        'probe_cache': get_probe_cache().stats(),
+        'reaper_worker': worker_stats,
+        'peak_rss_mb': peak_rss_mb()
+    }
+    if staged is not None:
+        result['pipeline'] = {'stages': staged.stats(), 'bottleneck': staged.bottleneck()}
+    return result
+
+
+##########
+# Driver #
+##########
+
+def build_env(args, work: str, base_url: str, launcher: str) -> dict:
+    """Entorno del proceso hijo: todo apunta al directorio temporal y a los simuladores."""
+    env = dict(os.environ)
+    env.update({
+        'AUDIOPRO_ELEVEN_DIR': os.path.join(work, 'eleven'),
+        'AUDIOPRO_SESSIONS_DIR': os.path.join(work, 'sesiones'),
+        'AUDIOPRO_SCRATCH_DIR': os.path.join(work, 'scratch'),
+        'AUDIOPRO_TELEMETRY_DIR': os.path.join(work, 'telemetry'),
+        'AUDIOPRO_REAPER_EXE': launcher,
+        'AUDIOPRO_REAPER_TEMPLATE': os.path.join(work, 'template.rpp'),
+        'REAPER_QUEUE_DIR': os.path.join(work, 'reaper_queue'),
+        'REAPER_MODE': args.reaper_mode,
+        'REAPER_BATCH_SIZE': str(args.reaper_batch),
+        'RENDER_BACKEND': args.render_backend,
+        'ELEVENLABS_API_KEY': 'local',
+        'ELEVENLABS_BASE_URL': base_url,
+        # Cada corrida debe llegar al servidor: sin caché de resultados
+        'ISOLATION_CACHE_MB': '0',
+        'MAX_WORKERS': str(args.workers),
+    })
+    # Defaults del benchmark que se pueden sobreescribir desde el entorno
+    for key, value in {
+        'ISOLATION_RATE_PER_MIN': '6000',
+        'ISOLATION_BURST': '64',
+        'RENDER_POLL_INTERVAL': '0.05',
+        'REAPER_STATUS_POLL_INTERVAL': '0.05',
+    }.items():
+        env.setdefault(key, value)
+    for path in ('eleven', 'sesiones', 'scratch'):
+        os.makedirs(os.path.join(work, path), exist_ok=True)
+    with open(env['AUDIOPRO_REAPER_TEMPLATE'], 'w', encoding='utf-8') as f:
+        f.write('<REAPER_PROJECT 0.1 "benchmark"\n  <TRACK\n    NAME Clase\n  >\n>\n')
+    return env
+
+
+def run_child(mode: str, fixtures_file: str, output_dir: str, workers: int, env: dict) -> dict:
+    cmd = [sys.executable, os.path.abspath(__file__), '--child', mode,
+           '--fixtures-file', fixtures_file, '--output-dir', output_dir, '--workers', str(workers)]
+    proc = subprocess.run(cmd, env=env, capture_output=True, text=True)
+    lines = [line for line in proc.stdout.splitlines() if line.startswith('{')]
+    if proc.returncode != 0 or not lines:
+        sys.stderr.write(proc.stderr[-4000:])
+        raise RuntimeError(f"El modo {mode} terminó con código {proc.returncode}")
+    return json.loads(lines[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--audio', default='30,120', help="Duraciones (s) de las clases de audio, separadas por coma")
+    parser.add_argument('--video', default='60', help="Duraciones (s) de los videos ('' para ninguno)")
+    parser.add_argument('--copies', type=int, default=2, help="Archivos por duración")
+    parser.add_argument('--modes', default='batch,staged', help=f"Modos a medir ({', '.join(MODES)})")
+    parser.add_argument('--workers', type=int, default=2, help="Archivos en vuelo en el modo batch")
+    parser.add_argument('--latency', type=float, default=0.2, help="Latencia del servidor de isolation (s)")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="Fracción de respuestas 500")
+    parser.add_argument('--rate-limit-rate', type=float, default=0.0, help="Fracción de respuestas 429")
+    parser.add_argument('--render-seconds', type=float, default=1.0, help="Duración simulada de cada render")
+    parser.add_argument('--reaper-mode', choices=('worker', 'launch'), default='worker')
+    parser.add_argument('--reaper-batch', type=int, default=1, help="Archivos por sesión de Reaper (lotes por regiones)")
+    parser.add_argument('--render-backend', choices=('reaper', 'numpy'), default='reaper')
+    parser.add_argument('--output', default=None, help="Archivo JSON de salida (por defecto stdout)")
+    parser.add_argument('--keep', action='store_true', help="Conservar el directorio de trabajo")
+    # Uso interno: ejecución de un modo en el proceso hijo
+    parser.add_argument('--child', choices=MODES, help=argparse.SUPPRESS)
+    parser.add_argument('--fixtures-file', help=argparse.SUPPRESS)
+    parser.add_argument('--output-dir', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        with open(args.fixtures_file, 'r', encoding='utf-8') as f:
+            fixtures = json.load(f)
+        print(json.dumps(run_mode(args.child, fixtures, args.output_dir, args.workers), ensure_ascii=False))
+        return
+
+    modes = [m.strip() for m in args.modes.split(',') if m.strip()]
+    unknown = set(modes) - set(MODES)
+    if unknown:
+        parser.error(f"Modos desconocidos: {', '.join(sorted(unknown))}")
+    audio_lengths = [float(x) for x in args.audio.split(',') if x.strip()]
+    video_lengths = [float(x) for x in args.video.split(',') if x.strip()]
+
+    from fake_isolation_server import start_server
+    from fake_reaper import write_launcher
+
+    work = tempfile.mkdtemp(prefix="bench_e2e_")
+    server = start_server(latency=args.latency, error_rate=args.error_rate, rate_limit_rate=args.rate_limit_rate)
+    try:
+        fixtures_start = time.perf_counter()
+        fixtures = make_fixtures(os.path.join(work, 'fixtures'), audio_lengths, video_lengths, args.copies)
+        fixtures_s = time.perf_counter() - fixtures_start
+        fixtures_file = os.path.join(work, 'fixtures.json')
+        with open(fixtures_file, 'w', encoding='utf-8') as f:
+            json.dump(fixtures, f)
+
+        launcher = write_launcher(os.path.join(work, 'fake_reaper'), args.render_seconds)
+        env = build_env(args, work, server.base_url, launcher)
+
+        runs = []
+        for mode in modes:
+            with server.lock:
+                before = dict(server.counters)
+            print(f"→ {mode}...", file=sys.stderr)
+            # Diario propio por modo: cada modo procesa todo (sin retomar lo que dejó el anterior)
+            mode_env = dict(env, AUDIOPRO_JOURNAL_PATH=os.path.join(work, f'journal_{mode}.sqlite3'))
+            result = run_child(mode, fixtures_file, os.path.join(work, 'salida', mode), args.workers, mode_env)
+            with server.lock:
+                result['isolation_server'] = {
+                    key: server.counters[key] - before[key]
+                    for key in ('requests', 'ok', 'errors', 'rate_limited', 'bytes_in', 'bytes_out')
+                }
+                result['isolation_server']['max_in_flight'] = server.counters['max_in_flight']
+            runs.append(result)
+    finally:
+        server.shutdown()
+        if args.keep:
+            print(f"Directorio de trabajo: {work}", file=sys.stderr)
+        else:
+            shutil.rmtree(work, ignore_errors=True)
+
+    report = {
+        'benchmark': 'end_to_end',
+        'created': datetime.now().isoformat(timespec='seconds'),
+        'git': current_commit(),
+        'python': sys.version.split()[0],
+        'platform': sys.platform,
+        'config': {
+            'audio_lengths_s': audio_lengths,
+            'video_lengths_s': video_lengths,
+            'copies': args.copies,
+            'workers': args.workers,
+            'isolation_latency_s': args.latency,
+            'isolation_error_rate': args.error_rate,
+            'isolation_rate_limit_rate': args.rate_limit_rate,
+            'render_seconds': args.render_seconds,
+            'reaper_mode': args.reaper_mode,
+            'reaper_batch': args.reaper_batch,
+            'render_backend': args.render_backend
+        },
+        'fixtures': {
+            'files': len(fixtures),
+            'audio_s': sum(f['seconds'] for f in fixtures),
+            'generation_s': round(fixtures_s, 3)
+        },
+        'runs': runs
+    }
+    payload = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(payload + '\n')
+        print(f"Resultados en {args.output}", file=sys.stderr)
+    else:
+        print(payload)
+
+
+if __name__ == '__main__':
+    main()
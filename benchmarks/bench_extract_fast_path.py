@@ -0,0 +1,126 @@
+"""
+Benchmark de la extracción de audio: transcodificación completa vs camino rápido
+
+Simula un archivo de clases grabadas: --files WAV que ya están en el formato
+del pipeline (PCM 16-bit mono 48kHz) y, con --containers, la misma cantidad en
+.mov con audio pcm_s16le (se copian sin decodificar). Mide el tiempo de
+extract_audio_wav16_mono con EXTRACT_FAST_PATH desactivado y activado.
+
+Con --same-volume la carpeta Eleven se crea junto a las entradas (hard link);
+sin ella se usa otro directorio temporal, que en la mayoría de los sistemas
+también está en el mismo volumen. Para medir el modo 'reuse' apunta
+--eleven-dir a otro disco.
+
+Uso:
+    python benchmarks/bench_extract_fast_path.py --files 6 --minutes 60
+    python benchmarks/bench_extract_fast_path.py --files 4 --minutes 90 --containers --json
+"""
+
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, 'benchmarks'))
+
+
+def make_container(wav_path: str, out_path: str) -> None:
+    """Empaqueta el PCM de un WAV en .mov sin re-codificarlo."""
+    subprocess.run(['ffmpeg', '-y', '-v', 'error', '-i', wav_path, '-c:a', 'copy', out_path], check=True)
+
+
+def run_extraction(inputs, fast_path: bool) -> dict:
+    import audio_utils
+    report = audio_utils.new_io_report()
+    modes = {}
+    outputs = []
+    start = time.perf_counter()
+    for path in inputs:
+        file_report = audio_utils.new_io_report()
+        outputs.append(audio_utils.extract_audio_wav16_mono(path, file_report, fast_path=fast_path))
+        modes[file_report['extract_mode']] = modes.get(file_report['extract_mode'], 0) + 1
+        report['io_saved_bytes'] += file_report['io_saved_bytes']
+    wall = time.perf_counter() - start
+    for out, path in zip(outputs, inputs):
+        if out != path:
+            os.unlink(out)
+    return {'wall_s': wall, 'modes': modes, 'io_saved_bytes': report['io_saved_bytes']}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--files', type=int, default=4)
+    parser.add_argument('--minutes', type=float, default=30.0, help="Duración de cada clase")
+    parser.add_argument('--containers', action='store_true', help="Agregar entradas .mov con PCM (stream copy)")
+    parser.add_argument('--eleven-dir', default=None, help="Carpeta de salida (por defecto, temporal)")
+    parser.add_argument('--same-volume', action='store_true', help="Carpeta de salida junto a las entradas")
+    parser.add_argument('--json', action='store_true')
+    args = parser.parse_args()
+
+    work = tempfile.mkdtemp(prefix="bench_extract_")
+    eleven_dir = args.eleven_dir or (os.path.join(work, 'eleven') if args.same_volume
+                                     else tempfile.mkdtemp(prefix="bench_eleven_"))
+    # audio_utils lee la carpeta al importarse
+    os.environ['AUDIOPRO_ELEVEN_DIR'] = eleven_dir
+
+    from bench_render_backend import make_voice_wav
+
+    try:
+        inputs = []
+        for i in range(args.files):
+            path = os.path.join(work, f"clase_{i:03d}.wav")
+            make_voice_wav(path, args.minutes * 60, seed=i)
+            inputs.append(path)
+        if args.containers:
+            for i, wav in enumerate(list(inputs)):
+                mov = os.path.join(work, f"clase_{i:03d}.mov")
+                make_container(wav, mov)
+                inputs.append(mov)
+        total_bytes = sum(os.path.getsize(p) for p in inputs)
+
+        results = {
+            'transcode': run_extraction(inputs, fast_path=False),
+            'fast_path': run_extraction(inputs, fast_path=True)
+        }
+    finally:
+        shutil.rmtree(work, ignore_errors=True)
+        if not args.eleven_dir and not args.same_volume:
+            shutil.rmtree(eleven_dir, ignore_errors=True)
+
+    audio_seconds = args.files * args.minutes * 60 * (2 if args.containers else 1)
+    rows = [{
+        'mode': label,
+        'wall_s': round(r['wall_s'], 3),
+        'per_file_s': round(r['wall_s'] / len(inputs), 3),
+        'realtime_factor': round(audio_seconds / r['wall_s'], 1) if r['wall_s'] else None,
+        'extract_modes': r['modes'],
+        'io_saved_mb': round(r['io_saved_bytes'] / (1024 * 1024), 1)
+    } for label, r in results.items()]
+    speedup = results['transcode']['wall_s'] / max(results['fast_path']['wall_s'], 1e-9)
+
+    if args.json:
+        print(json.dumps({
+            'files': len(inputs),
+            'audio_s': audio_seconds,
+            'input_mb': round(total_bytes / (1024 * 1024), 1),
+            'speedup': round(speedup, 1),
+            'results': rows
+        }, indent=2))
+        return
+
+    print(f"{len(inputs)} archivo(s)  |  {audio_seconds / 3600:.1f} h de audio  |  {total_bytes / (1024 * 1024):.0f} MB")
+    print(f"{'modo':>10} {'total s':>9} {'s/archivo':>10} {'x tiempo real':>14} {'MB evitados':>12}  modos")
+    for row in rows:
+        print(f"{row['mode']:>10} {row['wall_s']:>9} {row['per_file_s']:>10} "
+              f"{row['realtime_factor']:>14} {row['io_saved_mb']:>12}  {row['extract_modes']}")
+    print(f"Aceleración: {speedup:.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,110 @@
+"""
+Benchmark del cliente HTTP de Audio Isolation contra el servidor local simulado
+
+Compara requests.post sin sesión (como el pipeline original: conexión nueva
+y respuesta completa en memoria) con IsolationClient (pool keep-alive y
+streaming en ambos sentidos). Reporta conexiones abiertas, tiempo y pico de
+memoria Python por request.
+
+Uso:
+    python benchmarks/bench_isolation_client.py --size-mb 64 --requests 8
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import requests  # noqa: E402
+
+from fake_isolation_server import start_server  # noqa: E402
+from isolation_client import IsolationClient  # noqa: E402
+from wav_io import wav_header_bytes  # noqa: E402
+
+
+def make_wav(path: str, size_mb: int) -> None:
+    """Escribe un WAV mono 48kHz 16-bit de aproximadamente size_mb MB."""
+    data_size = size_mb * 1024 * 1024
+    block = os.urandom(1024 * 1024)
+    with open(path, 'wb') as f:
+        f.write(wav_header_bytes(48000, 1, 16, data_size))
+        for _ in range(size_mb):
+            f.write(block)
+
+
+def run_baseline(url: str, audio_file: str, dest: str) -> int:
+    with open(audio_file, 'rb') as f:
+        response = requests.post(url, headers={'xi-api-key': 'local'},
+                                 files={'audio': (os.path.basename(audio_file), f, 'audio/wav')}, timeout=180)
+    with open(dest, 'wb') as out:
+        out.write(response.content)
+    return response.status_code
+
+
+def measure(label: str, fn, count: int, server) -> dict:
+    before = dict(server.counters)
+    peaks = []
+    start = time.perf_counter()
+    for _ in range(count):
+        tracemalloc.start()
+        fn()
+        peaks.append(tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+    wall = time.perf_counter() - start
+    return {
+        'client': label,
+        'requests': count,
+        'connections': server.counters['connections'] - before['connections'],
+        'wall_s': round(wall, 3),
+        'per_request_s': round(wall / count, 4),
+        'peak_mem_mb': round(max(peaks) / (1024 * 1024), 2)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--size-mb', type=int, default=32)
+    parser.add_argument('--requests', type=int, default=6)
+    parser.add_argument('--json', action='store_true')
+    args = parser.parse_args()
+
+    server = start_server()
+    url = f"{server.base_url}/audio-isolation"
+    work = tempfile.mkdtemp(prefix="bench_client_")
+    audio = os.path.join(work, 'input.wav')
+    dest = os.path.join(work, 'output.wav')
+    make_wav(audio, args.size_mb)
+
+    try:
+        client = IsolationClient()
+        rows = [
+            measure('requests.post', lambda: run_baseline(url, audio, dest), args.requests, server),
+            measure('IsolationClient', lambda: client.post_audio(url, {'xi-api-key': 'local'}, audio, dest),
+                    args.requests, server),
+        ]
+        identical = os.path.getsize(dest) == os.path.getsize(audio)
+    finally:
+        server.shutdown()
+        for name in os.listdir(work):
+            os.unlink(os.path.join(work, name))
+        os.rmdir(work)
+
+    if args.json:
+        print(json.dumps({'size_mb': args.size_mb, 'echo_ok': identical, 'results': rows}, indent=2))
+        return
+
+    print(f"Archivo: {args.size_mb} MB  |  eco íntegro: {'sí' if identical else 'NO'}")
+    print(f"{'cliente':>16} {'requests':>9} {'conexiones':>11} {'s/request':>10} {'pico MB':>8}")
+    for row in rows:
+        print(f"{row['client']:>16} {row['requests']:>9} {row['connections']:>11} "
+              f"{row['per_request_s']:>10} {row['peak_mem_mb']:>8}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,133 @@
+"""
+Benchmark del recorte de silencios (voice_activity.py) antes de Audio Isolation
+
+Genera una clase sintética con tramos de voz y silencios largos (fracción
+--silence) y la procesa con process_audio_with_elevenlabs contra
+fake_isolation_server.py, con y sin VAD. El servidor simula un servicio que
+tarda en proporción a lo que recibe (--mb-per-second), así que se ve tanto
+el ahorro de bytes subidos como el de latencia. Verifica que la salida mida
+exactamente lo mismo que la entrada (alineación con el video).
+
+Uso:
+    python benchmarks/bench_isolation_vad.py --minutes 20 --silence 0.4
+    python benchmarks/bench_isolation_vad.py --minutes 60 --silence 0.3 --chunk-seconds 300 --json
+"""
+
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import numpy as np  # noqa: E402
+
+from fake_isolation_server import start_server  # noqa: E402
+
+SAMPLE_RATE = 48000
+
+
+def make_lecture_wav(path: str, minutes: float, silence: float, seed: int = 0) -> None:
+    """Voz sintética en tramos de 20-90 s separados por silencios (ruido de sala) hasta sumar la fracción pedida."""
+    from isolation_chunks import float_to_pcm16
+    from wav_io import wav_header_bytes
+
+    rng = np.random.default_rng(seed)
+    total = int(minutes * 60 * SAMPLE_RATE)
+    spans = []
+    remaining = total
+    while remaining > 0:
+        talk = min(remaining, int(rng.uniform(20, 90) * SAMPLE_RATE))
+        pause = min(remaining - talk, int(talk * silence / max(1e-6, 1.0 - silence)))
+        spans += [('voz', talk), ('silencio', pause)]
+        remaining -= talk + pause
+
+    with open(path, 'wb') as f:
+        f.write(wav_header_bytes(SAMPLE_RATE, 1, 16, total * 2))
+        for kind, frames in spans:
+            for first in range(0, frames, SAMPLE_RATE * 10):
+                n = min(SAMPLE_RATE * 10, frames - first)
+                noise = rng.standard_normal(n)
+                if kind == 'voz':
+                    t = (first + np.arange(n)) / SAMPLE_RATE
+                    envelope = 0.15 + 0.85 * np.clip(np.sin(2 * np.pi * 4 * t), 0, None)
+                    block = 0.2 * envelope * (np.sin(2 * np.pi * 150 * t) + 0.3 * noise)
+                else:
+                    block = 0.0005 * noise
+                f.write(float_to_pcm16(block).tobytes())
+
+
+def run(audio_file: str, vad: bool, server) -> dict:
+    import audio_utils
+    import voice_activity
+    from isolation_chunks import read_pcm16
+
+    voice_activity.VAD_ENABLED = vad
+    before = dict(server.counters)
+    report = audio_utils.new_io_report()
+    start = time.perf_counter()
+    output = audio_utils.process_audio_with_elevenlabs(audio_file, report)
+    wall = time.perf_counter() - start
+    if output == audio_file:
+        raise RuntimeError("Audio Isolation no procesó el archivo")
+    aligned = read_pcm16(output)[0].shape[0] == read_pcm16(audio_file)[0].shape[0]
+    os.unlink(output)
+    return {
+        'mode': 'vad' if vad else 'completo',
+        'wall_s': round(wall, 3),
+        'uploaded_mb': round((server.counters['bytes_in'] - before['bytes_in']) / 2 ** 20, 1),
+        'requests': server.counters['requests'] - before['requests'],
+        'same_length': aligned
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--minutes', type=float, default=20.0)
+    parser.add_argument('--silence', type=float, default=0.4, help="Fracción de silencio en la clase")
+    parser.add_argument('--mb-per-second', type=float, default=8.0, help="Velocidad simulada del servicio")
+    parser.add_argument('--chunk-seconds', type=float, default=0.0, help="ISOLATION_CHUNK_SECONDS")
+    parser.add_argument('--json', action='store_true')
+    args = parser.parse_args()
+
+    work = tempfile.mkdtemp(prefix="bench_vad_")
+    server = start_server(bytes_per_second=args.mb_per_second * 2 ** 20)
+    os.environ.update({
+        'ELEVENLABS_API_KEY': 'local',
+        'ELEVENLABS_BASE_URL': server.base_url,
+        'AUDIOPRO_ELEVEN_DIR': os.path.join(work, 'eleven'),
+        'ISOLATION_CACHE_MB': '0',
+        'ISOLATION_RATE_PER_MIN': '6000',
+        'ISOLATION_CHUNK_SECONDS': str(args.chunk_seconds)
+    })
+    try:
+        audio = os.path.join(work, 'clase.wav')
+        make_lecture_wav(audio, args.minutes, args.silence)
+        rows = [run(audio, False, server), run(audio, True, server)]
+    finally:
+        server.shutdown()
+        shutil.rmtree(work, ignore_errors=True)
+
+    full, vad = rows
+    summary = {
+        'bytes_saved_pct': round(100.0 * (1 - vad['uploaded_mb'] / full['uploaded_mb']), 1) if full['uploaded_mb'] else 0.0,
+        'latency_saved_pct': round(100.0 * (1 - vad['wall_s'] / full['wall_s']), 1) if full['wall_s'] else 0.0
+    }
+    if args.json:
+        print(json.dumps({'minutes': args.minutes, 'silence': args.silence, 'results': rows, **summary}, indent=2))
+        return
+
+    print(f"{args.minutes:g} min, {100 * args.silence:.0f}% de silencio  |  servicio simulado a {args.mb_per_second:g} MB/s")
+    print(f"{'modo':>10} {'total s':>9} {'MB subidos':>11} {'requests':>9} {'misma long.':>12}")
+    for row in rows:
+        print(f"{row['mode']:>10} {row['wall_s']:>9} {row['uploaded_mb']:>11} {row['requests']:>9} "
+              f"{'sí' if row['same_length'] else 'NO':>12}")
+    print(f"Ahorro: {summary['bytes_saved_pct']}% de bytes, {summary['latency_saved_pct']}% de latencia")
+
+
+if __name__ == '__main__':
+    main()
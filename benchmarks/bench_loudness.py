@@ -0,0 +1,132 @@
+"""
+Benchmark del medidor de loudness (loudness.py): velocidad y memoria
+
+Genera voz sintética (WAV mono 48kHz, 24-bit como los renders que mide la
+etapa de loudness; --bits 16 para el formato de la extracción) y mide el
+factor de tiempo real (segundos de audio / segundos de proceso) de:
+    measure        loudness integrado + LRA + true peak (memmap, una pasada)
+    measure-no-tp  sin true peak (solo filtro K y gating)
+    normalize      medición + ganancia a --target LUFS + medición de la salida
+    ffmpeg         filtro ebur128=peak=true de ffmpeg, como referencia (--skip-ffmpeg para omitir)
+
+La memoria pico de Python (tracemalloc) se reporta para mostrar que no
+depende de la duración: probar con --minutes 10 y --minutes 180.
+
+Uso:
+    python benchmarks/bench_loudness.py --minutes 60
+    python benchmarks/bench_loudness.py --minutes 180 --skip-ffmpeg --json
+    python benchmarks/bench_loudness.py --minutes 60 --bits 16
+"""
+
+import argparse
+import json
+import os
+import re
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_render_backend import make_voice_wav  # noqa: E402
+from dsp_render import CHUNK_FRAMES, SAMPLE_RATE, _iter_input, _to_pcm_bytes  # noqa: E402
+from loudness import measure_loudness, normalize_file  # noqa: E402
+from wav_io import wav_header_bytes  # noqa: E402
+
+
+def _timed(fn, *args, **kwargs):
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = fn(*args, **kwargs)
+    wall = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, wall, peak
+
+
+def to_24bit(source: str, path: str) -> None:
+    """Copia un WAV 16-bit como PCM 24-bit (mismas muestras, como un render)."""
+    frames = (os.path.getsize(source) - 44) // 2
+    with open(path, 'wb') as f:
+        f.write(wav_header_bytes(SAMPLE_RATE, 1, 24, frames * 3))
+        for block in _iter_input(source, CHUNK_FRAMES):
+            f.write(_to_pcm_bytes(block, 24))
+
+
+def bench_ffmpeg(path):
+    """Corre ffmpeg ebur128 y extrae I, LRA y true peak del resumen."""
+    start = time.perf_counter()
+    proc = subprocess.run(
+        ['ffmpeg', '-hide_banner', '-nostats', '-i', path, '-af', 'ebur128=peak=true:framelog=quiet', '-f', 'null', '-'],
+        capture_output=True, text=True
+    )
+    wall = time.perf_counter() - start
+    summary = proc.stderr[proc.stderr.rfind('Summary'):]
+
+    def _value(label):
+        match = re.search(rf'{label}:\s+(-?[\d.]+)', summary)
+        return float(match.group(1)) if match else None
+
+    return {'integrated_lufs': _value('I'), 'lra_lu': _value('LRA'), 'true_peak_dbtp': _value('Peak')}, wall
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--minutes', type=float, default=30.0, help="Duración del archivo de prueba")
+    parser.add_argument('--target', type=float, default=-16.0, help="Objetivo de normalización en LUFS")
+    parser.add_argument('--bits', type=int, choices=(16, 24), default=24, help="Profundidad del WAV de prueba")
+    parser.add_argument('--skip-ffmpeg', action='store_true')
+    parser.add_argument('--json', action='store_true')
+    args = parser.parse_args()
+
+    work = tempfile.mkdtemp(prefix="bench_loudness_")
+    try:
+        path = os.path.join(work, "input.wav")
+        make_voice_wav(path, args.minutes * 60, seed=0)
+        if args.bits == 24:
+            voice, path = path, os.path.join(work, "input_24.wav")
+            to_24bit(voice, path)
+            os.unlink(voice)
+        audio_seconds = args.minutes * 60
+
+        rows = []
+        measured, wall, peak = _timed(measure_loudness, path)
+        rows.append(('measure', wall, peak, measured))
+        result, wall, peak = _timed(measure_loudness, path, true_peak=False)
+        rows.append(('measure-no-tp', wall, peak, result))
+        report, wall, peak = _timed(normalize_file, path, os.path.join(work, "normalized.wav"), args.target)
+        rows.append(('normalize', wall, peak, report['output']))
+        if not args.skip_ffmpeg and shutil.which('ffmpeg'):
+            reference, wall = bench_ffmpeg(path)
+            rows.append(('ffmpeg', wall, None, reference))
+    finally:
+        shutil.rmtree(work, ignore_errors=True)
+
+    results = [{
+        'mode': label,
+        'wall_s': round(wall, 3),
+        'realtime_factor': round(audio_seconds / wall, 1),
+        'peak_python_mb': round(peak / (1024 * 1024), 1) if peak is not None else None,
+        'integrated_lufs': values.get('integrated_lufs'),
+        'lra_lu': values.get('lra_lu'),
+        'true_peak_dbtp': values.get('true_peak_dbtp')
+    } for label, wall, peak, values in rows]
+
+    if args.json:
+        print(json.dumps({'audio_s': audio_seconds, 'bits': args.bits, 'target_lufs': args.target, 'results': results},
+                         indent=2))
+        return
+
+    print(f"{args.minutes:g} min de audio {args.bits}-bit  |  objetivo {args.target:g} LUFS")
+    print(f"{'modo':>14} {'total s':>9} {'x tiempo real':>14} {'MB pico':>8} {'LUFS':>8} {'LRA':>6} {'dBTP':>7}")
+    for row in results:
+        mb = row['peak_python_mb'] if row['peak_python_mb'] is not None else '-'
+        print(f"{row['mode']:>14} {row['wall_s']:>9} {row['realtime_factor']:>14} {mb:>8} "
+              f"{row['integrated_lufs']!s:>8} {row['lra_lu']!s:>6} {row['true_peak_dbtp']!s:>7}")
+
+
+if __name__ == '__main__':
+    main()
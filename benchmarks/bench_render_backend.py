@@ -0,0 +1,136 @@
+"""
+Benchmark de backends de render: motor NumPy vs Reaper
+
+Genera archivos de voz sintética (WAV mono 48kHz 16-bit) y mide el factor
+de tiempo real (segundos de audio / segundos de proceso) de:
+    numpy-1      dsp_render en un solo proceso
+    numpy-pool   dsp_render repartido entre --workers procesos
+    reaper       cola del worker persistente (reaper_worker.py); sin --reaper-exe
+                 usa reaper_worker_stub.py, que solo copia el audio y mide el
+                 costo del protocolo, no el de la cadena de plugins
+
+Uso:
+    python benchmarks/bench_render_backend.py --files 4 --minutes 5 --workers 4
+    python benchmarks/bench_render_backend.py --reaper-exe "C:/Program Files/REAPER (x64)/reaper.exe" \\
+        --template "F:/00/00 Reaper/00 Voces.rpp"
+"""
+
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np  # noqa: E402
+
+from dsp_render import SAMPLE_RATE, render_batch, render_file  # noqa: E402
+from reaper_worker import ReaperWorkerHost  # noqa: E402
+from wav_io import wav_header_bytes  # noqa: E402
+
+
+def make_voice_wav(path: str, seconds: float, seed: int) -> None:
+    """Escribe voz sintética: ruido filtrado con envolvente silábica y pausas."""
+    rng = np.random.default_rng(seed)
+    frames = int(seconds * SAMPLE_RATE)
+    with open(path, 'wb') as f:
+        f.write(wav_header_bytes(SAMPLE_RATE, 1, 16, frames * 2))
+        block = SAMPLE_RATE * 10
+        for start in range(0, frames, block):
+            n = min(block, frames - start)
+            t = (start + np.arange(n)) / SAMPLE_RATE
+            carrier = np.sin(2 * np.pi * 140 * t) + 0.5 * np.sin(2 * np.pi * 280 * t) + 0.3 * rng.standard_normal(n)
+            envelope = np.clip(np.sin(2 * np.pi * 4 * t), 0, None) * (np.sin(2 * np.pi * 0.2 * t) > -0.6)
+            f.write(np.clip(carrier * envelope * 0.25 * 32767, -32768, 32767).astype('<i2').tobytes())
+
+
+def bench_numpy_serial(inputs, work) -> float:
+    start = time.perf_counter()
+    for i, path in enumerate(inputs):
+        render_file(path, os.path.join(work, f"numpy1_{i}.wav"))
+    return time.perf_counter() - start
+
+
+def bench_numpy_pool(inputs, work, workers) -> float:
+    start = time.perf_counter()
+    render_batch([(path, os.path.join(work, f"numpypool_{i}.wav")) for i, path in enumerate(inputs)], workers)
+    return time.perf_counter() - start
+
+
+def bench_reaper(inputs, work, reaper_exe, template) -> float:
+    queue = os.path.join(work, 'queue')
+    job_script = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'add_audio_to_session.lua')
+    host = ReaperWorkerHost(queue_dir=queue, reaper_exe=reaper_exe, job_script=job_script, stub=not reaper_exe)
+    host.ensure_running()
+    try:
+        start = time.perf_counter()
+        job_ids = []
+        for i, path in enumerate(inputs):
+            session = os.path.join(work, 'sessions', f"bench_{i}.rpp")
+            os.makedirs(os.path.dirname(session), exist_ok=True)
+            job_ids.append(host.submit({
+                'audio_file': path.replace('\\', '/'),
+                'session_name': session.replace('\\', '/'),
+                'template_path': (template or '').replace('\\', '/'),
+                'original_name': f"bench_{i}",
+                'render_file': os.path.join(work, 'sessions', f"bench_{i}_renderizado.wav").replace('\\', '/')
+            }))
+        for job_id in job_ids:
+            status = host.wait(job_id, timeout=3600)
+            if status.get('status') != 'ok':
+                raise RuntimeError(f"Trabajo {job_id} falló: {status.get('message')}")
+        return time.perf_counter() - start
+    finally:
+        host.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--files', type=int, default=4)
+    parser.add_argument('--minutes', type=float, default=2.0, help="Duración de cada archivo")
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--reaper-exe', default=None, help="Medir Reaper real en lugar del worker simulado")
+    parser.add_argument('--template', default=None, help="Template .rpp para Reaper real")
+    parser.add_argument('--skip-reaper', action='store_true')
+    parser.add_argument('--json', action='store_true')
+    args = parser.parse_args()
+
+    work = tempfile.mkdtemp(prefix="bench_render_")
+    try:
+        inputs = []
+        for i in range(args.files):
+            path = os.path.join(work, f"input_{i}.wav")
+            make_voice_wav(path, args.minutes * 60, seed=i)
+            inputs.append(path)
+        audio_seconds = args.files * args.minutes * 60
+
+        timings = [('numpy-1', bench_numpy_serial(inputs, work)),
+                   (f'numpy-pool({args.workers})', bench_numpy_pool(inputs, work, args.workers))]
+        if not args.skip_reaper:
+            label = 'reaper' if args.reaper_exe else 'reaper-stub'
+            timings.append((label, bench_reaper(inputs, work, args.reaper_exe, args.template)))
+    finally:
+        shutil.rmtree(work, ignore_errors=True)
+
+    rows = [{
+        'backend': label,
+        'wall_s': round(wall, 3),
+        'realtime_factor': round(audio_seconds / wall, 1),
+        'per_file_s': round(wall / args.files, 3)
+    } for label, wall in timings]
+
+    if args.json:
+        print(json.dumps({'files': args.files, 'audio_s': audio_seconds, 'results': rows}, indent=2))
+        return
+
+    print(f"{args.files} archivo(s) x {args.minutes:g} min  |  {audio_seconds:.0f}s de audio")
+    print(f"{'backend':>16} {'total s':>9} {'s/archivo':>10} {'x tiempo real':>14}")
+    for row in rows:
+        print(f"{row['backend']:>16} {row['wall_s']:>9} {row['per_file_s']:>10} {row['realtime_factor']:>14}")
+
+
+if __name__ == '__main__':
+    main()
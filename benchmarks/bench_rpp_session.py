@@ -0,0 +1,111 @@
+"""
+Benchmark del armado nativo de sesiones de Reaper (rpp_project.py)
+
+Arma --sessions sesiones listas para renderizar a partir de un template:
+el real (--template) o uno sintético con --tracks pistas y cadenas de
+plugins con datos base64 del tamaño de un template de voz típico. Reporta
+el parseo inicial del template, el armado y la escritura de cada sesión
+(con el template ya en caché) y verifica que el template se reescriba byte
+a byte sin cambios y que cada sesión tenga el audio en la pista Clase.
+
+Uso:
+    python benchmarks/bench_rpp_session.py --sessions 200
+    python benchmarks/bench_rpp_session.py --template "F:/00/00 Reaper/00 Voces.rpp" --json
+"""
+
+import argparse
+import base64
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np  # noqa: E402
+
+import rpp_project  # noqa: E402
+
+
+def make_template(path: str, tracks: int, fx_per_track: int = 4, blob_kb: int = 8) -> None:
+    """Template sintético: pistas con FX (datos base64 en líneas de 128) y la pista Clase."""
+    rng = np.random.default_rng(0)
+    lines = ['<REAPER_PROJECT 0.1 "7.22/win64" 1730000000', '  RIPPLE 0', '  RENDER_FILE ""',
+             '  RENDER_PATTERN ""', '  RENDER_FMT 0 2 0', '  SELECTION 0 0', '  SELECTION2 0 0',
+             '  <RENDER_CFG', '    ZXZhdxgAAAA=', '  >']
+    for t in range(tracks):
+        name = "Clase" if t == 0 else f"Bus {t}"
+        lines += [f'  <TRACK {rpp_project.new_guid()}', f'    NAME "{name}"', '    VOLPAN 1 0 -1 -1 1',
+                  '    <FXCHAIN', '      SHOW 0']
+        for _ in range(fx_per_track):
+            blob = base64.b64encode(rng.integers(0, 256, blob_kb * 1024, dtype=np.uint8).tobytes()).decode()
+            lines.append('      <VST "VST: ReaEQ (Cockos)" reaeq.dll 0 "" 1919247729<56535472656571726561657100000000> ""')
+            lines += ['        ' + blob[i:i + 128] for i in range(0, len(blob), 128)]
+            lines.append('      >')
+        lines += ['    >', '  >']
+    lines.append('>')
+    with open(path, 'w', encoding='utf-8', newline='\n') as f:
+        f.write('\n'.join(lines) + '\n')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sessions', type=int, default=100)
+    parser.add_argument('--template', default=None, help="Template .rpp real (por defecto uno sintético)")
+    parser.add_argument('--tracks', type=int, default=12, help="Pistas del template sintético")
+    parser.add_argument('--json', action='store_true')
+    args = parser.parse_args()
+
+    work = tempfile.mkdtemp(prefix="bench_rpp_")
+    try:
+        template = args.template
+        if not template:
+            template = os.path.join(work, 'template.rpp')
+            make_template(template, args.tracks)
+        with open(template, 'r', encoding='utf-8', errors='ignore') as f:
+            text = f.read()
+        round_trip = rpp_project.format_rpp(rpp_project.parse_rpp(text)) == text
+
+        start = time.perf_counter()
+        rpp_project.load_template(template)
+        first_parse = time.perf_counter() - start
+
+        times = []
+        audio = os.path.join(work, 'clase.wav')
+        for i in range(args.sessions):
+            session = os.path.join(work, 'sesiones', f"sesion_{i}.rpp")
+            start = time.perf_counter()
+            project = rpp_project.build_render_session(template, audio, 600.0 + i,
+                                                       os.path.join(work, f"clase_{i}_renderizado.wav"))
+            rpp_project.write_project(project, session)
+            times.append(time.perf_counter() - start)
+
+        with open(session, 'r', encoding='utf-8') as f:
+            sources = rpp_project.item_sources(rpp_project.parse_rpp(f.read()))
+        valid = sources == [(0.0, 600.0 + args.sessions - 1, audio)]
+        result = {
+            'template_kb': round(os.path.getsize(template) / 1024, 1),
+            'sessions': args.sessions,
+            'first_parse_ms': round(first_parse * 1000, 2),
+            'build_write_ms_p50': round(float(np.percentile(times, 50)) * 1000, 2),
+            'build_write_ms_max': round(max(times) * 1000, 2),
+            'round_trip_exact': round_trip,
+            'session_valid': valid,
+        }
+    finally:
+        shutil.rmtree(work, ignore_errors=True)
+
+    if args.json:
+        print(json.dumps(result, indent=2))
+        return
+    print(f"Template {result['template_kb']} KB  |  {result['sessions']} sesiones")
+    print(f"Parseo inicial:         {result['first_parse_ms']} ms")
+    print(f"Armado + escritura p50: {result['build_write_ms_p50']} ms (máx {result['build_write_ms_max']} ms)")
+    print(f"Reescritura idéntica:   {'sí' if round_trip else 'NO'}")
+    print(f"Sesión válida:          {'sí' if valid else 'NO'}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,99 @@
+"""
+Benchmark del códec de subida a Audio Isolation (ISOLATION_UPLOAD_CODEC)
+
+Sube la misma voz sintética (WAV mono 48kHz 16-bit) con cada códec a
+fake_isolation_server.py, que tarda en proporción a los bytes recibidos
+(--mb-per-second simula el uplink de la oficina), y recibe el eco por
+WavTranscodeSink como en el pipeline. Reporta bytes enviados, latencia de
+punta a punta (codificación + subida + respuesta + conversión a WAV) y si
+el audio que vuelve es idéntico al original (FLAC) o cuánto difiere (Opus).
+
+Uso:
+    python benchmarks/bench_upload_codec.py --minutes 5 --mb-per-second 2
+    python benchmarks/bench_upload_codec.py --codecs wav,flac --minutes 30 --json
+"""
+
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import numpy as np  # noqa: E402
+
+from bench_render_backend import make_voice_wav  # noqa: E402
+from fake_isolation_server import start_server  # noqa: E402
+
+
+def run(codec: str, audio_file: str, work: str, server) -> dict:
+    import audio_utils
+    import isolation_client
+    from isolation_chunks import read_pcm16
+
+    isolation_client.ISOLATION_UPLOAD_CODEC = codec
+    effective = isolation_client.resolve_upload_codec()
+    output = os.path.join(work, f"eco_{codec}.wav")
+    report = audio_utils.new_io_report()
+    before = dict(server.counters)
+    url = f"{server.base_url}/audio-isolation"
+    start = time.perf_counter()
+    ok = audio_utils._isolate_request(audio_file, output, url, {'xi-api-key': 'local'}, quiet=True,
+                                      io_report=report)
+    wall = time.perf_counter() - start
+    if not ok:
+        raise RuntimeError(f"La subida con {codec} falló")
+
+    original = np.asarray(read_pcm16(audio_file)[0][:, 0], dtype=np.float64)
+    echoed = np.asarray(read_pcm16(output)[0][:, 0], dtype=np.float64)
+    same_length = len(original) == len(echoed)
+    n = min(len(original), len(echoed))
+    error = original[:n] - echoed[:n]
+    snr = float('inf') if not error.any() else 10 * np.log10(np.sum(original[:n] ** 2) / np.sum(error ** 2))
+    os.unlink(output)
+    return {
+        'codec': effective,
+        'wall_s': round(wall, 3),
+        'sent_mb': round((server.counters['bytes_in'] - before['bytes_in']) / 2 ** 20, 2),
+        'same_length': same_length,
+        'bit_exact': not error.any() and same_length,
+        'snr_db': None if snr == float('inf') else round(snr, 1)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--minutes', type=float, default=5.0)
+    parser.add_argument('--codecs', default='wav,flac,opus')
+    parser.add_argument('--mb-per-second', type=float, default=2.0, help="Uplink simulado")
+    parser.add_argument('--json', action='store_true')
+    args = parser.parse_args()
+
+    work = tempfile.mkdtemp(prefix="bench_codec_")
+    server = start_server(bytes_per_second=args.mb_per_second * 2 ** 20)
+    os.environ['ISOLATION_RATE_PER_MIN'] = '6000'
+    try:
+        audio = os.path.join(work, 'voz.wav')
+        make_voice_wav(audio, args.minutes * 60, seed=0)
+        rows = [run(codec.strip(), audio, work, server) for codec in args.codecs.split(',')]
+    finally:
+        server.shutdown()
+        shutil.rmtree(work, ignore_errors=True)
+
+    if args.json:
+        print(json.dumps({'minutes': args.minutes, 'mb_per_second': args.mb_per_second, 'results': rows}, indent=2))
+        return
+
+    print(f"{args.minutes:g} min de voz  |  uplink simulado {args.mb_per_second:g} MB/s")
+    print(f"{'códec':>6} {'total s':>9} {'MB enviados':>12} {'misma long.':>12} {'idéntico':>9} {'SNR dB':>7}")
+    for row in rows:
+        print(f"{row['codec']:>6} {row['wall_s']:>9} {row['sent_mb']:>12} {'sí' if row['same_length'] else 'NO':>12} "
+              f"{'sí' if row['bit_exact'] else 'no':>9} {row['snr_db'] if row['snr_db'] is not None else '-':>7}")
+
+
+if __name__ == '__main__':
+    main()
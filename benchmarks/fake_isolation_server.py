@@ -0,0 +1,232 @@
+"""
+Servidor local que imita el endpoint /audio-isolation de ElevenLabs
+
+Devuelve el mismo audio que recibe (eco) con latencia y tasas de error
+configurables. Lee y responde por bloques, así que sirve para medir el
+cliente con archivos grandes sin cargarlos en memoria.
+
+Uso:
+    python benchmarks/fake_isolation_server.py --port 8765 --latency 0.5 --error-rate 0.1
+
+En .streamlit/secrets.toml:
+    [elevenlabs]
+    api_key = "local"
+    base_url = "http://127.0.0.1:8765/v1"
+"""
+
+import argparse
+import json
+import random
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Tuple
+
+CHUNK_BYTES = 256 * 1024
+
+
+class FakeIsolationServer(ThreadingHTTPServer):
+    """Servidor HTTP/1.1 con contadores de conexiones y requests.
+
+    Args:
+        address: (host, puerto); puerto 0 elige uno libre
+        latency: Segundos de espera antes de responder
+        error_rate: Fracción de requests que responden 500
+        rate_limit_rate: Fracción de requests que responden 429
+        retry_after: Valor del header Retry-After en las respuestas 429
+        bytes_per_second: Velocidad simulada de procesamiento (0 = sin límite)
+    """
+
+    daemon_threads = True
+
+    def __init__(self, address: Tuple[str, int], latency: float = 0.0, error_rate: float = 0.0,
+                 rate_limit_rate: float = 0.0, retry_after: float = 1.0, bytes_per_second: float = 0.0):
+        super().__init__(address, IsolationHandler)
+        self.latency = latency
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.retry_after = retry_after
+        self.bytes_per_second = bytes_per_second
+        self.lock = threading.Lock()
+        self.counters = {
+            'connections': 0,
+            'requests': 0,
+            'ok': 0,
+            'errors': 0,
+            'rate_limited': 0,
+            'bytes_in': 0,
+            'bytes_out': 0,
+            'in_flight': 0,
+            'max_in_flight': 0
+        }
+
+    def get_request(self):
+        request = super().get_request()
+        self.count('connections')
+        return request
+
+    def count(self, key: str, amount: int = 1) -> None:
+        with self.lock:
+            self.counters[key] += amount
+            if key == 'in_flight':
+                self.counters['max_in_flight'] = max(self.counters['max_in_flight'], self.counters['in_flight'])
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+
+class IsolationHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):  # noqa: A002 - firma de BaseHTTPRequestHandler
+        pass
+
+    def do_GET(self):
+        if self.path.rstrip('/').endswith('/stats'):
+            with self.server.lock:
+                payload = json.dumps(self.server.counters).encode('utf-8')
+            self._send_bytes(200, payload, 'application/json')
+        else:
+            self._send_bytes(404, b'{"detail": "not found"}', 'application/json')
+
+    def do_POST(self):
+        server = self.server
+        server.count('requests')
+        server.count('in_flight')
+        body = tempfile.TemporaryFile()
+        try:
+            received = self._read_body(body)
+            server.count('bytes_in', received)
+
+            if not self.path.rstrip('/').endswith('/audio-isolation'):
+                self._send_bytes(404, b'{"detail": "not found"}', 'application/json')
+                return
+
+            if server.latency:
+                time.sleep(server.latency)
+            if server.bytes_per_second:
+                time.sleep(received / server.bytes_per_second)
+
+            roll = random.random()
+            if roll < server.rate_limit_rate:
+                server.count('rate_limited')
+                self._send_bytes(429, b'{"detail": "rate limited"}', 'application/json',
+                                 {'Retry-After': f"{server.retry_after:g}"})
+                return
+            if roll < server.rate_limit_rate + server.error_rate:
+                server.count('errors')
+                self._send_bytes(500, b'{"detail": "simulated failure"}', 'application/json')
+                return
+
+            start, end = self._audio_span(body, received)
+            body.seek(start)
+            self.send_response(200)
+            self.send_header('Content-Type', 'audio/wav')
+            self.send_header('Content-Length', str(end - start))
+            self.end_headers()
+            remaining = end - start
+            while remaining > 0:
+                block = body.read(min(CHUNK_BYTES, remaining))
+                if not block:
+                    break
+                self.wfile.write(block)
+                remaining -= len(block)
+            server.count('bytes_out', end - start)
+            server.count('ok')
+        finally:
+            body.close()
+            server.count('in_flight', -1)
+
+    def _read_body(self, out) -> int:
+        """Copia el cuerpo del request a out, con o sin transfer-encoding chunked."""
+        total = 0
+        if self.headers.get('Transfer-Encoding', '').lower() == 'chunked':
+            while True:
+                size = int(self.rfile.readline().split(b';')[0].strip(), 16)
+                if size == 0:
+                    self.rfile.readline()
+                    break
+                remaining = size
+                while remaining > 0:
+                    block = self.rfile.read(min(CHUNK_BYTES, remaining))
+                    out.write(block)
+                    remaining -= len(block)
+                total += size
+                self.rfile.readline()
+        else:
+            remaining = int(self.headers.get('Content-Length', 0))
+            while remaining > 0:
+                block = self.rfile.read(min(CHUNK_BYTES, remaining))
+                if not block:
+                    break
+                out.write(block)
+                remaining -= len(block)
+                total += len(block)
+        return total
+
+    def _audio_span(self, body, size: int) -> Tuple[int, int]:
+        """Ubica el contenido del archivo dentro del cuerpo multipart (una sola parte)."""
+        content_type = self.headers.get('Content-Type', '')
+        if 'boundary=' not in content_type:
+            return 0, size
+        boundary = content_type.split('boundary=')[1].split(';')[0].strip('"')
+        body.seek(0)
+        head = body.read(64 * 1024)
+        start = head.index(b'\r\n\r\n') + 4
+        tail = f"\r\n--{boundary}--".encode('utf-8')
+        body.seek(max(0, size - len(tail) - 8))
+        end_region = body.read()
+        end = size - len(end_region) + end_region.rindex(tail)
+        return start, end
+
+    def _send_bytes(self, status: int, payload: bytes, content_type: str, headers: dict = None) -> None:
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(payload)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(payload)
+
+
+def start_server(host: str = '127.0.0.1', port: int = 0, **options) -> FakeIsolationServer:
+    """Inicia el servidor en un hilo de fondo y lo retorna (usa server.base_url)."""
+    server = FakeIsolationServer((host, port), **options)
+    thread = threading.Thread(target=server.serve_forever, name="fake-isolation", daemon=True)
+    thread.start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--latency', type=float, default=0.0, help="Segundos antes de responder")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="Fracción de respuestas 500")
+    parser.add_argument('--rate-limit-rate', type=float, default=0.0, help="Fracción de respuestas 429")
+    parser.add_argument('--retry-after', type=float, default=1.0, help="Retry-After de las respuestas 429")
+    parser.add_argument('--bytes-per-second', type=float, default=0.0, help="Velocidad simulada de proceso")
+    args = parser.parse_args()
+
+    server = FakeIsolationServer(
+        (args.host, args.port),
+        latency=args.latency,
+        error_rate=args.error_rate,
+        rate_limit_rate=args.rate_limit_rate,
+        retry_after=args.retry_after,
+        bytes_per_second=args.bytes_per_second
+    )
+    print(f"Servidor de Audio Isolation simulado en {server.base_url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == '__main__':
+    main()
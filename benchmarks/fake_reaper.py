@@ -0,0 +1,100 @@
+"""
+Reaper simulado para benchmarks de AudioPro v1.7
+
+Se usa como REAPER_EXE (a través de un envoltorio ejecutable, ver
+write_launcher): recibe los mismos argumentos que reaper.exe
+(-nosplash <script>.lua), lee del script los parámetros que la app pasa
+por ExtState y actúa según el modo:
+
+- Arranque del worker persistente (ExtState "queue_dir"): atiende la cola
+  con reaper_worker_stub.serve hasta que aparece el archivo stop
+- Lanzamiento por archivo (ExtState "audio_file"): espera --render-seconds,
+  escribe <original>_renderizado.wav y su testigo .done junto a la sesión
+  (si el script es render_prepared_session.lua, toma el audio del .rpp)
+
+El "render" copia el audio de entrada: mide el costo de la orquestación,
+no el de la cadena de plugins.
+
+Uso directo:
+    python benchmarks/fake_reaper.py --render-seconds 2 -nosplash script.lua
+"""
+
+import argparse
+import os
+import re
+import stat
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from reaper_worker_stub import render_job, serve  # noqa: E402
+
+# reaper.SetExtState("AudioPro", "clave", [[valor]], false)
+_EXTSTATE = re.compile(r'SetExtState\(\s*"AudioPro"\s*,\s*"([^"]+)"\s*,\s*\[\[(.*?)\]\]', re.S)
+# dofile([[ruta del script principal]])
+_DOFILE = re.compile(r'dofile\(\s*\[\[(.*?)\]\]')
+
+
+def read_extstate(script_path: str) -> dict:
+    """Parámetros que el script Lua de arranque pasa por ExtState."""
+    with open(script_path, 'r', encoding='utf-8', errors='ignore') as f:
+        text = f.read()
+    params = dict(_EXTSTATE.findall(text))
+    script = _DOFILE.search(text)
+    if script:
+        params['job_script'] = script.group(1)
+    return params
+
+
+def write_launcher(path: str, render_seconds: float = 0.0) -> str:
+    """Escribe un ejecutable que invoca este script, para usarlo como REAPER_EXE.
+
+    Args:
+        path: Ruta sin extensión del envoltorio (en Windows se agrega .cmd)
+        render_seconds: Duración simulada de cada render
+
+    Returns:
+        Ruta del envoltorio creado
+    """
+    script = os.path.abspath(__file__)
+    if os.name == 'nt':
+        path += '.cmd'
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(f'@"{sys.executable}" "{script}" --render-seconds {render_seconds} %*\r\n')
+    else:
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(f'#!/bin/sh\nexec "{sys.executable}" "{script}" --render-seconds {render_seconds} "$@"\n')
+        os.chmod(path, os.stat(path).st_mode | stat.S_IXUSR | stat.S_IXGRP | stat.S_IXOTH)
+    return path
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--render-seconds', type=float,
+                        default=float(os.getenv("FAKE_REAPER_RENDER_SECONDS", "0")))
+    parser.add_argument('-nosplash', action='store_true')
+    parser.add_argument('script', nargs='?')
+    args = parser.parse_args()
+
+    if not args.script or not os.path.exists(args.script):
+        # Reaper sin script: abre y no hace nada
+        return 0
+    params = read_extstate(args.script)
+
+    if params.get('queue_dir'):
+        serve(params['queue_dir'], poll_interval=0.05, render_seconds=args.render_seconds)
+        return 0
+
+    session = params.get('session_name', '')
+    original_name = params.get('original_name', '')
+    render_file = params.get('render_file') or os.path.join(os.path.dirname(session), f"{original_name}_renderizado.wav")
+    result = render_job(dict(params, render_file=render_file), args.render_seconds)
+    if result['status'] != 'ok':
+        print(result['message'], file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,293 @@
+"""
+AudioPro v1.7 - Procesamiento por lotes desde la línea de comandos
+Mismo pipeline que la app (pipeline.py) sin Streamlit: pensado para correr
+de noche sobre carpetas del NAS desde cron o el Programador de tareas.
+
+Uso:
+    python cli.py "F:/CURSOS/2025/Q2" --recursive --workers 4
+    python cli.py "F:/CURSOS/**/*.mp4" --staged --stage-workers "extract=2,isolate=4,render=1,loudness=2,mux=2" --json
+    python cli.py clase1.wav clase2.mp4 --backend numpy --jsonl > resultados.jsonl
+    python cli.py "F:/CURSOS/2025/Q2" --deliverables main,master,preview,proxy
+    python cli.py "https://drive.google.com/file/d/<id>/view" --output-dir F:/CURSOS/drive
+
+Los resultados quedan en <carpeta del archivo>/procesados (como en la app)
+o en <--output-dir>/procesados. El código de salida es 0 si todos los archivos se
+procesaron, 1 si alguno falló o fue rechazado y 2 si no hubo nada que procesar.
+
+Volver a lanzar el mismo comando después de un corte retoma cada archivo
+desde su última etapa terminada (diario de trabajos, ver job_journal.py).
+"""
+
+import argparse
+import glob
+import json
+import os
+import sys
+import threading
+import time
+from typing import List
+
+
+def find_inputs(patterns: List[str], extensions, recursive: bool) -> List[str]:
+    """Expande archivos, directorios y patrones glob a una lista ordenada sin duplicados.
+
+    Args:
+        patterns: Rutas de archivo, directorios o patrones (admite **)
+        extensions: Extensiones aceptadas (sin punto) para directorios y patrones
+        recursive: Recorrer subdirectorios de los directorios indicados
+
+    Returns:
+        Rutas absolutas de los archivos encontrados
+    """
+    accepted = tuple('.' + ext.lower().lstrip('.') for ext in extensions)
+    found = []
+    for pattern in patterns:
+        if os.path.isfile(pattern):
+            # Un archivo explícito se procesa aunque su extensión no esté en la lista
+            found.append(pattern)
+            continue
+        if os.path.isdir(pattern):
+            if recursive:
+                for root, dirs, names in os.walk(pattern):
+                    # Las salidas de corridas anteriores no son entradas
+                    dirs[:] = sorted(d for d in dirs if d != 'procesados')
+                    found.extend(os.path.join(root, n) for n in names)
+            else:
+                found.extend(os.path.join(pattern, n) for n in os.listdir(pattern))
+        else:
+            found.extend(glob.glob(pattern, recursive=True))
+        found = [p for p in found if os.path.isfile(p) and (p.lower().endswith(accepted) or p in patterns)]
+
+    seen = set()
+    unique = []
+    for path in found:
+        path = os.path.abspath(path)
+        if path not in seen and '_procesado.' not in os.path.basename(path):
+            seen.add(path)
+            unique.append(path)
+    return sorted(unique)
+
+
+def _configure_environment(args) -> None:
+    """Opciones que pipeline.py lee al importarse."""
+    if args.backend:
+        os.environ['RENDER_BACKEND'] = args.backend
+    if args.reaper_mode:
+        os.environ['REAPER_MODE'] = args.reaper_mode
+    if args.reaper_batch:
+        os.environ['REAPER_BATCH_SIZE'] = str(args.reaper_batch)
+    if args.stage_workers:
+        os.environ['STAGE_WORKERS'] = args.stage_workers
+    if args.workers:
+        os.environ['MAX_WORKERS'] = str(args.workers)
+    if args.no_resume:
+        os.environ['AUDIOPRO_JOURNAL_ENABLED'] = '0'
+    if args.loudness_target is not None:
+        os.environ['LOUDNESS_TARGET'] = str(args.loudness_target)
+    if args.deliverables:
+        os.environ['DELIVERABLES'] = args.deliverables
+
+
+def message_printer(verbose: bool):
+    """Manejador de mensajes del pipeline: a stderr con el archivo como prefijo."""
+    from telemetry import current_context
+
+    lock = threading.Lock()
+
+    def _print(level: str, message: str) -> None:
+        if not verbose and level in ('info', 'success'):
+            return
+        name = current_context().get('file')
+        prefix = f"[{name}] " if name else ""
+        with lock:
+            print(f"{level.upper():7} {prefix}{message}", file=sys.stderr, flush=True)
+
+    return _print
+
+
+def _file_record(entry: dict) -> dict:
+    """Resultado de un archivo listo para JSON."""
+    from audio_utils import IsolationDeferredError
+
+    item = entry['item']
+    record = {
+        'name': item['source'].name,
+        'path': item['path'],
+        'ok': entry['ok'],
+        'elapsed_s': round(entry['elapsed'], 3)
+    }
+    if entry['ok']:
+        result = entry['result']
+        record.update({
+            'output_file': result['output_file'],
+            'deliverables': result.get('deliverables'),
+            'reaper_session': result['reaper_session'],
+            'is_video': result['is_video'],
+            'io_saved_bytes': result.get('io_saved_bytes', 0),
+            'upload_saved_bytes': result.get('upload_saved_bytes', 0),
+            'upload_bytes': result.get('upload_bytes', 0),
+            'loudness': result.get('loudness'),
+            'resumed_from': result.get('resumed_from')
+        })
+    else:
+        record.update({
+            'stage': entry.get('stage'),
+            'error': str(entry['error']),
+            'deferred': isinstance(entry['error'], IsolationDeferredError)
+        })
+    return record
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('inputs', nargs='+', help="Archivos, directorios, patrones glob o links de Google Drive")
+    parser.add_argument('-r', '--recursive', action='store_true', help="Recorrer subdirectorios")
+    parser.add_argument('--ext', default=None, help="Extensiones a buscar, separadas por coma")
+    parser.add_argument('--workers', type=int, default=None, help="Archivos en vuelo (modo por archivo)")
+    parser.add_argument('--staged', action='store_true', help="Usar el motor por etapas")
+    parser.add_argument('--stage-workers', default=None, help='Workers por etapa, p. ej. "extract=2,isolate=4"')
+    parser.add_argument('--backend', choices=('reaper', 'numpy'), default=None, help="Backend de render")
+    parser.add_argument('--reaper-mode', choices=('worker', 'launch'), default=None)
+    parser.add_argument('--reaper-batch', type=int, default=None,
+                        help="Archivos por sesión de Reaper (un render por lote, una región por archivo)")
+    parser.add_argument('--output-dir', default=None, help="Los resultados van a <output-dir>/procesados (por defecto <carpeta del archivo>/procesados)")
+    parser.add_argument('--loudness-target', type=float, default=None,
+                        help="Normalizar el render a estos LUFS (p. ej. -16); por defecto solo se mide")
+    parser.add_argument('--deliverables', default=None,
+                        help='Entregables por archivo, p. ej. "main,master,preview,proxy" (en una pasada de ffmpeg)')
+    parser.add_argument('--no-isolation', action='store_true', help="No usar ElevenLabs Audio Isolation")
+    parser.add_argument('--no-resume', action='store_true',
+                        help="No usar el diario de trabajos (no retoma ni registra etapas)")
+    parser.add_argument('--stop-worker', action='store_true', help="Detener el worker de Reaper al terminar")
+    parser.add_argument('--dry-run', action='store_true', help="Solo listar los archivos encontrados")
+    parser.add_argument('--json', action='store_true', help="Resumen final en JSON por stdout")
+    parser.add_argument('--jsonl', action='store_true', help="Un JSON por archivo terminado por stdout")
+    parser.add_argument('-v', '--verbose', action='store_true', help="Mostrar todos los mensajes del pipeline")
+    args = parser.parse_args(argv)
+    if args.deliverables:
+        from deliverables import parse_deliverables
+        try:
+            parse_deliverables(args.deliverables)
+        except ValueError as e:
+            parser.error(str(e))
+
+    _configure_environment(args)
+
+    from ui_bridge import set_flag, set_message_handler
+    set_message_handler(message_printer(args.verbose))
+    if args.no_isolation:
+        set_flag('disable_elevenlabs', True)
+
+    import pipeline
+    from batch_executor import run_batch
+    from audio_utils import drive_file_id
+    from drive_ingest import prefetch_drive_sources
+    from media_source import DriveSource, LocalPathSource
+    from telemetry import get_telemetry, new_batch_id
+
+    # Links de Google Drive: sin carpeta de origen, la salida va a --output-dir (o al directorio actual)
+    drive_links = [p for p in args.inputs if p.startswith(('http://', 'https://'))]
+    drive_ids = [file_id for file_id in map(drive_file_id, drive_links) if file_id]
+    for link in drive_links:
+        if not drive_file_id(link):
+            print(f"URL de Google Drive no válida: {link}", file=sys.stderr)
+
+    extensions = args.ext.split(',') if args.ext else pipeline.MEDIA_EXTENSIONS
+    patterns = [p for p in args.inputs if p not in drive_links]
+    paths = find_inputs(patterns, extensions, args.recursive) if patterns else []
+    if args.dry_run:
+        for path in paths + [f"drive:{file_id}" for file_id in drive_ids]:
+            print(path)
+        return 0 if paths or drive_ids else 2
+    if not paths and not drive_ids:
+        print("No se encontraron archivos para procesar", file=sys.stderr)
+        return 2
+
+    files = [{
+        'source': LocalPathSource(path),
+        'name': os.path.basename(path),
+        'path': path,
+        'source_dir': args.output_dir or os.path.dirname(path)
+    } for path in paths]
+    for file_id in drive_ids:
+        files.append({
+            'source': DriveSource(file_id),
+            'name': file_id,
+            'path': f"drive:{file_id}",
+            'source_dir': os.path.abspath(args.output_dir or os.getcwd())
+        })
+
+    start = time.perf_counter()
+    files, rejected = pipeline.reject_invalid_inputs(files)
+    for item, reason in rejected:
+        print(f"RECHAZADO {item['path']}: {reason}", file=sys.stderr)
+    if not files:
+        return 1
+
+    # Las descargas de Drive empiezan ya; cada archivo entra al pipeline cuando termina la suya
+    prefetch_drive_sources([f['source'] for f in files])
+
+    batch_id = new_batch_id()
+    records = []
+
+    def _on_result(entry, completed, total):
+        record = _file_record(entry)
+        records.append(record)
+        if record['ok']:
+            status = f"ok ({record['resumed_from']})" if record.get('resumed_from') else 'ok'
+        else:
+            status = 'diferido' if record.get('deferred') else 'ERROR'
+        detail = record.get('output_file') or f"{record.get('stage') or ''} {record.get('error')}".strip()
+        print(f"[{completed}/{total}] {status:12} {record['name']} ({record['elapsed_s']:.1f}s) → {detail}",
+              file=sys.stderr, flush=True)
+        if args.jsonl:
+            print(json.dumps(record, ensure_ascii=False), flush=True)
+
+    staged = None
+    print(f"Lote {batch_id}: {len(files)} archivo(s), render {pipeline.RENDER_BACKEND}", file=sys.stderr)
+    if args.staged:
+        staged = pipeline.build_staged_pipeline(queue_size=pipeline.STAGE_QUEUE_SIZE)
+        jobs = [pipeline.new_pipeline_job(f['source'], f['name'], f['source_dir'], batch_id) for f in files]
+        batch = staged.run(jobs, on_result=lambda entry, done, total: _on_result(
+            dict(entry, item=files[entry['index']]), done, total))
+    else:
+        batch = run_batch(
+            files,
+            lambda f: pipeline.process_with_reaper_pipeline(f['source'], f['name'], f['source_dir'], batch_id),
+            max_workers=args.workers or pipeline.MAX_WORKERS,
+            on_result=_on_result
+        )
+    wall = time.perf_counter() - start
+
+    if args.stop_worker and pipeline.RENDER_BACKEND == 'reaper' and pipeline.REAPER_MODE == 'worker':
+        pipeline.get_reaper_worker_host().stop()
+
+    telemetry = get_telemetry()
+    telemetry.export_prometheus()
+    ok = sum(1 for entry in batch if entry['ok'])
+    failed = len(batch) - ok
+    print(f"Terminado en {wall:.1f}s: {ok} ok, {failed} con error, {len(rejected)} rechazado(s)", file=sys.stderr)
+
+    if args.json:
+        summary = {
+            'batch_id': batch_id,
+            'version': pipeline.PIPELINE_VERSION,
+            'render_backend': pipeline.RENDER_BACKEND,
+            'files': len(batch) + len(rejected),
+            'ok': ok,
+            'failed': failed,
+            'rejected': [{'path': item['path'], 'reason': reason} for item, reason in rejected],
+            'wall_s': round(wall, 3),
+            'results': sorted(records, key=lambda r: r['path']),
+            'telemetry': telemetry.summary(batch_id)
+        }
+        if staged is not None:
+            summary['stages'] = staged.stats()
+            summary['bottleneck'] = staged.bottleneck()
+        print(json.dumps(summary, ensure_ascii=False, indent=2))
+
+    return 0 if failed == 0 and not rejected else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
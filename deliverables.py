@@ -0,0 +1,133 @@
+"""
+Entregables de salida para AudioPro v1.7
+
+La etapa final puede producir varios archivos a partir del mismo render: el
+principal de siempre (MP4 con AAC 256k para video, copia del render para
+audio), un master WAV, un preview MP3 y un proxy liviano. Todos salen de una
+sola invocación de ffmpeg: el render se decodifica una vez y asplit lo
+reparte entre los codificadores; el video se lee una vez, va copiado (sin
+re-codificar) al principal y solo el proxy lo decodifica para achicarlo.
+
+Los nombres comparten el prefijo "<nombre>_procesado." para que cli.py y
+hot_folder.py nunca los tomen como entradas.
+"""
+
+import os
+from typing import Dict, List, Optional, Tuple
+
+# Entregables separados por coma (el principal siempre se produce), p. ej. "main,master,preview,proxy"
+DELIVERABLES = os.getenv("DELIVERABLES", "main")
+# Alto del video del proxy (el ancho conserva la proporción)
+PROXY_HEIGHT = int(os.getenv("PROXY_HEIGHT", "360"))
+
+# Por entregable: sufijo del nombre, extensión (None = la del principal) y
+# opciones de audio; el principal y el proxy también llevan el video
+DELIVERABLE_PROFILES = {
+    'main': {'suffix': '', 'ext': None,
+             'audio': ['-c:a', 'aac', '-b:a', '256k', '-ar', '48000']},
+    'master': {'suffix': '.master', 'ext': '.wav',
+               'audio': ['-c:a', 'pcm_s24le', '-ar', '48000']},
+    'preview': {'suffix': '.preview', 'ext': '.mp3',
+                'audio': ['-c:a', 'libmp3lame', '-b:a', '128k', '-ar', '48000']},
+    'proxy': {'suffix': '.proxy', 'ext': None,
+              'audio': ['-c:a', 'aac', '-b:a', '64k', '-ac', '1', '-ar', '48000']},
+}
+
+# Video del proxy: H.264 rápido y de bitrate bajo, apto para revisar en el navegador
+PROXY_VIDEO = ['-c:v', 'libx264', '-preset', 'veryfast', '-crf', '30', '-pix_fmt', 'yuv420p']
+
+
+def parse_deliverables(spec: str) -> List[str]:
+    """Interpreta la lista de entregables.
+
+    Args:
+        spec: Texto del estilo "main,master,preview,proxy"
+
+    Returns:
+        Nombres en el orden de DELIVERABLE_PROFILES, siempre con 'main'
+
+    Raises:
+        ValueError si algún nombre no es un entregable conocido
+    """
+    names = {part.strip().lower() for part in (spec or '').split(',') if part.strip()}
+    unknown = names - set(DELIVERABLE_PROFILES)
+    if unknown:
+        raise ValueError(
+            f"Entregables desconocidos: {', '.join(sorted(unknown))} "
+            f"(válidos: {', '.join(DELIVERABLE_PROFILES)})"
+        )
+    names.add('main')
+    return [name for name in DELIVERABLE_PROFILES if name in names]
+
+
+def deliverable_paths(output_dir: str, original_name: str, is_video: bool,
+                      names: List[str]) -> Dict[str, str]:
+    """Ruta de cada entregable dentro de output_dir.
+
+    Args:
+        output_dir: Carpeta de salida
+        original_name: Nombre del archivo original
+        is_video: True si el original tiene video
+        names: Entregables (de parse_deliverables)
+
+    Returns:
+        Dict entregable -> ruta
+    """
+    base_name, ext = os.path.splitext(original_name)
+    # El principal de un audio conserva la extensión original (es una copia del render)
+    main_ext = '.mp4' if is_video else ext
+    paths = {}
+    for name in names:
+        profile = DELIVERABLE_PROFILES[name]
+        out_ext = profile['ext'] or main_ext
+        if name == 'proxy' and not is_video:
+            out_ext = '.m4a'
+        paths[name] = os.path.join(output_dir, f"{base_name}_procesado{profile['suffix']}{out_ext}")
+    return paths
+
+
+def deliverables_command(video_input: Optional[str], rendered_audio: str,
+                         outputs: Dict[str, str]) -> Tuple[List[str], List[str]]:
+    """Comando ffmpeg que produce todos los entregables en una sola pasada.
+
+    Para audio sin video el principal queda fuera del comando: es una copia
+    byte a byte del render, más barata que cualquier codificación.
+
+    Args:
+        video_input: Archivo original con el video (None si es solo audio)
+        rendered_audio: WAV renderizado
+        outputs: Dict entregable -> ruta (de deliverable_paths)
+
+    Returns:
+        (comando, entregables que produce); el comando es [] si no hay nada que codificar
+    """
+    names = [name for name in outputs if video_input or name != 'main']
+    if not names:
+        return [], []
+
+    cmd = ['ffmpeg', '-y']
+    if video_input:
+        cmd += ['-i', video_input]
+    cmd += ['-i', rendered_audio]
+    audio_index = 1 if video_input else 0
+
+    # El render se decodifica una vez y asplit entrega una copia a cada salida
+    labels = [f"[a{i}]" for i in range(len(names))]
+    graph = f"[{audio_index}:a:0]asplit={len(names)}{''.join(labels)}"
+    if video_input and 'proxy' in names:
+        graph += f";[0:v:0]scale=-2:{PROXY_HEIGHT}[vproxy]"
+    cmd += ['-filter_complex', graph]
+
+    # El principal va al final: run_ffmpeg registra la última salida en su span
+    ordered = sorted(names, key=lambda name: name == 'main')
+    for name in ordered:
+        label = labels[names.index(name)]
+        if video_input and name == 'main':
+            cmd += ['-map', '0:v:0', '-c:v', 'copy']
+        elif video_input and name == 'proxy':
+            cmd += ['-map', '[vproxy]'] + PROXY_VIDEO
+        cmd += ['-map', label] + DELIVERABLE_PROFILES[name]['audio']
+        if video_input and name in ('main', 'proxy'):
+            cmd += ['-shortest']
+        cmd.append(outputs[name])
+    return cmd, ordered
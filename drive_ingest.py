@@ -0,0 +1,347 @@
+"""
+Ingesta de Google Drive para AudioPro v1.7
+Descargas concurrentes que se adelantan al pipeline y caché en disco por
+ID de archivo + fecha de modificación: pegar el mismo link dos veces (o
+volver a lanzar un lote) no vuelve a descargar nada.
+"""
+
+import hashlib
+import os
+import re
+import shutil
+import tempfile
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterable, Optional, Tuple
+from urllib.parse import unquote
+
+import requests
+
+from telemetry import file_size, span
+from ui_bridge import read_secrets
+
+# Descargas simultáneas (independientes de los workers del lote)
+DRIVE_DOWNLOAD_WORKERS = int(os.getenv("DRIVE_DOWNLOAD_WORKERS", "4"))
+
+# Caché de descargas (DRIVE_CACHE_MB=0 la deshabilita)
+DRIVE_CACHE_DIR = os.getenv(
+    "DRIVE_CACHE_DIR",
+    os.path.join(os.path.expanduser("~"), ".audiopro", "drive_cache")
+)
+DRIVE_CACHE_MB = int(os.getenv("DRIVE_CACHE_MB", "8192"))
+
+# Metadatos: API de Drive v3 si hay API key; si no, cabeceras de la descarga
+DRIVE_API_URL = "https://www.googleapis.com/drive/v3/files/{file_id}"
+DRIVE_DOWNLOAD_URL = "https://drive.usercontent.google.com/download?id={file_id}&export=download&confirm=t"
+DRIVE_METADATA_TIMEOUT = float(os.getenv("DRIVE_METADATA_TIMEOUT", "15"))
+
+_FILENAME_STAR = re.compile(r"filename\*=(?:UTF-8'')?([^;]+)", re.I)
+_FILENAME = re.compile(r'filename="?([^";]+)"?', re.I)
+
+
+def get_drive_api_key() -> Optional[str]:
+    """API key de Google (GOOGLE_API_KEY o [google] api_key en secrets.toml), o None."""
+    return os.getenv("GOOGLE_API_KEY") or read_secrets("google").get("api_key")
+
+
+def _filename_from_disposition(disposition: str) -> Optional[str]:
+    match = _FILENAME_STAR.search(disposition) or _FILENAME.search(disposition)
+    return os.path.basename(unquote(match.group(1).strip())) if match else None
+
+
+def drive_metadata(file_id: str) -> Optional[dict]:
+    """Nombre, tamaño y versión de un archivo de Drive sin descargarlo.
+
+    Con API key consulta la API de Drive (modifiedTime y md5Checksum); sin
+    ella pide el primer byte de la descarga y usa sus cabeceras
+    (Last-Modified / ETag, Content-Disposition y Content-Range).
+
+    Args:
+        file_id: ID del archivo en Drive
+
+    Returns:
+        Dict con 'name', 'size' y 'version' (None si no se pudo determinar),
+        o None si Drive no respondió con el archivo
+    """
+    api_key = get_drive_api_key()
+    with span('http.drive_metadata', file_id=file_id) as s:
+        try:
+            if api_key:
+                response = requests.get(
+                    DRIVE_API_URL.format(file_id=file_id),
+                    params={'fields': 'name,size,modifiedTime,md5Checksum', 'supportsAllDrives': 'true',
+                            'key': api_key},
+                    timeout=DRIVE_METADATA_TIMEOUT
+                )
+                s.set(status_code=response.status_code)
+                if response.status_code != 200:
+                    return None
+                data = response.json()
+                version = data.get('md5Checksum') or data.get('modifiedTime')
+                return {
+                    'name': data.get('name'),
+                    'size': int(data['size']) if data.get('size') else None,
+                    'version': f"{data.get('modifiedTime')}:{version}" if version else None
+                }
+
+            with requests.get(DRIVE_DOWNLOAD_URL.format(file_id=file_id), headers={'Range': 'bytes=0-0'},
+                              stream=True, timeout=DRIVE_METADATA_TIMEOUT) as response:
+                s.set(status_code=response.status_code)
+                # Una página HTML es el aviso de permisos o de antivirus, no el archivo
+                if response.status_code not in (200, 206) or 'text/html' in response.headers.get('Content-Type', ''):
+                    return None
+                headers = response.headers
+                size = None
+                if '/' in headers.get('Content-Range', ''):
+                    total = headers['Content-Range'].rsplit('/', 1)[1]
+                    size = int(total) if total.isdigit() else None
+                stamp = headers.get('Last-Modified') or headers.get('ETag')
+                return {
+                    'name': _filename_from_disposition(headers.get('Content-Disposition', '')),
+                    'size': size,
+                    'version': f"{stamp}:{size}" if stamp else None
+                }
+        except (requests.RequestException, ValueError) as e:
+            s.set(outcome='error', error=type(e).__name__)
+            return None
+
+
+class DriveCache:
+    """Caché LRU de descargas de Drive con presupuesto de tamaño.
+
+    Cada entrada es un directorio <file_id>/<versión>/ con el archivo y su
+    nombre original; el pipeline lee la entrada en su lugar (sin copiarla),
+    así que las entradas entregadas quedan fijadas hasta release() y el
+    desalojo no las toca. El orden LRU se guarda en el mtime del directorio.
+
+    Args:
+        cache_dir: Directorio de la caché
+        max_bytes: Tamaño máximo total; al superarlo se eliminan las entradas menos usadas
+    """
+
+    def __init__(self, cache_dir: str, max_bytes: int):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.bytes_saved = 0
+        self._pinned = {}
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_bytes > 0
+
+    def _pin(self, entry: str) -> None:
+        with self._lock:
+            self._pinned[entry] = self._pinned.get(entry, 0) + 1
+
+    def release(self, path: str) -> None:
+        """Libera una entrada entregada por get/commit cuando el pipeline terminó de leerla."""
+        entry = os.path.dirname(path)
+        with self._lock:
+            count = self._pinned.get(entry, 0) - 1
+            if count > 0:
+                self._pinned[entry] = count
+            else:
+                self._pinned.pop(entry, None)
+
+    def _entry_dir(self, file_id: str, version: str) -> str:
+        digest = hashlib.sha1(version.encode('utf-8')).hexdigest()[:16]
+        return os.path.join(self.cache_dir, file_id, digest)
+
+    def get(self, file_id: str, version: str) -> Optional[str]:
+        """Ruta del archivo en caché para esa versión, o None."""
+        entry = self._entry_dir(file_id, version)
+        try:
+            names = [n for n in os.listdir(entry) if not n.startswith('.')]
+        except FileNotFoundError:
+            names = []
+        if len(names) != 1:
+            with self._lock:
+                self.misses += 1
+            return None
+        path = os.path.join(entry, names[0])
+        os.utime(entry, None)
+        self._pin(entry)
+        with self._lock:
+            self.hits += 1
+            self.bytes_saved += file_size(path) or 0
+        return path
+
+    def staging_dir(self, file_id: str) -> str:
+        """Directorio temporal (mismo volumen que la caché) para una descarga en curso."""
+        path = os.path.join(self.cache_dir, file_id, f".{uuid.uuid4().hex[:8]}.part")
+        os.makedirs(path, exist_ok=True)
+        return path
+
+    def commit(self, file_id: str, version: str, staging: str) -> str:
+        """Publica una descarga terminada como entrada de la caché y aplica el presupuesto.
+
+        Returns:
+            Ruta del archivo dentro de la caché
+        """
+        entry = self._entry_dir(file_id, version)
+        try:
+            os.replace(staging, entry)
+        except OSError:
+            # Otro worker publicó la misma versión primero: se usa la suya
+            shutil.rmtree(staging, ignore_errors=True)
+        name = [n for n in os.listdir(entry) if not n.startswith('.')][0]
+        self._pin(entry)
+        self.evict()
+        return os.path.join(entry, name)
+
+    def _entries(self):
+        entries = []
+        if not os.path.isdir(self.cache_dir):
+            return entries
+        for file_dir in os.scandir(self.cache_dir):
+            if not file_dir.is_dir():
+                continue
+            for entry in os.scandir(file_dir.path):
+                if entry.name.startswith('.') or not entry.is_dir():
+                    continue
+                size = sum(f.stat().st_size for f in os.scandir(entry.path) if f.is_file())
+                entries.append((entry.stat().st_mtime, size, entry.path))
+        return entries
+
+    def evict(self) -> None:
+        """Elimina las entradas menos usadas hasta respetar max_bytes (salvo las fijadas)."""
+        with self._lock:
+            entries = sorted(self._entries())
+            total = sum(size for _, size, _ in entries)
+            for _, size, path in entries:
+                if total <= self.max_bytes:
+                    break
+                if path in self._pinned:
+                    continue
+                shutil.rmtree(path, ignore_errors=True)
+                total -= size
+                self.evictions += 1
+
+    def stats(self) -> dict:
+        """Contadores y ocupación actual de la caché."""
+        entries = self._entries()
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'saved_mb': round(self.bytes_saved / (1024 * 1024), 1),
+            'entries': len(entries),
+            'size_mb': round(sum(size for _, size, _ in entries) / (1024 * 1024), 1),
+            'max_mb': round(self.max_bytes / (1024 * 1024), 1)
+        }
+
+
+class DriveDownloader:
+    """Pool de descargas de Drive compartido por el proceso.
+
+    prefetch() encola las descargas de un lote apenas se arma; cada
+    DriveSource espera solo por su propio archivo al llegar a la etapa de
+    extracción, así que el primer archivo se procesa mientras los demás
+    siguen bajando.
+
+    Args:
+        cache: Caché de descargas
+        workers: Descargas simultáneas
+    """
+
+    def __init__(self, cache: DriveCache, workers: int = DRIVE_DOWNLOAD_WORKERS):
+        self.cache = cache
+        self.workers = workers
+        self.downloads = 0
+        self.failures = 0
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    def _pool(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="drive")
+            return self._executor
+
+    def prefetch(self, sources: Iterable) -> int:
+        """Empieza a descargar (en orden) las fuentes de Drive de un lote.
+
+        Args:
+            sources: Fuentes del lote; las que no son de Drive se ignoran
+
+        Returns:
+            Cantidad de descargas encoladas
+        """
+        queued = 0
+        for source in sources:
+            if hasattr(source, 'start_download'):
+                queued += source.start_download(self._pool())
+        return queued
+
+    def fetch(self, file_id: str, metadata: Optional[dict], scratch_dir: str) -> Tuple[str, bool]:
+        """Descarga un archivo (o lo toma de la caché).
+
+        Args:
+            file_id: ID del archivo en Drive
+            metadata: Resultado de drive_metadata (sin 'version' no se cachea)
+            scratch_dir: Directorio de trabajo para descargas que no se cachean
+
+        Returns:
+            (ruta, es_temporal): las entradas de la caché no son temporales
+        """
+        import gdown
+
+        version = (metadata or {}).get('version')
+        cacheable = self.cache.enabled and version is not None
+        if cacheable:
+            cached = self.cache.get(file_id, version)
+            if cached:
+                return cached, False
+            download_dir = self.cache.staging_dir(file_id)
+        else:
+            os.makedirs(scratch_dir, exist_ok=True)
+            download_dir = tempfile.mkdtemp(prefix="audiopro_drive_", dir=scratch_dir)
+
+        url = f"https://drive.google.com/uc?id={file_id}"
+        with span('drive.download', file_id=file_id, cached=cacheable) as s:
+            # gdown escribe por bloques directamente en el directorio indicado
+            path = gdown.download(url, output=download_dir + os.sep, quiet=True)
+            if not path:
+                shutil.rmtree(download_dir, ignore_errors=True)
+                with self._lock:
+                    self.failures += 1
+                raise Exception(f"No se pudo descargar el archivo de Google Drive: {file_id}")
+            s.set(bytes_out=file_size(path))
+        with self._lock:
+            self.downloads += 1
+
+        if cacheable:
+            return self.cache.commit(file_id, version, download_dir), False
+        return path, True
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                'workers': self.workers,
+                'downloads': self.downloads,
+                'failures': self.failures,
+                'cache': self.cache.stats()
+            }
+
+
+_downloader: Optional[DriveDownloader] = None
+_downloader_lock = threading.Lock()
+
+
+def get_drive_downloader() -> DriveDownloader:
+    """Descargador compartido del proceso (sobrevive a los reruns de Streamlit)."""
+    global _downloader
+    with _downloader_lock:
+        if _downloader is None:
+            _downloader = DriveDownloader(DriveCache(DRIVE_CACHE_DIR, DRIVE_CACHE_MB * 1024 * 1024))
+        return _downloader
+
+
+def prefetch_drive_sources(sources: Iterable) -> int:
+    """Atajo: encola en el descargador compartido las fuentes de Drive de un lote."""
+    return get_drive_downloader().prefetch(sources)
@@ -0,0 +1,478 @@
+"""
+Motor de render DSP en NumPy para AudioPro v1.7
+Alternativa sin Reaper a la cadena de voz del template 00 Voces.rpp
+
+La cadena (pasa-altos, EQ, compresor y limitador a 48 kHz, con 1 s de cola
+como el render de Reaper) se procesa en bloques vectorizados y con estado,
+así que un archivo de horas nunca se carga completo en memoria. Los archivos
+de un lote se reparten entre procesos para usar todos los núcleos.
+"""
+
+import math
+import multiprocessing
+import os
+import subprocess
+import threading
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from wav_io import WAVE_FORMAT_PCM, parse_wav_header, wav_header_bytes
+
+SAMPLE_RATE = 48000
+
+# Frames por bloque de lectura/proceso (10 s a 48 kHz, múltiplo del salto del compresor)
+CHUNK_FRAMES = int(os.getenv("DSP_CHUNK_FRAMES", str(SAMPLE_RATE * 10)))
+
+# Procesos para renderizar en paralelo (0 = un proceso por núcleo)
+DSP_WORKERS = int(os.getenv("DSP_WORKERS", "0")) or (os.cpu_count() or 1)
+
+# Muestras por bloque del filtro IIR vectorizado
+IIR_BLOCK = 64
+
+# Cadena de voz equivalente a la del template de Reaper
+VOICE_CHAIN = {
+    'highpass': {'freq': 80.0, 'q': 0.707},
+    'eq': [
+        {'type': 'peak', 'freq': 250.0, 'gain_db': -2.0, 'q': 1.0},
+        {'type': 'peak', 'freq': 3500.0, 'gain_db': 2.5, 'q': 1.0},
+        {'type': 'highshelf', 'freq': 10000.0, 'gain_db': 1.5, 'q': 0.707},
+    ],
+    'compressor': {
+        'threshold_db': -18.0,
+        'ratio': 3.0,
+        'knee_db': 6.0,
+        'attack_ms': 10.0,
+        'release_ms': 120.0,
+        'makeup_db': 4.0,
+        'hop_ms': 10.0
+    },
+    'limiter': {'ceiling_db': -1.0, 'lookahead_ms': 1.5},
+    'tail_ms': 1000.0,
+    'bits': 24
+}
+
+
+def _db_to_gain(db: float) -> float:
+    return 10.0 ** (db / 20.0)
+
+
+def biquad_coefficients(kind: str, freq: float, q: float, gain_db: float = 0.0,
+                        sample_rate: int = SAMPLE_RATE) -> Tuple[np.ndarray, np.ndarray]:
+    """Coeficientes (b, a) normalizados de un biquad (RBJ Audio EQ Cookbook).
+
+    Args:
+        kind: 'highpass', 'lowpass', 'peak', 'lowshelf' o 'highshelf'
+        freq: Frecuencia central o de corte en Hz
+        q: Factor de calidad
+        gain_db: Ganancia para peak/shelf
+        sample_rate: Frecuencia de muestreo
+
+    Returns:
+        Tuple de (b, a) con a[0] == 1
+    """
+    w0 = 2.0 * math.pi * freq / sample_rate
+    cos_w0, sin_w0 = math.cos(w0), math.sin(w0)
+    alpha = sin_w0 / (2.0 * q)
+    amp = 10.0 ** (gain_db / 40.0)
+
+    if kind == 'highpass':
+        b = [(1 + cos_w0) / 2, -(1 + cos_w0), (1 + cos_w0) / 2]
+        a = [1 + alpha, -2 * cos_w0, 1 - alpha]
+    elif kind == 'lowpass':
+        b = [(1 - cos_w0) / 2, 1 - cos_w0, (1 - cos_w0) / 2]
+        a = [1 + alpha, -2 * cos_w0, 1 - alpha]
+    elif kind == 'peak':
+        b = [1 + alpha * amp, -2 * cos_w0, 1 - alpha * amp]
+        a = [1 + alpha / amp, -2 * cos_w0, 1 - alpha / amp]
+    elif kind in ('lowshelf', 'highshelf'):
+        sign = -1 if kind == 'lowshelf' else 1
+        root = 2 * math.sqrt(amp) * alpha
+        b = [amp * ((amp + 1) + sign * (amp - 1) * cos_w0 + root),
+             -2 * sign * amp * ((amp - 1) + sign * (amp + 1) * cos_w0),
+             amp * ((amp + 1) + sign * (amp - 1) * cos_w0 - root)]
+        a = [(amp + 1) - sign * (amp - 1) * cos_w0 + root,
+             2 * sign * ((amp - 1) - sign * (amp + 1) * cos_w0),
+             (amp + 1) - sign * (amp - 1) * cos_w0 - root]
+    else:
+        raise ValueError(f"Tipo de biquad desconocido: {kind}")
+
+    b = np.asarray(b, dtype=np.float64) / a[0]
+    a = np.asarray(a, dtype=np.float64) / a[0]
+    return b, a
+
+
+class Biquad:
+    """Biquad con estado que filtra bloques completos sin bucles por muestra.
+
+    El filtro (forma directa II transpuesta) se escribe en espacio de estados
+    s[n+1] = A s[n] + B x[n], y[n] = C s[n] + D x[n]. Dentro de un bloque de
+    L muestras la salida es y = O s0 + T x (T Toeplitz con la respuesta al
+    impulso), así que todos los bloques de un chunk salen de un producto de
+    matrices; el estado inicial de cada bloque se obtiene con un scan
+    logarítmico de s[b+1] = A^L s[b] + R x[b]. El resultado es exacto (no
+    trunca la respuesta al impulso) salvo por el redondeo en float64.
+    """
+
+    def __init__(self, b: np.ndarray, a: np.ndarray, block: int = IIR_BLOCK):
+        b0, b1, b2 = (float(v) for v in b)
+        _, a1, a2 = (float(v) for v in a)
+        self.block = block
+        self.A = np.array([[-a1, 1.0], [-a2, 0.0]])
+        self.B = np.array([b1 - a1 * b0, b2 - a2 * b0])
+        self.C = np.array([1.0, 0.0])
+        self.D = b0
+        self.state = np.zeros(2)
+        self.O, self.T, self.R, self.M = self._block_matrices(block)
+
+    def _block_matrices(self, length: int):
+        """Matrices de un bloque de length muestras: (O, T, R, A^length)."""
+        powers = np.empty((length + 1, 2, 2))
+        powers[0] = np.eye(2)
+        for k in range(1, length + 1):
+            powers[k] = powers[k - 1] @ self.A
+        observe = powers[:length, 0, :]                        # C A^k (C = [1, 0])
+        impulse = np.empty(length)
+        impulse[0] = self.D
+        impulse[1:] = observe[:length - 1] @ self.B            # C A^(k-1) B
+        index = np.arange(length)
+        lag = index[:, None] - index[None, :]
+        toeplitz = np.where(lag >= 0, impulse[np.clip(lag, 0, None)], 0.0)
+        reach = (powers[length - 1 - index] @ self.B).T        # A^(L-1-k) B, forma (2, L)
+        return observe, toeplitz, reach, powers[length]
+
+    def process(self, x: np.ndarray) -> np.ndarray:
+        """Filtra x (1-D) continuando desde el estado del bloque anterior."""
+        x = np.asarray(x, dtype=np.float64)
+        n = len(x)
+        full = n // self.block
+        y = np.empty(n)
+        if full:
+            blocks = x[:full * self.block].reshape(full, self.block)
+            drive = blocks @ self.R.T                           # aporte de cada bloque al estado
+            states = self._scan_states(drive)
+            y[:full * self.block] = (blocks @ self.T.T + states[:-1] @ self.O.T).ravel()
+            self.state = states[-1]
+        rest = n - full * self.block
+        if rest:
+            observe, toeplitz, reach, power = self._block_matrices(rest)
+            tail = x[full * self.block:]
+            y[full * self.block:] = toeplitz @ tail + observe @ self.state
+            self.state = power @ self.state + reach @ tail
+        return y
+
+    def _scan_states(self, drive: np.ndarray) -> np.ndarray:
+        """Estados al inicio de cada bloque (y el final) con un scan de Hillis-Steele."""
+        states = np.empty((len(drive) + 1, 2))
+        states[0] = self.state
+        states[1:] = drive
+        power = self.M
+        step = 1
+        while step < len(states):
+            states[step:] = states[step:] + states[:-step] @ power.T
+            power = power @ power
+            step *= 2
+        return states
+
+
+def _sliding_min(values: np.ndarray, window: int) -> np.ndarray:
+    """Mínimo en ventanas de window muestras (van Herk/Gil-Werman), len - window + 1 salidas."""
+    count = len(values) - window + 1
+    if window <= 1:
+        return values.copy()
+    padded_len = -(-len(values) // window) * window
+    padded = np.full(padded_len, np.inf)
+    padded[:len(values)] = values
+    blocks = padded.reshape(-1, window)
+    prefix = np.minimum.accumulate(blocks, axis=1).ravel()
+    suffix = np.minimum.accumulate(blocks[:, ::-1], axis=1)[:, ::-1].ravel()
+    return np.minimum(suffix[:count], prefix[window - 1:window - 1 + count])
+
+
+def _sliding_mean(values: np.ndarray, window: int) -> np.ndarray:
+    """Media en ventanas de window muestras, len - window + 1 salidas."""
+    sums = np.concatenate(([0.0], np.cumsum(values)))
+    return (sums[window:] - sums[:-window]) / window
+
+
+class Compressor:
+    """Compresor feed-forward con detección RMS por saltos de hop_ms.
+
+    La reducción de ganancia se calcula por salto (vectorizado) y solo el
+    suavizado attack/release recorre los saltos, unos 100 por segundo de
+    audio; dentro de cada salto la ganancia se interpola linealmente.
+    """
+
+    def __init__(self, threshold_db: float, ratio: float, knee_db: float, attack_ms: float,
+                 release_ms: float, makeup_db: float, hop_ms: float, sample_rate: int = SAMPLE_RATE):
+        self.threshold_db = threshold_db
+        self.ratio = ratio
+        self.knee_db = knee_db
+        self.makeup_db = makeup_db
+        self.hop = max(1, int(sample_rate * hop_ms / 1000))
+        self.attack = 1.0 - math.exp(-hop_ms / max(attack_ms, 1e-3))
+        self.release = 1.0 - math.exp(-hop_ms / max(release_ms, 1e-3))
+        self.reduction_db = 0.0
+        self.last_gain = _db_to_gain(makeup_db)
+
+    def _gain_reduction(self, level_db: np.ndarray) -> np.ndarray:
+        over = level_db - self.threshold_db
+        slope = 1.0 - 1.0 / self.ratio
+        half = self.knee_db / 2.0
+        reduction = np.where(over > half, over * slope, 0.0)
+        if self.knee_db > 0:
+            in_knee = np.abs(over) <= half
+            reduction = np.where(in_knee, slope * (over + half) ** 2 / (2.0 * self.knee_db), reduction)
+        return reduction
+
+    def process(self, x: np.ndarray) -> np.ndarray:
+        n = len(x)
+        if not n:
+            return x
+        starts = np.arange(0, n, self.hop)
+        sizes = np.diff(np.append(starts, n))
+        energy = np.add.reduceat(x * x, starts) / sizes
+        level_db = 10.0 * np.log10(np.maximum(energy, 1e-12))
+        target = self._gain_reduction(level_db)
+
+        smoothed = np.empty(len(target))
+        reduction = self.reduction_db
+        attack, release = self.attack, self.release
+        for k, value in enumerate(target.tolist()):
+            coeff = attack if value > reduction else release
+            reduction += coeff * (value - reduction)
+            smoothed[k] = reduction
+        self.reduction_db = reduction
+
+        hop_gain = 10.0 ** ((self.makeup_db - smoothed) / 20.0)
+        # Rampa de la ganancia del salto anterior a la del actual dentro de cada salto
+        previous = np.concatenate(([self.last_gain], hop_gain[:-1]))
+        position = (np.arange(n) - np.repeat(starts, sizes) + 1) / np.repeat(sizes, sizes)
+        gain = np.repeat(previous, sizes) + (np.repeat(hop_gain, sizes) - np.repeat(previous, sizes)) * position
+        self.last_gain = float(hop_gain[-1])
+        return x * gain
+
+
+class Limiter:
+    """Limitador brickwall con lookahead y latencia compensada.
+
+    La ganancia requerida por muestra (techo / |x|) pasa por un mínimo
+    deslizante de W muestras hacia adelante y una media de W muestras hacia
+    atrás: cada muestra queda multiplicada por una media de valores que no
+    superan su propia ganancia requerida, así que la salida nunca pasa el
+    techo y la ganancia cambia suavemente en W muestras.
+    """
+
+    def __init__(self, ceiling_db: float, lookahead_ms: float, sample_rate: int = SAMPLE_RATE):
+        self.ceiling = _db_to_gain(ceiling_db)
+        self.window = max(2, int(sample_rate * lookahead_ms / 1000))
+        self.latency = self.window - 1
+        self._pending = np.zeros(self.latency)
+        self._required = np.ones(2 * self.window - 2)
+        self._skip = self.latency
+
+    def process(self, x: np.ndarray) -> np.ndarray:
+        if not len(x):
+            return x
+        required = np.minimum(1.0, self.ceiling / np.maximum(np.abs(x), 1e-12))
+        history = np.concatenate((self._required, required))
+        signal = np.concatenate((self._pending, x))
+        gain = _sliding_mean(_sliding_min(history, self.window), self.window)
+        out = np.clip(signal[:len(x)] * gain, -self.ceiling, self.ceiling)
+        self._pending = signal[len(x):]
+        self._required = history[-(2 * self.window - 2):]
+        if self._skip:
+            skipped = min(self._skip, len(out))
+            out = out[skipped:]
+            self._skip -= skipped
+        return out
+
+    def flush(self) -> np.ndarray:
+        """Entrega las muestras retenidas por el lookahead."""
+        return self.process(np.zeros(self.latency))
+
+
+class VoiceChain:
+    """Cadena de voz completa con estado entre bloques."""
+
+    def __init__(self, settings: Optional[dict] = None, sample_rate: int = SAMPLE_RATE):
+        settings = settings or VOICE_CHAIN
+        self.filters: List[Biquad] = []
+        hp = settings.get('highpass')
+        if hp:
+            self.filters.append(Biquad(*biquad_coefficients('highpass', hp['freq'], hp['q'], 0.0, sample_rate)))
+        for band in settings.get('eq', []):
+            self.filters.append(Biquad(*biquad_coefficients(
+                band['type'], band['freq'], band.get('q', 0.707), band.get('gain_db', 0.0), sample_rate
+            )))
+        comp = settings.get('compressor')
+        self.compressor = Compressor(sample_rate=sample_rate, **comp) if comp else None
+        lim = settings.get('limiter')
+        self.limiter = Limiter(sample_rate=sample_rate, **lim) if lim else None
+
+    def process(self, x: np.ndarray) -> np.ndarray:
+        y = np.asarray(x, dtype=np.float64)
+        for biquad in self.filters:
+            y = biquad.process(y)
+        if self.compressor:
+            y = self.compressor.process(y)
+        if self.limiter:
+            y = self.limiter.process(y)
+        return y
+
+    def flush(self) -> np.ndarray:
+        return self.limiter.flush() if self.limiter else np.zeros(0)
+
+
+def _iter_input(path: str, chunk_frames: int) -> Iterator[np.ndarray]:
+    """Bloques mono float64 a 48 kHz del archivo de entrada.
+
+    Los WAV PCM 16-bit (lo que produce la etapa de extracción) y 24-bit (los
+    renders de Reaper y de VOICE_CHAIN) a 48 kHz se leen por memmap; cualquier
+    otro formato se decodifica con ffmpeg por pipe.
+    """
+    info = parse_wav_header(path)
+    bits = info['bits_per_sample'] if info else 0
+    is_pcm = bool(info) and info['format_tag'] == WAVE_FORMAT_PCM and bits in (16, 24)
+    if is_pcm and info['block_align'] == info['channels'] * bits // 8 and info['sample_rate'] == SAMPLE_RATE:
+        channels = info['channels']
+        frames = info['data_size'] // info['block_align']
+        if bits == 16:
+            data = np.memmap(path, dtype='<i2', mode='r', offset=info['data_offset'], shape=(frames, channels))
+        else:
+            # numpy no tiene un entero de 3 bytes: se leen los bytes y se arma cada muestra en int32
+            data = np.memmap(path, dtype='<u1', mode='r', offset=info['data_offset'], shape=(frames, channels, 3))
+        scale = float(2 ** (bits - 1))
+        for start in range(0, frames, chunk_frames):
+            if bits == 16:
+                block = np.asarray(data[start:start + chunk_frames], dtype=np.float64)
+            else:
+                # Los 3 bytes van en la parte alta de un int32: el corrimiento extiende el signo
+                raw = data[start:start + chunk_frames]
+                padded = np.zeros(raw.shape[:2] + (4,), dtype=np.uint8)
+                padded[..., 1:] = raw
+                block = (padded.view('<i4')[..., 0] >> 8).astype(np.float64)
+            yield block.mean(axis=1) / scale if channels > 1 else block[:, 0] / scale
+        del data
+        return
+
+    cmd = ['ffmpeg', '-v', 'error', '-i', path, '-ac', '1', '-ar', str(SAMPLE_RATE), '-f', 'f32le', 'pipe:1']
+    process = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    try:
+        while True:
+            raw = process.stdout.read(chunk_frames * 4)
+            if not raw:
+                break
+            yield np.frombuffer(raw[:len(raw) - len(raw) % 4], dtype='<f4').astype(np.float64)
+        stderr = process.stderr.read()
+        if process.wait() != 0:
+            raise RuntimeError(f"ffmpeg no pudo decodificar {path}: {stderr.decode('utf-8', 'ignore')}")
+    finally:
+        if process.poll() is None:
+            process.kill()
+        process.stdout.close()
+        process.stderr.close()
+
+
+def _to_pcm_bytes(samples: np.ndarray, bits: int) -> bytes:
+    scale = float(2 ** (bits - 1))
+    ints = np.clip(np.round(samples * scale), -scale, scale - 1).astype('<i4')
+    if bits == 16:
+        return ints.astype('<i2').tobytes()
+    if bits == 24:
+        return ints.view(np.uint8).reshape(-1, 4)[:, :3].tobytes()
+    return ints.tobytes()
+
+
+def render_file(input_path: str, output_path: str, settings: Optional[dict] = None,
+                chunk_frames: int = CHUNK_FRAMES) -> Dict[str, float]:
+    """Renderiza input_path con la cadena de voz y escribe un WAV mono 48 kHz.
+
+    El WAV se escribe en un archivo .part y se renombra al final, así que
+    quien espera el render (render_watch) nunca ve un archivo a medias.
+
+    Args:
+        input_path: Audio de entrada (cualquier formato que ffmpeg lea)
+        output_path: WAV renderizado
+        settings: Parámetros de la cadena (por defecto VOICE_CHAIN)
+        chunk_frames: Frames por bloque de proceso
+
+    Returns:
+        Dict con duration_s, elapsed_s y realtime_factor (duración / tiempo de proceso)
+    """
+    settings = settings or VOICE_CHAIN
+    start = time.perf_counter()
+    bits = int(settings.get('bits', 24))
+    tail_frames = int(SAMPLE_RATE * settings.get('tail_ms', 0) / 1000)
+    chain = VoiceChain(settings)
+
+    part_path = f"{output_path}.{uuid.uuid4().hex[:8]}.part"
+    frames = 0
+    with open(part_path, 'wb') as out:
+        # La cabecera se reescribe al final con el tamaño real
+        out.write(wav_header_bytes(SAMPLE_RATE, 1, bits, 0))
+        for block in _iter_input(input_path, chunk_frames):
+            out.write(_to_pcm_bytes(chain.process(block), bits))
+            frames += len(block)
+        # Cola: la cadena sigue sonando sobre silencio, como RENDER_TAILMS en Reaper
+        for offset in range(0, tail_frames, chunk_frames):
+            out.write(_to_pcm_bytes(chain.process(np.zeros(min(chunk_frames, tail_frames - offset))), bits))
+        out.write(_to_pcm_bytes(chain.flush(), bits))
+        total = frames + tail_frames
+        out.seek(0)
+        out.write(wav_header_bytes(SAMPLE_RATE, 1, bits, total * (bits // 8)))
+    os.replace(part_path, output_path)
+
+    elapsed = time.perf_counter() - start
+    duration = frames / SAMPLE_RATE
+    return {
+        'duration_s': round(duration, 3),
+        'elapsed_s': round(elapsed, 3),
+        'realtime_factor': round(duration / elapsed, 1) if elapsed > 0 else 0.0
+    }
+
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+
+def _pool_context():
+    """Contexto de multiprocessing para los pools de render.
+
+    El pool crea sus procesos a demanda, mientras otros hilos lanzan ffmpeg:
+    con fork, un proceso nuevo hereda el extremo de escritura del pipe de
+    ese ffmpeg y el hilo que lo lee nunca recibe EOF. En POSIX los procesos
+    salen de un forkserver (limpios, como spawn en Windows).
+    """
+    if 'forkserver' in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context('forkserver')
+    return multiprocessing.get_context()
+
+
+def get_render_pool() -> ProcessPoolExecutor:
+    """Pool de procesos compartido para renders (DSP_WORKERS procesos)."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=DSP_WORKERS, mp_context=_pool_context())
+        return _pool
+
+
+def render_in_pool(input_path: str, output_path: str, settings: Optional[dict] = None) -> Dict[str, float]:
+    """Renderiza en el pool de procesos; bloquea el hilo llamador hasta terminar.
+
+    Los hilos del pipeline llaman a esta función, así que varios renders
+    corren en núcleos distintos sin competir por el GIL.
+    """
+    return get_render_pool().submit(render_file, input_path, output_path, settings).result()
+
+
+def render_batch(jobs: List[Tuple[str, str]], workers: int = DSP_WORKERS,
+                 settings: Optional[dict] = None) -> List[Dict[str, float]]:
+    """Renderiza varios (entrada, salida) en paralelo y retorna sus métricas en orden."""
+    with ProcessPoolExecutor(max_workers=workers, mp_context=_pool_context()) as pool:
+        futures = [pool.submit(render_file, src, dst, settings) for src, dst in jobs]
+        return [future.result() for future in futures]
@@ -0,0 +1,491 @@
+"""
+AudioPro v1.7 - Carpeta vigilada (hot folder) para el NAS
+Detecta grabaciones nuevas en una o más carpetas, espera a que terminen de
+copiarse (tamaño y mtime estables), descarta duplicados por hash de
+contenido y las procesa con el mismo pipeline que la app. Las salidas
+quedan en <carpeta del archivo>/procesados, igual que desde la pestaña
+"Desde NAS/Ruta Local".
+
+Uso:
+    python hot_folder.py "\\\\NAS\\Grabaciones" "F:/CURSOS/2025" --workers 2
+    python hot_folder.py "F:/CURSOS" --baseline   # marca lo existente como visto y sale
+
+El escaneo es incremental: cada ciclo solo relista los directorios cuyo
+mtime cambió (agregar, borrar o renombrar una entrada lo actualiza) y solo
+consulta el tamaño de los archivos que todavía se están copiando. Un
+escaneo completo cada WATCH_FULL_SCAN_S cubre los recursos de red que no
+actualizan el mtime de los directorios. El estado (archivos vistos,
+procesados y sus hashes) vive en SQLite y sobrevive a reinicios.
+"""
+
+import argparse
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from job_journal import file_checksum
+
+# Segundos que tamaño y mtime deben mantenerse para considerar terminada la copia
+WATCH_STABLE_SECONDS = float(os.getenv("WATCH_STABLE_SECONDS", "30"))
+# Intervalo entre ciclos de escaneo incremental
+WATCH_POLL_INTERVAL = float(os.getenv("WATCH_POLL_INTERVAL", "5"))
+# Intervalo entre escaneos completos (red de seguridad para SMB/NFS)
+WATCH_FULL_SCAN_S = float(os.getenv("WATCH_FULL_SCAN_S", "600"))
+# Estado persistente del vigilante
+WATCH_STATE_PATH = os.getenv(
+    "WATCH_STATE_PATH",
+    os.path.join(os.path.expanduser("~"), ".audiopro", "hot_folder.sqlite3")
+)
+
+# Carpetas que nunca se recorren (salidas del propio pipeline)
+IGNORED_DIRS = ('procesados',)
+# Archivos a medio escribir o temporales de editores y copiadores
+IGNORED_SUFFIXES = ('.part', '.tmp', '.crdownload', '.partial', '.!sync')
+IGNORED_PREFIXES = ('.', '~$')
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    path       TEXT PRIMARY KEY,
+    size       INTEGER NOT NULL,
+    mtime_ns   INTEGER NOT NULL,
+    sha256     TEXT,
+    status     TEXT NOT NULL,
+    output     TEXT,
+    error      TEXT,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS files_sha256 ON files (sha256);
+CREATE INDEX IF NOT EXISTS files_status ON files (status);
+"""
+
+
+def expected_output_exists(path: str) -> bool:
+    """True si ya existe la salida del pipeline en <carpeta>/procesados (lotes anteriores a la vigilancia)."""
+    folder, name = os.path.split(path)
+    base, ext = os.path.splitext(name)
+    output_dir = os.path.join(folder, IGNORED_DIRS[0])
+    return any(
+        os.path.exists(os.path.join(output_dir, f"{base}_procesado{out_ext}"))
+        for out_ext in (ext, '.mp4')
+    )
+
+
+class HotFolderState:
+    """Archivos vistos por el vigilante, en SQLite.
+
+    Estados: 'queued' (reclamado, en proceso), 'done', 'duplicate',
+    'error' y 'seen' (existía al marcar la línea base).
+    """
+
+    def __init__(self, path: str):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._db = sqlite3.connect(path, timeout=30, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript(_SCHEMA)
+        self._lock = threading.Lock()
+
+    def known(self, roots: Iterable[str]) -> Dict[str, Tuple[int, int, str]]:
+        """path -> (tamaño, mtime_ns, estado) de los archivos bajo roots."""
+        known = {}
+        with self._lock:
+            for root in roots:
+                prefix = os.path.join(os.path.abspath(root), '')
+                rows = self._db.execute(
+                    "SELECT path, size, mtime_ns, status FROM files WHERE substr(path, 1, ?) = ?",
+                    (len(prefix), prefix)
+                ).fetchall()
+                known.update({path: (size, mtime_ns, status) for path, size, mtime_ns, status in rows})
+        return known
+
+    def record(self, path: str, size: int, mtime_ns: int, status: str, sha256: Optional[str] = None,
+               output: Optional[str] = None, error: Optional[str] = None) -> None:
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO files (path, size, mtime_ns, sha256, status, output, error, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (path, size, mtime_ns, sha256, status, output, error, time.time())
+            )
+
+    def record_many(self, files: Iterable[Tuple[str, int, int]], status: str) -> None:
+        """Registra muchos archivos (ruta, tamaño, mtime_ns) con el mismo estado en una transacción."""
+        now = time.time()
+        with self._lock:
+            self._db.execute("BEGIN")
+            self._db.executemany(
+                "INSERT OR REPLACE INTO files (path, size, mtime_ns, status, updated_at) VALUES (?, ?, ?, ?, ?)",
+                [(path, size, mtime_ns, status, now) for path, size, mtime_ns in files]
+            )
+            self._db.execute("COMMIT")
+
+    def claim(self, path: str, size: int, mtime_ns: int, sha256: str) -> Optional[str]:
+        """Reserva un contenido para procesarlo.
+
+        Returns:
+            None si el archivo quedó reservado ('queued'), o la ruta del archivo
+            con el mismo contenido que ya se procesó o se está procesando
+        """
+        with self._lock:
+            row = self._db.execute(
+                "SELECT path FROM files WHERE sha256 = ? AND status IN ('queued', 'done') AND path != ? LIMIT 1",
+                (sha256, path)
+            ).fetchone()
+            status = 'duplicate' if row else 'queued'
+            self._db.execute(
+                "INSERT OR REPLACE INTO files (path, size, mtime_ns, sha256, status, output, error, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, NULL, ?)",
+                (path, size, mtime_ns, sha256, status, row[0] if row else None, time.time())
+            )
+        return row[0] if row else None
+
+    def counts(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self._db.execute("SELECT status, COUNT(*) FROM files GROUP BY status").fetchall())
+
+
+class HotFolderWatcher:
+    """Vigila carpetas y envía cada archivo terminado de copiar a process_fn.
+
+    Args:
+        roots: Carpetas a vigilar (se recorren recursivamente)
+        process_fn: Función ruta -> resultado del pipeline (dict con 'output_file')
+        state: Estado persistente
+        extensions: Extensiones aceptadas (sin punto)
+        workers: Archivos procesándose a la vez
+        stable_seconds: Tiempo que tamaño y mtime deben mantenerse
+        full_scan_interval: Segundos entre escaneos completos
+        on_event: Callback opcional (evento, ruta, detalle) para el avance
+    """
+
+    def __init__(
+        self,
+        roots: List[str],
+        process_fn: Callable[[str], dict],
+        state: HotFolderState,
+        extensions: Iterable[str],
+        workers: int = 2,
+        stable_seconds: float = WATCH_STABLE_SECONDS,
+        full_scan_interval: float = WATCH_FULL_SCAN_S,
+        on_event: Optional[Callable[[str, str, dict], None]] = None
+    ):
+        self.roots = [os.path.abspath(root) for root in roots]
+        self.process_fn = process_fn
+        self.state = state
+        self.extensions = tuple('.' + ext.lower().lstrip('.') for ext in extensions)
+        self.workers = workers
+        self.stable_seconds = stable_seconds
+        self.full_scan_interval = full_scan_interval
+        self.on_event = on_event
+
+        # Directorio -> mtime_ns del último listado
+        self._dirs: Dict[str, Optional[int]] = {root: None for root in self.roots}
+        # Archivo -> (tamaño, mtime_ns) ya resuelto (procesado, duplicado, en cola, línea base)
+        self._known: Dict[str, Tuple[int, int]] = {}
+        # Archivo -> (tamaño, mtime_ns, desde cuándo no cambia)
+        self._pending: Dict[str, Tuple[int, int, float]] = {}
+        self._in_flight = 0
+        self._last_full_scan = 0.0
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self.counters = {
+            'ticks': 0, 'dirs_listed': 0, 'entries_scanned': 0, 'files_stat': 0,
+            'enqueued': 0, 'done': 0, 'duplicates': 0, 'errors': 0, 'last_tick_s': 0.0
+        }
+
+        for path, (size, mtime_ns, status) in state.known(self.roots).items():
+            if status == 'queued':
+                # Quedó a medias en una ejecución anterior: se vuelve a encolar
+                # (el diario de trabajos lo retoma desde su última etapa)
+                self._pending[path] = (size, mtime_ns, 0.0)
+            else:
+                self._known[path] = (size, mtime_ns)
+
+    def _emit(self, event: str, path: str, **detail) -> None:
+        if self.on_event:
+            self.on_event(event, path, detail)
+
+    def _accepts(self, name: str) -> bool:
+        lower = name.lower()
+        return all((
+            lower.endswith(self.extensions),
+            not lower.endswith(IGNORED_SUFFIXES),
+            not name.startswith(IGNORED_PREFIXES),
+            '_procesado.' not in lower,
+        ))
+
+    def _list_dir(self, path: str, now: float, seen_dirs: set) -> None:
+        """Lista un directorio: registra subdirectorios nuevos y observa sus archivos."""
+        try:
+            entries = list(os.scandir(path))
+        except OSError:
+            return
+        self.counters['dirs_listed'] += 1
+        self.counters['entries_scanned'] += len(entries)
+        for entry in entries:
+            try:
+                if entry.is_dir(follow_symlinks=False):
+                    if entry.name in IGNORED_DIRS or entry.name.startswith(IGNORED_PREFIXES):
+                        continue
+                    if entry.path not in self._dirs:
+                        # Directorio nuevo: se lista en este mismo ciclo
+                        self._dirs[entry.path] = None
+                        self._scan_dir(entry.path, now, seen_dirs, force=True)
+                elif entry.is_file(follow_symlinks=False) and self._accepts(entry.name):
+                    # En Windows scandir trae tamaño y mtime sin un stat extra
+                    st = entry.stat(follow_symlinks=False)
+                    self._observe(entry.path, st.st_size, st.st_mtime_ns, now)
+            except OSError:
+                continue
+
+    def _scan_dir(self, path: str, now: float, seen_dirs: set, force: bool) -> None:
+        if path in seen_dirs:
+            return
+        seen_dirs.add(path)
+        try:
+            mtime_ns = os.stat(path).st_mtime_ns
+        except OSError:
+            # Directorio borrado: se olvida junto con sus subdirectorios
+            for known_dir in [d for d in self._dirs if d == path or d.startswith(os.path.join(path, ''))]:
+                if known_dir not in self.roots:
+                    del self._dirs[known_dir]
+            return
+        if force or self._dirs.get(path) != mtime_ns:
+            self._dirs[path] = mtime_ns
+            self._list_dir(path, now, seen_dirs)
+
+    def _observe(self, path: str, size: int, mtime_ns: int, now: float) -> None:
+        """Un archivo visto en un listado: nuevo o modificado pasa a pendiente."""
+        if self._known.get(path) == (size, mtime_ns):
+            return
+        pending = self._pending.get(path)
+        if pending and pending[:2] == (size, mtime_ns):
+            return
+        if pending is None and path not in self._known and expected_output_exists(path):
+            # Ya procesado antes de que existiera la vigilancia
+            self._known[path] = (size, mtime_ns)
+            self.state.record(path, size, mtime_ns, 'done')
+            return
+        self._pending[path] = (size, mtime_ns, now)
+        if pending is None:
+            self._emit('detected', path, size=size)
+
+    def _scan(self, now: float, full: bool) -> None:
+        """Relista los directorios que cambiaron (todos si full)."""
+        if full:
+            self._last_full_scan = now
+        seen_dirs: set = set()
+        for path in list(self._dirs):
+            if path in self._dirs:
+                self._scan_dir(path, now, seen_dirs, force=full)
+
+    def tick(self) -> List[str]:
+        """Un ciclo de escaneo. Retorna los archivos que se encolaron."""
+        start = time.perf_counter()
+        now = time.monotonic()
+        self._scan(now, full=now - self._last_full_scan >= self.full_scan_interval)
+
+        # Solo los archivos que se están copiando se consultan en cada ciclo
+        ready = []
+        for path, (size, mtime_ns, since) in list(self._pending.items()):
+            try:
+                st = os.stat(path)
+            except OSError:
+                del self._pending[path]
+                continue
+            self.counters['files_stat'] += 1
+            if (st.st_size, st.st_mtime_ns) != (size, mtime_ns):
+                self._pending[path] = (st.st_size, st.st_mtime_ns, now)
+            elif now - since >= self.stable_seconds:
+                del self._pending[path]
+                self._known[path] = (size, mtime_ns)
+                ready.append(path)
+
+        for path in ready:
+            self._submit(path)
+        self.counters['ticks'] += 1
+        self.counters['last_tick_s'] = round(time.perf_counter() - start, 4)
+        return ready
+
+    def _submit(self, path: str) -> None:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="hotfolder")
+        with self._lock:
+            self._in_flight += 1
+            self.counters['enqueued'] += 1
+        self._executor.submit(self._handle, path)
+
+    def _handle(self, path: str) -> None:
+        """Worker: hash, deduplicación y pipeline para un archivo estable."""
+        try:
+            st = os.stat(path)
+            sha256 = file_checksum(path)
+            duplicate_of = self.state.claim(path, st.st_size, st.st_mtime_ns, sha256)
+            if duplicate_of:
+                with self._lock:
+                    self.counters['duplicates'] += 1
+                self._emit('duplicate', path, duplicate_of=duplicate_of)
+                return
+
+            self._emit('started', path)
+            started = time.perf_counter()
+            try:
+                result = self.process_fn(path)
+            except Exception as e:
+                self.state.record(path, st.st_size, st.st_mtime_ns, 'error', sha256, error=str(e))
+                with self._lock:
+                    self.counters['errors'] += 1
+                self._emit('error', path, error=str(e), elapsed_s=round(time.perf_counter() - started, 3))
+                return
+            self.state.record(path, st.st_size, st.st_mtime_ns, 'done', sha256, output=result.get('output_file'))
+            with self._lock:
+                self.counters['done'] += 1
+            self._emit('done', path, output_file=result.get('output_file'),
+                       resumed_from=result.get('resumed_from'),
+                       integrated_lufs=(result.get('loudness') or {}).get('integrated_lufs'),
+                       elapsed_s=round(time.perf_counter() - started, 3))
+        except OSError as e:
+            # Borrado o movido mientras esperaba turno
+            self._emit('error', path, error=str(e))
+        finally:
+            with self._lock:
+                self._in_flight -= 1
+
+    def baseline(self) -> int:
+        """Marca como vistos todos los archivos actuales, sin procesarlos.
+
+        Returns:
+            Cantidad de archivos marcados
+        """
+        self._scan(time.monotonic(), full=True)
+        files = [(path, size, mtime_ns) for path, (size, mtime_ns, _) in self._pending.items()]
+        self.state.record_many(files, 'seen')
+        for path, size, mtime_ns in files:
+            self._known[path] = (size, mtime_ns)
+        self._pending.clear()
+        return len(files)
+
+    def run(self, poll_interval: float = WATCH_POLL_INTERVAL, on_tick: Optional[Callable[[], None]] = None) -> None:
+        """Vigila hasta stop() (o Ctrl+C); los archivos en proceso terminan antes de salir."""
+        try:
+            while not self._stop.is_set():
+                self.tick()
+                if on_tick:
+                    on_tick()
+                self._stop.wait(poll_interval)
+        finally:
+            if self._executor is not None:
+                self._executor.shutdown(wait=True, cancel_futures=True)
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return dict(
+                self.counters,
+                dirs=len(self._dirs),
+                known=len(self._known),
+                pending=len(self._pending),
+                in_flight=self._in_flight
+            )
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('folders', nargs='+', help="Carpetas a vigilar")
+    parser.add_argument('--workers', type=int, default=None, help="Archivos procesándose a la vez")
+    parser.add_argument('--stable-seconds', type=float, default=WATCH_STABLE_SECONDS)
+    parser.add_argument('--poll-interval', type=float, default=WATCH_POLL_INTERVAL)
+    parser.add_argument('--full-scan', type=float, default=WATCH_FULL_SCAN_S, help="Segundos entre escaneos completos")
+    parser.add_argument('--state', default=WATCH_STATE_PATH, help="Base SQLite del vigilante")
+    parser.add_argument('--backend', choices=('reaper', 'numpy'), default=None, help="Backend de render")
+    parser.add_argument('--loudness-target', type=float, default=None, help="Normalizar el render a estos LUFS")
+    parser.add_argument('--no-isolation', action='store_true', help="No usar ElevenLabs Audio Isolation")
+    parser.add_argument('--baseline', action='store_true',
+                        help="Marcar los archivos existentes como vistos (sin procesarlos) y salir")
+    parser.add_argument('--once', action='store_true',
+                        help="Un solo escaneo: procesar lo que ya está estable y salir")
+    parser.add_argument('--jsonl', action='store_true', help="Un JSON por evento por stdout")
+    parser.add_argument('-v', '--verbose', action='store_true', help="Mostrar todos los mensajes del pipeline")
+    args = parser.parse_args(argv)
+
+    for folder in args.folders:
+        if not os.path.isdir(folder):
+            print(f"No existe la carpeta: {folder}", file=sys.stderr)
+            return 2
+    if args.backend:
+        os.environ['RENDER_BACKEND'] = args.backend
+    if args.loudness_target is not None:
+        os.environ['LOUDNESS_TARGET'] = str(args.loudness_target)
+
+    from cli import message_printer
+    from ui_bridge import set_flag, set_message_handler
+    set_message_handler(message_printer(args.verbose))
+    if args.no_isolation:
+        set_flag('disable_elevenlabs', True)
+
+    import pipeline
+    from media_source import LocalPathSource
+    from telemetry import get_telemetry, new_batch_id
+
+    batch_id = new_batch_id()
+    print_lock = threading.Lock()
+
+    def _process(path: str) -> dict:
+        return pipeline.process_with_reaper_pipeline(LocalPathSource(path), os.path.basename(path),
+                                                     os.path.dirname(path), batch_id)
+
+    def _on_event(event: str, path: str, detail: dict) -> None:
+        with print_lock:
+            extra = ' '.join(f"{k}={v}" for k, v in detail.items() if v is not None)
+            print(f"{event:10} {path} {extra}".rstrip(), file=sys.stderr, flush=True)
+            if args.jsonl:
+                print(json.dumps(dict(detail, event=event, path=path), ensure_ascii=False), flush=True)
+
+    watcher = HotFolderWatcher(
+        args.folders, _process, HotFolderState(args.state), pipeline.MEDIA_EXTENSIONS,
+        workers=args.workers or pipeline.MAX_WORKERS,
+        stable_seconds=args.stable_seconds,
+        full_scan_interval=args.full_scan,
+        on_event=_on_event
+    )
+
+    if args.baseline:
+        marked = watcher.baseline()
+        print(f"Línea base: {marked} archivo(s) marcados como vistos", file=sys.stderr)
+        return 0
+
+    telemetry = get_telemetry()
+    finished = [0]
+
+    def _on_tick() -> None:
+        stats = watcher.stats()
+        done = stats['done'] + stats['errors']
+        if done != finished[0]:
+            finished[0] = done
+            telemetry.export_prometheus()
+        if args.once and not stats['pending'] and not stats['in_flight']:
+            watcher.stop()
+
+    print(f"Vigilando {len(args.folders)} carpeta(s) cada {args.poll_interval:g}s "
+          f"(estable tras {args.stable_seconds:g}s, render {pipeline.RENDER_BACKEND}) - Ctrl+C para salir",
+          file=sys.stderr)
+    try:
+        watcher.run(args.poll_interval, on_tick=_on_tick)
+    except KeyboardInterrupt:
+        # run() ya esperó a los archivos en proceso; los encolados se retoman al volver a iniciar
+        print("Vigilancia detenida", file=sys.stderr)
+    telemetry.export_prometheus()
+    stats = watcher.stats()
+    print(f"{stats['done']} procesado(s), {stats['duplicates']} duplicado(s), {stats['errors']} con error",
+          file=sys.stderr)
+    return 1 if stats['errors'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
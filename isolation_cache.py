@@ -0,0 +1,189 @@
+"""
+Caché en disco de resultados de ElevenLabs Audio Isolation para AudioPro v1.7
+Las entradas se direccionan por el hash del PCM extraído más el endpoint y parámetros
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import threading
+import uuid
+from typing import Optional
+
+from wav_io import iter_pcm_chunks, parse_wav_header
+
+# Configuración (ISOLATION_CACHE_MB=0 deshabilita la caché)
+ISOLATION_CACHE_DIR = os.getenv(
+    "ISOLATION_CACHE_DIR",
+    os.path.join(os.path.expanduser("~"), ".audiopro", "isolation_cache")
+)
+ISOLATION_CACHE_MB = int(os.getenv("ISOLATION_CACHE_MB", "2048"))
+
+
+def link_or_copy(src: str, dst: str) -> None:
+    """Crea dst como hard link de src, o lo copia si el sistema no lo permite."""
+    try:
+        os.link(src, dst)
+    except OSError:
+        shutil.copyfile(src, dst)
+
+
+class IsolationCache:
+    """Caché LRU de archivos aislados con presupuesto de tamaño.
+
+    El orden LRU se guarda en el mtime de cada entrada (se actualiza en cada
+    acierto), de modo que sobrevive a reinicios de la app sin índice aparte.
+
+    Args:
+        cache_dir: Directorio donde se guardan las entradas
+        max_bytes: Tamaño máximo total; al superarlo se eliminan las entradas menos usadas
+    """
+
+    def __init__(self, cache_dir: str, max_bytes: int):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_bytes > 0
+
+    def key_for(self, audio_file: str, endpoint: str, params: Optional[dict] = None) -> str:
+        """Calcula la clave de caché de un audio para un endpoint y parámetros.
+
+        Solo se hashea el PCM del data chunk, así que dos extracciones del
+        mismo archivo con distinta metadata comparten la entrada.
+
+        Args:
+            audio_file: Ruta al WAV extraído
+            endpoint: URL del endpoint de isolation
+            params: Parámetros que afectan al resultado
+
+        Returns:
+            Clave hexadecimal
+        """
+        digest = hashlib.sha256()
+        digest.update(endpoint.encode('utf-8'))
+        digest.update(json.dumps(params or {}, sort_keys=True).encode('utf-8'))
+
+        info = parse_wav_header(audio_file)
+        if info:
+            digest.update(json.dumps(
+                [info['format_tag'], info['channels'], info['sample_rate'], info['bits_per_sample']]
+            ).encode('utf-8'))
+            for block in iter_pcm_chunks(audio_file, info=info):
+                digest.update(block)
+        else:
+            with open(audio_file, 'rb') as f:
+                for block in iter(lambda: f.read(1024 * 1024), b''):
+                    digest.update(block)
+        return digest.hexdigest()
+
+    def _entry_path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key[:2], f"{key}.wav")
+
+    def get(self, key: str, dest: str) -> bool:
+        """Materializa la entrada en dest si existe.
+
+        Args:
+            key: Clave calculada con key_for
+            dest: Ruta donde dejar el resultado (hard link o copia)
+
+        Returns:
+            True si hubo acierto
+        """
+        if not self.enabled:
+            return False
+
+        entry = self._entry_path(key)
+        try:
+            os.utime(entry, None)
+            link_or_copy(entry, dest)
+        except FileNotFoundError:
+            # No existe, o se desalojó justo ahora
+            with self._lock:
+                self.misses += 1
+            return False
+
+        with self._lock:
+            self.hits += 1
+        return True
+
+    def put(self, key: str, result_file: str) -> None:
+        """Guarda un resultado en la caché y aplica el presupuesto de tamaño.
+
+        Args:
+            key: Clave calculada con key_for
+            result_file: Archivo aislado a guardar
+        """
+        if not self.enabled:
+            return
+
+        entry = self._entry_path(key)
+        os.makedirs(os.path.dirname(entry), exist_ok=True)
+
+        # Escritura atómica: otro worker nunca ve una entrada a medias
+        tmp = f"{entry}.{uuid.uuid4().hex[:8]}.part"
+        link_or_copy(result_file, tmp)
+        os.replace(tmp, entry)
+
+        self.evict()
+
+    def _entries(self):
+        entries = []
+        if not os.path.isdir(self.cache_dir):
+            return entries
+        for bucket in os.scandir(self.cache_dir):
+            if not bucket.is_dir():
+                continue
+            for entry in os.scandir(bucket.path):
+                if entry.name.endswith('.wav'):
+                    stat = entry.stat()
+                    entries.append((stat.st_mtime, stat.st_size, entry.path))
+        return entries
+
+    def evict(self) -> None:
+        """Elimina las entradas menos usadas hasta respetar max_bytes."""
+        with self._lock:
+            entries = sorted(self._entries())
+            total = sum(size for _, size, _ in entries)
+            for _, size, path in entries:
+                if total <= self.max_bytes:
+                    break
+                try:
+                    os.unlink(path)
+                    total -= size
+                    self.evictions += 1
+                except OSError:
+                    pass
+
+    def stats(self) -> dict:
+        """Contadores y ocupación actual de la caché."""
+        entries = self._entries()
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / lookups, 3) if lookups else 0.0,
+            'evictions': self.evictions,
+            'entries': len(entries),
+            'size_mb': round(sum(size for _, size, _ in entries) / (1024 * 1024), 1),
+            'max_mb': round(self.max_bytes / (1024 * 1024), 1)
+        }
+
+
+_cache: Optional[IsolationCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_isolation_cache() -> IsolationCache:
+    """Retorna la caché compartida del proceso (sobrevive a los reruns de Streamlit)."""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = IsolationCache(ISOLATION_CACHE_DIR, ISOLATION_CACHE_MB * 1024 * 1024)
+        return _cache
@@ -0,0 +1,262 @@
+"""
+División y unión de audio por segmentos para Audio Isolation en AudioPro v1.7
+Corta el WAV en segmentos solapados (o en tramos de voz) y los vuelve a unir exactos a la muestra
+"""
+
+import os
+from typing import List, Tuple
+
+import numpy as np
+
+from wav_io import WAVE_FORMAT_PCM, parse_wav_header, wav_header_bytes
+
+# Segmento: (primer frame, frame final exclusivo)
+Segment = Tuple[int, int]
+
+
+def plan_segments(total_frames: int, segment_frames: int, overlap_frames: int) -> List[Segment]:
+    """Calcula los segmentos solapados que cubren todo el audio.
+
+    Cada segmento empieza overlap_frames antes del final del anterior. El
+    último segmento absorbe el resto para no dejar una cola diminuta.
+
+    Args:
+        total_frames: Número total de frames del audio
+        segment_frames: Frames por segmento (incluido el solape)
+        overlap_frames: Frames compartidos entre segmentos consecutivos
+
+    Returns:
+        Lista de (inicio, fin) en frames
+    """
+    if segment_frames <= overlap_frames:
+        raise ValueError("El segmento debe ser más largo que el solape")
+    if total_frames <= segment_frames:
+        return [(0, total_frames)]
+
+    step = segment_frames - overlap_frames
+    segments = []
+    start = 0
+    while start + segment_frames < total_frames:
+        segments.append((start, start + segment_frames))
+        start += step
+    # Unir la cola al último segmento si quedaría más corta que el solape
+    if total_frames - start <= overlap_frames:
+        last_start, _ = segments.pop()
+        segments.append((last_start, total_frames))
+    else:
+        segments.append((start, total_frames))
+    return segments
+
+
+def read_pcm16(path: str) -> Tuple[np.ndarray, dict]:
+    """Mapea en memoria el PCM 16-bit de un WAV sin cargarlo completo.
+
+    Args:
+        path: Ruta al WAV
+
+    Returns:
+        Tuple de (array int16 de forma (frames, canales), cabecera)
+    """
+    info = parse_wav_header(path)
+    if not info or info['format_tag'] != WAVE_FORMAT_PCM or info['bits_per_sample'] != 16:
+        raise ValueError(f"Se esperaba WAV PCM 16-bit: {path}")
+    data_size = min(info['data_size'], info['file_size'] - info['data_offset'])
+    frames = data_size // info['block_align']
+    if frames == 0:
+        return np.zeros((0, info['channels']), dtype='<i2'), info
+    pcm = np.memmap(path, dtype='<i2', mode='r', offset=info['data_offset'], shape=(frames, info['channels']))
+    return pcm, info
+
+
+def write_pcm16(path: str, samples: np.ndarray, sample_rate: int) -> None:
+    """Escribe un array (frames, canales) como WAV PCM 16-bit.
+
+    Args:
+        path: Ruta de salida
+        samples: Muestras int16 o float en [-1, 1]
+        sample_rate: Frecuencia de muestreo
+    """
+    if samples.ndim == 1:
+        samples = samples[:, None]
+    if samples.dtype != np.int16:
+        samples = float_to_pcm16(samples)
+    with open(path, 'wb') as f:
+        f.write(wav_header_bytes(sample_rate, samples.shape[1], 16, samples.nbytes))
+        f.write(np.ascontiguousarray(samples, dtype='<i2').tobytes())
+
+
+def float_to_pcm16(samples: np.ndarray) -> np.ndarray:
+    """Convierte muestras float en [-1, 1] a int16 con saturación."""
+    return np.clip(np.round(samples * 32767.0), -32768, 32767).astype('<i2')
+
+
+def write_segments(audio_file: str, segments: List[Segment], out_dir: str) -> List[str]:
+    """Escribe cada segmento como WAV independiente listo para subir.
+
+    Args:
+        audio_file: WAV PCM 16-bit de origen
+        segments: Segmentos calculados con plan_segments
+        out_dir: Directorio donde escribir los segmentos
+
+    Returns:
+        Rutas de los WAV de cada segmento, en orden
+    """
+    pcm, info = read_pcm16(audio_file)
+    base = os.path.splitext(os.path.basename(audio_file))[0]
+    paths = []
+    for idx, (start, end) in enumerate(segments):
+        path = os.path.join(out_dir, f"{base}_seg{idx:03d}.wav")
+        write_pcm16(path, np.asarray(pcm[start:end]), info['sample_rate'])
+        paths.append(path)
+    return paths
+
+
+def crossfade_weights(length: int) -> np.ndarray:
+    """Curva de fundido de entrada (coseno elevado) que suma 1 con su complemento.
+
+    Los segmentos vienen del mismo audio, así que un fundido de amplitud
+    constante evita tanto huecos como picos en la unión.
+    """
+    if length <= 0:
+        return np.zeros(0)
+    n = np.arange(length, dtype=np.float64)
+    return 0.5 - 0.5 * np.cos(np.pi * (n + 0.5) / length)
+
+
+def _fit_length(samples: np.ndarray, frames: int, channels: int) -> np.ndarray:
+    """Recorta o rellena con silencio un resultado para que mida exactamente frames."""
+    if samples.ndim == 1:
+        samples = samples[:, None]
+    if samples.shape[1] != channels:
+        samples = np.repeat(samples.mean(axis=1, keepdims=True), channels, axis=1)
+    if samples.shape[0] >= frames:
+        return samples[:frames]
+    pad = np.zeros((frames - samples.shape[0], channels), dtype=samples.dtype)
+    return np.concatenate([samples, pad])
+
+
+def stitch_segments(result_files: List[str], segments: List[Segment], out_path: str,
+                    sample_rate: int, channels: int = 1) -> None:
+    """Une los segmentos procesados en un único WAV con crossfades en los solapes.
+
+    La salida conserva exactamente la longitud del original: cada resultado se
+    ajusta a la duración de su segmento antes de mezclarse, de modo que la
+    alineación con el video no se desplaza ni una muestra.
+
+    Args:
+        result_files: WAV procesados, uno por segmento y en orden
+        segments: Segmentos usados para cortar el original
+        out_path: Ruta del WAV final
+        sample_rate: Frecuencia de muestreo de salida
+        channels: Canales de salida
+    """
+    if len(result_files) != len(segments):
+        raise ValueError("Cada segmento necesita su resultado")
+
+    total_frames = segments[-1][1] if segments else 0
+    with open(out_path, 'wb') as out:
+        out.write(wav_header_bytes(sample_rate, channels, 16, total_frames * channels * 2))
+
+        written = 0  # frames ya escritos en la salida
+        carry = None  # cola del segmento anterior que se solapa con el siguiente
+        for idx, (path, (start, end)) in enumerate(zip(result_files, segments)):
+            pcm, _ = read_pcm16(path)
+            current = _fit_length(np.asarray(pcm, dtype=np.float64), end - start, channels)
+
+            if carry is not None:
+                overlap = carry.shape[0]
+                fade_in = crossfade_weights(overlap)[:, None]
+                current[:overlap] = carry * (1.0 - fade_in) + current[:overlap] * fade_in
+
+            # Guardar la parte que se solapará con el siguiente segmento
+            if idx + 1 < len(segments):
+                next_start = segments[idx + 1][0]
+                keep = end - next_start
+                carry = current[current.shape[0] - keep:].copy()
+                current = current[:current.shape[0] - keep]
+            else:
+                carry = None
+
+            out.write(np.clip(np.round(current), -32768, 32767).astype('<i2').tobytes())
+            written += current.shape[0]
+
+    if written != total_frames:
+        raise ValueError(f"Longitud final inesperada: {written} != {total_frames} frames")
+
+
+def write_regions(audio_file: str, regions: List[Segment], out_path: str, block_frames: int = 480000) -> int:
+    """Escribe los tramos indicados uno detrás de otro en un único WAV compacto.
+
+    Args:
+        audio_file: WAV PCM 16-bit de origen
+        regions: Tramos (inicio, fin) ordenados y sin solape
+        out_path: WAV compacto a subir
+        block_frames: Frames copiados por bloque (memoria constante)
+
+    Returns:
+        Frames escritos (suma de los largos de los tramos)
+    """
+    pcm, info = read_pcm16(audio_file)
+    total = sum(end - start for start, end in regions)
+    with open(out_path, 'wb') as out:
+        out.write(wav_header_bytes(info['sample_rate'], info['channels'], 16, total * info['block_align']))
+        for start, end in regions:
+            for first in range(start, end, block_frames):
+                out.write(np.ascontiguousarray(pcm[first:min(first + block_frames, end)], dtype='<i2').tobytes())
+    return total
+
+
+def splice_regions(result_file: str, regions: List[Segment], total_frames: int, out_path: str,
+                   sample_rate: int, channels: int = 1, fade_frames: int = 480,
+                   block_frames: int = 480000) -> None:
+    """Devuelve un resultado compacto (ver write_regions) a la línea de tiempo original.
+
+    Cada tramo procesado vuelve a su posición exacta y los huecos recortados
+    se rellenan con silencio, así que la salida mide total_frames y queda
+    alineada al video muestra a muestra. Los bordes que dan a un hueco llevan
+    un fundido corto (dentro del margen del VAD) para que no haya clics.
+
+    Args:
+        result_file: WAV procesado con los tramos concatenados
+        regions: Tramos usados para armar el WAV compacto
+        total_frames: Frames del audio original
+        out_path: WAV final
+        sample_rate: Frecuencia de muestreo de salida
+        channels: Canales de salida
+        fade_frames: Largo de los fundidos en los bordes de cada tramo
+        block_frames: Frames escritos por bloque (memoria constante)
+    """
+    pcm, _ = read_pcm16(result_file)
+    compact = sum(end - start for start, end in regions)
+    available = min(pcm.shape[0], compact)
+    silence = np.zeros((block_frames, channels), dtype='<i2')
+
+    def _write_silence(out, frames: int) -> None:
+        for first in range(0, frames, block_frames):
+            out.write(silence[:min(block_frames, frames - first)].tobytes())
+
+    with open(out_path, 'wb') as out:
+        out.write(wav_header_bytes(sample_rate, channels, 16, total_frames * channels * 2))
+        position = 0  # frame actual en la salida
+        offset = 0    # frame actual en el resultado compacto
+        for start, end in regions:
+            _write_silence(out, start - position)
+            length = end - start
+            fade_in = fade_frames if start > 0 else 0
+            fade_out = fade_frames if end < total_frames else 0
+            for first in range(0, length, block_frames):
+                count = min(block_frames, length - first)
+                lo, hi = offset + first, min(offset + first + count, available)
+                block = _fit_length(np.asarray(pcm[lo:max(lo, hi)], dtype=np.float64), count, channels)
+                # Fundidos (coseno elevado) en los extremos del tramo que caen en este bloque
+                if fade_in and first < fade_in:
+                    n = min(fade_in - first, count)
+                    block[:n] *= crossfade_weights(fade_in)[first:first + n, None]
+                if fade_out and first + count > length - fade_out:
+                    skip = max(0, length - fade_out - first)
+                    ramp = 1.0 - crossfade_weights(fade_out)
+                    block[skip:] *= ramp[first + skip - (length - fade_out):first + count - (length - fade_out), None]
+                out.write(np.clip(np.round(block), -32768, 32767).astype('<i2').tobytes())
+            offset += length
+            position = end
+        _write_silence(out, total_frames - position)
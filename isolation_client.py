@@ -0,0 +1,560 @@
+"""
+Cliente HTTP compartido para el servicio de Audio Isolation en AudioPro v1.7
+Reutiliza conexiones y transmite el audio por bloques en ambos sentidos
+(comprimido con ffmpeg al vuelo según ISOLATION_UPLOAD_CODEC)
+"""
+
+import os
+import shutil
+import subprocess
+import tempfile
+import threading
+import time
+import uuid
+from email.utils import parsedate_to_datetime
+from typing import Any, BinaryIO, Callable, Iterator, Optional, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from telemetry import span
+
+# Tamaño de bloque para subir y descargar audio
+STREAM_CHUNK_BYTES = int(os.getenv("ISOLATION_STREAM_CHUNK_KB", "256")) * 1024
+
+# Códec con el que se sube el audio: "flac" (sin pérdida), "opus" (con pérdida,
+# ISOLATION_UPLOAD_BITRATE) o "wav" (el PCM tal cual, sin ffmpeg)
+ISOLATION_UPLOAD_CODEC = os.getenv("ISOLATION_UPLOAD_CODEC", "flac").lower()
+ISOLATION_UPLOAD_BITRATE = os.getenv("ISOLATION_UPLOAD_BITRATE", "192k")
+
+# Argumentos de ffmpeg, extensión y tipo MIME de cada códec de subida. Opus va en
+# Ogg porque su pre-skip viaja en la cabecera: el audio decodificado no se
+# corre respecto del original (MP3 por pipe no puede garantizarlo)
+UPLOAD_CODECS = {
+    'flac': {'args': ['-c:a', 'flac', '-compression_level', '5', '-f', 'flac'],
+             'ext': 'flac', 'mime': 'audio/flac', 'lossless': True},
+    'opus': {'args': ['-c:a', 'libopus', '-b:a', '{bitrate}', '-f', 'ogg'],
+             'ext': 'ogg', 'mime': 'audio/ogg', 'lossless': False},
+}
+
+# Conexiones persistentes por host (una por worker en vuelo es suficiente)
+HTTP_POOL_SIZE = int(os.getenv("ISOLATION_HTTP_POOL", "8"))
+
+# (conexión, lectura) en segundos
+HTTP_TIMEOUT = (10, 180)
+
+# Límite de requests compartido por todos los workers del proceso
+ISOLATION_RATE_PER_MIN = float(os.getenv("ISOLATION_RATE_PER_MIN", "30"))
+ISOLATION_BURST = int(os.getenv("ISOLATION_BURST", "4"))
+
+# Circuit breaker: fallos consecutivos para abrir y segundos hasta volver a probar
+ISOLATION_BREAKER_THRESHOLD = int(os.getenv("ISOLATION_BREAKER_THRESHOLD", "5"))
+ISOLATION_BREAKER_RESET_S = float(os.getenv("ISOLATION_BREAKER_RESET_S", "60"))
+
+
+class CircuitOpenError(Exception):
+    """El circuit breaker está abierto: el servicio se considera caído."""
+
+
+def parse_retry_after(value: Optional[str], default: float = 0.0) -> float:
+    """Convierte un header Retry-After (segundos o fecha HTTP) a segundos de espera."""
+    if not value:
+        return default
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return default
+
+
+class TokenBucket:
+    """Token bucket compartido entre hilos, con pausa global por Retry-After.
+
+    Args:
+        rate_per_s: Tokens que se reponen por segundo (0 = sin límite)
+        burst: Capacidad máxima del bucket
+    """
+
+    def __init__(self, rate_per_s: float, burst: int):
+        self.rate_per_s = rate_per_s
+        self.burst = max(1, burst)
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._cond = threading.Condition()
+        self.acquired = 0
+        self.waits = 0
+        self.wait_seconds = 0.0
+        self.penalties = 0
+
+    def _refill(self, now: float) -> None:
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate_per_s)
+        self._updated = now
+
+    def acquire(self) -> float:
+        """Espera hasta obtener un token; retorna los segundos esperados."""
+        start = time.monotonic()
+        with self._cond:
+            while True:
+                now = time.monotonic()
+                if now < self._paused_until:
+                    self._cond.wait(self._paused_until - now)
+                    continue
+                if self.rate_per_s <= 0:
+                    break
+                self._refill(now)
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    break
+                self._cond.wait((1 - self._tokens) / self.rate_per_s)
+
+            waited = time.monotonic() - start
+            self.acquired += 1
+            if waited > 0.001:
+                self.waits += 1
+                self.wait_seconds += waited
+            return waited
+
+    def penalize(self, seconds: float) -> None:
+        """Pausa a todos los workers durante seconds (p. ej. por un 429 con Retry-After)."""
+        with self._cond:
+            self.penalties += 1
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+            self._tokens = 0.0
+            self._updated = time.monotonic()
+            self._cond.notify_all()
+
+    def stats(self) -> dict:
+        with self._cond:
+            now = time.monotonic()
+            if self.rate_per_s > 0:
+                self._refill(now)
+            return {
+                'tokens': round(self._tokens, 2),
+                'paused_s': round(max(0.0, self._paused_until - now), 1),
+                'acquired': self.acquired,
+                'waits': self.waits,
+                'wait_s': round(self.wait_seconds, 1),
+                'penalties': self.penalties
+            }
+
+
+class CircuitBreaker:
+    """Circuit breaker de tres estados (cerrado, abierto, semiabierto).
+
+    Tras failure_threshold fallos consecutivos el circuito se abre y todas las
+    llamadas fallan al instante. Pasado reset_timeout se deja pasar una sola
+    llamada de prueba: si funciona se cierra, si falla se vuelve a abrir.
+
+    Args:
+        failure_threshold: Fallos consecutivos que abren el circuito
+        reset_timeout: Segundos que el circuito permanece abierto
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, failure_threshold: int, reset_timeout: float):
+        self.failure_threshold = max(1, failure_threshold)
+        self.reset_timeout = reset_timeout
+        self._state = self.CLOSED
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self._consecutive_failures = 0
+        self._lock = threading.Lock()
+        self.successes = 0
+        self.failures = 0
+        self.rejected = 0
+        self.opens = 0
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._current_state()
+
+    def _current_state(self) -> str:
+        if self._state == self.OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+            self._state = self.HALF_OPEN
+            self._probe_in_flight = False
+        return self._state
+
+    def allow(self) -> bool:
+        """True si la llamada puede salir; False si debe fallar rápido."""
+        with self._lock:
+            state = self._current_state()
+            if state == self.CLOSED:
+                return True
+            if state == self.HALF_OPEN and not self._probe_in_flight:
+                self._probe_in_flight = True
+                return True
+            self.rejected += 1
+            return False
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.successes += 1
+            self._consecutive_failures = 0
+            self._state = self.CLOSED
+            self._probe_in_flight = False
+
+    def release(self) -> None:
+        """Libera la llamada de prueba sin contarla (error local, no del servicio)."""
+        with self._lock:
+            self._probe_in_flight = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.failures += 1
+            self._consecutive_failures += 1
+            state = self._current_state()
+            if state == self.HALF_OPEN or self._consecutive_failures >= self.failure_threshold:
+                if state != self.OPEN:
+                    self.opens += 1
+                self._state = self.OPEN
+                self._opened_at = time.monotonic()
+                self._probe_in_flight = False
+
+    def stats(self) -> dict:
+        with self._lock:
+            state = self._current_state()
+            retry_in = 0.0
+            if state == self.OPEN:
+                retry_in = max(0.0, self.reset_timeout - (time.monotonic() - self._opened_at))
+            return {
+                'state': state,
+                'consecutive_failures': self._consecutive_failures,
+                'successes': self.successes,
+                'failures': self.failures,
+                'rejected': self.rejected,
+                'opens': self.opens,
+                'retry_in_s': round(retry_in, 1)
+            }
+
+
+class MultipartFileStream:
+    """Cuerpo multipart/form-data de un único archivo que se lee desde disco por bloques.
+
+    requests lo envía en streaming con Content-Length conocido, así que la
+    memoria usada no depende del tamaño del archivo.
+
+    Args:
+        fileobj: Archivo abierto en modo binario
+        field: Nombre del campo del formulario
+        filename: Nombre del archivo en el formulario
+        content_type: Tipo MIME del archivo
+        chunk_bytes: Tamaño de bloque de lectura
+    """
+
+    def __init__(self, fileobj: BinaryIO, field: str, filename: str, content_type: str,
+                 chunk_bytes: int = STREAM_CHUNK_BYTES):
+        self.boundary = uuid.uuid4().hex
+        self.content_type = f"multipart/form-data; boundary={self.boundary}"
+        self._head = (
+            f"--{self.boundary}\r\n"
+            f'Content-Disposition: form-data; name="{field}"; filename="{filename}"\r\n'
+            f"Content-Type: {content_type}\r\n\r\n"
+        ).encode('utf-8')
+        self._tail = f"\r\n--{self.boundary}--\r\n".encode('utf-8')
+        self._file = fileobj
+        self._file_start = fileobj.tell()
+        self._file_size = os.fstat(fileobj.fileno()).st_size - self._file_start
+        self._chunk_bytes = chunk_bytes
+        self._parts = None
+        self.bytes_read = 0
+        self.rewind()
+
+    def rewind(self) -> None:
+        """Vuelve al inicio del cuerpo (para reintentos)."""
+        self._file.seek(self._file_start)
+        self._parts = [self._head, self._file, self._tail]
+        self.bytes_read = 0
+
+    def __len__(self) -> int:
+        return len(self._head) + self._file_size + len(self._tail)
+
+    def read(self, size: int = -1) -> bytes:
+        if size is None or size < 0:
+            size = len(self)
+        out = b''
+        while self._parts and len(out) < size:
+            part = self._parts[0]
+            if isinstance(part, bytes):
+                take = part[:size - len(out)]
+                out += take
+                rest = part[len(take):]
+                if rest:
+                    self._parts[0] = rest
+                else:
+                    self._parts.pop(0)
+            else:
+                block = part.read(size - len(out))
+                if block:
+                    out += block
+                else:
+                    self._parts.pop(0)
+        self.bytes_read += len(out)
+        return out
+
+    def __iter__(self) -> Iterator[bytes]:
+        while True:
+            block = self.read(self._chunk_bytes)
+            if not block:
+                return
+            yield block
+
+
+def resolve_upload_codec(codec: Optional[str] = None) -> str:
+    """Códec de subida efectivo: "wav" si el pedido no existe o no hay ffmpeg en el PATH."""
+    codec = (codec or ISOLATION_UPLOAD_CODEC).lower()
+    if codec not in UPLOAD_CODECS or shutil.which('ffmpeg') is None:
+        return 'wav'
+    return codec
+
+
+def upload_codec_signature(codec: Optional[str] = None) -> Optional[str]:
+    """Parte de la clave de caché que aporta el códec (None si es sin pérdida: no cambia el resultado)."""
+    codec = resolve_upload_codec(codec)
+    if codec == 'wav' or UPLOAD_CODECS[codec]['lossless']:
+        return None
+    return f"{codec}:{ISOLATION_UPLOAD_BITRATE}"
+
+
+class EncodedMultipartStream:
+    """Cuerpo multipart/form-data cuyo archivo se codifica con ffmpeg mientras se sube.
+
+    La salida de ffmpeg va directo al socket por bloques (transfer-encoding
+    chunked, porque el tamaño final no se conoce de antemano): no hay archivo
+    comprimido intermedio y la codificación se solapa con la subida.
+
+    Args:
+        audio_file: WAV a codificar
+        codec: Clave de UPLOAD_CODECS
+        field: Nombre del campo del formulario
+        chunk_bytes: Tamaño de bloque de lectura
+    """
+
+    def __init__(self, audio_file: str, codec: str, field: str, chunk_bytes: int = STREAM_CHUNK_BYTES):
+        spec = UPLOAD_CODECS[codec]
+        self.codec = codec
+        self.boundary = uuid.uuid4().hex
+        self.content_type = f"multipart/form-data; boundary={self.boundary}"
+        filename = f"{os.path.splitext(os.path.basename(audio_file))[0]}.{spec['ext']}"
+        self._head = (
+            f"--{self.boundary}\r\n"
+            f'Content-Disposition: form-data; name="{field}"; filename="{filename}"\r\n'
+            f"Content-Type: {spec['mime']}\r\n\r\n"
+        ).encode('utf-8')
+        self._tail = f"\r\n--{self.boundary}--\r\n".encode('utf-8')
+        self._chunk_bytes = chunk_bytes
+        self._cmd = ['ffmpeg', '-v', 'error', '-i', audio_file] + \
+            [arg.format(bitrate=ISOLATION_UPLOAD_BITRATE) for arg in spec['args']] + ['pipe:1']
+        self._process = None
+        self._stderr = None
+        self.bytes_sent = 0
+
+    def __iter__(self) -> Iterator[bytes]:
+        self._stderr = tempfile.TemporaryFile()
+        self._process = subprocess.Popen(self._cmd, stdout=subprocess.PIPE, stderr=self._stderr)
+        yield self._emit(self._head)
+        while True:
+            block = self._process.stdout.read(self._chunk_bytes)
+            if not block:
+                break
+            yield self._emit(block)
+        if self._process.wait() != 0:
+            self._stderr.seek(0)
+            error = self._stderr.read().decode('utf-8', 'ignore').strip()
+            raise RuntimeError(f"ffmpeg no pudo codificar el audio a {self.codec}: {error}")
+        yield self._emit(self._tail)
+
+    def _emit(self, block: bytes) -> bytes:
+        self.bytes_sent += len(block)
+        return block
+
+    def close(self) -> None:
+        """Detiene ffmpeg si la subida se cortó a mitad."""
+        if self._process is not None:
+            if self._process.poll() is None:
+                self._process.kill()
+                self._process.wait()
+            self._process.stdout.close()
+        if self._stderr is not None:
+            self._stderr.close()
+
+
+class IsolationClient:
+    """Sesión HTTP con pool de conexiones keep-alive compartida entre workers.
+
+    Todas las llamadas pasan por el mismo token bucket y circuit breaker, así
+    que el límite de rate y el estado del servicio se coordinan entre los
+    workers del lote.
+
+    Args:
+        pool_size: Conexiones persistentes por host
+        chunk_bytes: Tamaño de bloque para subir y descargar
+        timeout: Timeout (conexión, lectura) en segundos
+        bucket: Token bucket compartido (por defecto según ISOLATION_RATE_PER_MIN)
+        breaker: Circuit breaker compartido (por defecto según ISOLATION_BREAKER_*)
+    """
+
+    def __init__(self, pool_size: int = HTTP_POOL_SIZE, chunk_bytes: int = STREAM_CHUNK_BYTES,
+                 timeout=HTTP_TIMEOUT, bucket: Optional[TokenBucket] = None,
+                 breaker: Optional[CircuitBreaker] = None):
+        self.chunk_bytes = chunk_bytes
+        self.timeout = timeout
+        self.bucket = bucket or TokenBucket(ISOLATION_RATE_PER_MIN / 60.0, ISOLATION_BURST)
+        self.breaker = breaker or CircuitBreaker(ISOLATION_BREAKER_THRESHOLD, ISOLATION_BREAKER_RESET_S)
+        self.session = requests.Session()
+        # Los reintentos los decide quien llama, no urllib3
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_size, max_retries=0)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+    def post_audio(
+        self,
+        url: str,
+        headers: dict,
+        audio_file: str,
+        dest_file: str,
+        field: str = 'audio',
+        content_type: str = 'audio/wav',
+        open_sink: Optional[Callable[[], Any]] = None,
+        codec: Optional[str] = None
+    ) -> dict:
+        """Sube un archivo de audio y guarda la respuesta en dest_file por bloques.
+
+        Args:
+            url: Endpoint del servicio
+            headers: Headers adicionales (p. ej. la API key)
+            audio_file: Archivo a subir
+            dest_file: Ruta donde escribir el cuerpo de una respuesta 200
+            field: Nombre del campo multipart
+            content_type: Tipo MIME del archivo subido
+            open_sink: Fábrica opcional de un destino con write(), close() y
+                abort() que recibe el cuerpo de una respuesta 200 en lugar de
+                dest_file (p. ej. un transcodificador por pipe); lo que
+                retorne close() queda en 'sink'
+            codec: Códec de subida (ver UPLOAD_CODECS); None o "wav" sube el
+                archivo tal cual
+
+        Returns:
+            Dict con 'status_code', 'bytes_sent', 'bytes_received', 'text'
+            (cuerpo de la respuesta solo si no es 200), 'retry_after'
+            (segundos pedidos por el servicio en un 429) y 'sink'
+
+        Raises:
+            CircuitOpenError si el circuit breaker está abierto
+            requests.exceptions.ConnectionError / Timeout si la red falla
+        """
+        if not self.breaker.allow():
+            raise CircuitOpenError("Servicio de Audio Isolation no disponible (circuito abierto)")
+        self.bucket.acquire()
+
+        try:
+            with span('http.isolation', file_name=os.path.basename(audio_file), codec=codec or 'wav') as s:
+                result = self._send(url, headers, audio_file, dest_file, field, content_type, open_sink, codec)
+                s.set(bytes_in=result['bytes_sent'], bytes_out=result['bytes_received'],
+                      status_code=result['status_code'],
+                      outcome='ok' if result['status_code'] == 200 else f"http_{result['status_code']}")
+        except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
+            self.breaker.record_failure()
+            raise
+        except Exception:
+            self.breaker.release()
+            raise
+
+        status = result['status_code']
+        if status == 429:
+            # No es una caída del servicio: todos los workers esperan lo que pide.
+            # Tampoco prueba que esté sano: solo se libera la llamada de prueba
+            result['retry_after'] = parse_retry_after(result['headers'].get('Retry-After'), default=5.0)
+            self.bucket.penalize(result['retry_after'])
+            self.breaker.release()
+        elif status >= 500:
+            self.breaker.record_failure()
+        else:
+            self.breaker.record_success()
+        del result['headers']
+        return result
+
+    def _send(self, url: str, headers: dict, audio_file: str, dest_file: str, field: str,
+              content_type: str, open_sink: Optional[Callable[[], Any]] = None,
+              codec: Optional[str] = None) -> dict:
+        body, closer = self._open_body(audio_file, field, content_type, codec)
+        try:
+            request_headers = dict(headers)
+            request_headers['Content-Type'] = body.content_type
+
+            with self.session.post(url, headers=request_headers, data=body,
+                                   timeout=self.timeout, stream=True) as response:
+                result = {
+                    'status_code': response.status_code,
+                    'bytes_sent': body.bytes_sent if isinstance(body, EncodedMultipartStream) else len(body),
+                    'bytes_received': 0,
+                    'text': None,
+                    'retry_after': None,
+                    'sink': None,
+                    'headers': response.headers
+                }
+                if response.status_code != 200:
+                    result['text'] = response.text
+                    return result
+
+                if open_sink is not None:
+                    sink = open_sink()
+                    try:
+                        for block in response.iter_content(chunk_size=self.chunk_bytes):
+                            sink.write(block)
+                            result['bytes_received'] += len(block)
+                    except BaseException:
+                        sink.abort()
+                        raise
+                    result['sink'] = sink.close()
+                    return result
+
+                tmp = f"{dest_file}.{uuid.uuid4().hex[:8]}.part"
+                try:
+                    with open(tmp, 'wb') as out:
+                        for block in response.iter_content(chunk_size=self.chunk_bytes):
+                            out.write(block)
+                            result['bytes_received'] += len(block)
+                    os.replace(tmp, dest_file)
+                finally:
+                    if os.path.exists(tmp):
+                        os.unlink(tmp)
+                return result
+        finally:
+            closer()
+
+    def _open_body(self, audio_file: str, field: str, content_type: str,
+                   codec: Optional[str]) -> Tuple[Any, Callable[[], None]]:
+        """Cuerpo del request (archivo tal cual o codificado al vuelo) y cómo liberarlo."""
+        if codec in UPLOAD_CODECS:
+            body = EncodedMultipartStream(audio_file, codec, field, self.chunk_bytes)
+            return body, body.close
+        f = open(audio_file, 'rb')
+        return MultipartFileStream(f, field, os.path.basename(audio_file), content_type, self.chunk_bytes), f.close
+
+    def stats(self) -> dict:
+        """Estado del circuit breaker y del token bucket."""
+        return {'breaker': self.breaker.stats(), 'bucket': self.bucket.stats()}
+
+    def close(self) -> None:
+        self.session.close()
+
+
+_client: Optional[IsolationClient] = None
+_client_lock = threading.Lock()
+
+
+def get_isolation_client() -> IsolationClient:
+    """Retorna el cliente compartido del proceso."""
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = IsolationClient()
+        return _client
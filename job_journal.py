@@ -0,0 +1,399 @@
+"""
+Diario de trabajos de AudioPro v1.7
+Registra en SQLite el estado de cada archivo por etapa (extract, isolate,
+render, mux) con la ruta, el tamaño y el checksum del archivo que produjo.
+Si el lote se interrumpe (rerun de Streamlit, navegador desconectado,
+timeout de Reaper) y se vuelve a lanzar, cada archivo retoma desde la
+última etapa cuyo resultado sigue intacto en disco.
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+# Base de datos del diario (AUDIOPRO_JOURNAL_ENABLED=0 lo deshabilita)
+JOURNAL_ENABLED = os.getenv("AUDIOPRO_JOURNAL_ENABLED", "1") == "1"
+JOURNAL_PATH = os.getenv(
+    "AUDIOPRO_JOURNAL_PATH",
+    os.path.join(os.path.expanduser("~"), ".audiopro", "journal.sqlite3")
+)
+
+# Verificar los archivos intermedios con SHA-256 al retomar (0 = solo tamaño y mtime)
+JOURNAL_CHECKSUMS = os.getenv("AUDIOPRO_JOURNAL_CHECKSUMS", "1") == "1"
+
+# Días que se conservan los trabajos terminados
+JOURNAL_RETENTION_DAYS = int(os.getenv("AUDIOPRO_JOURNAL_RETENTION_DAYS", "30"))
+
+# Claves del estado que no se guardan: objetos vivos o rutas que cambian entre ejecuciones
+_VOLATILE_KEYS = ('source', 'tmp_input', 'journal_key', 'journal_plan')
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    job_key    TEXT PRIMARY KEY,
+    name       TEXT NOT NULL,
+    source     TEXT NOT NULL,
+    batch_id   TEXT,
+    status     TEXT NOT NULL,
+    stage      TEXT,
+    error      TEXT,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS stages (
+    job_key     TEXT NOT NULL,
+    stage       TEXT NOT NULL,
+    position    INTEGER NOT NULL,
+    status      TEXT NOT NULL,
+    state       TEXT,
+    artifact    TEXT,
+    size        INTEGER,
+    mtime_ns    INTEGER,
+    checksum    TEXT,
+    started_at  REAL NOT NULL,
+    finished_at REAL,
+    error       TEXT,
+    PRIMARY KEY (job_key, stage)
+);
+CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, updated_at);
+"""
+
+
+def file_checksum(path: str) -> str:
+    """SHA-256 de un archivo leído por bloques."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _snapshot(state: dict) -> str:
+    """Estado del trabajo como JSON, sin objetos vivos ni valores no serializables."""
+    clean = {}
+    for key, value in state.items():
+        if key in _VOLATILE_KEYS:
+            continue
+        try:
+            json.dumps(value)
+        except (TypeError, ValueError):
+            continue
+        clean[key] = value
+    return json.dumps(clean, ensure_ascii=False)
+
+
+class JobJournal:
+    """Diario persistente de trabajos y etapas.
+
+    Cada archivo se identifica por la huella de su fuente (MediaSource.fingerprint)
+    más la configuración que afecta al resultado, así que el mismo archivo
+    con otro backend de render cuenta como un trabajo distinto. Las escrituras
+    se confirman en cada cambio de etapa (modo WAL): un corte del proceso
+    pierde como mucho la etapa en curso.
+
+    Args:
+        path: Archivo SQLite
+        checksums: Guardar y verificar el SHA-256 de cada archivo producido
+        retention_days: Días que se conservan los trabajos terminados
+    """
+
+    def __init__(self, path: str, checksums: bool = True, retention_days: int = 30):
+        self.path = path
+        self.checksums = checksums
+        self.retention_days = retention_days
+        self.resumed = 0
+        self.stages_skipped = 0
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._db = sqlite3.connect(path, timeout=30, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(_SCHEMA)
+        self.prune()
+
+    def _execute(self, sql: str, params=()) -> List[tuple]:
+        with self._lock:
+            return self._db.execute(sql, params).fetchall()
+
+    @staticmethod
+    def job_key(fingerprint: str, config: str) -> str:
+        """Clave de un trabajo a partir de la huella de la fuente y la configuración."""
+        return hashlib.sha256(f"{fingerprint}|{config}".encode('utf-8')).hexdigest()[:32]
+
+    def open_job(self, job_key: str, name: str, source: str, batch_id: Optional[str],
+                 stages: List[str]) -> Optional[dict]:
+        """Registra el trabajo y calcula desde dónde retomarlo.
+
+        Busca la última etapa terminada cuyo archivo sigue intacto y cuyas
+        etapas anteriores también terminaron; los registros posteriores a
+        ella se descartan porque se van a rehacer.
+
+        Args:
+            job_key: Clave del trabajo (job_key)
+            name: Nombre del archivo
+            source: Huella de la fuente (solo informativa)
+            batch_id: Lote que lo procesa ahora
+            stages: Nombres de las etapas en orden
+
+        Returns:
+            None si hay que empezar desde cero, o dict con 'stage', 'position'
+            y 'state' (estado guardado al terminar esa etapa)
+        """
+        now = time.time()
+        with self._lock:
+            self._db.execute(
+                "INSERT INTO jobs (job_key, name, source, batch_id, status, created_at, updated_at) "
+                "VALUES (?, ?, ?, ?, 'running', ?, ?) "
+                "ON CONFLICT(job_key) DO UPDATE SET batch_id = excluded.batch_id, "
+                "status = 'running', error = NULL, updated_at = excluded.updated_at",
+                (job_key, name, source, batch_id, now, now)
+            )
+            rows = self._db.execute(
+                "SELECT stage, position, state, artifact, size, mtime_ns, checksum FROM stages "
+                "WHERE job_key = ? AND status = 'done'",
+                (job_key,)
+            ).fetchall()
+
+        done = {row[0]: row for row in rows}
+        # Solo vale una cadena continua desde la primera etapa
+        chain = []
+        for position, stage in enumerate(stages):
+            if stage not in done or done[stage][1] != position:
+                break
+            chain.append(done[stage])
+
+        plan = None
+        for row in reversed(chain):
+            stage, position, state, artifact, size, mtime_ns, checksum = row
+            if self._artifact_intact(artifact, size, mtime_ns, checksum):
+                plan = {'stage': stage, 'position': position, 'state': json.loads(state or '{}')}
+                break
+
+        keep = plan['position'] if plan else -1
+        self._execute("DELETE FROM stages WHERE job_key = ? AND position > ?", (job_key, keep))
+        if plan:
+            if plan['position'] == len(stages) - 1:
+                # Ya estaba terminado: no queda nada por correr
+                self._execute("UPDATE jobs SET status = 'done', stage = ? WHERE job_key = ?", (plan['stage'], job_key))
+            with self._lock:
+                self.resumed += 1
+                self.stages_skipped += plan['position'] + 1
+        return plan
+
+    def _artifact_intact(self, path: Optional[str], size: Optional[int], mtime_ns: Optional[int],
+                         checksum: Optional[str]) -> bool:
+        """True si el archivo registrado existe y no cambió desde que se produjo."""
+        if not path:
+            return False
+        try:
+            st = os.stat(path)
+        except OSError:
+            return False
+        if st.st_size != size:
+            return False
+        if checksum and self.checksums:
+            try:
+                return file_checksum(path) == checksum
+            except OSError:
+                return False
+        return st.st_mtime_ns == mtime_ns
+
+    def stage_started(self, job_key: str, stage: str, position: int) -> None:
+        """Marca una etapa como en curso (queda así si el proceso se corta)."""
+        now = time.time()
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO stages (job_key, stage, position, status, started_at) "
+                "VALUES (?, ?, ?, 'running', ?)",
+                (job_key, stage, position, now)
+            )
+            self._db.execute(
+                "UPDATE jobs SET stage = ?, status = 'running', updated_at = ? WHERE job_key = ?",
+                (stage, now, job_key)
+            )
+
+    def stage_done(self, job_key: str, stage: str, state: dict, artifact: Optional[str],
+                   final: bool = False) -> None:
+        """Registra el resultado de una etapa con su archivo producido.
+
+        Args:
+            job_key: Clave del trabajo
+            stage: Etapa terminada
+            state: Estado del trabajo tras la etapa (se guarda sin objetos vivos)
+            artifact: Ruta del archivo que produjo la etapa
+            final: True en la última etapa (el trabajo queda terminado)
+        """
+        size = mtime_ns = checksum = None
+        if artifact and os.path.exists(artifact):
+            st = os.stat(artifact)
+            size, mtime_ns = st.st_size, st.st_mtime_ns
+            if self.checksums:
+                checksum = file_checksum(artifact)
+        now = time.time()
+        with self._lock:
+            self._db.execute(
+                "UPDATE stages SET status = 'done', state = ?, artifact = ?, size = ?, mtime_ns = ?, "
+                "checksum = ?, finished_at = ? WHERE job_key = ? AND stage = ?",
+                (_snapshot(state), artifact, size, mtime_ns, checksum, now, job_key, stage)
+            )
+            self._db.execute(
+                "UPDATE jobs SET stage = ?, status = ?, updated_at = ? WHERE job_key = ?",
+                (stage, 'done' if final else 'running', now, job_key)
+            )
+
+    def stage_failed(self, job_key: str, stage: str, error: BaseException) -> None:
+        """Registra la falla de una etapa; las anteriores siguen sirviendo para retomar."""
+        now = time.time()
+        message = f"{type(error).__name__}: {error}"
+        with self._lock:
+            self._db.execute(
+                "UPDATE stages SET status = 'error', error = ?, finished_at = ? WHERE job_key = ? AND stage = ?",
+                (message, now, job_key, stage)
+            )
+            self._db.execute(
+                "UPDATE jobs SET stage = ?, status = 'error', error = ?, updated_at = ? WHERE job_key = ?",
+                (stage, message, now, job_key)
+            )
+
+    def jobs(self, status: Optional[str] = None, batch_id: Optional[str] = None, limit: int = 200) -> List[Dict]:
+        """Trabajos registrados, los más recientes primero.
+
+        Un trabajo en estado 'running' que no pertenece al lote en curso quedó
+        interrumpido: al volver a lanzarlo retoma desde su última etapa.
+        """
+        sql = "SELECT job_key, name, batch_id, status, stage, error, updated_at FROM jobs"
+        clauses, params = [], []
+        if status:
+            clauses.append("status = ?")
+            params.append(status)
+        if batch_id:
+            clauses.append("batch_id = ?")
+            params.append(batch_id)
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        sql += " ORDER BY updated_at DESC LIMIT ?"
+        params.append(limit)
+        keys = ('job_key', 'name', 'batch_id', 'status', 'stage', 'error', 'updated_at')
+        return [dict(zip(keys, row)) for row in self._execute(sql, params)]
+
+    def prune(self) -> int:
+        """Elimina los trabajos terminados más antiguos que retention_days."""
+        if self.retention_days <= 0:
+            return 0
+        cutoff = time.time() - self.retention_days * 86400
+        with self._lock:
+            old = [row[0] for row in self._db.execute(
+                "SELECT job_key FROM jobs WHERE status = 'done' AND updated_at < ?", (cutoff,)
+            ).fetchall()]
+            for job_key in old:
+                self._db.execute("DELETE FROM stages WHERE job_key = ?", (job_key,))
+                self._db.execute("DELETE FROM jobs WHERE job_key = ?", (job_key,))
+        return len(old)
+
+    def clear(self) -> None:
+        """Olvida todos los trabajos (el próximo lote empieza desde cero)."""
+        with self._lock:
+            self._db.execute("DELETE FROM stages")
+            self._db.execute("DELETE FROM jobs")
+
+    def stats(self) -> dict:
+        """Trabajos por estado y etapas omitidas al retomar en este proceso."""
+        counts = dict(self._execute("SELECT status, COUNT(*) FROM jobs GROUP BY status"))
+        with self._lock:
+            return {
+                'done': counts.get('done', 0),
+                'running': counts.get('running', 0),
+                'error': counts.get('error', 0),
+                'resumed': self.resumed,
+                'stages_skipped': self.stages_skipped
+            }
+
+
+_journal: Optional[JobJournal] = None
+_journal_lock = threading.Lock()
+
+
+def get_job_journal() -> Optional[JobJournal]:
+    """Diario compartido del proceso (sobrevive a los reruns de Streamlit), o None si está deshabilitado."""
+    global _journal
+    if not JOURNAL_ENABLED:
+        return None
+    with _journal_lock:
+        if _journal is None:
+            _journal = JobJournal(JOURNAL_PATH, JOURNAL_CHECKSUMS, JOURNAL_RETENTION_DAYS)
+        return _journal
+
+
+def journaled_stages(stages: list, artifacts: Dict[str, str], config: Callable[[dict], str]) -> list:
+    """Envuelve las etapas del pipeline para registrarlas en el diario y retomarlas.
+
+    La primera etapa abre el trabajo en el diario (open_job) y guarda el plan
+    de reanudación en el propio estado; cada etapa hasta la de reanudación
+    se omite y esa restaura el estado guardado (sin la ruta local de la
+    fuente: las etapas que la necesiten deben volver a pedirla). Las demás
+    corren normalmente y registran su resultado. Sin diario, o si la fuente
+    no tiene huella estable, las etapas corren sin cambios.
+
+    Args:
+        stages: Lista de (nombre, función) en orden
+        artifacts: Etapa -> clave del estado con la ruta que produce
+        config: Función trabajo -> texto con la configuración que afecta al resultado
+
+    Returns:
+        Lista de (nombre, función) con las etapas envueltas
+    """
+    names = [name for name, _ in stages]
+    last = len(stages) - 1
+
+    def _wrap(position: int, name: str, fn):
+        def _stage(job: dict) -> dict:
+            journal = get_job_journal()
+            if journal is None:
+                return fn(job)
+
+            if position == 0 and 'journal_key' not in job:
+                source = job.get('source')
+                fingerprint = source.fingerprint() if source is not None else None
+                if fingerprint is None:
+                    job['journal_key'] = None
+                else:
+                    job['journal_key'] = journal.job_key(fingerprint, config(job))
+                    job['journal_plan'] = journal.open_job(
+                        job['journal_key'], job.get('name') or source.name, fingerprint,
+                        job.get('batch_id'), names
+                    )
+
+            key = job.get('journal_key')
+            if not key:
+                return fn(job)
+
+            plan = job.get('journal_plan')
+            if plan and position <= plan['position']:
+                if position < plan['position']:
+                    return job
+                restored = dict(plan['state'], resumed_from=name)
+                if position == last:
+                    return restored
+                for volatile in ('source', 'source_dir', 'batch_id', 'journal_key'):
+                    restored[volatile] = job.get(volatile)
+                return restored
+
+            journal.stage_started(key, name, position)
+            try:
+                result = fn(job)
+            except BaseException as e:
+                journal.stage_failed(key, name, e)
+                raise
+            journal.stage_done(key, name, result, result.get(artifacts.get(name)), final=position == last)
+            if position < last:
+                result['journal_key'] = key
+            return result
+
+        _stage.__name__ = getattr(fn, '__name__', name)
+        _stage.__doc__ = fn.__doc__
+        return _stage
+
+    return [(name, _wrap(position, name, fn)) for position, (name, fn) in enumerate(stages)]
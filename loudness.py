@@ -0,0 +1,298 @@
+"""
+Medición y normalización de loudness (EBU R128 / ITU-R BS.1770-4) para AudioPro v1.7
+
+Loudness integrado (con gating absoluto y relativo), rango de loudness
+(LRA, EBU Tech 3342) y true peak (sobremuestreo 4x) en una sola pasada
+por bloques: el PCM se lee por memmap (o por pipe de ffmpeg) con el mismo
+lector que dsp_render, el filtro K usa sus Biquad vectorizados y los
+bloques de 400 ms / 3 s se acumulan en histogramas de tamaño fijo, así que
+la memoria no crece con la duración del archivo.
+"""
+
+import math
+import os
+import time
+import uuid
+from typing import Dict, Optional
+
+import numpy as np
+
+from dsp_render import CHUNK_FRAMES, SAMPLE_RATE, Biquad, _iter_input, _to_pcm_bytes
+from wav_io import WAVE_FORMAT_PCM, parse_wav_header, wav_header_bytes
+
+# Objetivo de normalización en LUFS ("" = solo medir; p. ej. -16 para cursos online, -23 para broadcast)
+LOUDNESS_TARGET = os.getenv("LOUDNESS_TARGET", "")
+# Medir el render aunque no se normalice (las métricas quedan en el resultado de cada archivo)
+LOUDNESS_MEASURE = os.getenv("LOUDNESS_MEASURE", "1") == "1"
+# Techo de true peak al normalizar: la ganancia se recorta para no superarlo
+LOUDNESS_TRUE_PEAK_LIMIT = float(os.getenv("LOUDNESS_TRUE_PEAK_LIMIT", "-1.0"))
+
+# Filtro K a 48 kHz (BS.1770-4, tablas 1 y 2): pre-filtro shelving + pasa-altos RLB
+K_WEIGHTING = (
+    (np.array([1.53512485958697, -2.69169618940638, 1.19839281085285]),
+     np.array([1.0, -1.69065929318241, 0.73248077421585])),
+    (np.array([1.0, -2.0, 1.0]),
+     np.array([1.0, -1.99004745483398, 0.99007225036621])),
+)
+
+# Bloques: 100 ms de salto, momentáneo 400 ms, corto plazo 3 s (el LRA usa todos, como ffmpeg ebur128)
+SEGMENT_FRAMES = SAMPLE_RATE // 10
+MOMENTARY_SEGMENTS = 4
+SHORT_TERM_SEGMENTS = 30
+
+ABSOLUTE_GATE_LUFS = -70.0
+RELATIVE_GATE_LU = -10.0
+LRA_RELATIVE_GATE_LU = -20.0
+
+# Histogramas de loudness por bloque: 0.01 LU entre -70 y +10 LUFS
+_HIST_MIN = ABSOLUTE_GATE_LUFS
+_HIST_STEP = 0.01
+_HIST_BINS = int((10.0 - _HIST_MIN) / _HIST_STEP)
+
+# Interpolador de true peak: FIR de 48 coeficientes en 4 fases de 12 (BS.1770-4, anexo 2)
+TRUE_PEAK_OVERSAMPLING = 4
+TRUE_PEAK_TAPS = 48
+
+
+def _loudness(energy):
+    """Loudness en LUFS de una energía media (canal mono, G = 1)."""
+    return -0.691 + 10.0 * np.log10(np.maximum(energy, 1e-20))
+
+
+def _true_peak_phases() -> np.ndarray:
+    """Fases del interpolador 4x (windowed sinc), forma (4, 12), invertidas para correlar."""
+    # Centro en un coeficiente entero: la fase 0 reproduce las muestras y las otras caen en 1/4, 1/2, 3/4
+    n = np.arange(TRUE_PEAK_TAPS) - TRUE_PEAK_TAPS // 2
+    taps = np.sinc(n / TRUE_PEAK_OVERSAMPLING) * np.kaiser(TRUE_PEAK_TAPS + 1, 8.0)[:TRUE_PEAK_TAPS]
+    phases = taps.reshape(-1, TRUE_PEAK_OVERSAMPLING).T
+    # Ganancia unitaria en continua por fase e invertidas para usarlas como correlación
+    phases = phases / phases.sum(axis=1, keepdims=True)
+    return np.ascontiguousarray(phases[:, ::-1])
+
+
+class _GatedHistogram:
+    """Conteo y energía acumulada de bloques por franja de 0.01 LU (memoria constante)."""
+
+    def __init__(self):
+        self.counts = np.zeros(_HIST_BINS, dtype=np.int64)
+        self.energy = np.zeros(_HIST_BINS)
+
+    def add(self, energies: np.ndarray) -> None:
+        if not len(energies):
+            return
+        levels = _loudness(energies)
+        keep = levels > ABSOLUTE_GATE_LUFS
+        index = np.clip(((levels[keep] - _HIST_MIN) / _HIST_STEP).astype(np.int64), 0, _HIST_BINS - 1)
+        np.add.at(self.counts, index, 1)
+        np.add.at(self.energy, index, energies[keep])
+
+    def _levels(self) -> np.ndarray:
+        return _HIST_MIN + (np.arange(_HIST_BINS) + 0.5) * _HIST_STEP
+
+    def gate(self, relative_lu: float) -> np.ndarray:
+        """Máscara de franjas que superan el gate relativo (el absoluto ya se aplicó al agregar)."""
+        total = self.counts.sum()
+        if not total:
+            return np.zeros(_HIST_BINS, dtype=bool)
+        threshold = float(_loudness(self.energy.sum() / total)) + relative_lu
+        return self._levels() >= threshold
+
+    def integrated(self) -> Optional[float]:
+        mask = self.gate(RELATIVE_GATE_LU)
+        count = self.counts[mask].sum()
+        if not count:
+            return None
+        return float(_loudness(self.energy[mask].sum() / count))
+
+    def loudness_range(self) -> Optional[float]:
+        mask = self.gate(LRA_RELATIVE_GATE_LU)
+        counts = np.where(mask, self.counts, 0)
+        total = counts.sum()
+        if not total:
+            return None
+        cumulative = np.cumsum(counts)
+        levels = self._levels()
+        low = levels[np.searchsorted(cumulative, 0.10 * total, side='left')]
+        high = levels[np.searchsorted(cumulative, 0.95 * total, side='left')]
+        return float(high - low)
+
+
+class LoudnessMeter:
+    """Medidor BS.1770-4 con estado: se alimenta con bloques mono float a 48 kHz.
+
+    Args:
+        true_peak: Calcular true peak (sobremuestreo 4x); si es False solo sample peak
+    """
+
+    def __init__(self, true_peak: bool = True):
+        self.filters = [Biquad(b, a) for b, a in K_WEIGHTING]
+        self.frames = 0
+        self._partial = np.zeros(0)
+        # Energías de los últimos 29 segmentos de 100 ms (ventanas que cruzan bloques)
+        self._recent = np.zeros(0)
+        self._segments = 0
+        self.blocks = _GatedHistogram()
+        self.short_term = _GatedHistogram()
+        self.max_momentary = -math.inf
+        self.max_short_term = -math.inf
+        self.sample_peak = 0.0
+        self.true_peak = 0.0 if true_peak else None
+        if true_peak:
+            self._phases = _true_peak_phases().astype(np.float32)
+            self._history = np.zeros(self._phases.shape[1] - 1, dtype=np.float32)
+
+    def process(self, x: np.ndarray) -> None:
+        """Agrega un bloque de muestras (cualquier largo)."""
+        if not len(x):
+            return
+        self.frames += len(x)
+        self.sample_peak = max(self.sample_peak, float(np.max(np.abs(x))))
+        if self.true_peak is not None:
+            # Vista (12, n) de filas contiguas: las 4 fases salen de un solo producto en float32
+            extended = np.concatenate((self._history, x.astype(np.float32)))
+            taps = self._phases.shape[1]
+            shifted = np.lib.stride_tricks.sliding_window_view(extended, len(extended) - taps + 1)
+            self.true_peak = max(self.true_peak, float(np.max(np.abs(self._phases @ shifted))))
+            self._history = extended[-(taps - 1):]
+
+        y = x
+        for biquad in self.filters:
+            y = biquad.process(y)
+        y = np.concatenate((self._partial, y))
+        whole = len(y) // SEGMENT_FRAMES
+        self._partial = y[whole * SEGMENT_FRAMES:]
+        if not whole:
+            return
+        segments = np.mean(y[:whole * SEGMENT_FRAMES].reshape(whole, SEGMENT_FRAMES) ** 2, axis=1)
+        self._add_segments(segments)
+
+    def _add_segments(self, segments: np.ndarray) -> None:
+        """Arma los bloques de 400 ms y 3 s que terminan en cada segmento nuevo."""
+        series = np.concatenate((self._recent, segments))
+        sums = np.concatenate(([0.0], np.cumsum(series)))
+        ends = np.arange(len(self._recent), len(series)) + 1  # fin (exclusivo) de cada segmento nuevo
+
+        # Momentáneo / bloques de gating: 400 ms, salto de 100 ms
+        momentary_ends = ends[ends >= MOMENTARY_SEGMENTS]
+        momentary = (sums[momentary_ends] - sums[momentary_ends - MOMENTARY_SEGMENTS]) / MOMENTARY_SEGMENTS
+        self.blocks.add(momentary)
+        if len(momentary):
+            self.max_momentary = max(self.max_momentary, float(_loudness(momentary.max())))
+
+        # Corto plazo: 3 s
+        short_ends = ends[ends >= SHORT_TERM_SEGMENTS]
+        short = (sums[short_ends] - sums[short_ends - SHORT_TERM_SEGMENTS]) / SHORT_TERM_SEGMENTS
+        if len(short):
+            self.max_short_term = max(self.max_short_term, float(_loudness(short.max())))
+            self.short_term.add(short)
+
+        self._segments += len(segments)
+        self._recent = series[-(SHORT_TERM_SEGMENTS - 1):]
+
+    def result(self) -> Dict[str, Optional[float]]:
+        """Métricas acumuladas hasta ahora."""
+        def _db(value):
+            return round(20.0 * math.log10(value), 2) if value else None
+
+        integrated = self.blocks.integrated()
+        lra = self.short_term.loudness_range()
+        return {
+            'integrated_lufs': round(integrated, 2) if integrated is not None else None,
+            'lra_lu': round(lra, 2) if lra is not None else None,
+            'true_peak_dbtp': _db(max(self.true_peak, self.sample_peak)) if self.true_peak is not None else None,
+            'sample_peak_dbfs': _db(self.sample_peak),
+            'max_momentary_lufs': round(self.max_momentary, 2) if self.max_momentary > -math.inf else None,
+            'max_short_term_lufs': round(self.max_short_term, 2) if self.max_short_term > -math.inf else None,
+            'duration_s': round(self.frames / SAMPLE_RATE, 3)
+        }
+
+
+def measure_loudness(path: str, true_peak: bool = True, chunk_frames: int = CHUNK_FRAMES) -> Dict[str, float]:
+    """Mide loudness integrado, LRA y true peak de un archivo en una pasada.
+
+    Args:
+        path: Audio (los WAV PCM 16 y 24-bit 48 kHz se leen por memmap; el resto con ffmpeg)
+        true_peak: Calcular true peak además del sample peak
+        chunk_frames: Frames por bloque
+
+    Returns:
+        Dict de LoudnessMeter.result más elapsed_s y realtime_factor
+    """
+    start = time.perf_counter()
+    meter = LoudnessMeter(true_peak=true_peak)
+    for block in _iter_input(path, chunk_frames):
+        meter.process(block)
+    result = meter.result()
+    elapsed = time.perf_counter() - start
+    result['elapsed_s'] = round(elapsed, 3)
+    result['realtime_factor'] = round(result['duration_s'] / elapsed, 1) if elapsed > 0 else 0.0
+    return result
+
+
+def normalization_gain(measured: Dict[str, float], target_lufs: float,
+                       true_peak_limit: float = LOUDNESS_TRUE_PEAK_LIMIT) -> float:
+    """Ganancia en dB para llevar el loudness integrado a target_lufs sin pasar el techo de true peak."""
+    if measured.get('integrated_lufs') is None:
+        return 0.0
+    gain = target_lufs - measured['integrated_lufs']
+    peak = measured.get('true_peak_dbtp') or measured.get('sample_peak_dbfs')
+    if peak is not None:
+        gain = min(gain, true_peak_limit - peak)
+    return round(gain, 2)
+
+
+def normalize_file(input_path: str, output_path: str, target_lufs: float,
+                   true_peak_limit: float = LOUDNESS_TRUE_PEAK_LIMIT,
+                   chunk_frames: int = CHUNK_FRAMES) -> Dict[str, float]:
+    """Mide y aplica ganancia lineal para llegar a target_lufs (dos pasadas por bloques).
+
+    La ganancia se recorta para que el true peak no pase true_peak_limit (sin
+    limitador: el resultado puede quedar por debajo del objetivo). La salida
+    es un WAV mono 48 kHz con la misma profundidad que la entrada (16 o 24
+    bits; 24 para otros formatos), escrito en .part y renombrado al final.
+
+    Args:
+        input_path: Audio a normalizar
+        output_path: WAV normalizado
+        target_lufs: Loudness integrado objetivo
+        true_peak_limit: Techo de true peak en dBTP
+        chunk_frames: Frames por bloque
+
+    Returns:
+        Dict con 'measured' (antes), 'gain_db', 'output' (medición de la salida)
+        y elapsed_s / realtime_factor del proceso completo
+    """
+    start = time.perf_counter()
+    measured = measure_loudness(input_path, chunk_frames=chunk_frames)
+    gain_db = normalization_gain(measured, target_lufs, true_peak_limit)
+    gain = 10.0 ** (gain_db / 20.0)
+
+    info = parse_wav_header(input_path)
+    bits = info['bits_per_sample'] if info and info['format_tag'] == WAVE_FORMAT_PCM \
+        and info['bits_per_sample'] in (16, 24) else 24
+
+    meter = LoudnessMeter()
+    part_path = f"{output_path}.{uuid.uuid4().hex[:8]}.part"
+    frames = 0
+    with open(part_path, 'wb') as out:
+        out.write(wav_header_bytes(SAMPLE_RATE, 1, bits, 0))
+        for block in _iter_input(input_path, chunk_frames):
+            scaled = block * gain
+            # La salida se mide tal como queda escrita (cuantizada) en la misma pasada
+            meter.process(np.clip(scaled, -1.0, 1.0 - 1.0 / 2 ** (bits - 1)))
+            out.write(_to_pcm_bytes(scaled, bits))
+            frames += len(block)
+        out.seek(0)
+        out.write(wav_header_bytes(SAMPLE_RATE, 1, bits, frames * (bits // 8)))
+    os.replace(part_path, output_path)
+
+    elapsed = time.perf_counter() - start
+    duration = frames / SAMPLE_RATE
+    return {
+        'measured': measured,
+        'gain_db': gain_db,
+        'target_lufs': target_lufs,
+        'output': meter.result(),
+        'elapsed_s': round(elapsed, 3),
+        'realtime_factor': round(duration / elapsed, 1) if elapsed > 0 else 0.0
+    }
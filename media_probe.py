@@ -0,0 +1,287 @@
+"""
+Inspección de medios con ffprobe para AudioPro v1.7
+Una sola llamada a ffprobe por archivo, con caché LRU por (ruta, tamaño, mtime)
+"""
+
+import json
+import os
+import subprocess
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+from telemetry import span
+
+# Entradas en la caché de resultados (las menos usadas se descartan primero)
+PROBE_CACHE_SIZE = int(os.getenv("PROBE_CACHE_SIZE", "512"))
+
+# ffprobe concurrentes al validar un lote
+PROBE_WORKERS = int(os.getenv("PROBE_WORKERS", "8"))
+
+# Segundos máximos por llamada a ffprobe
+PROBE_TIMEOUT = float(os.getenv("PROBE_TIMEOUT", "60"))
+
+
+class ProbeError(Exception):
+    """El archivo no existe, ffprobe no pudo leerlo o no tiene audio utilizable."""
+
+
+@dataclass(frozen=True)
+class StreamInfo:
+    """Un stream del contenedor tal como lo reporta ffprobe."""
+    index: int
+    codec_type: str
+    codec_name: Optional[str] = None
+    sample_rate: Optional[int] = None
+    channels: Optional[int] = None
+    duration: Optional[float] = None
+    width: Optional[int] = None
+    height: Optional[int] = None
+    attached_pic: bool = False
+
+
+@dataclass(frozen=True)
+class MediaInfo:
+    """Resultado estructurado de ffprobe para un archivo."""
+    path: str
+    size: int
+    mtime_ns: int
+    format_name: Optional[str]
+    duration: Optional[float]
+    bit_rate: Optional[int]
+    streams: Tuple[StreamInfo, ...] = field(default_factory=tuple)
+
+    @property
+    def audio_streams(self) -> List[StreamInfo]:
+        return [s for s in self.streams if s.codec_type == 'audio']
+
+    @property
+    def video_streams(self) -> List[StreamInfo]:
+        # Las carátulas de mp3/m4a aparecen como video pero no lo son
+        return [s for s in self.streams if s.codec_type == 'video' and not s.attached_pic]
+
+    @property
+    def has_audio(self) -> bool:
+        return bool(self.audio_streams)
+
+    @property
+    def has_video(self) -> bool:
+        return bool(self.video_streams)
+
+    @property
+    def is_audio_only(self) -> bool:
+        return self.has_audio and not self.has_video
+
+    @property
+    def audio(self) -> Optional[StreamInfo]:
+        """Primer stream de audio (el que usa la extracción)."""
+        streams = self.audio_streams
+        return streams[0] if streams else None
+
+    @property
+    def sample_rate(self) -> Optional[int]:
+        return self.audio.sample_rate if self.audio else None
+
+    @property
+    def channels(self) -> Optional[int]:
+        return self.audio.channels if self.audio else None
+
+    @property
+    def audio_codec(self) -> Optional[str]:
+        return self.audio.codec_name if self.audio else None
+
+
+def _to_int(value) -> Optional[int]:
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _to_float(value) -> Optional[float]:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _run_ffprobe(path: str) -> dict:
+    cmd = [
+        'ffprobe', '-v', 'error', '-print_format', 'json',
+        '-show_format', '-show_streams', path
+    ]
+    try:
+        result = subprocess.run(cmd, capture_output=True, text=True, timeout=PROBE_TIMEOUT)
+    except FileNotFoundError:
+        raise ProbeError("ffprobe no está instalado")
+    except subprocess.TimeoutExpired:
+        raise ProbeError(f"ffprobe excedió {PROBE_TIMEOUT:.0f}s con {os.path.basename(path)}")
+    if result.returncode != 0:
+        raise ProbeError(result.stderr.strip() or f"ffprobe falló con código {result.returncode}")
+    try:
+        return json.loads(result.stdout or '{}')
+    except json.JSONDecodeError as e:
+        raise ProbeError(f"Salida de ffprobe inválida: {e}")
+
+
+def _parse_probe(path: str, size: int, mtime_ns: int, data: dict) -> MediaInfo:
+    fmt = data.get('format', {})
+    streams = tuple(
+        StreamInfo(
+            index=_to_int(s.get('index')) or 0,
+            codec_type=s.get('codec_type', 'unknown'),
+            codec_name=s.get('codec_name'),
+            sample_rate=_to_int(s.get('sample_rate')),
+            channels=_to_int(s.get('channels')),
+            duration=_to_float(s.get('duration')),
+            width=_to_int(s.get('width')),
+            height=_to_int(s.get('height')),
+            attached_pic=bool(s.get('disposition', {}).get('attached_pic'))
+        )
+        for s in data.get('streams', [])
+    )
+    duration = _to_float(fmt.get('duration'))
+    if duration is None:
+        known = [s.duration for s in streams if s.duration]
+        duration = max(known) if known else None
+    return MediaInfo(
+        path=path,
+        size=size,
+        mtime_ns=mtime_ns,
+        format_name=fmt.get('format_name'),
+        duration=duration,
+        bit_rate=_to_int(fmt.get('bit_rate')),
+        streams=streams
+    )
+
+
+class ProbeCache:
+    """Caché LRU de resultados de ffprobe, segura entre hilos.
+
+    La clave incluye tamaño y mtime, así que un archivo reemplazado en la
+    misma ruta se vuelve a inspeccionar. Si varios hilos piden el mismo
+    archivo a la vez, ffprobe corre una sola vez y el resto espera su
+    resultado.
+
+    Args:
+        max_entries: Resultados a conservar antes de descartar los menos usados
+    """
+
+    def __init__(self, max_entries: int = PROBE_CACHE_SIZE):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Tuple[str, int, int], MediaInfo]" = OrderedDict()
+        self._in_flight: Dict[Tuple[str, int, int], threading.Event] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def probe(self, path: str) -> MediaInfo:
+        """Retorna la información del archivo, desde caché si no cambió.
+
+        Raises:
+            ProbeError si el archivo no existe o ffprobe no puede leerlo
+        """
+        path = os.path.abspath(path)
+        try:
+            st = os.stat(path)
+        except OSError:
+            raise ProbeError(f"Archivo no encontrado: {path}")
+        key = (path, st.st_size, st.st_mtime_ns)
+
+        while True:
+            with self._lock:
+                info = self._entries.get(key)
+                if info is not None:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return info
+                pending = self._in_flight.get(key)
+                if pending is None:
+                    self._in_flight[key] = threading.Event()
+                    self.misses += 1
+                    break
+            # Otro hilo está corriendo ffprobe para este mismo archivo
+            pending.wait()
+            with self._lock:
+                if key not in self._entries and key not in self._in_flight:
+                    # Falló en el otro hilo: este lo intenta por su cuenta
+                    self._in_flight[key] = threading.Event()
+                    self.misses += 1
+                    break
+
+        try:
+            with span('ffprobe', bytes_in=st.st_size, file_name=os.path.basename(path)):
+                info = _parse_probe(path, st.st_size, st.st_mtime_ns, _run_ffprobe(path))
+            with self._lock:
+                self._entries[key] = info
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+                    self.evictions += 1
+            return info
+        finally:
+            with self._lock:
+                self._in_flight.pop(key).set()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / total, 3) if total else 0.0,
+                'evictions': self.evictions
+            }
+
+
+_cache = ProbeCache()
+
+
+def get_probe_cache() -> ProbeCache:
+    """Caché compartida por todo el proceso."""
+    return _cache
+
+
+def probe_media(path: str) -> MediaInfo:
+    """Inspecciona un archivo con ffprobe (una vez por versión del archivo)."""
+    return _cache.probe(path)
+
+
+def validate_media(info: MediaInfo) -> Optional[str]:
+    """Motivo por el que el pipeline no puede procesar el archivo, o None si es válido."""
+    if not info.has_audio:
+        return "no tiene stream de audio"
+    if info.duration is not None and info.duration <= 0:
+        return "duración 0"
+    return None
+
+
+def probe_many(paths: List[str], max_workers: int = PROBE_WORKERS) -> List[Tuple[Optional[MediaInfo], Optional[str]]]:
+    """Inspecciona y valida varios archivos en paralelo.
+
+    Args:
+        paths: Rutas a inspeccionar
+        max_workers: ffprobe simultáneos
+
+    Returns:
+        Lista en el orden de entrada de (MediaInfo o None, motivo de rechazo o None)
+    """
+    def _check(path: str):
+        try:
+            info = probe_media(path)
+        except ProbeError as e:
+            return None, str(e)
+        return info, validate_media(info)
+
+    if not paths:
+        return []
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(paths))),
+                            thread_name_prefix="audiopro-probe") as pool:
+        return list(pool.map(_check, paths))
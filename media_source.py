@@ -0,0 +1,226 @@
+"""
+Fuentes de medios para AudioPro v1.7
+Representa cada archivo de entrada por referencia en lugar de cargarlo en memoria
+"""
+
+import hashlib
+import io
+import os
+import shutil
+import tempfile
+import threading
+from concurrent.futures import Executor, Future
+from typing import BinaryIO, Optional
+
+# Directorio de trabajo para copias temporales (subidas y descargas)
+SCRATCH_DIR = os.getenv("AUDIOPRO_SCRATCH_DIR", tempfile.gettempdir())
+
+# Tamaño de bloque para copiar flujos a disco sin cargarlos completos
+COPY_CHUNK_BYTES = 1024 * 1024
+
+
+class MediaSource:
+    """Archivo de entrada que se materializa en disco solo cuando se necesita.
+
+    El pipeline recibe la fuente por referencia y llama a local_path() en la
+    etapa de extracción. Las fuentes que ya viven en disco (NAS/ruta local)
+    retornan su propia ruta sin copiar nada; las demás escriben una copia en
+    SCRATCH_DIR que cleanup() elimina al final.
+    """
+
+    # False si local_path() implica una descarga (no conviene hacerlo antes de tiempo)
+    local_is_cheap = True
+
+    def __init__(self, name: str, source_dir: Optional[str] = None):
+        self.name = name
+        self.source_dir = source_dir
+        self._path: Optional[str] = None
+        self._owns_path = False
+        self._lock = threading.Lock()
+
+    def local_path(self) -> str:
+        """Retorna una ruta en disco legible por ffmpeg, materializándola si hace falta."""
+        with self._lock:
+            if self._path is None:
+                self._path, self._owns_path = self._materialize()
+            return self._path
+
+    def _materialize(self):
+        """Retorna (ruta, es_temporal). Las subclases deben implementarlo."""
+        raise NotImplementedError
+
+    def fingerprint(self) -> Optional[str]:
+        """Identidad estable del contenido entre ejecuciones (diario de trabajos), o None."""
+        return None
+
+    def cleanup(self) -> None:
+        """Elimina la copia temporal si la fuente la creó. Nunca borra originales."""
+        with self._lock:
+            if self._path and self._owns_path:
+                try:
+                    os.unlink(self._path)
+                except Exception:
+                    pass
+            if self._owns_path:
+                self._path = None
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({self.name!r})"
+
+
+def _ensure_scratch_dir() -> str:
+    """Crea SCRATCH_DIR si no existe y lo retorna."""
+    os.makedirs(SCRATCH_DIR, exist_ok=True)
+    return SCRATCH_DIR
+
+
+def _scratch_file(name: str) -> str:
+    """Crea un archivo vacío en SCRATCH_DIR conservando la extensión de name."""
+    fd, path = tempfile.mkstemp(prefix="audiopro_", suffix=os.path.splitext(name)[1], dir=_ensure_scratch_dir())
+    os.close(fd)
+    return path
+
+
+class LocalPathSource(MediaSource):
+    """Archivo en NAS o disco local: ffmpeg lo lee directamente, sin copias."""
+
+    def __init__(self, path: str):
+        super().__init__(os.path.basename(path), os.path.dirname(path))
+        self.path = path
+
+    def _materialize(self):
+        return self.path, False
+
+    def fingerprint(self) -> Optional[str]:
+        # Ruta + tamaño + mtime: un archivo editado o reemplazado cuenta como otro
+        st = os.stat(self.path)
+        return f"file:{os.path.abspath(self.path)}:{st.st_size}:{st.st_mtime_ns}"
+
+
+class UploadSource(MediaSource):
+    """Archivo subido por el navegador (o cualquier objeto con read/seek).
+
+    Se guarda una referencia al objeto subido y se vuelca a disco por
+    bloques en la etapa de extracción, sin duplicarlo en la lista del lote.
+    """
+
+    def __init__(self, fileobj: BinaryIO, name: Optional[str] = None):
+        super().__init__(name or getattr(fileobj, 'name', 'upload'))
+        self.fileobj = fileobj
+
+    def _materialize(self):
+        path = _scratch_file(self.name)
+        self.fileobj.seek(0)
+        with open(path, 'wb') as f:
+            shutil.copyfileobj(self.fileobj, f, COPY_CHUNK_BYTES)
+        return path, True
+
+    def fingerprint(self) -> Optional[str]:
+        # Una subida no tiene ruta estable: se identifica por su contenido
+        digest = hashlib.sha256()
+        self.fileobj.seek(0)
+        for block in iter(lambda: self.fileobj.read(COPY_CHUNK_BYTES), b''):
+            digest.update(block)
+        self.fileobj.seek(0)
+        return f"upload:{self.name}:{digest.hexdigest()}"
+
+
+class BytesSource(UploadSource):
+    """Bytes ya cargados en memoria (compatibilidad con llamadas antiguas)."""
+
+    def __init__(self, data: bytes, name: str, source_dir: Optional[str] = None):
+        super().__init__(io.BytesIO(data), name)
+        self.source_dir = source_dir
+
+
+class DriveSource(MediaSource):
+    """Archivo de Google Drive que se descarga en streaming al usarse.
+
+    La descarga la hace el pool compartido de drive_ingest: puede empezar
+    antes con start_download (prefetch del lote) o, si no, en la etapa de
+    extracción. Si Drive informa la versión del archivo, la descarga queda
+    en la caché de Drive y se lee desde ahí sin copiarla. El nombre real
+    solo se conoce con los metadatos o después de la descarga; hasta
+    entonces name es el ID de Drive.
+    """
+
+    local_is_cheap = False
+
+    def __init__(self, file_id: str):
+        super().__init__(file_id)
+        self.file_id = file_id
+        self.metadata: Optional[dict] = None
+        self._metadata_loaded = False
+        self._metadata_lock = threading.Lock()
+        self._future: Optional[Future] = None
+
+    def load_metadata(self) -> Optional[dict]:
+        """Nombre, tamaño y versión según Drive (se consultan una sola vez)."""
+        with self._metadata_lock:
+            if not self._metadata_loaded:
+                from drive_ingest import drive_metadata
+
+                self.metadata = drive_metadata(self.file_id)
+                self._metadata_loaded = True
+                if self.metadata and self.metadata.get('name') and self._path is None:
+                    self.name = self.metadata['name']
+            return self.metadata
+
+    def start_download(self, executor: Executor) -> int:
+        """Encola la descarga en executor si todavía no empezó. Retorna 1 si la encoló."""
+        if not self._lock.acquire(blocking=False):
+            # Ya se está materializando en otro hilo
+            return 0
+        try:
+            if self._future is not None or self._path is not None:
+                return 0
+            self._future = executor.submit(self._download)
+            return 1
+        finally:
+            self._lock.release()
+
+    def _download(self):
+        from drive_ingest import get_drive_downloader
+
+        path, owns_path = get_drive_downloader().fetch(self.file_id, self.load_metadata(), SCRATCH_DIR)
+        self.name = os.path.basename(path)
+        return path, owns_path
+
+    def _materialize(self):
+        if self._future is not None:
+            return self._future.result()
+        return self._download()
+
+    def fingerprint(self) -> Optional[str]:
+        # Sin versión conocida no hay forma de saber si el archivo cambió en Drive
+        version = (self.load_metadata() or {}).get('version')
+        return f"drive:{self.file_id}:{version}" if version else None
+
+    def cleanup(self) -> None:
+        with self._lock:
+            path, owned = self._path, self._owns_path
+            # Descarga del prefetch que nunca se usó (links recargados, archivo descartado)
+            pending = self._future if path is None else None
+            self._future = None
+        super().cleanup()
+        if pending is not None:
+            # Si sigue descargando, se libera al terminar
+            pending.add_done_callback(_release_prefetched)
+        elif path:
+            _release_download(path, owned)
+
+
+def _release_download(path: str, owned: bool) -> None:
+    """Borra el directorio temporal de una descarga o suelta su entrada en la caché de Drive."""
+    if owned:
+        shutil.rmtree(os.path.dirname(path), ignore_errors=True)
+    else:
+        from drive_ingest import get_drive_downloader
+
+        get_drive_downloader().cache.release(path)
+
+
+def _release_prefetched(future: Future) -> None:
+    if future.cancelled() or future.exception() is not None:
+        return
+    _release_download(*future.result())
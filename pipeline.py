@@ -0,0 +1,994 @@
+"""
+Pipeline de AudioPro v1.7 - Extracción → ElevenLabs → Reaper → Loudness → Mux
+Lógica de procesamiento compartida por la app de Streamlit (app.py) y la
+línea de comandos (cli.py); no importa Streamlit (los mensajes pasan por ui_bridge)
+"""
+
+import os
+import tempfile
+import subprocess
+import shutil
+import threading
+import uuid
+from datetime import datetime
+from typing import Callable, Optional, Tuple, Union
+from audio_utils import (
+    extract_audio_wav16_mono,
+    run_ffmpeg,
+    is_audio_only_file,
+    process_audio_with_elevenlabs,
+    get_elevenlabs_config,
+    new_io_report,
+    ELEVEN_DIR,
+)
+from media_source import SCRATCH_DIR, BytesSource, MediaSource
+from render_watch import RenderFailedError, RenderTimeoutError, sentinel_path, wait_for_render
+from reaper_worker import ReaperJobTimeoutError, ReaperWorkerError, get_reaper_worker_host
+from dsp_render import DSP_WORKERS, get_render_pool, render_in_pool
+from loudness import LOUDNESS_MEASURE, LOUDNESS_TARGET, LOUDNESS_TRUE_PEAK_LIMIT, measure_loudness, normalize_file
+from deliverables import DELIVERABLES, deliverable_paths, deliverables_command, parse_deliverables
+from job_journal import journaled_stages
+from media_probe import ProbeError, probe_many, probe_media, validate_media
+from pipeline_engine import Stage, StagedPipeline, parse_stage_workers
+from reaper_batch import REAPER_BATCH_GAP_S, REAPER_BATCH_SIZE, get_render_batcher
+from rpp_project import RppError, build_region_session, build_render_session, template_version, write_project
+from telemetry import file_size, span, traced_stage
+from ui_bridge import session_flag, st
+from wav_io import parse_wav_header
+
+##############################
+# Configuración / Parámetros #
+##############################
+PIPELINE_VERSION = "v1.7.0"
+
+# Rutas de Reaper
+REAPER_EXE = os.getenv("AUDIOPRO_REAPER_EXE", r"C:\Program Files\REAPER (x64)\reaper.exe")
+REAPER_TEMPLATE = os.getenv("AUDIOPRO_REAPER_TEMPLATE", r"F:\00\00 Reaper\00 Voces.rpp")
+REAPER_SESSIONS_DIR = os.getenv("AUDIOPRO_SESSIONS_DIR", r"F:\00\00 Reaper\Procesados")
+# Salida de los archivos sin carpeta de origen (subidas y Google Drive); los locales van a <carpeta>/procesados
+OUTPUT_DIR = os.getenv("AUDIOPRO_OUTPUT_DIR", REAPER_SESSIONS_DIR)
+
+# Extensiones que acepta el pipeline (subida en la app y búsqueda en directorios del CLI)
+MEDIA_EXTENSIONS = ('mp3', 'mp4', 'wav', 'avi', 'mov', 'mkv', 'm4a', 'flac')
+
+# Límite de archivos
+MAX_FILE_MB = int(os.getenv("MAX_FILE_MB", "800"))
+MAX_WORKERS = int(os.getenv("MAX_WORKERS", "2"))
+
+# Backend de render: "reaper" (template 00 Voces.rpp) o "numpy" (dsp_render.py,
+# sin Reaper ni GUI, reparte los renders entre núcleos)
+RENDER_BACKEND = os.getenv("RENDER_BACKEND", "reaper")
+
+# Workers por etapa del pipeline (p. ej. "extract=2,isolate=4,render=1,loudness=2,mux=2")
+STAGE_WORKERS = parse_stage_workers(
+    os.getenv("STAGE_WORKERS", ""),
+    # Con lotes de Reaper, cada hilo de render espera en un lote: tantos como archivos por lote
+    {'extract': 2, 'isolate': MAX_WORKERS, 'render': DSP_WORKERS if RENDER_BACKEND == "numpy" else REAPER_BATCH_SIZE,
+     'loudness': 2, 'mux': 2}
+)
+STAGE_QUEUE_SIZE = int(os.getenv("STAGE_QUEUE_SIZE", "2"))
+
+# Entregables de la etapa final (deliverables.py); un nombre desconocido falla al arrancar
+DELIVERABLE_NAMES = parse_deliverables(DELIVERABLES)
+
+# Espera del render: tiempo máximo y si se exige el testigo .done del script Lua
+RENDER_TIMEOUT = int(os.getenv("RENDER_TIMEOUT", "600"))
+RENDER_REQUIRE_SENTINEL = os.getenv("RENDER_REQUIRE_SENTINEL", "1") == "1"
+
+# Modo de Reaper: "worker" (una instancia persistente atiende una cola de
+# trabajos) o "launch" (un reaper.exe por archivo, comportamiento anterior)
+REAPER_MODE = os.getenv("REAPER_MODE", "worker")
+
+# Armado de la sesión: "native" (rpp_project.py escribe el .rpp listo para
+# renderizar y Reaper solo renderiza) o "lua" (add_audio_to_session.lua abre
+# el template, inserta el audio y configura el render dentro de Reaper)
+REAPER_SESSION_BUILDER = os.getenv("REAPER_SESSION_BUILDER", "native")
+PREPARED_SESSION_SCRIPT = "render_prepared_session.lua"
+
+# Reaper se lanza de a un proceso a la vez aunque el lote corra en paralelo
+_REAPER_LAUNCH_LOCK = threading.Lock()
+
+
+#########################
+# Funciones de Reaper #
+#########################
+
+
+def create_reaper_session_from_template(
+    template_path: str,
+    session_name: str,
+    audio_file: str,
+    output_dir: str
+) -> str:
+    """Crea una nueva sesión de Reaper a partir del template.
+
+    Args:
+        template_path: Ruta al template .rpp
+        session_name: Nombre para la nueva sesión
+        audio_file: Ruta al archivo de audio a procesar
+        output_dir: Directorio donde guardar la sesión
+
+    Returns:
+        Ruta al archivo .rpp de la nueva sesión
+    """
+    # Crear directorio de sesión
+    session_dir = os.path.join(output_dir, session_name)
+    os.makedirs(session_dir, exist_ok=True)
+
+    # Leer template
+    with open(template_path, 'r', encoding='utf-8', errors='ignore') as f:
+        template_content = f.read()
+
+    # Modificar template para la nueva sesión
+    # Actualizar RENDER_FILE path
+    new_render_path = os.path.join(session_dir, session_name)
+    template_content = template_content.replace(
+        'RENDER_FILE "F:\\CURSOS\\2025\\Q2\\2505_php\\Prueba Reaper"',
+        f'RENDER_FILE "{new_render_path}"'
+    )
+
+    # Guardar nueva sesión
+    new_session_path = os.path.join(session_dir, f"{session_name}.rpp")
+    with open(new_session_path, 'w', encoding='utf-8') as f:
+        f.write(template_content)
+
+    return new_session_path
+
+
+def test_reaper_script():
+    """Función de prueba para verificar que Reaper funciona correctamente."""
+    lua_script = os.path.join(os.path.dirname(__file__), "test_reaper.lua")
+    
+    if not os.path.exists(lua_script):
+        st.error("❌ Script de prueba no encontrado")
+        return
+
+    # Ejecutar script de prueba
+    cmd = [
+        REAPER_EXE,
+        '-nosplash',
+        lua_script,
+        "test_audio.wav",
+        "F:\\00\\00 Reaper\\test_session.rpp"
+    ]
+
+    try:
+        result = subprocess.run(cmd, capture_output=True, text=True, timeout=60)
+        st.info(f"Resultado: {result.returncode}")
+        st.info(f"Salida: {result.stdout}")
+        if result.stderr:
+            st.error(f"Error: {result.stderr}")
+    except Exception as e:
+        st.error(f"❌ Error ejecutando prueba: {e}")
+
+
+def _session_audio(audio_file: str) -> Tuple[str, float]:
+    """(ruta permanente, duración en segundos) del audio que va en una sesión.
+
+    Como add_audio_to_session.lua, el audio se copia a Eleven si no está ahí:
+    la sesión queda apuntando a una copia que no se borra con los temporales.
+    """
+    eleven_dir = os.path.abspath(ELEVEN_DIR)
+    if os.path.dirname(os.path.abspath(audio_file)) != eleven_dir:
+        os.makedirs(eleven_dir, exist_ok=True)
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        audio_copy = os.path.join(eleven_dir, f"audio_{timestamp}_{os.urandom(4).hex()}.wav")
+        shutil.copyfile(audio_file, audio_copy)
+        audio_file = audio_copy
+
+    info = parse_wav_header(audio_file)
+    if info and info['block_align'] and info['sample_rate']:
+        length = info['data_size'] / info['block_align'] / info['sample_rate']
+    else:
+        length = get_audio_duration(audio_file)
+    return audio_file, length
+
+
+def build_reaper_session(session_path: str, audio_file: str, render_file: str) -> str:
+    """Escribe la sesión lista para renderizar sin abrir Reaper (rpp_project.py).
+
+    El audio va en la pista "Clase" desde 0, con la selección de tiempo y el
+    render ya configurados.
+
+    Args:
+        session_path: Ruta del .rpp a escribir
+        audio_file: WAV a insertar
+        render_file: WAV que debe producir el render
+
+    Returns:
+        Ruta de la sesión
+
+    Raises:
+        RppError si el template no se puede leer o no tiene la pista "Clase"
+        ProbeError si no se puede determinar la duración del audio
+    """
+    audio_file, length = _session_audio(audio_file)
+    project = build_render_session(REAPER_TEMPLATE, audio_file, length, render_file)
+    return write_project(project, session_path)
+
+
+def add_audio_to_reaper_session(session_path: str, audio_file: str, original_name: str = None,
+                                script_name: str = "add_audio_to_session.lua", render_file: str = "",
+                                render_files: Optional[list] = None):
+    """Agrega un archivo de audio a una sesión de Reaper usando ReaScript Lua.
+
+    Args:
+        session_path: Ruta al archivo .rpp de la sesión
+        audio_file: Ruta al archivo de audio a agregar
+        original_name: Nombre original del archivo (sin extensión)
+        script_name: Script que se ejecuta (render_prepared_session.lua si la sesión ya está armada)
+        render_file: WAV que debe producir el render (lo usa render_prepared_session.lua)
+        render_files: Todos los WAV que produce el render, en un lote por regiones
+    """
+    # Usar el script Lua estático
+    lua_script = os.path.abspath(os.path.join(os.path.dirname(__file__), script_name))
+    if not os.path.exists(lua_script):
+        st.error(f"❌ Script Lua no encontrado: {script_name}")
+        return
+
+    # Crear script temporal que establece ExtState y ejecuta el script principal
+    # Según documentación: usar SetExtState para pasar parámetros
+    temp_script = tempfile.NamedTemporaryFile(
+        mode='w',
+        suffix='.lua',
+        delete=False,
+        encoding='utf-8'
+    )
+
+    # Convertir rutas a formato compatible con Lua (usar / en lugar de \)
+    lua_script_path = lua_script.replace('\\', '/')
+    audio_file_path = audio_file.replace('\\', '/')
+    session_path_path = session_path.replace('\\', '/')
+    template_path = REAPER_TEMPLATE.replace('\\', '/')
+    render_file_path = render_file.replace('\\', '/')
+    render_files_path = '|'.join(path.replace('\\', '/') for path in render_files or [])
+    
+    # Usar el nombre original proporcionado o fallback al nombre del audio_file
+    if not original_name:
+        original_name = os.path.splitext(os.path.basename(audio_file))[0]
+
+    temp_script.write(f"""
+-- Script temporal para pasar parámetros usando ExtState
+-- Según documentación de ReaScript: https://www.reaper.fm/sdk/reascript/reascript.php
+
+-- Establecer parámetros usando ExtState
+reaper.SetExtState("AudioPro", "audio_file", [[{audio_file_path}]], false)
+reaper.SetExtState("AudioPro", "session_name", [[{session_path_path}]], false)
+reaper.SetExtState("AudioPro", "template_path", [[{template_path}]], false)
+reaper.SetExtState("AudioPro", "original_name", [[{original_name}]], false)
+reaper.SetExtState("AudioPro", "render_file", [[{render_file_path}]], false)
+reaper.SetExtState("AudioPro", "render_files", [[{render_files_path}]], false)
+
+-- Ejecutar el script principal
+dofile([[{lua_script_path}]])
+
+-- Limpiar ExtState
+reaper.DeleteExtState("AudioPro", "audio_file", false)
+reaper.DeleteExtState("AudioPro", "session_name", false)
+reaper.DeleteExtState("AudioPro", "template_path", false)
+reaper.DeleteExtState("AudioPro", "original_name", false)
+reaper.DeleteExtState("AudioPro", "render_file", false)
+reaper.DeleteExtState("AudioPro", "render_files", false)
+""")
+    temp_script.close()
+
+    # Ejecutar ReaScript según documentación
+    cmd = [
+        REAPER_EXE,
+        '-nosplash',
+        temp_script.name
+    ]
+
+    try:
+        with _REAPER_LAUNCH_LOCK:
+            # Ejecutar Reaper en background para que permanezca abierto
+            process = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+
+            # Esperar un poco para que Reaper inicie y ejecute el script
+            import time
+            time.sleep(5)  # Esperar 5 segundos para que el script se ejecute
+
+        # Verificar si el proceso sigue corriendo
+        if process.poll() is None:
+            st.success("✅ Audio agregado a sesión de Reaper - Reaper permanecerá abierto")
+        else:
+            # Si terminó, verificar el código de salida
+            stdout, stderr = process.communicate()
+            if process.returncode != 0:
+                st.error(f"❌ Error ejecutando ReaScript: {stderr}")
+            else:
+                st.success("✅ Audio agregado a sesión de Reaper")
+    except Exception as e:
+        st.error(f"❌ Error ejecutando ReaScript: {e}")
+    finally:
+        # Limpiar archivo temporal
+        try:
+            os.unlink(temp_script.name)
+        except Exception:
+            pass
+
+
+def render_with_reaper_worker(session_path: str, audio_file: str, original_name: str, render_file: str,
+                              job_script: Optional[str] = None, render_files: Optional[list] = None) -> str:
+    """Envía el trabajo al worker persistente de Reaper y espera su render.
+
+    Args:
+        session_path: Ruta al archivo .rpp de la sesión
+        audio_file: Ruta al archivo de audio a agregar
+        original_name: Nombre original del archivo (sin extensión)
+        render_file: Ruta donde add_audio_to_session.lua escribe el render
+        job_script: Script del trabajo si no es el del worker (p. ej. render_prepared_session.lua)
+        render_files: Todos los WAV que produce el render, en un lote por regiones
+            (el plazo de espera se multiplica por la cantidad)
+
+    Returns:
+        Ruta del WAV renderizado
+
+    Raises:
+        ReaperWorkerError si el worker no está disponible o el trabajo falla
+    """
+    lua_script = os.path.abspath(os.path.join(os.path.dirname(__file__), "add_audio_to_session.lua"))
+    host = get_reaper_worker_host(REAPER_EXE, lua_script)
+    host.ensure_running(on_status=lambda msg: st.info(f"🚀 {msg}"))
+
+    job = {
+        'audio_file': audio_file.replace('\\', '/'),
+        'session_name': session_path.replace('\\', '/'),
+        'template_path': REAPER_TEMPLATE.replace('\\', '/'),
+        'original_name': original_name,
+        'render_file': render_file.replace('\\', '/')
+    }
+    if job_script:
+        job['job_script'] = job_script.replace('\\', '/')
+    if render_files:
+        job['render_files'] = '|'.join(path.replace('\\', '/') for path in render_files)
+    job_id = host.submit(job)
+    timeout = RENDER_TIMEOUT * len(render_files or [render_file])
+    st.info(f"📨 Trabajo {job_id} en cola del worker de Reaper")
+
+    def _on_progress(elapsed, state):
+        st.info(f"⏳ Trabajo en Reaper: {state} ({elapsed:.0f}s / {timeout}s)")
+
+    with span('reaper.job', bytes_in=file_size(audio_file), job_id=job_id) as s:
+        status = host.wait(job_id, timeout=timeout, on_progress=_on_progress)
+        if status.get('status') != 'ok':
+            raise ReaperWorkerError(status.get('message') or f"El trabajo {job_id} falló en Reaper")
+
+        # El estado llega después del render: solo resta validar la cabecera del WAV
+        rendered = wait_for_render(render_file, timeout=30, require_sentinel=RENDER_REQUIRE_SENTINEL)
+        s.set(bytes_out=file_size(rendered), reaper_elapsed_s=status.get('elapsed'))
+    return rendered
+
+
+def render_region_batch(requests: list) -> list:
+    """Renderiza varios archivos en una sola sesión de Reaper, uno por región.
+
+    Los audios van uno tras otro en la pista "Clase", separados por
+    REAPER_BATCH_GAP_S; cada región se llama como el render que espera su
+    trabajo, así que Reaper (patrón $region) escribe cada WAV donde lo
+    esperaría una sesión individual.
+
+    Args:
+        requests: Dicts con 'audio_wav' y 'render_file' (ruta esperada del render)
+
+    Returns:
+        Por pedido, un dict con 'session_path' y 'render_file', o la excepción
+        si ese render no se generó
+
+    Raises:
+        RppError, ProbeError, ReaperWorkerError si falla el lote completo
+    """
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    batch_name = f"lote_{timestamp}_{os.urandom(3).hex()}"
+    session_path = os.path.join(REAPER_SESSIONS_DIR, f"{batch_name}.rpp")
+
+    items, outputs, used = [], [], set()
+    with span('reaper.session_build', files=len(requests)) as s:
+        for request in requests:
+            # Dos archivos del lote con el mismo nombre no pueden compartir región
+            base = os.path.splitext(os.path.basename(request['render_file']))[0]
+            name, suffix = base, 2
+            while name.lower() in used:
+                name, suffix = f"{base}_{suffix}", suffix + 1
+            used.add(name.lower())
+            audio_file, length = _session_audio(request['audio_wav'])
+            items.append((audio_file, length, name))
+            outputs.append(os.path.join(REAPER_SESSIONS_DIR, f"{name}.wav"))
+        project = build_region_session(REAPER_TEMPLATE, items, REAPER_SESSIONS_DIR, REAPER_BATCH_GAP_S)
+        write_project(project, session_path)
+        s.set(bytes_out=file_size(session_path))
+
+    for output in outputs:
+        for stale in (output, sentinel_path(output)):
+            if os.path.exists(stale):
+                os.unlink(stale)
+
+    st.info(f"🎛️ Lote de {len(requests)} archivo(s) en una sola sesión de Reaper: {session_path}")
+    job_script = os.path.abspath(os.path.join(os.path.dirname(__file__), PREPARED_SESSION_SCRIPT))
+    if REAPER_MODE == "worker":
+        with span('reaper.batch', files=len(requests)):
+            render_with_reaper_worker(session_path, items[0][0], batch_name, outputs[0],
+                                      job_script=job_script, render_files=outputs)
+        timeout = 30
+    else:
+        with span('reaper.launch', files=len(requests)):
+            add_audio_to_reaper_session(session_path, items[0][0], batch_name, script_name=PREPARED_SESSION_SCRIPT,
+                                        render_file=outputs[0], render_files=outputs)
+        timeout = RENDER_TIMEOUT * len(outputs)
+
+    results = []
+    for output in outputs:
+        try:
+            rendered = wait_for_render(output, timeout=timeout, require_sentinel=RENDER_REQUIRE_SENTINEL)
+            results.append({'session_path': session_path, 'render_file': rendered})
+        except (RenderTimeoutError, RenderFailedError) as e:
+            results.append(e)
+    return results
+
+
+def get_audio_duration(audio_file: str) -> float:
+    """Obtiene la duración de un archivo de audio (caché de media_probe).
+
+    Args:
+        audio_file: Ruta al archivo de audio
+
+    Returns:
+        Duración en segundos
+
+    Raises:
+        ProbeError si ffprobe no puede leer el archivo o no informa la duración
+    """
+    duration = probe_media(audio_file).duration
+    if duration is None:
+        raise ProbeError(f"ffprobe no informa la duración de {audio_file}")
+    return duration
+
+
+def render_reaper_session(session_path: str, reaper_exe: str, original_name: str = None) -> str:
+    """El render ya se hace en add_audio_to_reaper_session, solo retorna la ruta esperada.
+
+    Args:
+        session_path: Ruta al archivo .rpp de la sesión
+        reaper_exe: Ruta al ejecutable de Reaper
+        original_name: Nombre original del archivo (sin extensión)
+
+    Returns:
+        Ruta al archivo renderizado
+    """
+    # El render ya se ejecutó en add_audio_to_reaper_session
+    # Solo retornamos la ruta esperada del archivo renderizado
+    session_dir = os.path.dirname(session_path)
+    
+    if original_name:
+        # Usar nombre original del archivo
+        output_file = os.path.join(session_dir, f"{original_name}_renderizado.wav")
+    else:
+        # Fallback al nombre de sesión
+        session_name = os.path.splitext(os.path.basename(session_path))[0]
+        output_file = os.path.join(session_dir, f"{session_name}_renderizado.wav")
+    
+    st.info(f"🔍 Buscando archivo renderizado en: {output_file}")
+    
+    # Verificar que el archivo existe
+    if os.path.exists(output_file):
+        st.success(f"✅ Render completado: {output_file}")
+        return output_file
+    else:
+        st.error(f"❌ Archivo renderizado no encontrado en: {output_file}")
+        # Listar archivos en el directorio para debug
+        if os.path.exists(session_dir):
+            files = os.listdir(session_dir)
+            st.info(f"📂 Archivos en {session_dir}: {files}")
+        return None
+
+
+def stage_extract(job: dict) -> dict:
+    """Etapa 1: obtiene la ruta del archivo original y extrae el audio a WAV mono 48kHz.
+
+    Args:
+        job: Estado del trabajo con 'source' (MediaSource), 'name' y 'source_dir'
+
+    Returns:
+        Estado del trabajo con 'tmp_input' y 'audio_wav'
+    """
+    source = job['source']
+
+    # Archivos locales se leen en su lugar; subidas y descargas se vuelcan a disco
+    job['tmp_input'] = source.local_path()
+    job['name'] = original_name = source.name
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    # El sufijo evita que dos archivos con el mismo nombre (clase.wav y clase.mp3)
+    # en el mismo segundo compartan sesión y temporales
+    job['session_name'] = f"{os.path.splitext(original_name)[0]}_{timestamp}_{uuid.uuid4().hex[:6]}"
+
+    st.info(f"📁 Procesando: {original_name}")
+
+    # Las descargas no se validan antes del lote: se rechazan aquí, antes de las etapas caras
+    media_info = probe_media(job['tmp_input'])
+    reason = validate_media(media_info)
+    if reason:
+        raise ProbeError(f"{original_name}: {reason}")
+    job['media_info'] = media_info
+
+    # Extraer audio
+    st.info("🎵 Extrayendo audio...")
+    job['audio_wav'] = extract_audio_wav16_mono(job['tmp_input'], job['io_report'])
+    job['extracted_wav'] = job['audio_wav']
+    return job
+
+
+def stage_isolate(job: dict) -> dict:
+    """Etapa 2: aplica ElevenLabs Audio Isolation si está configurado.
+
+    Args:
+        job: Estado del trabajo con 'audio_wav'
+
+    Returns:
+        Estado del trabajo con 'audio_wav' apuntando al audio aislado
+    """
+    # Se lee en cada trabajo: secrets.toml o las variables de entorno pueden cambiar entre lotes
+    api_key, base_url = get_elevenlabs_config()
+    if api_key and base_url:
+        st.info("🤖 Aplicando Audio Isolation (ElevenLabs)...")
+        st.info(f"📤 Enviando a ElevenLabs: {job['audio_wav']}")
+        audio_wav_before = job['audio_wav']
+        job['audio_wav'] = process_audio_with_elevenlabs(job['audio_wav'], job['io_report'])
+        if job['audio_wav'] != audio_wav_before:
+            st.success(f"✅ ElevenLabs procesó correctamente: {job['audio_wav']}")
+        else:
+            st.warning("⚠️ ElevenLabs no procesó el audio - usando original")
+    else:
+        st.warning("⚠️ ElevenLabs no configurado - saltando Audio Isolation")
+    return job
+
+
+def render_with_reaper(job: dict) -> dict:
+    """Backend de render "reaper": crea la sesión, agrega el audio y espera el render.
+
+    Args:
+        job: Estado del trabajo con 'audio_wav' y 'session_name'
+
+    Returns:
+        Estado del trabajo con 'session_path' y 'rendered_audio'
+    """
+    audio_wav = job['audio_wav']
+    session_name = job['session_name']
+
+    # Crear directorio de sesiones si no existe
+    os.makedirs(REAPER_SESSIONS_DIR, exist_ok=True)
+
+    # Definir ruta de la nueva sesión
+    session_path = os.path.join(REAPER_SESSIONS_DIR, f"{session_name}.rpp")
+    job['session_path'] = session_path
+
+    st.info(f"🎛️ Creando sesión de Reaper: {session_name}")
+    st.info(f"📁 Sesión se guardará en: {session_path}")
+
+    # Agregar audio a la sesión (esto crea la sesión desde el template)
+    st.info("📂 Agregando audio a sesión de Reaper...")
+    st.info(f"📤 Enviando a Reaper: {audio_wav}")
+
+    # Obtener nombre original sin extensión para pasar a Reaper
+    original_name_clean = os.path.splitext(job['name'])[0]
+
+    # add_audio_to_session.lua nombra el render como el archivo original; la
+    # sesión nativa usa el nombre de la sesión, único aunque dos archivos del
+    # lote se llamen igual (clase.wav y clase.mp3)
+    session_dir = os.path.dirname(session_path)
+    render_stem = session_name if REAPER_SESSION_BUILDER == "native" else original_name_clean
+    expected_render = os.path.join(session_dir, f"{render_stem}_renderizado.wav")
+
+    # Un render o testigo de una corrida anterior se confundiría con el nuevo
+    for stale in (expected_render, sentinel_path(expected_render)):
+        if os.path.exists(stale):
+            os.unlink(stale)
+
+    # Lote por regiones: varios archivos comparten sesión y pasada de render
+    if REAPER_BATCH_SIZE > 1 and REAPER_SESSION_BUILDER == "native":
+        try:
+            result = get_render_batcher(render_region_batch).submit({
+                'audio_wav': audio_wav,
+                'render_file': expected_render
+            })
+        except (ReaperWorkerError, RenderTimeoutError, RenderFailedError, RppError, ProbeError, OSError) as e:
+            st.error(f"❌ El lote de Reaper no completó el render: {e}")
+            raise Exception("Render de Reaper falló")
+        st.success(f"✅ Render completado: {result['render_file']}")
+        job['session_path'] = result['session_path']
+        job['rendered_audio'] = result['render_file']
+        job['render_is_temp'] = False
+        return job
+
+    # Sesión nativa: el .rpp sale armado de Python y Reaper solo renderiza
+    job_script = None
+    if REAPER_SESSION_BUILDER == "native":
+        try:
+            with span('reaper.session_build', bytes_in=file_size(audio_wav)) as s:
+                build_reaper_session(session_path, audio_wav, expected_render)
+                s.set(bytes_out=file_size(session_path))
+        except (RppError, ProbeError, OSError) as e:
+            st.error(f"❌ No se pudo armar la sesión de Reaper: {e}")
+            raise Exception("No se pudo crear la sesión de Reaper")
+        job_script = os.path.abspath(os.path.join(os.path.dirname(__file__), PREPARED_SESSION_SCRIPT))
+
+    if REAPER_MODE == "worker":
+        try:
+            rendered_audio = render_with_reaper_worker(session_path, audio_wav, original_name_clean, expected_render,
+                                                       job_script=job_script)
+        except ReaperJobTimeoutError:
+            st.error(f"❌ Timeout esperando el archivo renderizado: {expected_render}")
+            raise Exception("Timeout esperando render de Reaper")
+        except (ReaperWorkerError, RenderTimeoutError, RenderFailedError) as e:
+            st.error(f"❌ El worker de Reaper no completó el render: {e}")
+            raise Exception("Render de Reaper falló")
+        st.success(f"✅ Render completado: {expected_render}")
+        job['rendered_audio'] = rendered_audio
+        job['render_is_temp'] = False
+        return job
+
+    with span('reaper.launch', bytes_in=file_size(audio_wav)):
+        if job_script:
+            add_audio_to_reaper_session(session_path, audio_wav, original_name_clean,
+                                        script_name=PREPARED_SESSION_SCRIPT, render_file=expected_render)
+        else:
+            add_audio_to_reaper_session(session_path, audio_wav, original_name_clean)
+
+    # Esperar a que Reaper termine el render
+    st.info("⚙️ Esperando a que Reaper complete el render...")
+    st.warning("⏰ Por favor, ten paciencia. El procesamiento con Reaper puede tomar varios minutos.")
+
+    # Esperar hasta RENDER_TIMEOUT a que el render termine (testigo + cabecera WAV coherente)
+    def _on_progress(elapsed):
+        st.info(f"⏳ Esperando render... ({elapsed:.0f}s / {RENDER_TIMEOUT}s)")
+
+    try:
+        with span('reaper.render_wait') as s:
+            rendered_audio = wait_for_render(
+                expected_render,
+                timeout=RENDER_TIMEOUT,
+                require_sentinel=RENDER_REQUIRE_SENTINEL,
+                on_progress=_on_progress
+            )
+            s.set(bytes_out=file_size(rendered_audio))
+    except RenderTimeoutError:
+        st.error(f"❌ Timeout esperando el archivo renderizado: {expected_render}")
+        raise Exception("Timeout esperando render de Reaper")
+    except RenderFailedError as e:
+        st.error(f"❌ El render de Reaper no generó un archivo de salida: {e}")
+        raise Exception("Render de Reaper falló")
+
+    st.success(f"✅ Render completado: {expected_render}")
+
+    job['rendered_audio'] = rendered_audio
+    job['render_is_temp'] = False
+    return job
+
+
+def render_with_numpy(job: dict) -> dict:
+    """Backend de render "numpy": aplica la cadena de voz de dsp_render sin Reaper.
+
+    El render corre en el pool de procesos de dsp_render y queda en
+    SCRATCH_DIR como archivo temporal; la etapa de mux lo elimina al terminar.
+
+    Args:
+        job: Estado del trabajo con 'audio_wav' y 'session_name'
+
+    Returns:
+        Estado del trabajo con 'rendered_audio' ('session_path' es None)
+    """
+    original_name_clean = os.path.splitext(job['name'])[0]
+    os.makedirs(SCRATCH_DIR, exist_ok=True)
+    rendered_audio = os.path.join(SCRATCH_DIR, f"{job['session_name']}_{original_name_clean}_renderizado.wav")
+    job['session_path'] = None
+
+    st.info("🧮 Renderizando con el motor DSP (NumPy)...")
+    with span('dsp.render', bytes_in=file_size(job['audio_wav'])) as s:
+        metrics = render_in_pool(job['audio_wav'], rendered_audio)
+        s.set(bytes_out=file_size(rendered_audio), realtime_factor=metrics['realtime_factor'])
+    st.success(
+        f"✅ Render completado: {os.path.basename(rendered_audio)} "
+        f"({metrics['duration_s']:.0f}s de audio en {metrics['elapsed_s']:.1f}s, {metrics['realtime_factor']}x)"
+    )
+
+    job['rendered_audio'] = rendered_audio
+    job['render_is_temp'] = True
+    return job
+
+
+# Backends de render seleccionables con RENDER_BACKEND
+RENDER_BACKENDS = {
+    'reaper': render_with_reaper,
+    'numpy': render_with_numpy,
+}
+
+
+def stage_render(job: dict) -> dict:
+    """Etapa 3: renderiza el audio con el backend configurado en RENDER_BACKEND.
+
+    Args:
+        job: Estado del trabajo con 'audio_wav' y 'session_name'
+
+    Returns:
+        Estado del trabajo con 'session_path' y 'rendered_audio'
+    """
+    backend = RENDER_BACKENDS.get(RENDER_BACKEND)
+    if backend is None:
+        raise ValueError(f"RENDER_BACKEND desconocido: {RENDER_BACKEND} (opciones: {', '.join(RENDER_BACKENDS)})")
+    return backend(job)
+
+
+def stage_loudness(job: dict) -> dict:
+    """Etapa 4: mide el loudness del render (EBU R128) y, si hay LOUDNESS_TARGET, lo normaliza.
+
+    La medición y la ganancia corren en el pool de procesos de dsp_render.
+    El render normalizado queda en SCRATCH_DIR como temporal; el render de
+    Reaper original se conserva junto a su sesión.
+
+    Args:
+        job: Estado del trabajo con 'rendered_audio'
+
+    Returns:
+        Estado del trabajo con 'loudness' (métricas o None si no se midió)
+    """
+    job['loudness'] = None
+    if not LOUDNESS_TARGET and not LOUDNESS_MEASURE:
+        return job
+
+    rendered_audio = job['rendered_audio']
+    if not LOUDNESS_TARGET:
+        with span('dsp.loudness', bytes_in=file_size(rendered_audio)) as s:
+            measured = get_render_pool().submit(measure_loudness, rendered_audio).result()
+            s.set(realtime_factor=measured['realtime_factor'])
+        job['loudness'] = measured
+        st.info(
+            f"📏 Loudness: {measured['integrated_lufs']} LUFS, LRA {measured['lra_lu']} LU, "
+            f"true peak {measured['true_peak_dbtp']} dBTP"
+        )
+        return job
+
+    target = float(LOUDNESS_TARGET)
+    original_name_clean = os.path.splitext(job['name'])[0]
+    os.makedirs(SCRATCH_DIR, exist_ok=True)
+    normalized = os.path.join(SCRATCH_DIR, f"{job['session_name']}_{original_name_clean}_normalizado.wav")
+
+    st.info(f"📏 Normalizando a {target:g} LUFS (techo {LOUDNESS_TRUE_PEAK_LIMIT:g} dBTP)...")
+    with span('dsp.loudness', bytes_in=file_size(rendered_audio)) as s:
+        report = get_render_pool().submit(
+            normalize_file, rendered_audio, normalized, target, LOUDNESS_TRUE_PEAK_LIMIT
+        ).result()
+        s.set(bytes_out=file_size(normalized), realtime_factor=report['realtime_factor'])
+
+    measured, output = report['measured'], report['output']
+    st.success(
+        f"✅ Loudness: {measured['integrated_lufs']} → {output['integrated_lufs']} LUFS "
+        f"({report['gain_db']:+.2f} dB), true peak {output['true_peak_dbtp']} dBTP"
+    )
+
+    if job.get('render_is_temp'):
+        try:
+            os.unlink(rendered_audio)
+        except Exception:
+            pass
+    job['rendered_audio'] = normalized
+    job['render_is_temp'] = True
+    job['loudness'] = dict(output, gain_db=report['gain_db'], measured_lufs=measured['integrated_lufs'])
+    return job
+
+
+def stage_mux(job: dict) -> dict:
+    """Etapa 5: combina el render con el video (o copia el audio) y limpia temporales.
+
+    Args:
+        job: Estado del trabajo con 'tmp_input' y 'rendered_audio'
+
+    Returns:
+        Dict con información del archivo procesado
+    """
+    original_name = job['name']
+    source_dir = job.get('source_dir')
+    # Al retomar desde el diario la fuente no está materializada todavía
+    tmp_input = job.get('tmp_input') or job['source'].local_path()
+    rendered_audio = job['rendered_audio']
+
+    # Determinar directorio de salida (nunca la carpeta del render: con el
+    # backend numpy o la normalización de loudness es un temporal)
+    output_dir = os.path.join(source_dir, 'procesados') if source_dir else OUTPUT_DIR
+    os.makedirs(output_dir, exist_ok=True)
+
+    # Procesar según tipo de archivo
+    is_video = not is_audio_only_file(tmp_input)
+    outputs = deliverable_paths(output_dir, original_name, is_video, DELIVERABLE_NAMES)
+    final_out = outputs['main']
+
+    # Todos los entregables en una sola pasada de ffmpeg (el video se copia, no se re-codifica)
+    cmd, encoded = deliverables_command(tmp_input if is_video else None, rendered_audio, outputs)
+    if cmd:
+        if is_video:
+            st.info("🎬 Combinando audio procesado con video...")
+        if len(encoded) > 1:
+            st.info(f"📦 Entregables en una pasada: {', '.join(encoded)}")
+        with span('mux.deliverables', deliverables=len(outputs)):
+            run_ffmpeg(cmd)
+    if not is_video:
+        # Solo copiar audio procesado
+        shutil.copy(rendered_audio, final_out)
+
+    # Limpiar archivos temporales (la fuente solo borra copias, nunca originales)
+    job['source'].cleanup()
+    temp_files = []
+    # Una entrada que ya estaba en formato 48kHz mono se usa sin copiarla: no es temporal
+    if os.path.abspath(job['audio_wav']) != os.path.abspath(tmp_input):
+        temp_files.append(job['audio_wav'])
+    if job.get('render_is_temp'):
+        temp_files.append(rendered_audio)
+    for temp_file in temp_files:
+        try:
+            os.unlink(temp_file)
+        except Exception:
+            pass
+
+    st.success(f"✅ Procesado completado: {os.path.basename(final_out)}")
+    io_report = job['io_report']
+    if io_report['io_saved_bytes']:
+        st.info(
+            f"💾 I/O intermedio evitado: {io_report['io_saved_bytes'] / (1024 * 1024):.1f} MB "
+            f"({io_report['ffmpeg_skipped']} conversión(es) omitida(s), {io_report['ffmpeg_piped']} por pipe)"
+        )
+
+    return {
+        'original_name': original_name,
+        'output_file': final_out,
+        'deliverables': outputs,
+        'reaper_session': job['session_path'],
+        'is_video': is_video,
+        'is_local': source_dir is not None,  # Indica si es archivo local
+        'io_saved_bytes': io_report['io_saved_bytes'],
+        'upload_saved_bytes': io_report.get('vad_skipped_bytes', 0),
+        'upload_bytes': io_report.get('upload_bytes', 0),
+        'loudness': job.get('loudness'),
+        'resumed_from': job.get('resumed_from')
+    }
+
+
+def journal_config(job: dict) -> str:
+    """Configuración que cambia el resultado de un archivo (parte de su clave en el diario)."""
+    api_key, base_url = get_elevenlabs_config()
+    isolation = bool(api_key and base_url) and not session_flag('disable_elevenlabs')
+    # Editar la cadena de FX del template cambia el render: su versión es parte de la clave
+    version = template_version(REAPER_TEMPLATE)
+    template = f"{REAPER_TEMPLATE}@{version[0]}:{version[1]}" if version else REAPER_TEMPLATE
+    render = f"reaper:{template}" if RENDER_BACKEND == "reaper" else RENDER_BACKEND
+    loudness = f"{LOUDNESS_TARGET}/{LOUDNESS_TRUE_PEAK_LIMIT:g}" if LOUDNESS_TARGET else "off"
+    deliverables = ','.join(DELIVERABLE_NAMES)
+    return (f"{PIPELINE_VERSION}|isolation={isolation}|{render}|loudness={loudness}|deliverables={deliverables}|"
+            f"{job.get('source_dir') or ''}")
+
+
+# Archivo que produce cada etapa (el diario lo verifica antes de retomar desde ella)
+STAGE_ARTIFACTS = {
+    'extract': 'audio_wav',
+    'isolate': 'audio_wav',
+    'render': 'rendered_audio',
+    'loudness': 'rendered_audio',
+    'mux': 'output_file',
+}
+
+# Etapas del pipeline en orden de ejecución (cada una registra un span stage.<nombre>
+# y su resultado en el diario de trabajos, para retomar lotes interrumpidos)
+PIPELINE_STAGES = journaled_stages([
+    ('extract', traced_stage('extract', stage_extract, 'tmp_input', 'audio_wav')),
+    ('isolate', traced_stage('isolate', stage_isolate, 'audio_wav', 'audio_wav')),
+    ('render', traced_stage('render', stage_render, 'audio_wav', 'rendered_audio')),
+    ('loudness', traced_stage('loudness', stage_loudness, 'rendered_audio', 'rendered_audio')),
+    ('mux', traced_stage('mux', stage_mux, 'rendered_audio', 'output_file')),
+], STAGE_ARTIFACTS, journal_config)
+
+
+def process_with_reaper_pipeline(
+    source: Union[MediaSource, bytes],
+    original_name: Optional[str] = None,
+    source_dir: Optional[str] = None,
+    batch_id: Optional[str] = None
+) -> dict:
+    """Pipeline completo (el render usa el backend de RENDER_BACKEND).
+
+    Args:
+        source: Fuente del archivo original (MediaSource) o sus bytes
+        original_name: Nombre del archivo original (requerido si source son bytes)
+        source_dir: Directorio de origen (opcional)
+        batch_id: Lote al que pertenece (agrupa los spans de telemetría)
+
+    Returns:
+        Dict con información del archivo procesado
+    """
+    job = new_pipeline_job(source, original_name, source_dir, batch_id)
+    for _, stage_fn in PIPELINE_STAGES:
+        job = stage_fn(job)
+    return job
+
+
+def new_pipeline_job(
+    source: Union[MediaSource, bytes],
+    original_name: Optional[str] = None,
+    source_dir: Optional[str] = None,
+    batch_id: Optional[str] = None
+) -> dict:
+    """Crea el estado inicial de un trabajo del pipeline.
+
+    Args:
+        source: Fuente del archivo original (MediaSource) o sus bytes
+        original_name: Nombre del archivo original
+        source_dir: Directorio de origen (opcional)
+        batch_id: Lote al que pertenece (agrupa los spans de telemetría)
+
+    Returns:
+        Dict con 'source', 'name', 'source_dir', 'batch_id' e 'io_report'
+    """
+    if not isinstance(source, MediaSource):
+        source = BytesSource(bytes(source), original_name, source_dir)
+    return {
+        'source': source,
+        'name': original_name or source.name,
+        'source_dir': source_dir if source_dir is not None else source.source_dir,
+        'batch_id': batch_id,
+        'io_report': new_io_report()
+    }
+
+
+def reject_invalid_inputs(files: list) -> Tuple[list, list]:
+    """Valida con ffprobe (en paralelo) las entradas que ya están en disco.
+
+    Las fuentes cuya ruta local implica una descarga (Drive) se validan al
+    inicio de su etapa de extracción.
+
+    Args:
+        files: Entradas del lote con 'source', 'name' y 'source_dir'
+
+    Returns:
+        Tuple de (entradas válidas, lista de (entrada, motivo de rechazo))
+    """
+    checked = [f for f in files if f['source'].local_is_cheap]
+    paths = []
+    rejected = []
+    for f in checked:
+        try:
+            paths.append(f['source'].local_path())
+        except Exception as e:
+            paths.append(None)
+            rejected.append((f, str(e)))
+
+    failed = {id(f) for f, _ in rejected}
+    results = iter(probe_many([p for p in paths if p is not None]))
+    for f, path in zip(checked, paths):
+        if path is None:
+            continue
+        _, reason = next(results)
+        if reason:
+            rejected.append((f, reason))
+            failed.add(id(f))
+            f['source'].cleanup()
+
+    return [f for f in files if id(f) not in failed], rejected
+
+
+def build_staged_pipeline(
+    stage_workers: Optional[dict] = None,
+    queue_size: int = 2,
+    thread_initializer: Optional[Callable[[], None]] = None
+) -> StagedPipeline:
+    """Construye el motor por etapas con los workers configurados para cada etapa.
+
+    Args:
+        stage_workers: Dict etapa -> workers (por defecto STAGE_WORKERS)
+        queue_size: Capacidad de la cola de entrada de cada etapa
+        thread_initializer: Función opcional que se ejecuta al iniciar cada hilo
+
+    Returns:
+        StagedPipeline listo para ejecutar
+    """
+    workers = stage_workers or STAGE_WORKERS
+    stages = [
+        Stage(name, fn, workers=workers.get(name, 1), queue_size=queue_size)
+        for name, fn in PIPELINE_STAGES
+    ]
+    return StagedPipeline(stages, thread_initializer=thread_initializer)
@@ -0,0 +1,266 @@
+"""
+Motor de procesamiento por etapas para AudioPro v1.7
+Encadena extracción → isolation → render → mux con colas acotadas entre etapas
+"""
+
+import queue
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+# Marca de fin de flujo que se propaga entre etapas
+_END = object()
+
+
+class Stage:
+    """Etapa del pipeline con su propio número de workers y cola de entrada.
+
+    Args:
+        name: Nombre de la etapa (aparece en las estadísticas)
+        fn: Función que recibe el estado del trabajo y retorna el nuevo estado
+        workers: Número de hilos que procesan esta etapa en paralelo
+        queue_size: Capacidad de la cola de entrada de la etapa
+    """
+
+    def __init__(self, name: str, fn: Callable[[Any], Any], workers: int = 1, queue_size: int = 2):
+        self.name = name
+        self.fn = fn
+        self.workers = max(1, int(workers))
+        self.queue_size = max(1, int(queue_size))
+
+        self.queue: queue.Queue = queue.Queue(maxsize=self.queue_size)
+        self._lock = threading.Lock()
+        self._alive = self.workers
+        self.processed = 0
+        self.failed = 0
+        self.busy_seconds = 0.0
+        self.blocked_seconds = 0.0
+        self.depth_samples = 0
+        self.depth_total = 0
+        self.depth_max = 0
+
+    def _record(self, busy: float, blocked: float, ok: bool) -> None:
+        with self._lock:
+            self.busy_seconds += busy
+            self.blocked_seconds += blocked
+            if ok:
+                self.processed += 1
+            else:
+                self.failed += 1
+
+    def _sample_depth(self) -> None:
+        depth = self.queue.qsize()
+        with self._lock:
+            self.depth_samples += 1
+            self.depth_total += depth
+            self.depth_max = max(self.depth_max, depth)
+
+    def _worker_done(self) -> bool:
+        """Marca un worker como terminado; True si era el último de la etapa."""
+        with self._lock:
+            self._alive -= 1
+            return self._alive == 0
+
+    def stats(self, wall_seconds: float) -> Dict:
+        """Retorna las estadísticas de la etapa para un tiempo total dado."""
+        capacity = self.workers * wall_seconds
+        return {
+            'stage': self.name,
+            'workers': self.workers,
+            'queue_size': self.queue_size,
+            'processed': self.processed,
+            'failed': self.failed,
+            'queue_depth': self.queue.qsize(),
+            'queue_depth_avg': round(self.depth_total / self.depth_samples, 2) if self.depth_samples else 0.0,
+            'queue_depth_max': self.depth_max,
+            'busy_s': round(self.busy_seconds, 3),
+            'blocked_s': round(self.blocked_seconds, 3),
+            'utilisation': round(self.busy_seconds / capacity, 3) if capacity > 0 else 0.0
+        }
+
+
+class StagedPipeline:
+    """Ejecuta trabajos a través de una secuencia de etapas solapadas.
+
+    Mientras el archivo N+1 se extrae, el archivo N puede estar subiéndose a
+    ElevenLabs y el N-1 renderizándose. Cada etapa tiene una cola acotada de
+    entrada, de modo que una etapa lenta frena a las anteriores en lugar de
+    acumular intermedios en disco o memoria.
+
+    Args:
+        stages: Etapas en orden de ejecución
+        sample_interval: Intervalo en segundos para muestrear la profundidad de las colas
+        thread_initializer: Función opcional que se ejecuta al iniciar cada hilo
+    """
+
+    def __init__(
+        self,
+        stages: Sequence[Stage],
+        sample_interval: float = 0.1,
+        thread_initializer: Optional[Callable[[], None]] = None
+    ):
+        if not stages:
+            raise ValueError("El pipeline necesita al menos una etapa")
+        self.stages = list(stages)
+        self.sample_interval = sample_interval
+        self.thread_initializer = thread_initializer
+        self.wall_seconds = 0.0
+        self._running = False
+
+    def run(
+        self,
+        items: Sequence[Any],
+        on_result: Optional[Callable[[Dict, int, int], None]] = None
+    ) -> List[Dict]:
+        """Procesa los elementos y retorna un resultado por elemento en orden.
+
+        El estado de cada trabajo pasa de etapa en etapa: la primera recibe el
+        elemento original y cada etapa recibe lo que retornó la anterior. Si
+        una etapa falla, el trabajo sale del pipeline con su error y el resto
+        del lote continúa.
+
+        Args:
+            items: Elementos a procesar
+            on_result: Callback opcional (entrada, completados, total) que se
+                llama desde el hilo que invoca run al terminar cada elemento
+
+        Returns:
+            Lista de dicts con 'index', 'item', 'ok', 'result', 'error',
+            'stage' (etapa donde falló, o None) y 'elapsed', en orden de entrada
+        """
+        if self._running:
+            raise RuntimeError("El pipeline ya está en ejecución")
+        self._running = True
+
+        total = len(items)
+        entries: List[Optional[Dict]] = [None] * total
+        done: queue.Queue = queue.Queue()
+        threads: List[threading.Thread] = []
+        start = time.perf_counter()
+
+        def _finish(job: Dict, ok: bool, stage_name: Optional[str], error: Optional[Exception]) -> None:
+            done.put({
+                'index': job['index'],
+                'item': job['item'],
+                'ok': ok,
+                'result': job['state'] if ok else None,
+                'error': error,
+                'stage': stage_name,
+                'elapsed': time.perf_counter() - job['start']
+            })
+
+        def _worker(position: int) -> None:
+            if self.thread_initializer:
+                self.thread_initializer()
+            stage = self.stages[position]
+            downstream = self.stages[position + 1] if position + 1 < len(self.stages) else None
+
+            while True:
+                job = stage.queue.get()
+                if job is _END:
+                    if stage._worker_done() and downstream:
+                        for _ in range(downstream.workers):
+                            downstream.queue.put(_END)
+                    return
+
+                if job['start'] is None:
+                    job['start'] = time.perf_counter()
+                t0 = time.perf_counter()
+                try:
+                    job['state'] = stage.fn(job['state'])
+                except Exception as e:
+                    stage._record(time.perf_counter() - t0, 0.0, ok=False)
+                    _finish(job, False, stage.name, e)
+                    continue
+                busy = time.perf_counter() - t0
+
+                if downstream:
+                    t1 = time.perf_counter()
+                    downstream.queue.put(job)
+                    stage._record(busy, time.perf_counter() - t1, ok=True)
+                else:
+                    stage._record(busy, 0.0, ok=True)
+                    _finish(job, True, None, None)
+
+        def _feed() -> None:
+            first = self.stages[0]
+            for idx, item in enumerate(items):
+                first.queue.put({'index': idx, 'item': item, 'state': item, 'start': None})
+            for _ in range(first.workers):
+                first.queue.put(_END)
+
+        sampling = threading.Event()
+
+        def _sample() -> None:
+            while not sampling.wait(self.sample_interval):
+                for stage in self.stages:
+                    stage._sample_depth()
+
+        try:
+            for position, stage in enumerate(self.stages):
+                for n in range(stage.workers):
+                    thread = threading.Thread(
+                        target=_worker,
+                        args=(position,),
+                        name=f"audiopro-{stage.name}-{n}",
+                        daemon=True
+                    )
+                    thread.start()
+                    threads.append(thread)
+
+            feeder = threading.Thread(target=_feed, name="audiopro-feed", daemon=True)
+            feeder.start()
+            sampler = threading.Thread(target=_sample, name="audiopro-sampler", daemon=True)
+            sampler.start()
+
+            for completed in range(1, total + 1):
+                entry = done.get()
+                entries[entry['index']] = entry
+                if on_result:
+                    on_result(entry, completed, total)
+
+            feeder.join()
+            for thread in threads:
+                thread.join()
+            sampling.set()
+            sampler.join()
+        finally:
+            self.wall_seconds = time.perf_counter() - start
+            self._running = False
+
+        return entries
+
+    def stats(self) -> List[Dict]:
+        """Estadísticas por etapa de la última ejecución."""
+        return [stage.stats(self.wall_seconds) for stage in self.stages]
+
+    def bottleneck(self) -> Optional[str]:
+        """Nombre de la etapa con mayor utilización en la última ejecución."""
+        stats = self.stats()
+        if not stats:
+            return None
+        return max(stats, key=lambda s: s['utilisation'])['stage']
+
+
+def parse_stage_workers(spec: str, defaults: Dict[str, int]) -> Dict[str, int]:
+    """Interpreta una especificación de workers por etapa.
+
+    Args:
+        spec: Texto del estilo "extract=2,isolate=4,render=1,mux=2"
+        defaults: Valores por defecto para etapas no mencionadas
+
+    Returns:
+        Dict etapa -> número de workers
+    """
+    workers = dict(defaults)
+    for part in (spec or '').split(','):
+        if '=' not in part:
+            continue
+        name, value = part.split('=', 1)
+        name = name.strip()
+        if name in workers:
+            try:
+                workers[name] = max(1, int(value))
+            except ValueError:
+                pass
+    return workers
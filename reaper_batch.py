@@ -0,0 +1,119 @@
+"""
+Lotes de render por regiones para AudioPro v1.7
+
+Cada sesión de Reaper paga la carga del template y sus plugins (Waves),
+que en clips cortos cuesta más que el render. Con REAPER_BATCH_SIZE > 1 los
+archivos que llegan al render a la vez (o con menos de REAPER_BATCH_WAIT_S
+de diferencia) se juntan en una sola sesión: uno tras otro en la pista
+"Clase", cada uno en su región, y Reaper los renderiza en una pasada con
+el patrón $region. Cada archivo recibe su propio WAV.
+"""
+
+import os
+import queue
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+from telemetry import current_context, use_context
+
+# Archivos por sesión de Reaper ("1" = una sesión por archivo, sin lotes)
+REAPER_BATCH_SIZE = int(os.getenv("REAPER_BATCH_SIZE", "1"))
+# Cuánto espera el primer archivo de un lote a que lleguen los demás
+REAPER_BATCH_WAIT_S = float(os.getenv("REAPER_BATCH_WAIT_S", "1.0"))
+# Silencio entre archivos en la sesión: mayor que la cola de render (1 s)
+# para que la cola de una región no incluya el archivo siguiente
+REAPER_BATCH_GAP_S = float(os.getenv("REAPER_BATCH_GAP_S", "2.0"))
+
+
+class RenderBatcher:
+    """Junta pedidos de render concurrentes y los procesa de a lotes en un hilo propio.
+
+    Quien llama a submit queda bloqueado hasta que su lote termina. El hilo
+    toma el primer pedido pendiente y espera hasta max_wait segundos (o
+    hasta max_size pedidos) antes de procesar el lote.
+
+    Args:
+        render_batch: Recibe la lista de pedidos y retorna un resultado por
+            pedido (una excepción en la lista falla solo ese pedido; si
+            lanza, fallan todos los del lote)
+        max_size: Pedidos por lote
+        max_wait: Espera máxima por pedidos adicionales, en segundos
+    """
+
+    def __init__(self, render_batch: Callable[[List[Any]], List[Any]], max_size: int, max_wait: float):
+        self.render_batch = render_batch
+        self.max_size = max(1, int(max_size))
+        self.max_wait = max(0.0, float(max_wait))
+        self._queue: queue.Queue = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self.stats = {'batches': 0, 'files': 0, 'max_batch': 0}
+
+    def submit(self, request: Any) -> Any:
+        """Encola un pedido y espera su resultado.
+
+        Raises:
+            La excepción del pedido o del lote si el render falló
+        """
+        entry = {'request': request, 'context': current_context(), 'done': threading.Event(),
+                 'result': None, 'error': None}
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="audiopro-reaper-batch", daemon=True)
+                self._thread.start()
+        self._queue.put(entry)
+        entry['done'].wait()
+        if entry['error'] is not None:
+            raise entry['error']
+        return entry['result']
+
+    def _collect(self) -> List[Dict]:
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self) -> None:
+        while True:
+            batch = self._collect()
+            with self._lock:
+                self.stats['batches'] += 1
+                self.stats['files'] += len(batch)
+                self.stats['max_batch'] = max(self.stats['max_batch'], len(batch))
+            # Los spans del lote van al lote de archivos del primero, sin archivo propio
+            context = batch[0]['context']
+            try:
+                with use_context(batch_id=context.get('batch_id'), stage=context.get('stage')):
+                    results = self.render_batch([entry['request'] for entry in batch])
+                for entry, result in zip(batch, results):
+                    if isinstance(result, Exception):
+                        entry['error'] = result
+                    else:
+                        entry['result'] = result
+            except Exception as e:
+                for entry in batch:
+                    entry['error'] = e
+            finally:
+                for entry in batch:
+                    entry['done'].set()
+
+
+_batcher: Optional[RenderBatcher] = None
+_batcher_lock = threading.Lock()
+
+
+def get_render_batcher(render_batch: Callable[[List[Any]], List[Any]]) -> RenderBatcher:
+    """Batcher compartido del proceso (REAPER_BATCH_SIZE / REAPER_BATCH_WAIT_S)."""
+    global _batcher
+    with _batcher_lock:
+        if _batcher is None:
+            _batcher = RenderBatcher(render_batch, REAPER_BATCH_SIZE, REAPER_BATCH_WAIT_S)
+        return _batcher
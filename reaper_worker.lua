@@ -0,0 +1,181 @@
+-- Worker persistente de AudioPro para Reaper
+-- AudioPro v1.7 - Reaper Edition
+-- Atiende la cola de reaper_worker.py sin cerrar Reaper entre archivos:
+--   inbox/<id>.job -> working/<id>.job -> done/<id>.status
+-- Se lanza una vez (reaper.exe -nosplash <arranque>.lua) con ExtState
+-- "queue_dir" y "job_script"; cada trabajo ejecuta job_script con los
+-- parámetros del trabajo en ExtState, igual que el lanzamiento por archivo.
+-- Un trabajo puede traer su propio "job_script" (p. ej. render_prepared_session.lua
+-- cuando la sesión ya viene armada desde Python).
+
+local queue_dir = reaper.GetExtState("AudioPro", "queue_dir")
+local job_script = reaper.GetExtState("AudioPro", "job_script")
+
+if queue_dir == "" or job_script == "" then
+    reaper.ShowConsoleMsg("AudioPro worker: faltan queue_dir o job_script\n")
+    return
+end
+
+local inbox = queue_dir .. "/inbox"
+local working = queue_dir .. "/working"
+local done = queue_dir .. "/done"
+local heartbeat_file = queue_dir .. "/worker.heartbeat"
+local stop_file = queue_dir .. "/stop"
+
+local POLL_INTERVAL = 0.5
+local HEARTBEAT_INTERVAL = 1.0
+
+local JOB_KEYS = { "audio_file", "session_name", "template_path", "original_name", "render_file", "render_files" }
+
+local last_poll = 0
+local last_beat = 0
+local jobs_done = 0
+
+reaper.RecursiveCreateDirectory(inbox, 0)
+reaper.RecursiveCreateDirectory(working, 0)
+reaper.RecursiveCreateDirectory(done, 0)
+
+local function read_kv(path)
+    local f = io.open(path, "r")
+    if not f then return nil end
+    local values = {}
+    for line in f:lines() do
+        local key, value = line:match("^([^=]+)=(.*)$")
+        if key then
+            values[key:match("^%s*(.-)%s*$")] = value:match("^%s*(.-)%s*$")
+        end
+    end
+    f:close()
+    return values
+end
+
+-- Escritura atómica: el host solo ve el archivo una vez renombrado
+local function write_kv(path, values)
+    local tmp = path .. ".tmp"
+    local f = io.open(tmp, "w")
+    if not f then return false end
+    for key, value in pairs(values) do
+        f:write(key .. "=" .. tostring(value):gsub("[\r\n]", " ") .. "\n")
+    end
+    f:close()
+    os.remove(path)
+    return os.rename(tmp, path)
+end
+
+local function list_jobs(dir)
+    reaper.EnumerateFiles(dir, -1) -- invalidar la caché del listado
+    local jobs = {}
+    local i = 0
+    while true do
+        local name = reaper.EnumerateFiles(dir, i)
+        if not name then break end
+        if name:sub(-4) == ".job" then
+            jobs[#jobs + 1] = name
+        end
+        i = i + 1
+    end
+    table.sort(jobs) -- los ids empiezan con la marca de tiempo: orden de llegada
+    return jobs
+end
+
+local function write_heartbeat()
+    write_kv(heartbeat_file, {
+        worker = "reaper",
+        jobs = jobs_done,
+        time = os.date("%Y-%m-%dT%H:%M:%S")
+    })
+end
+
+-- Un trabajo que quedó en working/ es de un worker que se cerró a mitad del render
+local function fail_orphaned_jobs()
+    for _, name in ipairs(list_jobs(working)) do
+        local job_id = name:sub(1, -5)
+        write_kv(done .. "/" .. job_id .. ".status", {
+            job_id = job_id,
+            status = "error",
+            message = "El worker se reinició durante el trabajo"
+        })
+        os.remove(working .. "/" .. name)
+    end
+end
+
+local function run_job(name)
+    local job_path = working .. "/" .. name
+    if not os.rename(inbox .. "/" .. name, job_path) then
+        return
+    end
+    local job = read_kv(job_path) or {}
+    local job_id = job.job_id or name:sub(1, -5)
+    local started = reaper.time_precise()
+
+    reaper.ShowConsoleMsg("=== AudioPro worker: trabajo " .. job_id .. " ===\n")
+
+    for _, key in ipairs(JOB_KEYS) do
+        reaper.SetExtState("AudioPro", key, job[key] or "", false)
+    end
+    reaper.SetExtState("AudioPro", "headless", "1", false)
+    reaper.DeleteExtState("AudioPro", "last_error", false)
+
+    local script = job.job_script
+    if not script or script == "" then
+        script = job_script
+    end
+    local ok, err = pcall(dofile, script)
+
+    local render_file = job.render_file or ""
+    local message = ok and reaper.GetExtState("AudioPro", "last_error") or tostring(err)
+    local status = "ok"
+    if not ok or message ~= "" then
+        status = "error"
+    elseif render_file ~= "" and not reaper.file_exists(render_file) then
+        status = "error"
+        message = "Reaper no generó el render: " .. render_file
+    end
+
+    write_kv(done .. "/" .. job_id .. ".status", {
+        job_id = job_id,
+        status = status,
+        message = message,
+        render_file = render_file,
+        elapsed = string.format("%.3f", reaper.time_precise() - started)
+    })
+    os.remove(job_path)
+
+    for _, key in ipairs(JOB_KEYS) do
+        reaper.DeleteExtState("AudioPro", key, false)
+    end
+    reaper.DeleteExtState("AudioPro", "headless", false)
+    jobs_done = jobs_done + 1
+end
+
+local function loop()
+    if reaper.file_exists(stop_file) then
+        os.remove(heartbeat_file)
+        reaper.ShowConsoleMsg("AudioPro worker detenido (" .. jobs_done .. " trabajos)\n")
+        return
+    end
+
+    local now = reaper.time_precise()
+    if now - last_beat >= HEARTBEAT_INTERVAL then
+        write_heartbeat()
+        last_beat = now
+    end
+
+    if now - last_poll >= POLL_INTERVAL then
+        last_poll = now
+        local pending = list_jobs(inbox)
+        if pending[1] then
+            run_job(pending[1])
+            -- Latido inmediato al terminar: el render bloquea el bucle
+            write_heartbeat()
+            last_beat = reaper.time_precise()
+        end
+    end
+
+    reaper.defer(loop)
+end
+
+fail_orphaned_jobs()
+write_heartbeat()
+reaper.ShowConsoleMsg("AudioPro worker esperando trabajos en " .. queue_dir .. "\n")
+loop()
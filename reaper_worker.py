@@ -0,0 +1,349 @@
+"""
+Worker persistente de Reaper para AudioPro v1.7
+Cola de trabajos en disco que atiende una instancia de Reaper siempre abierta
+
+Protocolo (un directorio compartido, REAPER_QUEUE_DIR):
+    inbox/<id>.job       trabajo pendiente (líneas clave=valor)
+    working/<id>.job     trabajo que el worker está procesando
+    done/<id>.status     resultado: status=ok|error, message, render_file, elapsed
+    worker.heartbeat     el worker lo reescribe cada segundo mientras espera trabajos
+    stop                 si existe, el worker termina su bucle
+
+reaper_worker.lua implementa el worker dentro de Reaper (bucle con
+reaper.defer); reaper_worker_stub.py implementa el mismo protocolo en Python
+para probar el flujo en Linux sin Reaper.
+"""
+
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from typing import Callable, Dict, List, Optional
+
+# Directorio de la cola compartida con el worker
+REAPER_QUEUE_DIR = os.getenv("REAPER_QUEUE_DIR", os.path.join(tempfile.gettempdir(), "audiopro_reaper_queue"))
+
+# Usar el worker simulado de Python en lugar de Reaper (pruebas en Linux)
+REAPER_WORKER_STUB = os.getenv("REAPER_WORKER_STUB", "0") == "1"
+
+# Segundos sin latido a partir de los cuales el worker se considera caído
+HEARTBEAT_STALE_S = float(os.getenv("REAPER_HEARTBEAT_STALE", "10"))
+
+# Un worker ocupado no late: se lo considera vivo mientras tenga un trabajo
+# en working/ y su último latido sea más reciente que este límite
+WORKER_BUSY_TIMEOUT = float(os.getenv("REAPER_WORKER_BUSY_TIMEOUT", "900"))
+
+# Segundos máximos para que un worker recién lanzado empiece a latir
+WORKER_STARTUP_TIMEOUT = float(os.getenv("REAPER_WORKER_STARTUP_TIMEOUT", "90"))
+
+# Intervalo de verificación del archivo de estado
+STATUS_POLL_INTERVAL = float(os.getenv("REAPER_STATUS_POLL_INTERVAL", "0.25"))
+
+JOB_SUFFIX = ".job"
+STATUS_SUFFIX = ".status"
+HEARTBEAT_FILE = "worker.heartbeat"
+STOP_FILE = "stop"
+
+
+class ReaperWorkerError(Exception):
+    """El worker no está disponible o terminó sin reportar el trabajo."""
+
+
+class ReaperJobTimeoutError(ReaperWorkerError):
+    """El trabajo no se completó dentro del tiempo máximo."""
+
+
+def queue_paths(queue_dir: str) -> Dict[str, str]:
+    """Rutas de los subdirectorios y archivos de control de la cola."""
+    return {
+        'inbox': os.path.join(queue_dir, 'inbox'),
+        'working': os.path.join(queue_dir, 'working'),
+        'done': os.path.join(queue_dir, 'done'),
+        'heartbeat': os.path.join(queue_dir, HEARTBEAT_FILE),
+        'stop': os.path.join(queue_dir, STOP_FILE)
+    }
+
+
+def ensure_queue_dirs(queue_dir: str) -> Dict[str, str]:
+    """Crea la estructura de la cola si no existe y retorna sus rutas."""
+    paths = queue_paths(queue_dir)
+    for key in ('inbox', 'working', 'done'):
+        os.makedirs(paths[key], exist_ok=True)
+    return paths
+
+
+def read_kv_file(path: str) -> Optional[Dict[str, str]]:
+    """Lee un archivo de líneas clave=valor, o None si no existe."""
+    try:
+        with open(path, 'r', encoding='utf-8', errors='ignore') as f:
+            lines = f.read().splitlines()
+    except OSError:
+        return None
+    values = {}
+    for line in lines:
+        if '=' in line:
+            key, value = line.split('=', 1)
+            values[key.strip()] = value.strip()
+    return values
+
+
+def write_kv_file(path: str, values: Dict[str, object]) -> None:
+    """Escribe clave=valor de forma atómica (archivo .tmp y rename).
+
+    El lector solo ve archivos completos: el worker ignora todo lo que no
+    termina en .job y el host solo abre .status ya renombrados.
+    """
+    tmp_path = f"{path}.{uuid.uuid4().hex[:8]}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8', newline='\n') as f:
+        for key, value in values.items():
+            # Los valores viajan en una sola línea
+            f.write(f"{key}={str(value).replace(chr(10), ' ').replace(chr(13), ' ')}\n")
+    os.replace(tmp_path, path)
+
+
+def new_job_id() -> str:
+    """Identificador ordenable por llegada (FIFO por nombre de archivo)."""
+    return f"{time.time_ns()}_{uuid.uuid4().hex[:8]}"
+
+
+class ReaperWorkerHost:
+    """Cliente de la cola: lanza el worker una sola vez y le envía trabajos.
+
+    Reemplaza el patrón de un reaper.exe por archivo: el arranque de Reaper
+    (y su escaneo de plugins) se paga una vez por sesión y cada trabajo se
+    reduce a escribir un archivo en inbox/ y esperar su estado en done/.
+
+    Args:
+        queue_dir: Directorio de la cola
+        reaper_exe: Ejecutable de Reaper usado para lanzar el worker
+        job_script: Script Lua que procesa cada trabajo (add_audio_to_session.lua)
+        stub: Lanzar reaper_worker_stub.py en lugar de Reaper
+    """
+
+    def __init__(
+        self,
+        queue_dir: str = REAPER_QUEUE_DIR,
+        reaper_exe: Optional[str] = None,
+        job_script: Optional[str] = None,
+        stub: bool = REAPER_WORKER_STUB
+    ):
+        self.queue_dir = queue_dir
+        self.reaper_exe = reaper_exe
+        self.job_script = job_script
+        self.stub = stub
+        self.paths = ensure_queue_dirs(queue_dir)
+        self._process: Optional[subprocess.Popen] = None
+        self._bootstrap: Optional[str] = None
+        self._lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._stats = {'submitted': 0, 'ok': 0, 'failed': 0, 'launches': 0}
+
+    def heartbeat_age(self) -> Optional[float]:
+        """Segundos desde el último latido del worker, o None si nunca latió."""
+        try:
+            return max(0.0, time.time() - os.path.getmtime(self.paths['heartbeat']))
+        except OSError:
+            return None
+
+    def is_alive(self) -> bool:
+        """True si el worker late o está ocupado con un trabajo reciente.
+
+        El bucle de Reaper se bloquea durante el render, así que un latido
+        viejo con un trabajo en working/ significa "ocupado", no "caído".
+        Un worker al que ya se le pidió terminar no cuenta como vivo.
+        """
+        if os.path.exists(self.paths['stop']):
+            return False
+        age = self.heartbeat_age()
+        if age is None:
+            return False
+        if age < HEARTBEAT_STALE_S:
+            return True
+        return age < WORKER_BUSY_TIMEOUT and self._count_jobs('working') > 0
+
+    def _count_jobs(self, folder: str) -> int:
+        try:
+            return sum(1 for name in os.listdir(self.paths[folder]) if name.endswith(JOB_SUFFIX))
+        except OSError:
+            return 0
+
+    def ensure_running(self, on_status: Optional[Callable[[str], None]] = None) -> None:
+        """Lanza el worker si no hay uno vivo y espera su primer latido.
+
+        Raises:
+            ReaperWorkerError si el worker no arranca a tiempo
+        """
+        with self._lock:
+            if self.is_alive():
+                return
+            if os.path.exists(self.paths['stop']):
+                os.unlink(self.paths['stop'])
+            if on_status:
+                on_status("Iniciando worker de Reaper...")
+            self._launch()
+            if not self._wait_heartbeat(WORKER_STARTUP_TIMEOUT):
+                raise ReaperWorkerError(
+                    f"El worker de Reaper no respondió en {WORKER_STARTUP_TIMEOUT:.0f}s ({self.queue_dir})"
+                )
+            self._remove_bootstrap()
+
+    def _launch_command(self) -> List[str]:
+        if self.stub:
+            stub_script = os.path.join(os.path.dirname(os.path.abspath(__file__)), "reaper_worker_stub.py")
+            return [sys.executable, stub_script, '--queue-dir', self.queue_dir]
+
+        if not self.reaper_exe or not self.job_script:
+            raise ReaperWorkerError("Falta el ejecutable de Reaper o el script de trabajos")
+        worker_script = os.path.join(os.path.dirname(os.path.abspath(__file__)), "reaper_worker.lua")
+        bootstrap = tempfile.NamedTemporaryFile(mode='w', suffix='.lua', delete=False, encoding='utf-8')
+        bootstrap.write(f"""
+-- Arranque del worker persistente de AudioPro
+reaper.SetExtState("AudioPro", "queue_dir", [[{self.queue_dir.replace(chr(92), '/')}]], false)
+reaper.SetExtState("AudioPro", "job_script", [[{self.job_script.replace(chr(92), '/')}]], false)
+dofile([[{worker_script.replace(chr(92), '/')}]])
+""")
+        bootstrap.close()
+        self._bootstrap = bootstrap.name
+        return [self.reaper_exe, '-nosplash', bootstrap.name]
+
+    def _launch(self) -> None:
+        cmd = self._launch_command()
+        self._process = subprocess.Popen(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        with self._stats_lock:
+            self._stats['launches'] += 1
+
+    def _wait_heartbeat(self, timeout: float) -> bool:
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if self.is_alive():
+                return True
+            if self._process is not None and self._process.poll() is not None and not self.is_alive():
+                return False
+            time.sleep(STATUS_POLL_INTERVAL)
+        return self.is_alive()
+
+    def _remove_bootstrap(self) -> None:
+        if self._bootstrap:
+            try:
+                os.unlink(self._bootstrap)
+            except OSError:
+                pass
+            self._bootstrap = None
+
+    def submit(self, job: Dict[str, object]) -> str:
+        """Encola un trabajo y retorna su identificador."""
+        job_id = new_job_id()
+        payload = {'job_id': job_id, 'submitted': f"{time.time():.3f}"}
+        payload.update(job)
+        write_kv_file(os.path.join(self.paths['inbox'], job_id + JOB_SUFFIX), payload)
+        with self._stats_lock:
+            self._stats['submitted'] += 1
+        return job_id
+
+    def job_state(self, job_id: str) -> str:
+        """Estado actual del trabajo: queued, working, done o unknown."""
+        name = job_id + JOB_SUFFIX
+        if os.path.exists(os.path.join(self.paths['done'], job_id + STATUS_SUFFIX)):
+            return 'done'
+        if os.path.exists(os.path.join(self.paths['working'], name)):
+            return 'working'
+        if os.path.exists(os.path.join(self.paths['inbox'], name)):
+            return 'queued'
+        return 'unknown'
+
+    def wait(
+        self,
+        job_id: str,
+        timeout: float = 600,
+        on_progress: Optional[Callable[[float, str], None]] = None,
+        progress_every: float = 30
+    ) -> Dict[str, str]:
+        """Espera el estado final de un trabajo y lo retorna.
+
+        Args:
+            job_id: Identificador devuelto por submit()
+            timeout: Segundos máximos de espera
+            on_progress: Callback opcional con (segundos, estado del trabajo)
+            progress_every: Cada cuántos segundos llamar a on_progress
+
+        Returns:
+            Dict del archivo .status (status, message, render_file, elapsed...)
+
+        Raises:
+            ReaperJobTimeoutError si no termina a tiempo
+            ReaperWorkerError si el worker lanzado por este host terminó
+        """
+        status_path = os.path.join(self.paths['done'], job_id + STATUS_SUFFIX)
+        start = time.monotonic()
+        next_progress = progress_every
+        while True:
+            status = read_kv_file(status_path)
+            if status is not None:
+                try:
+                    os.unlink(status_path)
+                except OSError:
+                    pass
+                with self._stats_lock:
+                    self._stats['ok' if status.get('status') == 'ok' else 'failed'] += 1
+                return status
+
+            elapsed = time.monotonic() - start
+            if self._process is not None and self._process.poll() is not None and not self.is_alive():
+                raise ReaperWorkerError(f"El worker de Reaper terminó antes de completar {job_id}")
+            if elapsed >= timeout:
+                raise ReaperJobTimeoutError(f"Timeout esperando el trabajo {job_id} ({self.job_state(job_id)})")
+            if on_progress and elapsed >= next_progress:
+                on_progress(elapsed, self.job_state(job_id))
+                next_progress += progress_every
+            time.sleep(STATUS_POLL_INTERVAL)
+
+    def run_job(self, job: Dict[str, object], timeout: float = 600,
+                on_progress: Optional[Callable[[float, str], None]] = None) -> Dict[str, str]:
+        """Asegura el worker, encola el trabajo y espera su estado."""
+        self.ensure_running()
+        return self.wait(self.submit(job), timeout=timeout, on_progress=on_progress)
+
+    def stop(self, timeout: float = 10) -> None:
+        """Pide al worker que termine su bucle (Reaper queda abierto)."""
+        with open(self.paths['stop'], 'w', encoding='utf-8') as f:
+            f.write(f"requested={time.time():.3f}\n")
+        if self._process is not None and self.stub:
+            try:
+                self._process.wait(timeout=timeout)
+            except subprocess.TimeoutExpired:
+                self._process.kill()
+        self._remove_bootstrap()
+
+    def stats(self) -> Dict[str, object]:
+        """Contadores del host y tamaño de la cola."""
+        with self._stats_lock:
+            stats = dict(self._stats)
+        stats['queued'] = self._count_jobs('inbox')
+        stats['working'] = self._count_jobs('working')
+        age = self.heartbeat_age()
+        stats['alive'] = self.is_alive()
+        stats['heartbeat_age_s'] = round(age, 1) if age is not None else None
+        return stats
+
+
+_host: Optional[ReaperWorkerHost] = None
+_host_lock = threading.Lock()
+
+
+def get_reaper_worker_host(reaper_exe: Optional[str] = None, job_script: Optional[str] = None) -> ReaperWorkerHost:
+    """Host del worker compartido por todo el proceso.
+
+    Los argumentos completan la configuración del host si una llamada
+    anterior (p. ej. la barra lateral) lo creó sin ellos.
+    """
+    global _host
+    with _host_lock:
+        if _host is None:
+            _host = ReaperWorkerHost(reaper_exe=reaper_exe, job_script=job_script)
+        else:
+            _host.reaper_exe = _host.reaper_exe or reaper_exe
+            _host.job_script = _host.job_script or job_script
+        return _host
@@ -0,0 +1,178 @@
+"""
+Worker simulado de Reaper para AudioPro v1.7
+Implementa el protocolo de reaper_worker.py sin Reaper (pruebas en Linux)
+
+Por cada trabajo copia el audio de entrada como render, escribe la sesión
+.rpp (copia del template si existe) y el testigo .done, igual que
+add_audio_to_session.lua, y reporta el estado en done/. Si la sesión ya
+viene armada (render_prepared_session.lua) la lee con rpp_project y
+"renderiza" el audio de la pista Clase (un WAV por región si la sesión es un
+lote por regiones), lo que además valida el .rpp escrito.
+
+Uso:
+    python reaper_worker_stub.py --queue-dir /tmp/audiopro_reaper_queue --render-seconds 0.5
+"""
+
+import argparse
+import os
+import shutil
+import time
+from datetime import datetime
+
+from reaper_worker import (
+    JOB_SUFFIX,
+    REAPER_QUEUE_DIR,
+    STATUS_SUFFIX,
+    ensure_queue_dirs,
+    read_kv_file,
+    write_kv_file
+)
+from rpp_project import REGION_PATTERN, item_sources, parse_rpp, regions
+
+PREPARED_JOB_SCRIPT = "render_prepared_session.lua"
+
+
+def _finish_render(source_file: str, render_file: str, render_seconds: float) -> None:
+    """Como Reaper: el WAV aparece completo al volver del render, luego el testigo."""
+    if render_seconds:
+        time.sleep(render_seconds)
+    partial = render_file + ".part"
+    shutil.copyfile(source_file, partial)
+    os.replace(partial, render_file)
+    write_kv_file(os.path.splitext(render_file)[0] + ".done", {
+        'status': 'ok',
+        'render': render_file,
+        'finished': datetime.now().strftime("%Y-%m-%dT%H:%M:%S")
+    })
+
+
+def render_prepared_job(job: dict, render_seconds: float = 0.0) -> dict:
+    """Simula render_prepared_session.lua: la sesión ya trae el audio y el render."""
+    session_name = job.get('session_name', '')
+    render_file = job.get('render_file', '')
+    if not session_name or not render_file:
+        return {'status': 'error', 'message': "Faltan parámetros (sesión y archivo de render)"}
+    if not os.path.exists(session_name):
+        return {'status': 'error', 'message': f"La sesión no existe: {session_name}"}
+    with open(session_name, 'r', encoding='utf-8') as f:
+        project = parse_rpp(f.read())
+    sources = item_sources(project)
+    if not sources:
+        return {'status': 'error', 'message': "La sesión no tiene audio en la pista Clase"}
+
+    # Lote por regiones: cada región renderiza el ítem que empieza en ella
+    outputs = [(sources[0][2], render_file)]
+    if (project.get('RENDER_PATTERN') or [''])[0] == REGION_PATTERN:
+        render_dir = project.get('RENDER_FILE')[0]
+        by_position = {round(position, 6): audio for position, _, audio in sources}
+        outputs = [(by_position.get(round(start, 6), ''), os.path.join(render_dir, f"{name}.wav"))
+                   for start, _, name in regions(project)]
+
+    for audio_file, output in outputs:
+        if not os.path.exists(audio_file):
+            return {'status': 'error', 'message': f"El archivo de audio no existe: {audio_file}"}
+    # Una sola pasada de render (el costo fijo que el lote reparte entre archivos)
+    if render_seconds:
+        time.sleep(render_seconds)
+    for audio_file, output in outputs:
+        _finish_render(audio_file, output, 0.0)
+    return {'status': 'ok', 'message': '', 'render_file': render_file}
+
+
+def render_job(job: dict, render_seconds: float = 0.0) -> dict:
+    """Simula el render de un trabajo y retorna los campos de su estado."""
+    if os.path.basename(job.get('job_script', '')) == PREPARED_JOB_SCRIPT:
+        return render_prepared_job(job, render_seconds)
+    audio_file = job.get('audio_file', '')
+    session_name = job.get('session_name', '')
+    original_name = job.get('original_name', '')
+    if not audio_file or not session_name or not original_name:
+        return {'status': 'error', 'message': "Faltan parámetros (archivo de audio, sesión y nombre)"}
+    if not os.path.exists(audio_file):
+        return {'status': 'error', 'message': f"El archivo de audio no existe: {audio_file}"}
+
+    session_dir = os.path.dirname(session_name)
+    os.makedirs(session_dir or '.', exist_ok=True)
+    render_file = job.get('render_file') or os.path.join(session_dir, f"{original_name}_renderizado.wav")
+
+    template = job.get('template_path', '')
+    if template and os.path.exists(template):
+        shutil.copyfile(template, session_name)
+    else:
+        with open(session_name, 'w', encoding='utf-8') as f:
+            f.write(f"<REAPER_PROJECT 0.1 \"stub\"\n  RENDER_FILE \"{render_file}\"\n>\n")
+
+    _finish_render(audio_file, render_file, render_seconds)
+    return {'status': 'ok', 'message': '', 'render_file': render_file}
+
+
+def fail_orphaned_jobs(paths: dict) -> None:
+    """Reporta como fallidos los trabajos que quedaron en working/ tras una caída."""
+    for name in sorted(os.listdir(paths['working'])):
+        if not name.endswith(JOB_SUFFIX):
+            continue
+        job_id = name[:-len(JOB_SUFFIX)]
+        write_kv_file(os.path.join(paths['done'], job_id + STATUS_SUFFIX), {
+            'job_id': job_id, 'status': 'error', 'message': "El worker se reinició durante el trabajo"
+        })
+        os.unlink(os.path.join(paths['working'], name))
+
+
+def serve(queue_dir: str, poll_interval: float = 0.2, render_seconds: float = 0.0) -> int:
+    """Atiende la cola hasta que aparece el archivo stop. Retorna trabajos procesados."""
+    paths = ensure_queue_dirs(queue_dir)
+    fail_orphaned_jobs(paths)
+    processed = 0
+    last_beat = 0.0
+    while not os.path.exists(paths['stop']):
+        now = time.monotonic()
+        if now - last_beat >= 1.0:
+            write_kv_file(paths['heartbeat'], {'pid': os.getpid(), 'jobs': processed, 'worker': 'stub'})
+            last_beat = now
+
+        pending = sorted(n for n in os.listdir(paths['inbox']) if n.endswith(JOB_SUFFIX))
+        if not pending:
+            time.sleep(poll_interval)
+            continue
+
+        name = pending[0]
+        job_path = os.path.join(paths['working'], name)
+        try:
+            os.replace(os.path.join(paths['inbox'], name), job_path)
+        except OSError:
+            continue
+        job = read_kv_file(job_path) or {}
+        job_id = job.get('job_id', name[:-len(JOB_SUFFIX)])
+        started = time.monotonic()
+        try:
+            result = render_job(job, render_seconds)
+        except Exception as e:
+            result = {'status': 'error', 'message': str(e)}
+        result.update({'job_id': job_id, 'elapsed': f"{time.monotonic() - started:.3f}"})
+        write_kv_file(os.path.join(paths['done'], job_id + STATUS_SUFFIX), result)
+        os.unlink(job_path)
+        processed += 1
+        last_beat = 0.0
+    try:
+        os.unlink(paths['heartbeat'])
+    except OSError:
+        pass
+    return processed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--queue-dir', default=REAPER_QUEUE_DIR)
+    parser.add_argument('--poll-interval', type=float, default=0.2)
+    parser.add_argument('--render-seconds', type=float, default=float(os.getenv("REAPER_STUB_RENDER_SECONDS", "0")),
+                        help="Duración simulada de cada render")
+    args = parser.parse_args()
+    try:
+        processed = serve(args.queue_dir, args.poll_interval, args.render_seconds)
+    except KeyboardInterrupt:
+        return
+    print(f"Worker simulado detenido: {processed} trabajos")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,86 @@
+-- ReaScript para renderizar una sesión ya armada por AudioPro
+-- AudioPro v1.7 - Reaper Edition
+-- rpp_project.py escribe el .rpp completo (audio en la pista "Clase",
+-- selección de tiempo y configuración de render); este script solo abre
+-- la sesión, renderiza y escribe el testigo .done que espera AudioPro.
+-- En un lote por regiones "render_files" trae todos los WAV que produce
+-- el render (separados por "|"), y cada uno recibe su testigo.
+
+local session_name = reaper.GetExtState("AudioPro", "session_name")
+local render_file = reaper.GetExtState("AudioPro", "render_file")
+local render_files_list = reaper.GetExtState("AudioPro", "render_files")
+
+reaper.ShowConsoleMsg("=== AudioPro v1.7 - Render de sesión preparada ===\n")
+reaper.ShowConsoleMsg("Session name: " .. session_name .. "\n")
+reaper.ShowConsoleMsg("Render file: " .. render_file .. "\n")
+
+-- Modo sin diálogos: lo activa reaper_worker.lua, que lee el error de ExtState
+local headless = reaper.GetExtState("AudioPro", "headless") == "1"
+
+local function show_message(msg, title)
+    if headless then
+        reaper.ShowConsoleMsg(title .. ": " .. msg .. "\n")
+        if title == "AudioPro Error" then
+            reaper.SetExtState("AudioPro", "last_error", msg, false)
+        end
+    else
+        reaper.MB(msg, title, 0)
+    end
+end
+
+if session_name == "" or render_file == "" then
+    show_message("Error: Faltan parámetros (sesión y archivo de render)", "AudioPro Error")
+    return
+end
+
+if not reaper.file_exists(session_name) then
+    show_message("Error: La sesión no existe: " .. session_name, "AudioPro Error")
+    return
+end
+
+local render_files = {}
+for path in render_files_list:gmatch("[^|]+") do
+    render_files[#render_files + 1] = path
+end
+if #render_files == 0 then
+    render_files[1] = render_file
+end
+
+local function sentinel_path(path)
+    return (path:gsub("%.[wW][aA][vV]$", "")) .. ".done"
+end
+
+-- noprompt: no preguntar por guardar el proyecto anterior
+reaper.Main_openProject("noprompt:" .. session_name)
+
+-- Testigo de fin de render: AudioPro lo espera en lugar de adivinar con pausas fijas
+for _, path in ipairs(render_files) do
+    os.remove(sentinel_path(path))
+end
+
+-- La configuración de render viene en la sesión; 42230 cierra el diálogo al terminar
+reaper.Main_OnCommand(42230, 0) -- File: Render project, using the most recent render settings, auto-close render dialog
+
+-- El render es síncrono: al volver, los WAV ya están cerrados
+local missing = {}
+for _, path in ipairs(render_files) do
+    local render_ok = reaper.file_exists(path)
+    if not render_ok then
+        missing[#missing + 1] = path
+    end
+    local sentinel = io.open(sentinel_path(path), "w")
+    if sentinel then
+        sentinel:write("status=" .. (render_ok and "ok" or "missing") .. "\n")
+        sentinel:write("render=" .. path .. "\n")
+        sentinel:write("finished=" .. os.date("%Y-%m-%dT%H:%M:%S") .. "\n")
+        sentinel:close()
+        reaper.ShowConsoleMsg("Testigo de render escrito: " .. sentinel_path(path) .. "\n")
+    end
+end
+
+if #missing > 0 then
+    show_message("Error: Reaper no generó el render: " .. table.concat(missing, ", "), "AudioPro Error")
+    return
+end
+
+reaper.ShowConsoleMsg("=== Render completado ===\n")
@@ -0,0 +1,168 @@
+"""
+Detección de fin de render para AudioPro v1.7
+Espera el WAV renderizado por Reaper usando eventos del sistema de archivos
+"""
+
+import os
+import threading
+import time
+from typing import Callable, Optional
+
+from wav_io import is_wav_complete
+
+# Intervalo de verificación cuando no hay eventos (o watchdog no está instalado)
+RENDER_POLL_INTERVAL = float(os.getenv("RENDER_POLL_INTERVAL", "0.5"))
+
+# Extensión del archivo testigo que escribe add_audio_to_session.lua al terminar
+SENTINEL_SUFFIX = ".done"
+
+
+class RenderTimeoutError(Exception):
+    """El render no terminó dentro del tiempo máximo."""
+
+
+class RenderFailedError(Exception):
+    """El testigo del render indica que Reaper no generó el archivo."""
+
+
+def sentinel_path(render_path: str) -> str:
+    """Ruta del archivo testigo que acompaña a un render terminado."""
+    return os.path.splitext(render_path)[0] + SENTINEL_SUFFIX
+
+
+def read_sentinel(render_path: str) -> Optional[dict]:
+    """Lee el testigo de un render (líneas clave=valor) si existe.
+
+    Args:
+        render_path: Ruta del WAV renderizado
+
+    Returns:
+        Dict con los campos del testigo, o None si todavía no existe
+    """
+    path = sentinel_path(render_path)
+    try:
+        with open(path, 'r', encoding='utf-8', errors='ignore') as f:
+            lines = f.read().splitlines()
+    except OSError:
+        return None
+    manifest = {}
+    for line in lines:
+        if '=' in line:
+            key, value = line.split('=', 1)
+            manifest[key.strip()] = value.strip()
+    return manifest
+
+
+def is_render_complete(render_path: str, require_sentinel: bool = False) -> bool:
+    """True si el render existe, su cabecera WAV es coherente y (opcional) hay testigo.
+
+    Args:
+        render_path: Ruta del WAV renderizado
+        require_sentinel: Exigir el archivo testigo además de la cabecera
+
+    Raises:
+        RenderFailedError si el testigo existe pero reporta un fallo
+    """
+    if require_sentinel:
+        manifest = read_sentinel(render_path)
+        if manifest is None:
+            return False
+        if manifest.get('status', 'ok') != 'ok':
+            raise RenderFailedError(f"Reaper reportó '{manifest.get('status')}' para {render_path}")
+    return os.path.exists(render_path) and is_wav_complete(render_path)
+
+
+class _DirectoryEvents:
+    """Señal que se activa con cualquier evento en un directorio (vía watchdog)."""
+
+    def __init__(self, directory: str, names):
+        self.event = threading.Event()
+        self._observer = None
+        self._names = set(names)
+        try:
+            from watchdog.events import FileSystemEventHandler
+            from watchdog.observers import Observer
+        except ImportError:
+            return
+
+        signal = self
+
+        class _Handler(FileSystemEventHandler):
+            def on_any_event(self, event):
+                paths = [getattr(event, 'src_path', ''), getattr(event, 'dest_path', '')]
+                if any(os.path.basename(str(p)) in signal._names for p in paths if p):
+                    signal.event.set()
+
+        try:
+            self._observer = Observer()
+            self._observer.schedule(_Handler(), directory, recursive=False)
+            self._observer.start()
+        except Exception:
+            self._observer = None
+
+    @property
+    def active(self) -> bool:
+        return self._observer is not None
+
+    def wait(self, timeout: float) -> None:
+        self.event.wait(timeout)
+        self.event.clear()
+
+    def stop(self) -> None:
+        if self._observer:
+            self._observer.stop()
+            self._observer.join(timeout=2)
+
+
+def wait_for_render(
+    render_path: str,
+    timeout: float = 600,
+    require_sentinel: bool = False,
+    on_progress: Optional[Callable[[float], None]] = None,
+    progress_every: float = 30
+) -> str:
+    """Espera a que Reaper termine de escribir el render y retorna su ruta.
+
+    Con watchdog instalado reacciona a los eventos del directorio; sin él
+    verifica cada RENDER_POLL_INTERVAL segundos. En ambos casos el render se
+    da por terminado solo cuando los tamaños RIFF/data coinciden con el
+    archivo, así que nunca se entrega un WAV a medio escribir.
+
+    Args:
+        render_path: Ruta esperada del WAV renderizado
+        timeout: Segundos máximos de espera
+        require_sentinel: Exigir el testigo .done de add_audio_to_session.lua
+        on_progress: Callback opcional con los segundos transcurridos
+        progress_every: Cada cuántos segundos llamar a on_progress
+
+    Returns:
+        Ruta del WAV renderizado
+
+    Raises:
+        RenderTimeoutError si el render no termina a tiempo
+        RenderFailedError si el testigo reporta que el render falló
+    """
+    directory = os.path.dirname(os.path.abspath(render_path)) or '.'
+    os.makedirs(directory, exist_ok=True)
+    names = {os.path.basename(render_path), os.path.basename(sentinel_path(render_path))}
+    events = _DirectoryEvents(directory, names)
+
+    start = time.monotonic()
+    next_progress = progress_every
+    try:
+        while True:
+            if is_render_complete(render_path, require_sentinel):
+                return render_path
+
+            elapsed = time.monotonic() - start
+            if elapsed >= timeout:
+                raise RenderTimeoutError(f"Timeout esperando render: {render_path}")
+            if on_progress and elapsed >= next_progress:
+                on_progress(elapsed)
+                next_progress += progress_every
+
+            # Con eventos se despierta al instante; el intervalo es solo un respaldo
+            wait = RENDER_POLL_INTERVAL * (4 if events.active else 1)
+            events.wait(min(wait, max(0.0, timeout - elapsed)))
+    finally:
+        events.stop()
@@ -0,0 +1,431 @@
+"""
+Lectura y escritura de proyectos de Reaper (.rpp) para AudioPro v1.7
+
+Un .rpp es texto: bloques "<TAG parámetros" ... ">" anidados con líneas
+de atributos ("CLAVE valor valor"); los datos binarios de plugins van como
+líneas base64 dentro de sus bloques y se conservan tal cual. El template se
+parsea una vez (caché por ruta + mtime) y cada sesión se arma en Python con
+el ítem de audio, la selección de tiempo y la configuración de render ya
+puestos: Reaper solo tiene que abrir el proyecto y renderizar.
+"""
+
+import copy
+import os
+import threading
+import uuid
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple, Union
+
+# Pista del template donde va el audio de la clase (se busca sin distinguir mayúsculas)
+CLASS_TRACK_NAME = "Clase"
+
+# Render igual al que configuraba add_audio_to_session.lua: WAV 24-bit, 48 kHz
+# mono, mezcla master, límites = selección de tiempo, 1 s de cola, resample sinc
+RENDER_SETTINGS = {
+    'sample_rate': 48000,
+    'channels': 1,
+    'format_cfg': "ZXZhdxgAAAA=",  # RENDER_CFG: WAV 24-bit PCM
+    'tail_ms': 1000,
+    'resample': 2,
+}
+
+# RENDER_RANGE: límites (2 = selección de tiempo, 3 = todas las regiones) y
+# máscara de cola por tipo de límite (4 = selección de tiempo, 8 = regiones)
+RENDER_BOUNDS_TIME_SELECTION = 2
+RENDER_BOUNDS_ALL_REGIONS = 3
+RENDER_TAIL_MASK = 4 | 8
+
+# Patrón de nombre de Reaper: un WAV por región, con el nombre de la región
+REGION_PATTERN = "$region"
+
+
+class RppError(Exception):
+    """El .rpp no se pudo leer o no tiene lo que el pipeline necesita."""
+
+
+def tokenize(line: str) -> List[str]:
+    """Separa una línea de .rpp en tokens (comillas ", ' o ` agrupan espacios)."""
+    tokens = []
+    i, n = 0, len(line)
+    while i < n:
+        while i < n and line[i] in ' \t':
+            i += 1
+        if i >= n:
+            break
+        if line[i] in '"\'`':
+            quote_char = line[i]
+            end = line.find(quote_char, i + 1)
+            if end < 0:
+                end = n
+            tokens.append(line[i + 1:end])
+            i = end + 1
+        else:
+            start = i
+            while i < n and line[i] not in ' \t':
+                i += 1
+            tokens.append(line[start:i])
+    return tokens
+
+
+def quote(value: object) -> str:
+    """Token listo para escribir: números tal cual, texto entre comillas que no contenga."""
+    if isinstance(value, float):
+        return repr(round(value, 10))
+    if isinstance(value, int):
+        return str(value)
+    text = str(value)
+    if text and not any(c in text for c in ' \t"\'`'):
+        return text
+    for quote_char in '"\'`':
+        if quote_char not in text:
+            return f"{quote_char}{text}{quote_char}"
+    # Reaper no tiene escape: el último recurso es cambiar las comillas invertidas
+    return f"`{text.replace('`', chr(39))}`"
+
+
+def new_guid() -> str:
+    """GUID con el formato de Reaper ({XXXXXXXX-XXXX-...})."""
+    return "{" + str(uuid.uuid4()).upper() + "}"
+
+
+class RppNode:
+    """Bloque <TAG ...> de un .rpp con sus líneas hijas (atributos, datos o bloques).
+
+    Las líneas de atributos y datos se guardan como texto sin indentar (y la
+    cabecera original del bloque), así que lo que no se modifica se escribe
+    exactamente como se leyó.
+    """
+
+    def __init__(self, tag: str, params: Optional[List[str]] = None,
+                 children: Optional[List[Union['RppNode', str]]] = None, header: Optional[str] = None):
+        self.tag = tag
+        self.params = list(params or [])
+        self.children: List[Union[RppNode, str]] = list(children or [])
+        self._header = (header, list(self.params)) if header is not None else None
+
+    def __repr__(self) -> str:
+        return f"RppNode({self.tag!r}, {len(self.children)} hijos)"
+
+    def nodes(self, tag: Optional[str] = None) -> Iterator['RppNode']:
+        """Bloques hijos directos (opcionalmente solo los de un tag)."""
+        for child in self.children:
+            if isinstance(child, RppNode) and (tag is None or child.tag == tag):
+                yield child
+
+    def find(self, tag: str) -> Optional['RppNode']:
+        """Primer bloque hijo con ese tag, o None."""
+        return next(self.nodes(tag), None)
+
+    def _attribute_index(self, key: str) -> Optional[int]:
+        for index, child in enumerate(self.children):
+            if isinstance(child, str) and (child == key or child.startswith(key + ' ')):
+                return index
+        return None
+
+    def get(self, key: str) -> Optional[List[str]]:
+        """Valores de la línea de atributo KEY (sin la clave), o None si no está."""
+        index = self._attribute_index(key)
+        if index is None:
+            return None
+        return tokenize(self.children[index])[1:]
+
+    def set(self, key: str, *values: object) -> None:
+        """Reemplaza (o agrega antes del primer bloque hijo) la línea KEY valores..."""
+        line = ' '.join([key] + [quote(v) for v in values])
+        index = self._attribute_index(key)
+        if index is not None:
+            self.children[index] = line
+            return
+        first_node = next((i for i, c in enumerate(self.children) if isinstance(c, RppNode)), len(self.children))
+        self.children.insert(first_node, line)
+
+    def insert_before(self, tag: str, lines: Sequence[str]) -> None:
+        """Inserta líneas de atributo antes del primer bloque hijo con ese tag (o al final)."""
+        index = next((i for i, c in enumerate(self.children) if isinstance(c, RppNode) and c.tag == tag),
+                     len(self.children))
+        self.children[index:index] = list(lines)
+
+    def remove(self, key: str) -> None:
+        """Elimina todas las líneas de atributo KEY."""
+        self.children = [c for c in self.children
+                         if not (isinstance(c, str) and (c == key or c.startswith(key + ' ')))]
+
+    def set_node(self, node: 'RppNode') -> None:
+        """Reemplaza el primer bloque hijo con el mismo tag (o lo agrega al final)."""
+        for index, child in enumerate(self.children):
+            if isinstance(child, RppNode) and child.tag == node.tag:
+                self.children[index] = node
+                return
+        self.children.append(node)
+
+    def append(self, child: Union['RppNode', str]) -> None:
+        self.children.append(child)
+
+    def shallow_copy(self) -> 'RppNode':
+        """Copia del bloque que comparte los bloques hijos (para editar solo este nivel)."""
+        node = RppNode(self.tag, self.params, self.children)
+        node._header = self._header
+        return node
+
+    def lines(self, depth: int = 0) -> Iterator[str]:
+        """Líneas del bloque con la indentación de Reaper (dos espacios por nivel)."""
+        pad = '  ' * depth
+        if self._header is not None and self._header[1] == self.params:
+            yield pad + self._header[0]
+        else:
+            yield pad + ' '.join(['<' + self.tag] + [quote(p) for p in self.params])
+        for child in self.children:
+            if isinstance(child, RppNode):
+                yield from child.lines(depth + 1)
+            else:
+                yield pad + '  ' + child
+        yield pad + '>'
+
+
+def parse_rpp(text: str) -> RppNode:
+    """Parsea el texto de un .rpp y retorna el bloque raíz (REAPER_PROJECT).
+
+    Raises:
+        RppError si los bloques no están balanceados
+    """
+    root = None
+    stack: List[RppNode] = []
+    for raw in text.splitlines():
+        line = raw.strip()
+        if not line:
+            continue
+        if line.startswith('<'):
+            tokens = tokenize(line[1:])
+            node = RppNode(tokens[0] if tokens else '', tokens[1:], header=line)
+            if stack:
+                stack[-1].append(node)
+            elif root is None:
+                root = node
+            else:
+                raise RppError("Hay más de un bloque raíz en el proyecto")
+            stack.append(node)
+        elif line == '>':
+            if not stack:
+                raise RppError("Cierre '>' sin bloque abierto")
+            stack.pop()
+        elif stack:
+            stack[-1].append(line)
+    if root is None:
+        raise RppError("El archivo no contiene un proyecto de Reaper")
+    if stack:
+        raise RppError(f"Bloque <{stack[-1].tag} sin cerrar")
+    return root
+
+
+def format_rpp(root: RppNode) -> str:
+    """Texto del proyecto listo para guardar."""
+    return '\n'.join(root.lines()) + '\n'
+
+
+_template_cache: Dict[str, Tuple[Tuple[int, int], RppNode]] = {}
+_template_lock = threading.Lock()
+
+
+def template_version(path: str) -> Optional[Tuple[int, int]]:
+    """(mtime_ns, tamaño) del template: cambia cada vez que se guarda en Reaper. None si no existe."""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+def _cached_template(path: str) -> RppNode:
+    """Template parseado una vez por ruta y versión del archivo (compartido: no modificar)."""
+    version = template_version(path)
+    if version is None:
+        raise RppError(f"Template no encontrado: {path}")
+    key = os.path.abspath(path)
+    with _template_lock:
+        cached = _template_cache.get(key)
+        if cached is None or cached[0] != version:
+            with open(path, 'r', encoding='utf-8', errors='ignore') as f:
+                cached = (version, parse_rpp(f.read()))
+            _template_cache[key] = cached
+    return cached[1]
+
+
+def load_template(path: str) -> RppNode:
+    """Copia editable del template (parseado una sola vez, ver _cached_template).
+
+    Raises:
+        RppError si el template no existe o no se puede parsear
+    """
+    return copy.deepcopy(_cached_template(path))
+
+
+def find_track(project: RppNode, name: str = CLASS_TRACK_NAME) -> RppNode:
+    """Pista del proyecto por nombre (sin distinguir mayúsculas).
+
+    Raises:
+        RppError si no existe
+    """
+    for track in project.nodes('TRACK'):
+        values = track.get('NAME')
+        if values and values[0].lower() == name.lower():
+            return track
+    raise RppError(f"No se encontró la pista '{name}' en el template")
+
+
+def media_item(audio_file: str, position: float, length: float, name: Optional[str] = None) -> RppNode:
+    """Ítem de audio con una toma WAVE, como el que crea AddMediaItemToTrack + PCM_Source_CreateFromFile."""
+    item = RppNode('ITEM')
+    item.set('POSITION', float(position))
+    item.set('SNAPOFFS', 0)
+    item.set('LENGTH', float(length))
+    item.set('LOOP', 0)
+    item.set('ALLTAKES', 0)
+    item.set('FADEIN', 1, 0, 0, 1, 0, 0, 0)
+    item.set('FADEOUT', 1, 0, 0, 1, 0, 0, 0)
+    item.set('MUTE', 0, 0)
+    item.set('SEL', 0)
+    item.set('IGUID', new_guid())
+    item.set('IID', 1)
+    item.set('NAME', name or os.path.basename(audio_file))
+    item.set('VOLPAN', 1, 0, 1, -1)
+    item.set('SOFFS', 0)
+    item.set('PLAYRATE', 1, 1, 0, -1, 0, 0.0025)
+    item.set('CHANMODE', 0)
+    item.set('GUID', new_guid())
+    item.append(RppNode('SOURCE', ['WAVE'], [f"FILE {quote(audio_file)}"]))
+    return item
+
+
+def apply_render_settings(project: RppNode, render_dir: str, pattern: str, bounds: int,
+                          start: float = 0.0, end: float = 0.0,
+                          settings: Optional[dict] = None) -> None:
+    """Escribe la configuración de render del proyecto (lo que antes hacía GetSetProjectInfo)."""
+    settings = settings or RENDER_SETTINGS
+    project.set('RENDER_FILE', render_dir)
+    project.set('RENDER_PATTERN', pattern)
+    project.set('RENDER_FMT', 0, settings['channels'], settings['sample_rate'])
+    project.set('RENDER_1X', 0)
+    project.set('RENDER_RANGE', bounds, float(start), float(end), RENDER_TAIL_MASK, settings['tail_ms'])
+    project.set('RENDER_RESAMPLE', settings['resample'], 0, 1)
+    project.set('RENDER_ADDTOPROJ', 0)
+    project.set('RENDER_STEMS', 0)
+    project.set('RENDER_DITHER', 0)
+    project.set_node(RppNode('RENDER_CFG', children=[settings['format_cfg']]))
+
+
+def _editable_template(template_path: str, track_name: str) -> Tuple[RppNode, RppNode]:
+    """(proyecto, pista) editables a partir del template en caché.
+
+    Solo se copian los bloques que cambian; el resto de las pistas y los
+    datos de plugins se comparten con la caché.
+    """
+    project = _cached_template(template_path).shallow_copy()
+    track = find_track(project, track_name)
+    project.children[project.children.index(track)] = track = track.shallow_copy()
+    return project, track
+
+
+def build_render_session(template_path: str, audio_file: str, length: float, render_file: str,
+                         track_name: str = CLASS_TRACK_NAME, settings: Optional[dict] = None) -> RppNode:
+    """Proyecto listo para renderizar: template + ítem en la pista + selección + render.
+
+    Args:
+        template_path: Template .rpp (se parsea una vez y queda en caché)
+        audio_file: WAV que va en la pista
+        length: Duración del audio en segundos
+        render_file: WAV que debe producir el render
+        track_name: Pista donde va el ítem
+        settings: Configuración de render (por defecto RENDER_SETTINGS)
+
+    Returns:
+        Bloque raíz del proyecto nuevo
+
+    Raises:
+        RppError si el template no se puede leer o no tiene la pista
+    """
+    project, track = _editable_template(template_path, track_name)
+    track.append(media_item(audio_file, 0.0, length))
+    project.set('SELECTION', 0.0, float(length))
+    project.set('SELECTION2', 0.0, float(length))
+    render_dir, render_name = os.path.split(render_file)
+    apply_render_settings(project, render_dir, os.path.splitext(render_name)[0],
+                          RENDER_BOUNDS_TIME_SELECTION, 0.0, length, settings)
+    return project
+
+
+def build_region_session(template_path: str, items: Sequence[Tuple[str, float, str]], render_dir: str,
+                         gap: float, track_name: str = CLASS_TRACK_NAME,
+                         settings: Optional[dict] = None) -> RppNode:
+    """Proyecto con varios audios en fila, cada uno en su región, que se renderiza en una pasada.
+
+    Cada región produce render_dir/<nombre de la región>.wav (patrón $region,
+    límites = todas las regiones, con la cola de render). Las regiones y
+    marcadores del template se descartan para no renderizar de más.
+
+    Args:
+        template_path: Template .rpp (se parsea una vez y queda en caché)
+        items: (archivo, duración en segundos, nombre de la región) en orden
+        render_dir: Carpeta donde Reaper escribe los renders
+        gap: Silencio entre ítems (debe superar la cola de render)
+        track_name: Pista donde van los ítems
+        settings: Configuración de render (por defecto RENDER_SETTINGS)
+
+    Returns:
+        Bloque raíz del proyecto nuevo
+
+    Raises:
+        RppError si el template no se puede leer o no tiene la pista
+    """
+    project, track = _editable_template(template_path, track_name)
+    project.remove('MARKER')
+    markers = []
+    position = 0.0
+    for index, (audio_file, length, name) in enumerate(items, 1):
+        track.append(media_item(audio_file, position, length))
+        markers.append(f"MARKER {index} {quote(float(position))} {quote(name)} 1")
+        markers.append(f"MARKER {index} {quote(float(position + length))} \"\" 1")
+        position += length + gap
+    end = max(0.0, position - gap)
+    project.insert_before('TRACK', markers)
+    project.set('SELECTION', 0.0, end)
+    project.set('SELECTION2', 0.0, end)
+    apply_render_settings(project, render_dir, REGION_PATTERN, RENDER_BOUNDS_ALL_REGIONS, 0.0, end, settings)
+    return project
+
+
+def regions(project: RppNode) -> List[Tuple[float, float, str]]:
+    """(inicio, fin, nombre) de las regiones del proyecto, en orden."""
+    starts: Dict[str, Tuple[float, str]] = {}
+    found = []
+    for child in project.children:
+        if not (isinstance(child, str) and child.startswith('MARKER ')):
+            continue
+        values = tokenize(child)[1:]
+        if len(values) < 4 or not int(values[3]) & 1:
+            continue
+        if values[0] in starts:
+            start, name = starts.pop(values[0])
+            found.append((start, float(values[1]), name))
+        else:
+            starts[values[0]] = (float(values[1]), values[2])
+    return sorted(found)
+
+
+def write_project(project: RppNode, session_path: str) -> str:
+    """Guarda el proyecto (en .part y con rename, nunca a medio escribir) y retorna la ruta."""
+    os.makedirs(os.path.dirname(os.path.abspath(session_path)), exist_ok=True)
+    part = f"{session_path}.{uuid.uuid4().hex[:8]}.part"
+    with open(part, 'w', encoding='utf-8', newline='\n') as f:
+        f.write(format_rpp(project))
+    os.replace(part, session_path)
+    return session_path
+
+
+def item_sources(project: RppNode, track_name: str = CLASS_TRACK_NAME) -> List[Tuple[float, float, str]]:
+    """(posición, duración, archivo) de los ítems de audio de una pista, en orden."""
+    items = []
+    for item in find_track(project, track_name).nodes('ITEM'):
+        source = item.find('SOURCE')
+        file_values = source.get('FILE') if source else None
+        if file_values:
+            items.append((float(item.get('POSITION')[0]), float(item.get('LENGTH')[0]), file_values[0]))
+    return sorted(items)
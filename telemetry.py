@@ -0,0 +1,339 @@
+"""
+Telemetría de AudioPro v1.7
+Spans con duración, bytes y resultado para cada etapa y cada llamada externa
+(ffmpeg, HTTP, Reaper), exportados como JSON lines y como métricas Prometheus
+"""
+
+import json
+import os
+import threading
+import time
+import uuid
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Iterator, List, Optional
+
+# Directorio de exportación (spans.jsonl y metrics.prom); TELEMETRY_ENABLED=0 no registra nada
+TELEMETRY_ENABLED = os.getenv("TELEMETRY_ENABLED", "1") == "1"
+TELEMETRY_DIR = os.getenv(
+    "AUDIOPRO_TELEMETRY_DIR",
+    os.path.join(os.path.expanduser("~"), ".audiopro", "telemetry")
+)
+
+# Puerto del endpoint /metrics (0 = solo archivo metrics.prom)
+TELEMETRY_METRICS_PORT = int(os.getenv("TELEMETRY_METRICS_PORT", "0"))
+
+# Spans que se conservan en memoria para los resúmenes por lote
+TELEMETRY_BUFFER = int(os.getenv("TELEMETRY_BUFFER", "20000"))
+
+# Muestras por operación para los cuantiles de Prometheus
+_QUANTILE_SAMPLES = 1024
+
+# Contexto del hilo actual (lote y archivo); los spans lo heredan
+_context = threading.local()
+
+
+def new_batch_id() -> str:
+    """Identificador de un lote: marca de tiempo legible + sufijo aleatorio."""
+    return f"{datetime.now().strftime('%Y%m%d_%H%M%S')}_{uuid.uuid4().hex[:6]}"
+
+
+def current_context() -> Dict[str, Optional[str]]:
+    """Lote, archivo y etapa asociados al hilo actual."""
+    return dict(getattr(_context, 'values', None) or {})
+
+
+@contextmanager
+def use_context(**values) -> Iterator[None]:
+    """Asocia lote/archivo/etapa a los spans que se abran en este hilo.
+
+    Los pools de hilos no heredan el contexto: quien reparte trabajo debe
+    capturarlo con current_context() y restaurarlo en cada tarea.
+    """
+    previous = getattr(_context, 'values', None)
+    merged = dict(previous or {})
+    merged.update({k: v for k, v in values.items() if v is not None})
+    _context.values = merged
+    try:
+        yield
+    finally:
+        _context.values = previous
+
+
+def file_size(path: Optional[str]) -> Optional[int]:
+    """Tamaño de un archivo o None si no existe (para bytes_in/bytes_out)."""
+    try:
+        return os.path.getsize(path) if path else None
+    except OSError:
+        return None
+
+
+class Span:
+    """Una operación medida. Se crea con Telemetry.span, no directamente.
+
+    bytes_in son los bytes que la operación consume (lee o sube) y
+    bytes_out los que produce (escribe o descarga).
+    """
+
+    def __init__(self, name: str, attrs: dict):
+        self.name = name
+        self.attrs = attrs
+        self.bytes_in: Optional[int] = None
+        self.bytes_out: Optional[int] = None
+        self.outcome = 'ok'
+        self.error: Optional[str] = None
+        self.start = time.time()
+        self._t0 = time.perf_counter()
+        self.duration_s = 0.0
+
+    def set(self, bytes_in: Optional[int] = None, bytes_out: Optional[int] = None,
+            outcome: Optional[str] = None, **attrs) -> None:
+        """Completa el span con bytes, un resultado distinto de 'ok' o atributos."""
+        if bytes_in is not None:
+            self.bytes_in = bytes_in
+        if bytes_out is not None:
+            self.bytes_out = bytes_out
+        if outcome is not None:
+            self.outcome = outcome
+        self.attrs.update(attrs)
+
+    def to_dict(self) -> dict:
+        record = {
+            'name': self.name,
+            'start': datetime.fromtimestamp(self.start).isoformat(timespec='milliseconds'),
+            'duration_s': round(self.duration_s, 6),
+            'bytes_in': self.bytes_in,
+            'bytes_out': self.bytes_out,
+            'outcome': self.outcome,
+        }
+        if self.error:
+            record['error'] = self.error
+        record.update(self.attrs)
+        return record
+
+
+class Telemetry:
+    """Registro de spans del proceso.
+
+    Cada span terminado se agrega a spans.jsonl, actualiza los acumulados
+    por operación (para Prometheus) y queda en un buffer en memoria para
+    el resumen por lote.
+
+    Args:
+        export_dir: Directorio de spans.jsonl y metrics.prom (None = solo memoria)
+        buffer_size: Spans que se conservan en memoria
+    """
+
+    def __init__(self, export_dir: Optional[str] = TELEMETRY_DIR, buffer_size: int = TELEMETRY_BUFFER):
+        self.export_dir = export_dir
+        self.enabled = TELEMETRY_ENABLED
+        self.jsonl_path = os.path.join(export_dir, "spans.jsonl") if export_dir else None
+        self.prom_path = os.path.join(export_dir, "metrics.prom") if export_dir else None
+        self._spans: deque = deque(maxlen=buffer_size)
+        self._totals: Dict[str, dict] = {}
+        self._lock = threading.Lock()
+        self._server: Optional[ThreadingHTTPServer] = None
+        if export_dir and self.enabled:
+            os.makedirs(export_dir, exist_ok=True)
+
+    @contextmanager
+    def span(self, name: str, **attrs) -> Iterator[Span]:
+        """Mide el bloque como un span; una excepción lo marca como 'error' y se propaga.
+
+        Uso:
+            with telemetry.span('ffmpeg', bytes_in=size) as s:
+                ...
+                s.set(bytes_out=file_size(output))
+        """
+        bytes_in = attrs.pop('bytes_in', None)
+        values = current_context()
+        values.update(attrs)
+        span = Span(name, values)
+        span.bytes_in = bytes_in
+        try:
+            yield span
+        except BaseException as e:
+            span.outcome = 'error'
+            span.error = f"{type(e).__name__}: {e}"[:500]
+            raise
+        finally:
+            span.duration_s = time.perf_counter() - span._t0
+            self._finish(span)
+
+    def _finish(self, span: Span) -> None:
+        if not self.enabled:
+            return
+        record = span.to_dict()
+        with self._lock:
+            self._spans.append(record)
+            totals = self._totals.setdefault(span.name, {
+                'count': 0, 'errors': 0, 'seconds': 0.0, 'bytes_in': 0, 'bytes_out': 0,
+                'samples': deque(maxlen=_QUANTILE_SAMPLES)
+            })
+            totals['count'] += 1
+            totals['errors'] += span.outcome != 'ok'
+            totals['seconds'] += span.duration_s
+            totals['bytes_in'] += span.bytes_in or 0
+            totals['bytes_out'] += span.bytes_out or 0
+            totals['samples'].append(span.duration_s)
+            if self.jsonl_path:
+                try:
+                    with open(self.jsonl_path, 'a', encoding='utf-8') as f:
+                        f.write(json.dumps(record, ensure_ascii=False) + "\n")
+                except OSError:
+                    pass
+
+    def spans(self, batch_id: Optional[str] = None) -> List[dict]:
+        """Spans en memoria, opcionalmente solo los de un lote."""
+        with self._lock:
+            records = list(self._spans)
+        if batch_id is None:
+            return records
+        return [r for r in records if r.get('batch_id') == batch_id]
+
+    def summary(self, batch_id: Optional[str] = None) -> List[dict]:
+        """Tabla por operación: cantidad, errores, tiempos (total/p50/p95/máx) y MB movidos."""
+        groups: Dict[str, List[dict]] = {}
+        for record in self.spans(batch_id):
+            groups.setdefault(record['name'], []).append(record)
+
+        rows = []
+        for name, records in groups.items():
+            durations = sorted(r['duration_s'] for r in records)
+            rows.append({
+                'operación': name,
+                'n': len(records),
+                'errores': sum(r['outcome'] != 'ok' for r in records),
+                'total_s': round(sum(durations), 2),
+                'p50_s': round(_quantile(durations, 0.5), 3),
+                'p95_s': round(_quantile(durations, 0.95), 3),
+                'max_s': round(durations[-1], 3),
+                'MB_entrada': round(sum(r['bytes_in'] or 0 for r in records) / (1024 * 1024), 1),
+                'MB_salida': round(sum(r['bytes_out'] or 0 for r in records) / (1024 * 1024), 1)
+            })
+        return sorted(rows, key=lambda r: r['total_s'], reverse=True)
+
+    def prometheus_text(self) -> str:
+        """Métricas acumuladas del proceso en formato de exposición de Prometheus."""
+        with self._lock:
+            totals = {name: dict(t, samples=sorted(t['samples'])) for name, t in self._totals.items()}
+
+        lines = [
+            "# HELP audiopro_span_duration_seconds Duración de las operaciones del pipeline",
+            "# TYPE audiopro_span_duration_seconds summary"
+        ]
+        for name, t in sorted(totals.items()):
+            for q in (0.5, 0.95):
+                lines.append(f'audiopro_span_duration_seconds{{span="{name}",quantile="{q}"}} '
+                             f'{_quantile(t["samples"], q):.6f}')
+            lines.append(f'audiopro_span_duration_seconds_sum{{span="{name}"}} {t["seconds"]:.6f}')
+            lines.append(f'audiopro_span_duration_seconds_count{{span="{name}"}} {t["count"]}')
+        for metric, key, help_text in (
+            ('audiopro_span_errors_total', 'errors', "Operaciones que terminaron con error"),
+            ('audiopro_span_bytes_in_total', 'bytes_in', "Bytes consumidos (leídos o subidos)"),
+            ('audiopro_span_bytes_out_total', 'bytes_out', "Bytes producidos (escritos o descargados)"),
+        ):
+            lines.append(f"# HELP {metric} {help_text}")
+            lines.append(f"# TYPE {metric} counter")
+            for name, t in sorted(totals.items()):
+                lines.append(f'{metric}{{span="{name}"}} {t[key]}')
+        return "\n".join(lines) + "\n"
+
+    def export_prometheus(self) -> Optional[str]:
+        """Escribe metrics.prom (para el textfile collector de node_exporter). Retorna la ruta."""
+        if not self.prom_path or not self.enabled:
+            return None
+        tmp = self.prom_path + ".tmp"
+        with open(tmp, 'w', encoding='utf-8') as f:
+            f.write(self.prometheus_text())
+        os.replace(tmp, self.prom_path)
+        return self.prom_path
+
+    def serve_metrics(self, port: int, host: str = '0.0.0.0') -> ThreadingHTTPServer:
+        """Inicia (una vez) un endpoint HTTP /metrics en un hilo de fondo."""
+        with self._lock:
+            if self._server is not None:
+                return self._server
+            telemetry = self
+
+            class _MetricsHandler(BaseHTTPRequestHandler):
+                def log_message(self, format, *args):  # noqa: A002 - firma de BaseHTTPRequestHandler
+                    pass
+
+                def do_GET(self):
+                    if self.path.split('?')[0].rstrip('/') != '/metrics':
+                        self.send_error(404)
+                        return
+                    payload = telemetry.prometheus_text().encode('utf-8')
+                    self.send_response(200)
+                    self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+                    self.send_header('Content-Length', str(len(payload)))
+                    self.end_headers()
+                    self.wfile.write(payload)
+
+            self._server = ThreadingHTTPServer((host, port), _MetricsHandler)
+            self._server.daemon_threads = True
+            threading.Thread(target=self._server.serve_forever, name="audiopro-metrics", daemon=True).start()
+            return self._server
+
+
+def _quantile(ordered: List[float], q: float) -> float:
+    if not ordered:
+        return 0.0
+    pos = (len(ordered) - 1) * q
+    low = int(pos)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (pos - low)
+
+
+_telemetry: Optional[Telemetry] = None
+_telemetry_lock = threading.Lock()
+
+
+def get_telemetry() -> Telemetry:
+    """Registro compartido por todo el proceso (inicia /metrics si TELEMETRY_METRICS_PORT > 0)."""
+    global _telemetry
+    with _telemetry_lock:
+        if _telemetry is None:
+            _telemetry = Telemetry()
+            if TELEMETRY_METRICS_PORT and _telemetry.enabled:
+                try:
+                    _telemetry.serve_metrics(TELEMETRY_METRICS_PORT)
+                except OSError:
+                    # Puerto ocupado (p. ej. otra instancia de la app): queda el archivo .prom
+                    pass
+        return _telemetry
+
+
+def span(name: str, **attrs):
+    """Atajo de get_telemetry().span(...)."""
+    return get_telemetry().span(name, **attrs)
+
+
+def traced_stage(name: str, fn, input_key: Optional[str] = None, output_key: Optional[str] = None):
+    """Envuelve una etapa del pipeline en un span 'stage.<name>'.
+
+    El contexto (lote y archivo) sale del propio trabajo, así que funciona
+    igual en process_with_reaper_pipeline, run_batch y el motor por etapas.
+
+    Args:
+        name: Nombre de la etapa
+        fn: Función de la etapa (recibe y retorna el estado del trabajo)
+        input_key / output_key: Claves del trabajo con las rutas que la etapa
+            lee y escribe (para bytes_in / bytes_out)
+    """
+    def _stage(job: dict):
+        with use_context(batch_id=job.get('batch_id'), file=job.get('name'), stage=name):
+            with span(f"stage.{name}") as s:
+                s.set(bytes_in=file_size(job.get(input_key)) if input_key else None)
+                result = fn(job)
+                if input_key and s.bytes_in is None:
+                    s.set(bytes_in=file_size(result.get(input_key)))
+                if output_key:
+                    s.set(bytes_out=file_size(result.get(output_key)))
+                return result
+    _stage.__name__ = getattr(fn, '__name__', name)
+    _stage.__doc__ = fn.__doc__
+    return _stage
@@ -0,0 +1,134 @@
+"""
+Puente entre el pipeline de AudioPro v1.7 y la interfaz
+El pipeline reporta su avance con st.info / st.success / st.warning / st.error
+sin depender de Streamlit: en la app los mensajes van a la página y en la
+línea de comandos (cli.py) al manejador instalado con set_message_handler.
+Streamlit solo se importa si algo realmente lo usa.
+"""
+
+import os
+import sys
+import threading
+from typing import Callable, Optional
+
+MESSAGE_LEVELS = ('info', 'success', 'warning', 'error')
+
+# Manejador (nivel, mensaje) para ejecución sin Streamlit; None = usar Streamlit
+_handler: Optional[Callable[[str, str], None]] = None
+_handler_lock = threading.Lock()
+
+# Interruptores de sesión sin interfaz (equivalen a st.session_state en la app)
+_flags: dict = {}
+
+# Archivos de secretos que lee Streamlit, en el mismo orden de prioridad
+SECRETS_PATHS = (
+    os.path.join(os.path.expanduser("~"), ".streamlit", "secrets.toml"),
+    os.path.join(os.getcwd(), ".streamlit", "secrets.toml"),
+)
+
+
+def set_message_handler(handler: Optional[Callable[[str, str], None]]) -> None:
+    """Envía los mensajes del pipeline a handler(nivel, mensaje) en lugar de Streamlit.
+
+    Con un manejador instalado el proceso se considera sin interfaz:
+    session_flag retorna lo fijado con set_flag y read_secrets lee los
+    archivos .toml directamente.
+    """
+    global _handler
+    with _handler_lock:
+        _handler = handler
+
+
+def is_headless() -> bool:
+    """True si hay un manejador instalado (CLI, benchmarks)."""
+    return _handler is not None
+
+
+def _streamlit():
+    import streamlit
+    return streamlit
+
+
+class _MessageProxy:
+    """Objeto con la misma forma que el módulo streamlit para los mensajes.
+
+    Cualquier otro atributo (metric, session_state, ...) se resuelve en el
+    módulo streamlit real, así que solo debe usarse desde la interfaz.
+    """
+
+    def _emit(self, level: str, message, *args, **kwargs):
+        handler = _handler
+        if handler is not None:
+            handler(level, str(message))
+            return None
+        return getattr(_streamlit(), level)(message, *args, **kwargs)
+
+    def info(self, message, *args, **kwargs):
+        return self._emit('info', message, *args, **kwargs)
+
+    def success(self, message, *args, **kwargs):
+        return self._emit('success', message, *args, **kwargs)
+
+    def warning(self, message, *args, **kwargs):
+        return self._emit('warning', message, *args, **kwargs)
+
+    def error(self, message, *args, **kwargs):
+        return self._emit('error', message, *args, **kwargs)
+
+    def __getattr__(self, name):
+        return getattr(_streamlit(), name)
+
+
+st = _MessageProxy()
+
+
+def set_flag(name: str, value) -> None:
+    """Fija un interruptor de sesión para la ejecución sin interfaz (p. ej. disable_elevenlabs)."""
+    _flags[name] = value
+
+
+def session_flag(name: str, default=False):
+    """Valor de st.session_state (interruptores de la barra lateral) o de set_flag sin interfaz."""
+    if is_headless():
+        return _flags.get(name, default)
+    try:
+        return _streamlit().session_state.get(name, default)
+    except Exception:
+        return default
+
+
+def read_secrets(section: str) -> dict:
+    """Sección de .streamlit/secrets.toml.
+
+    En la app usa st.secrets; sin interfaz lee los mismos archivos con
+    tomllib (Python 3.11+) o el paquete toml, sin importar Streamlit.
+    """
+    if not is_headless():
+        try:
+            return dict(_streamlit().secrets.get(section, {}))
+        except Exception:
+            return {}
+
+    try:
+        import tomllib
+
+        def _load(path):
+            with open(path, 'rb') as f:
+                return tomllib.load(f)
+    except ImportError:
+        try:
+            import toml
+        except ImportError:
+            return {}
+
+        def _load(path):
+            return toml.load(path)
+
+    merged = {}
+    for path in SECRETS_PATHS:
+        if os.path.isfile(path):
+            try:
+                merged.update(_load(path).get(section, {}))
+            except Exception as e:
+                print(f"⚠️ No se pudo leer {path}: {e}", file=sys.stderr)
+    return merged
@@ -0,0 +1,140 @@
+"""
+Detección de voz (VAD por energía) para AudioPro v1.7
+
+Ubica los tramos de voz del WAV extraído para que Audio Isolation reciba
+solo esos tramos (con margen) y no los silencios largos de las clases:
+preparación, pausas, pantallas sin narración. La energía se calcula por
+tramas de 20 ms sobre el PCM mapeado en memoria, bloque a bloque; el umbral
+se adapta al piso de ruido de cada archivo.
+"""
+
+import os
+from typing import List, Optional
+
+import numpy as np
+
+from isolation_chunks import Segment, read_pcm16
+
+# Recortar silencios antes de Audio Isolation ("0" envía siempre el archivo completo)
+VAD_ENABLED = os.getenv("ISOLATION_VAD", "1") == "1"
+# Solo se recortan silencios de al menos esta duración (las pausas entre frases se conservan)
+VAD_MIN_SILENCE_S = float(os.getenv("VAD_MIN_SILENCE_S", "2.0"))
+# Margen que se conserva antes y después de cada tramo de voz
+VAD_PAD_S = float(os.getenv("VAD_PAD_S", "0.5"))
+# Umbral: dB por encima del piso de ruido del archivo (percentil 10 de las tramas)
+VAD_MARGIN_DB = float(os.getenv("VAD_MARGIN_DB", "12"))
+# Fracción mínima de silencio para que valga la pena recortar
+VAD_MIN_SAVINGS = float(os.getenv("VAD_MIN_SAVINGS", "0.05"))
+
+FRAME_S = 0.02
+# Lo que está por debajo de esto es silencio siempre; el umbral nunca queda
+# a menos de SPEECH_HEADROOM_DB del nivel de la voz (percentil 90)
+SILENCE_FLOOR_DB = -70.0
+SPEECH_HEADROOM_DB = 20.0
+_BLOCK_FRAMES = 500
+
+
+def vad_signature() -> str:
+    """Parámetros del VAD que cambian el resultado (van en la clave de caché de Audio Isolation)."""
+    return f"energy:{VAD_MIN_SILENCE_S:g}/{VAD_PAD_S:g}/{VAD_MARGIN_DB:g}"
+
+
+def frame_levels(pcm: np.ndarray, frame_length: int) -> np.ndarray:
+    """Nivel RMS en dBFS de cada trama completa, leyendo el PCM por bloques."""
+    frames = pcm.shape[0] // frame_length
+    levels = np.empty(frames, dtype=np.float32)
+    for first in range(0, frames, _BLOCK_FRAMES):
+        count = min(_BLOCK_FRAMES, frames - first)
+        block = np.asarray(pcm[first * frame_length:first * frame_length + count * frame_length], dtype=np.float32)
+        if block.ndim > 1:
+            block = block.mean(axis=1)
+        power = np.mean((block.reshape(count, frame_length) / 32768.0) ** 2, axis=1)
+        levels[first:first + count] = 10.0 * np.log10(np.maximum(power, 1e-12))
+    return levels
+
+
+def _runs(mask: np.ndarray):
+    """(inicios, fines) de las corridas True de una máscara booleana."""
+    edges = np.diff(np.concatenate(([0], mask.astype(np.int8), [0])))
+    return np.flatnonzero(edges == 1), np.flatnonzero(edges == -1)
+
+
+def detect_speech_regions(audio_file: str, min_silence_s: float = VAD_MIN_SILENCE_S,
+                          pad_s: float = VAD_PAD_S, margin_db: float = VAD_MARGIN_DB) -> List[Segment]:
+    """Tramos con voz (en frames de audio) de un WAV PCM 16-bit.
+
+    Las tramas por encima del umbral son voz; los huecos más cortos que
+    min_silence_s se rellenan, cada tramo se extiende pad_s hacia ambos
+    lados y los que quedan solapados se unen.
+
+    Args:
+        audio_file: WAV PCM 16-bit
+        min_silence_s: Silencio mínimo que se recorta
+        pad_s: Margen alrededor de cada tramo de voz
+        margin_db: dB sobre el piso de ruido para considerar voz
+
+    Returns:
+        Lista ordenada de (inicio, fin) en frames; vacía si no hay voz
+    """
+    pcm, info = read_pcm16(audio_file)
+    total = pcm.shape[0]
+    frame_length = max(1, int(round(FRAME_S * info['sample_rate'])))
+    levels = frame_levels(pcm, frame_length)
+    if not len(levels):
+        return [(0, total)] if total else []
+
+    floor, loud = np.percentile(levels, [10, 90])
+    threshold = max(min(floor + margin_db, loud - SPEECH_HEADROOM_DB), SILENCE_FLOOR_DB)
+    speech = levels > threshold
+
+    # Rellenar los silencios cortos (pausas entre frases) antes de aplicar el margen
+    gaps_start, gaps_end = _runs(~speech)
+    short = (gaps_end - gaps_start) < int(min_silence_s / FRAME_S)
+    fill = np.zeros(len(speech) + 1, dtype=np.int32)
+    np.add.at(fill, gaps_start[short], 1)
+    np.add.at(fill, gaps_end[short], -1)
+    speech |= np.cumsum(fill[:-1]) > 0
+
+    starts, ends = _runs(speech)
+    if not len(starts):
+        return []
+    pad = int(round(pad_s * info['sample_rate']))
+    starts = np.maximum(starts * frame_length - pad, 0)
+    ends = np.minimum(ends * frame_length + pad, total)
+    # La cola que no llena una trama sigue al último tramo si este llega al final
+    if ends[-1] >= len(levels) * frame_length:
+        ends[-1] = total
+
+    regions: List[Segment] = []
+    for start, end in zip(starts.tolist(), ends.tolist()):
+        if regions and start <= regions[-1][1]:
+            regions[-1] = (regions[-1][0], max(regions[-1][1], end))
+        else:
+            regions.append((start, end))
+    return regions
+
+
+def plan_speech_upload(audio_file: str) -> Optional[List[Segment]]:
+    """Tramos a enviar a Audio Isolation, o None si conviene enviar el archivo completo.
+
+    Retorna None si el VAD está desactivado, el WAV no es PCM 16-bit, no se
+    detectó voz o el silencio recortable es menor que VAD_MIN_SAVINGS.
+    """
+    if not VAD_ENABLED:
+        return None
+    try:
+        pcm, _ = read_pcm16(audio_file)
+    except ValueError:
+        return None
+    total = pcm.shape[0]
+    del pcm
+    if not total:
+        return None
+    regions = detect_speech_regions(audio_file)
+    if not regions:
+        # Sin voz detectable (p. ej. silencio digital): no hay nada que ahorrar con seguridad
+        return None
+    kept = sum(end - start for start, end in regions)
+    if 1.0 - kept / total < VAD_MIN_SAVINGS:
+        return None
+    return regions
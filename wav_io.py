@@ -0,0 +1,175 @@
+"""
+Lectura de cabeceras WAV (RIFF) en Python puro para AudioPro v1.7
+Permite inspeccionar y recorrer el PCM sin lanzar ffmpeg
+"""
+
+import io
+import os
+import struct
+from typing import BinaryIO, Iterator, Optional
+
+# Códigos de formato WAVE
+WAVE_FORMAT_PCM = 0x0001
+WAVE_FORMAT_IEEE_FLOAT = 0x0003
+WAVE_FORMAT_EXTENSIBLE = 0xFFFE
+
+
+def parse_wav_header(path: str) -> Optional[dict]:
+    """Lee los chunks 'fmt ' y 'data' de un archivo WAV.
+
+    Args:
+        path: Ruta al archivo WAV
+
+    Returns:
+        Dict con 'format_tag', 'channels', 'sample_rate', 'bits_per_sample',
+        'block_align', 'data_offset', 'data_size', 'riff_size' y 'file_size',
+        o None si el archivo no es un WAV RIFF válido
+    """
+    try:
+        file_size = os.path.getsize(path)
+        with open(path, 'rb') as f:
+            return _parse_wav_stream(f, file_size)
+    except (OSError, struct.error):
+        return None
+
+
+def parse_wav_header_bytes(head: bytes, file_size: Optional[int] = None) -> Optional[dict]:
+    """Lee los chunks 'fmt ' y 'data' desde los primeros bytes de un flujo WAV.
+
+    Sirve para decidir el formato de un audio que llega por red o por pipe
+    antes de tenerlo completo en disco.
+
+    Args:
+        head: Primeros bytes del flujo (deben incluir la cabecera del data chunk)
+        file_size: Tamaño total si se conoce
+
+    Returns:
+        Mismo dict que parse_wav_header, o None si los bytes no alcanzan o no es WAV
+    """
+    try:
+        info = _parse_wav_stream(io.BytesIO(head), file_size)
+    except struct.error:
+        return None
+    if info and info['data_offset'] > len(head):
+        return None
+    return info
+
+
+def _parse_wav_stream(f: BinaryIO, file_size: Optional[int]) -> Optional[dict]:
+    header = f.read(12)
+    if len(header) < 12 or header[:4] != b'RIFF' or header[8:12] != b'WAVE':
+        return None
+
+    info = {
+        'riff_size': struct.unpack('<I', header[4:8])[0],
+        'file_size': file_size,
+        'format_tag': None,
+        'data_offset': None,
+        'data_size': None
+    }
+
+    while True:
+        chunk = f.read(8)
+        if len(chunk) < 8:
+            break
+        chunk_id, chunk_size = chunk[:4], struct.unpack('<I', chunk[4:8])[0]
+        chunk_start = f.tell()
+
+        if chunk_id == b'fmt ':
+            fmt = f.read(min(chunk_size, 40))
+            if len(fmt) < 16:
+                return None
+            format_tag, channels, sample_rate, _, block_align, bits = struct.unpack('<HHIIHH', fmt[:16])
+            if format_tag == WAVE_FORMAT_EXTENSIBLE and len(fmt) >= 26:
+                # El subformato está en los 2 primeros bytes del GUID
+                format_tag = struct.unpack('<H', fmt[24:26])[0]
+            info.update({
+                'format_tag': format_tag,
+                'channels': channels,
+                'sample_rate': sample_rate,
+                'bits_per_sample': bits,
+                'block_align': block_align
+            })
+        elif chunk_id == b'data':
+            info['data_offset'] = chunk_start
+            info['data_size'] = chunk_size
+            # El data chunk suele ser el último; no hace falta recorrer el PCM
+            if info['format_tag'] is not None:
+                break
+
+        # Los chunks se alinean a 2 bytes
+        f.seek(chunk_start + chunk_size + (chunk_size & 1))
+
+    if info['format_tag'] is None or info['data_offset'] is None:
+        return None
+    return info
+
+
+def is_wav_complete(path: str) -> bool:
+    """Verifica que los tamaños RIFF/data de un WAV sean coherentes con el archivo.
+
+    Mientras un programa escribe un WAV, la cabecera suele tener tamaños en 0
+    (o provisionales) que solo se corrigen al cerrar el archivo.
+
+    Args:
+        path: Ruta al archivo WAV
+
+    Returns:
+        True si la cabecera describe exactamente los datos presentes
+    """
+    info = parse_wav_header(path)
+    if not info or not info['data_size']:
+        return False
+    if info['riff_size'] + 8 != info['file_size']:
+        return False
+    return info['data_offset'] + info['data_size'] <= info['file_size']
+
+
+def iter_pcm_chunks(path: str, chunk_bytes: int = 1024 * 1024, info: Optional[dict] = None) -> Iterator[bytes]:
+    """Recorre el PCM del data chunk por bloques, sin cabecera ni metadata.
+
+    Args:
+        path: Ruta al archivo WAV
+        chunk_bytes: Tamaño de cada bloque
+        info: Cabecera ya leída con parse_wav_header (opcional)
+
+    Yields:
+        Bloques de bytes PCM
+    """
+    info = info or parse_wav_header(path)
+    if not info:
+        raise ValueError(f"No es un WAV válido: {path}")
+
+    remaining = min(info['data_size'], info['file_size'] - info['data_offset'])
+    with open(path, 'rb') as f:
+        f.seek(info['data_offset'])
+        while remaining > 0:
+            block = f.read(min(chunk_bytes, remaining))
+            if not block:
+                break
+            remaining -= len(block)
+            yield block
+
+
+def wav_header_bytes(sample_rate: int, channels: int, bits_per_sample: int, data_size: int,
+                     format_tag: int = WAVE_FORMAT_PCM) -> bytes:
+    """Construye una cabecera WAV canónica de 44 bytes.
+
+    Args:
+        sample_rate: Frecuencia de muestreo
+        channels: Número de canales
+        bits_per_sample: Bits por muestra
+        data_size: Tamaño del data chunk en bytes
+        format_tag: Código de formato (PCM por defecto)
+
+    Returns:
+        Bytes de la cabecera RIFF/fmt/data
+    """
+    block_align = channels * bits_per_sample // 8
+    return struct.pack(
+        '<4sI4s4sIHHIIHH4sI',
+        b'RIFF', 36 + data_size, b'WAVE',
+        b'fmt ', 16, format_tag, channels, sample_rate,
+        sample_rate * block_align, block_align, bits_per_sample,
+        b'data', data_size
+    )